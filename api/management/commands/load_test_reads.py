@@ -0,0 +1,255 @@
+"""
+Management command to load-test the high-traffic read endpoints against a running server.
+Run it once against a WSGI server and once against an ASGI server, then --compare the two.
+"""
+
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """Concurrent clients per endpoint; prints throughput and latency percentiles."""
+
+    help = (
+        'Load-test product search, stock snapshot, notification and sync read endpoints. '
+        'Example: serve with "gunicorn vessel_sales.wsgi -w 4 --threads 8", run with --label wsgi '
+        '--output wsgi.json; serve with "uvicorn vessel_sales.asgi:application --workers 4", run with '
+        '--label asgi --output asgi.json; then --compare wsgi.json asgi.json. '
+        'Start both servers with RATELIMIT_ENABLE=false - every client shares one IP'
+    )
+
+    SEARCH_TERMS = ['a', 'co', 'wat', 'ju', '1', 'ch']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='Server to test')
+        parser.add_argument('--username', help='Operations user to log in as')
+        parser.add_argument('--password', help='Password for --username')
+        parser.add_argument('--vessel-id', type=int, help='Vessel the search, stock and sync requests use')
+        parser.add_argument('--clients', type=int, default=200, help='Concurrent clients (default: 200)')
+        parser.add_argument('--requests', type=int, default=20, help='Requests per client per endpoint (default: 20)')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Per-request timeout in seconds')
+        parser.add_argument(
+            '--endpoints',
+            help='Comma-separated subset of: product_search, stock_snapshot, notifications, sync_pull, sync_list'
+        )
+        parser.add_argument('--label', default='run', help='Name of this run in the output (e.g. wsgi, asgi)')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument(
+            '--compare',
+            nargs=2,
+            metavar=('BASELINE', 'CANDIDATE'),
+            help='Compare two --output files instead of running a test'
+        )
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            self._compare(*options['compare'])
+            return
+
+        try:
+            import requests
+        except ImportError:
+            raise CommandError('The requests package is required to run a load test')
+
+        for required in ('username', 'password', 'vessel_id'):
+            if not options[required]:
+                raise CommandError(f'--{required.replace("_", "-")} is required')
+        if options['clients'] < 1 or options['requests'] < 1:
+            raise CommandError('--clients and --requests must be positive')
+
+        base_url = options['base_url'].rstrip('/')
+        credentials = self._login(requests, base_url, options['username'], options['password'])
+        endpoints = self._endpoints(options['vessel_id'])
+        if options['endpoints']:
+            wanted = [name.strip() for name in options['endpoints'].split(',')]
+            unknown = set(wanted) - set(endpoints)
+            if unknown:
+                raise CommandError(f'Unknown endpoints: {", ".join(sorted(unknown))}')
+            endpoints = {name: endpoints[name] for name in wanted}
+
+        self.stdout.write(
+            f"{options['label']}: {options['clients']} clients x {options['requests']} requests "
+            f"per endpoint against {base_url}"
+        )
+        results = {}
+        for name, endpoint in endpoints.items():
+            results[name] = self._run_endpoint(
+                requests, base_url, credentials, endpoint,
+                options['clients'], options['requests'], options['timeout']
+            )
+            self.stdout.write(self._format_row(name, results[name]))
+            if 'HTTP 429' in results[name]['errors']:
+                self.stdout.write(self.style.WARNING(
+                    '  Rate limited - restart the server with RATELIMIT_ENABLE=false for a meaningful run'
+                ))
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump({
+                    'label': options['label'],
+                    'base_url': base_url,
+                    'clients': options['clients'],
+                    'requests_per_client': options['requests'],
+                    'results': results,
+                }, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    # ------------------------------------------------------------------
+    # Setup
+    # ------------------------------------------------------------------
+
+    def _login(self, requests, base_url, username, password):
+        """Session cookie + CSRF token for the frontend endpoints, JWT for the API"""
+        session = requests.Session()
+        session.get(f'{base_url}/login/')
+        csrf_token = session.cookies.get('csrftoken')
+        if not csrf_token:
+            raise CommandError('No CSRF cookie from /login/ - is the server running?')
+        session.post(
+            f'{base_url}/login/',
+            data={'username': username, 'password': password, 'csrfmiddlewaretoken': csrf_token},
+            headers={'Referer': f'{base_url}/login/'},
+            allow_redirects=False
+        )
+        if 'sessionid' not in session.cookies:
+            raise CommandError('Login failed - check --username and --password')
+
+        token_response = requests.post(
+            f'{base_url}/api/v1/auth/login/', json={'username': username, 'password': password}
+        )
+        if token_response.status_code != 200:
+            raise CommandError(f'JWT login failed: HTTP {token_response.status_code}')
+
+        return {
+            'cookies': session.cookies.get_dict(),
+            'csrf_token': session.cookies.get('csrftoken'),
+            'access_token': token_response.json()['access'],
+        }
+
+    def _endpoints(self, vessel_id):
+        terms = self.SEARCH_TERMS
+        return {
+            'product_search': {
+                'method': 'POST', 'path': '/sales/search-products/', 'auth': 'session',
+                'bodies': [{'search': term, 'vessel_id': vessel_id} for term in terms],
+            },
+            'stock_snapshot': {
+                'method': 'GET', 'path': f'/inventory/product-index/{vessel_id}/', 'auth': 'session',
+            },
+            'notifications': {
+                'method': 'GET', 'path': '/transfer-workflow/notifications/summary/', 'auth': 'session',
+            },
+            'sync_pull': {
+                'method': 'GET', 'path': f'/api/v1/sync/pull/?vessel_id={vessel_id}', 'auth': 'jwt',
+            },
+            # DRF viewset (always sync) - the baseline for sync_pull on the same server
+            'sync_list': {
+                'method': 'GET', 'path': f'/api/v1/sync/?vessel_id={vessel_id}', 'auth': 'jwt',
+            },
+        }
+
+    # ------------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------------
+
+    def _run_endpoint(self, requests, base_url, credentials, endpoint, clients, per_client, timeout):
+        latencies = []
+        errors = {}
+        lock = threading.Lock()
+        start_gate = threading.Barrier(clients)
+
+        def client(_):
+            http = requests.Session()
+            http.cookies.update(credentials['cookies'])
+            headers = {'X-Requested-With': 'XMLHttpRequest'}
+            if endpoint['auth'] == 'jwt':
+                headers['Authorization'] = f"Bearer {credentials['access_token']}"
+            elif endpoint['method'] == 'POST':
+                headers['X-CSRFToken'] = credentials['csrf_token']
+                headers['Referer'] = f'{base_url}/'
+            bodies = cycle(endpoint.get('bodies') or [None])
+
+            local_latencies, local_errors = [], {}
+            start_gate.wait()
+            for _ in range(per_client):
+                started = time.perf_counter()
+                try:
+                    response = http.request(
+                        endpoint['method'], f"{base_url}{endpoint['path']}",
+                        json=next(bodies), headers=headers, timeout=timeout
+                    )
+                    outcome = None if response.status_code < 400 else f'HTTP {response.status_code}'
+                except requests.RequestException as e:
+                    outcome = type(e).__name__
+                local_latencies.append(time.perf_counter() - started)
+                if outcome:
+                    local_errors[outcome] = local_errors.get(outcome, 0) + 1
+            with lock:
+                latencies.extend(local_latencies)
+                for outcome, count in local_errors.items():
+                    errors[outcome] = errors.get(outcome, 0) + count
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            list(pool.map(client, range(clients)))
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'seconds': round(elapsed, 3),
+            'rps': round(len(latencies) / elapsed, 1) if elapsed else 0,
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 1) if latencies else None,
+            'p50_ms': self._percentile(latencies, 50),
+            'p95_ms': self._percentile(latencies, 95),
+            'p99_ms': self._percentile(latencies, 99),
+        }
+
+    @staticmethod
+    def _percentile(ordered, percent):
+        if not ordered:
+            return None
+        index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+        return round(ordered[index] * 1000, 1)
+
+    # ------------------------------------------------------------------
+    # Reporting
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _format_row(name, result):
+        error_count = sum(result['errors'].values())
+        return (
+            f"  {name:<15} {result['rps']:>8} req/s  p50 {result['p50_ms']:>7} ms  "
+            f"p95 {result['p95_ms']:>7} ms  p99 {result['p99_ms']:>7} ms  errors {error_count}"
+        )
+
+    def _compare(self, baseline_path, candidate_path):
+        try:
+            with open(baseline_path) as f:
+                baseline = json.load(f)
+            with open(candidate_path) as f:
+                candidate = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read results: {e}')
+
+        self.stdout.write(
+            f"{'endpoint':<15} {'metric':<7} {baseline['label']:>10} {candidate['label']:>10} {'change':>8}"
+        )
+        for name, before in baseline['results'].items():
+            after = candidate['results'].get(name)
+            if after is None:
+                continue
+            for metric in ('rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+                old, new = before[metric], after[metric]
+                change = f'{(new - old) / old * 100:+.0f}%' if old else '-'
+                self.stdout.write(f'{name:<15} {metric:<7} {old:>10} {new:>10} {change:>8}')
+            old_errors, new_errors = sum(before['errors'].values()), sum(after['errors'].values())
+            self.stdout.write(f"{name:<15} {'errors':<7} {old_errors:>10} {new_errors:>10}")
@@ -0,0 +1,105 @@
+"""
+Management command to tail the transaction / inventory event change feed as JSON lines.
+"""
+
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from vessels.models import Vessel
+from frontend.utils.change_feed import ChangeFeedHelper
+
+
+class Command(BaseCommand):
+    """Print new ledger rows as JSON lines, resuming from a saved cursor."""
+
+    help = (
+        'Tail the transaction or inventory event change feed as JSON lines on stdout, '
+        'resuming from a change feed sequence'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stream',
+            choices=list(ChangeFeedHelper.STREAMS),
+            default='transactions',
+            help='Stream to read (default: transactions)'
+        )
+        parser.add_argument(
+            '--cursor',
+            type=int,
+            default=0,
+            help='Start after this sequence (ignored when --cursor-file holds a cursor)'
+        )
+        parser.add_argument(
+            '--cursor-file',
+            type=str,
+            help='Read the starting cursor from this file and save it after every batch'
+        )
+        parser.add_argument(
+            '--vessel',
+            type=str,
+            help='Only rows of this vessel (by name)'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=ChangeFeedHelper.BATCH_SIZE,
+            help=f'Rows per batch (default: {ChangeFeedHelper.BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--follow',
+            action='store_true',
+            help='Keep polling for new rows instead of exiting when caught up'
+        )
+
+    def handle(self, *args, **options):
+        vessel_id = None
+        if options['vessel']:
+            vessel = Vessel.objects.filter(name=options['vessel']).first()
+            if not vessel:
+                raise CommandError(f'Vessel not found: {options["vessel"]}')
+            vessel_id = vessel.id
+
+        cursor = self._load_cursor(options['cursor_file'], options['cursor'])
+        self.stderr.write(f'📡 Tailing {options["stream"]} after sequence {cursor}')
+
+        emitted = 0
+        try:
+            while True:
+                rows, next_cursor, has_more = ChangeFeedHelper.wait(
+                    options['stream'], cursor=cursor, limit=options['limit'], vessel_id=vessel_id,
+                    timeout=ChangeFeedHelper.MAX_WAIT_SECONDS if options['follow'] else 0
+                )
+                if rows:
+                    self.stdout.write(ChangeFeedHelper.to_json_lines(rows), ending='')
+                    self.stdout.flush()
+                    emitted += len(rows)
+                if next_cursor != cursor:
+                    # Also advances past entries whose rows were deleted before they were read
+                    cursor = next_cursor
+                    self._save_cursor(options['cursor_file'], cursor)
+                if not has_more and not options['follow']:
+                    break
+                if not rows:
+                    time.sleep(ChangeFeedHelper.POLL_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+
+        self.stderr.write(self.style.SUCCESS(f'✅ {emitted} rows emitted, cursor {cursor}'))
+
+    def _load_cursor(self, path, default):
+        if path and os.path.exists(path):
+            with open(path) as f:
+                content = f.read().strip()
+            if not content.isdigit():
+                raise CommandError(f'Invalid cursor in {path}: {content!r}')
+            return int(content)
+        return default
+
+    def _save_cursor(self, path, cursor):
+        if path:
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'w') as f:
+                f.write(str(cursor))
+            os.replace(tmp_path, path)
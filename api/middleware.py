@@ -4,6 +4,7 @@ Security middleware for API rate limiting and security headers.
 
 import time
 from typing import Dict, Optional
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.core.cache import cache
 from django.conf import settings
@@ -313,4 +314,118 @@ class CompactResponseMiddleware(MiddlewareMixin):
     def process_request(self, request):
         """Check if compact response is requested."""
         request.compact_response = request.GET.get('compact', '').lower() == 'true'
-        return None
\ No newline at end of file
+        return None
+
+class MetricsMiddleware:
+    """
+    Record request latency and SQL timings in the in-process MetricsRegistry.
+    Placed first in MIDDLEWARE so the timing covers the whole stack.
+    Async-capable so an ASGI deployment keeps a fully async stack for async views.
+    """
+    
+    SQL_KINDS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE')
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        from frontend.utils.metrics import MetricsRegistry
+        
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        # Worker boot: drop a snapshot a dead worker left under this PID
+        MetricsRegistry.claim()
+    
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        
+        from django.db import connection
+        
+        started = time.perf_counter()
+        query_count = [0]
+        with connection.execute_wrapper(self._sql_timer(query_count)):
+            response = self.get_response(request)
+        self._record(request, response, started, query_count[0])
+        return response
+    
+    async def __acall__(self, request):
+        from asgiref.sync import sync_to_async
+        
+        started = time.perf_counter()
+        query_count = [0]
+        time_sql = self._sql_timer(query_count)
+        # Async ORM calls run on the request's thread-sensitive worker, so the wrapper goes on that thread's connection
+        await sync_to_async(self._wrappers_call)('append', time_sql)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(self._wrappers_call)('remove', time_sql)
+        self._record(request, response, started, query_count[0])
+        return response
+    
+    @staticmethod
+    def _wrappers_call(method, time_sql):
+        from django.db import connection
+        
+        getattr(connection.execute_wrappers, method)(time_sql)
+    
+    def _sql_timer(self, query_count):
+        from frontend.utils.metrics import MetricsRegistry
+        
+        def time_sql(execute, sql, params, many, context):
+            sql_started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                kind = sql.lstrip()[:6].upper()
+                kind = kind if kind in self.SQL_KINDS else 'OTHER'
+                query_count[0] += 1
+                MetricsRegistry.inc('db_queries_total', (('kind', kind),))
+                MetricsRegistry.observe('db_query_duration_seconds', (('kind', kind),), time.perf_counter() - sql_started)
+        
+        return time_sql
+    
+    def _record(self, request, response, started, query_count):
+        from frontend.utils.metrics import MetricsRegistry
+        
+        # View names keep label cardinality bounded (raw paths carry ids)
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unmatched'
+        MetricsRegistry.inc('http_requests_total', (
+            ('view', view), ('method', request.method), ('status', f'{response.status_code // 100}xx')
+        ))
+        MetricsRegistry.observe('http_request_duration_seconds', (('view', view),), time.perf_counter() - started)
+        MetricsRegistry.observe('db_queries_per_request', (('view', view),), query_count)
+        MetricsRegistry.flush()
+
+
+class CacheInvalidationMiddleware:
+    """
+    Open a CacheInvalidationCollector request scope: invalidations issued outside
+    a DB transaction are merged and run once when the response is ready
+    (those issued inside one already wait for its commit).
+    
+    Under an async stack the scope is not opened: it is thread-local, and sync code
+    of the request runs on a different thread than this middleware. Invalidations
+    inside transactions still coalesce per commit; others run immediately.
+    """
+    
+    sync_capable = True
+    async_capable = True
+    
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+    
+    def __call__(self, request):
+        if self.async_mode:
+            return self.get_response(request)
+        
+        from frontend.utils.cache_invalidation import CacheInvalidationCollector
+        
+        with CacheInvalidationCollector.request_scope():
+            return self.get_response(request)
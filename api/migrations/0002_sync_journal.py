@@ -0,0 +1,49 @@
+# Generated by Django 5.2.1 on 2026-10-18 21:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_create_webhook_models'),
+        ('transactions', '0023_transaction_cogs_total'),
+        ('vessels', '0003_add_database_integrity_constraints_fixed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OfflineSaleReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('client_id', models.CharField(help_text='Client-generated sale id (UUID)', max_length=64, unique=True)),
+                ('device_id', models.CharField(blank=True, max_length=100)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('transaction', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='transactions.transaction')),
+                ('vessel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='vessels.vessel')),
+            ],
+            options={
+                'db_table': 'api_offline_sale_receipt',
+                'ordering': ['-received_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='SyncChange',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(choices=[('PRODUCT', 'Product state (catalog, vessel price, stock)'), ('ASSIGNMENT', 'Vessel user assignment'), ('RESET', 'Full resync required')], max_length=12)),
+                ('vessel_id', models.IntegerField(blank=True, null=True)),
+                ('entity_id', models.IntegerField(blank=True, null=True)),
+                ('changed_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'api_sync_change',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['vessel_id', 'id'], name='sync_change_vessel_idx'), models.Index(fields=['changed_at'], name='sync_change_changed_at_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.1 on 2026-10-18 23:40
+
+from django.db import migrations, models
+
+
+def backfill_outbox(apps, schema_editor):
+    """Publish existing rows in id order (they are all committed) and seed the stream counters"""
+    ChangeFeedEntry = apps.get_model('api', 'ChangeFeedEntry')
+    ChangeFeedSequence = apps.get_model('api', 'ChangeFeedSequence')
+    sources = {
+        'transactions': apps.get_model('transactions', 'Transaction'),
+        'events': apps.get_model('transactions', 'InventoryEvent'),
+    }
+
+    for stream, model in sources.items():
+        sequence = 0
+        batch = []
+        for object_id, vessel_id in model.objects.order_by('id').values_list('id', 'vessel_id').iterator(chunk_size=5000):
+            sequence += 1
+            batch.append(ChangeFeedEntry(stream=stream, object_id=object_id, vessel_id=vessel_id, sequence=sequence))
+            if len(batch) >= 5000:
+                ChangeFeedEntry.objects.bulk_create(batch)
+                batch = []
+        ChangeFeedEntry.objects.bulk_create(batch)
+        ChangeFeedSequence.objects.create(stream=stream, last_sequence=sequence)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_sync_journal'),
+        ('transactions', '0024_stock_reservations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeFeedEntry',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('stream', models.CharField(choices=[('transactions', 'Transactions'), ('events', 'Inventory events')], max_length=12)),
+                ('object_id', models.BigIntegerField()),
+                ('vessel_id', models.IntegerField()),
+                ('sequence', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'api_change_feed_entry',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['stream', 'vessel_id', 'sequence'], name='change_feed_vessel_seq_idx'), models.Index(fields=['created_at'], name='change_feed_created_at_idx')],
+                'constraints': [models.UniqueConstraint(fields=('stream', 'sequence'), name='change_feed_stream_seq_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ChangeFeedSequence',
+            fields=[
+                ('stream', models.CharField(choices=[('transactions', 'Transactions'), ('events', 'Inventory events')], max_length=12, primary_key=True, serialize=False)),
+                ('last_sequence', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'api_change_feed_sequence',
+            },
+        ),
+        migrations.RunPython(backfill_outbox, migrations.RunPython.noop),
+    ]
@@ -86,4 +86,105 @@ class WebhookDelivery(models.Model):
         ]
         
     def __str__(self):
-        return f"{self.endpoint.name} - {self.event_type} - {self.status}"
\ No newline at end of file
+        return f"{self.endpoint.name} - {self.event_type} - {self.status}"
+
+class SyncChange(models.Model):
+    """
+    Append-only change journal for offline vessel clients.
+    The auto-increment id is the monotonic change token handed to /api/v1/sync/.
+    """
+    ENTITY_CHOICES = [
+        ('PRODUCT', 'Product state (catalog, vessel price, stock)'),
+        ('ASSIGNMENT', 'Vessel user assignment'),
+        ('RESET', 'Full resync required'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    entity = models.CharField(max_length=12, choices=ENTITY_CHOICES)
+    # Plain ids: the journal must outlive deleted rows. NULL vessel = every vessel
+    vessel_id = models.IntegerField(null=True, blank=True)
+    entity_id = models.IntegerField(null=True, blank=True)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'api_sync_change'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['vessel_id', 'id'], name='sync_change_vessel_idx'),
+            models.Index(fields=['changed_at'], name='sync_change_changed_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.entity} {self.entity_id} (vessel {self.vessel_id or 'all'})"
+
+
+class OfflineSaleReceipt(models.Model):
+    """
+    Idempotency record for sales queued offline and replayed through /api/v1/sync/sales/.
+    One row per client-generated sale id; replays of the same id return the original result.
+    """
+    client_id = models.CharField(max_length=64, unique=True, help_text="Client-generated sale id (UUID)")
+    device_id = models.CharField(max_length=100, blank=True)
+    vessel = models.ForeignKey('vessels.Vessel', on_delete=models.CASCADE, related_name='+')
+    transaction = models.ForeignKey(
+        'transactions.Transaction', on_delete=models.SET_NULL, null=True, blank=True, related_name='+'
+    )
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'api_offline_sale_receipt'
+        ordering = ['-received_at']
+
+    def __str__(self):
+        return f"{self.client_id} → {self.transaction_id}"
+
+
+class ChangeFeedEntry(models.Model):
+    """
+    Outbox for the /api/v1/changes/ feed: one row per inserted Transaction or
+    InventoryEvent, written in the inserting database transaction.
+    The sequence is assigned after commit by ChangeFeedHelper, in commit order,
+    and is the cursor handed to feed consumers.
+    """
+    STREAM_CHOICES = [
+        ('transactions', 'Transactions'),
+        ('events', 'Inventory events'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    stream = models.CharField(max_length=12, choices=STREAM_CHOICES)
+    # Plain ids: entries outlive deleted and archived rows
+    object_id = models.BigIntegerField()
+    vessel_id = models.IntegerField()
+    sequence = models.BigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'api_change_feed_entry'
+        ordering = ['id']
+        constraints = [
+            models.UniqueConstraint(fields=['stream', 'sequence'], name='change_feed_stream_seq_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['stream', 'vessel_id', 'sequence'], name='change_feed_vessel_seq_idx'),
+            models.Index(fields=['created_at'], name='change_feed_created_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.stream} #{self.sequence or '-'}: {self.object_id} (vessel {self.vessel_id})"
+
+
+class ChangeFeedSequence(models.Model):
+    """
+    Last sequence handed out per change feed stream.
+    Its row lock serializes sequence assignment.
+    """
+    stream = models.CharField(max_length=12, primary_key=True, choices=ChangeFeedEntry.STREAM_CHOICES)
+    last_sequence = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = 'api_change_feed_sequence'
+
+    def __str__(self):
+        return f"{self.stream}: {self.last_sequence}"
@@ -4,7 +4,10 @@ Handles product data serialization with dynamic pricing and category management.
 """
 
 from rest_framework import serializers
+from rest_framework.exceptions import PermissionDenied
 from products.models import Product, Category
+from frontend.utils.cache_helpers import VesselCacheHelper, VesselPricingCacheHelper
+from vessel_management.utils import VesselAccessHelper
 from decimal import Decimal
 
 
@@ -229,12 +232,29 @@ class ProductPricingSerializer(serializers.ModelSerializer):
     
     def get_effective_price(self, obj):
         """Calculate effective price based on context (vessel, quantity, etc.)."""
-        request = self.context.get('request')
-        
-        # Default to selling price
-        price = obj.selling_price
+        vessel = self._get_context_vessel()
+        if vessel is None:
+            # Default to selling price
+            return obj.selling_price
         
-        # For duty-free products, we might implement special pricing logic here
-        # Currently just return the selling price
-        
-        return price
\ No newline at end of file
+        # Custom vessel price (duty-free rules applied) from the cached per-vessel price table
+        price, _ = VesselPricingCacheHelper.get_price_map(vessel).get(obj.id, (obj.selling_price, False))
+        return price
+    
+    def _get_context_vessel(self):
+        """Vessel from serializer context or ?vessel_id=, resolved once per serializer"""
+        if not hasattr(self, '_context_vessel'):
+            vessel = self.context.get('vessel')
+            request = self.context.get('request')
+            if vessel is None and request is not None:
+                vessel_id = request.query_params.get('vessel_id')
+                if vessel_id and str(vessel_id).isdigit():
+                    vessel = next(
+                        (v for v in VesselCacheHelper.get_all_vessels_basic_data() if v.id == int(vessel_id)),
+                        None
+                    )
+                # Validate user has access to this vessel
+                if vessel is not None and not VesselAccessHelper.can_user_access_vessel(request.user, vessel):
+                    raise PermissionDenied(f"User {request.user.username} does not have access to vessel {vessel.name}")
+            self._context_vessel = vessel
+        return self._context_vessel
\ No newline at end of file
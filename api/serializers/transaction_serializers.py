@@ -44,8 +44,9 @@ class FIFOConsumptionSerializer(serializers.ModelSerializer):
     
     # Related object names
     transaction_type = serializers.CharField(source='transaction.transaction_type', read_only=True)
-    vessel_name = serializers.CharField(source='inventory_lot.vessel.name', read_only=True)
-    product_name = serializers.CharField(source='inventory_lot.product.name', read_only=True)
+    # Via the transaction: the consumed lot may have moved to InventoryLotArchive
+    vessel_name = serializers.CharField(source='transaction.vessel.name', read_only=True)
+    product_name = serializers.CharField(source='transaction.product.name', read_only=True)
     
     class Meta:
         model = FIFOConsumption
@@ -86,13 +87,10 @@ class TransactionSerializer(serializers.ModelSerializer):
     def get_profit_margin(self, obj):
         """Calculate profit margin for sales."""
         if obj.transaction_type == 'SALE':
-            # Get average cost from FIFO consumption
-            from django.db.models import Sum, F
-            total_cost = obj.fifo_consumptions.aggregate(
-                total=Sum(F('consumed_quantity') * F('unit_cost'))
-            )
-            if total_cost and total_cost['total'] and obj.quantity > 0:
-                avg_cost = total_cost['total'] / obj.quantity
+            # Stored FIFO COGS (falls back to prefetched FIFO consumption for older rows)
+            total_cost = obj.cogs
+            if total_cost and obj.quantity > 0:
+                avg_cost = total_cost / obj.quantity
                 profit = obj.unit_price - avg_cost
                 return (profit / obj.unit_price) * 100 if obj.unit_price > 0 else 0
         return None
@@ -7,8 +7,9 @@ from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.contrib.auth.models import User, Group
 from django.urls import reverse
-from django.test import override_settings
+from django.test import override_settings, SimpleTestCase, TestCase
 from decimal import Decimal
+from datetime import date
 import json
 
 from vessels.models import Vessel
@@ -16,6 +17,8 @@ from products.models import Product, Category
 from transactions.models import Transaction, InventoryLot
 
 
+# Metrics snapshot files stay off in tests; MetricsEndpointTests points them at a temp dir
+@override_settings(METRICS_DIR='')
 class APITestSetup(APITestCase):
     """Base test class with common setup for API tests."""
     
@@ -188,6 +191,24 @@ class ProductAPITests(APITestSetup):
         response = self.client.get(f'/api/v1/products/{self.product.id}/pricing/')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn('effective_price', response.data)
+    
+    def test_product_pricing_checks_vessel_access(self):
+        """Test ?vessel_id= pricing is refused for vessels the user is not assigned to"""
+        from vessel_management.models import UserVesselAssignment
+        
+        InventoryLot.objects.create(
+            vessel=self.vessel, product=self.product, purchase_date=date.today(),
+            purchase_price=Decimal('10.00'), original_quantity=5, remaining_quantity=5
+        )
+        self.authenticate_regular()
+        url = f'/api/v1/products/{self.product.id}/pricing/'
+        response = self.client.get(url, {'vessel_id': self.vessel.id})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        
+        UserVesselAssignment.objects.create(user=self.regular_user, vessel=self.vessel, assigned_by=self.admin_user)
+        response = self.client.get(url, {'vessel_id': self.vessel.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('effective_price', response.data)
 
 
 class CategoryAPITests(APITestSetup):
@@ -423,6 +444,7 @@ class SecurityAPITests(APITestSetup):
         self.assertIn('X-RateLimit-Remaining', response.headers)
 
 
+@override_settings(METRICS_DIR='')
 class APISchemaTests(APITestCase):
     """Test API schema and documentation."""
     
@@ -457,4 +479,103 @@ class MobileAPITests(APITestSetup):
         """Test compact response format for mobile."""
         self.authenticate_admin()
         response = self.client.get('/api/v1/products/', {'compact': 'true'})
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+class StartupImportBudgetTests(SimpleTestCase):
+    """Test that booting the URLconf stays free of heavy export dependencies."""
+    
+    # Cumulative import time of the root URLconf after django.setup()
+    IMPORT_BUDGET_MS = 1000
+    
+    def test_urlconf_import_time_budget(self):
+        """Test exporter backends stay lazy and URLconf import stays within budget."""
+        import os
+        import subprocess
+        import sys
+        from django.conf import settings
+        from frontend.utils.export_backends import ExportBackends
+        
+        script = f"import django; django.setup(); import {settings.ROOT_URLCONF}"
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', script],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE},
+        )
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        
+        cumulative = {}
+        for line in result.stderr.splitlines():
+            if line.startswith('import time:') and '|' in line:
+                _, total, name = line.split('|')
+                if total.strip().isdigit():
+                    cumulative[name.strip()] = int(total)
+        
+        loaded_heavy = sorted(
+            name for name in cumulative if name.split('.')[0] in ExportBackends.HEAVY_MODULES
+        )
+        self.assertEqual(loaded_heavy, [], 'Heavy export modules imported at startup')
+        self.assertLess(cumulative[settings.ROOT_URLCONF] / 1000, self.IMPORT_BUDGET_MS)
+
+
+class MetricsEndpointTests(TestCase):
+    """Test in-process cache metrics and the Prometheus endpoint."""
+    
+    def setUp(self):
+        import tempfile
+        from django.core.cache import cache
+        from frontend.utils.metrics import MetricsRegistry
+        
+        self.metrics_dir = tempfile.mkdtemp()
+        # Every read and write in the test uses the temp dir, never a real worker's snapshots
+        metrics_settings = override_settings(METRICS_DIR=self.metrics_dir)
+        metrics_settings.enable()
+        self.addCleanup(metrics_settings.disable)
+        cache.clear()
+        MetricsRegistry.reset()
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
+    
+    def test_metrics_endpoint_merges_workers(self):
+        """Test cache hits/misses per family and other workers' snapshots are exposed."""
+        import os
+        import subprocess
+        import sys
+        from django.core.cache import cache
+        from frontend.utils.cache_helpers import CachePerformanceTracker
+        
+        self.assertIsNone(cache.get('trip_mgmt_list_v1_all'))
+        cache.set('trip_mgmt_list_v1_all', [1, 2, 3])
+        self.assertEqual(cache.get('trip_mgmt_list_v1_all'), [1, 2, 3])
+        
+        stats = CachePerformanceTracker.get_performance_stats('trip')
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 50.0))
+        
+        # Snapshot of another live worker (the parent process stands in for it)
+        # and one left by a worker that has since exited
+        trip_hits = lambda count: json.dumps({'counters': [
+            ['cache_operations_total', [['family', 'trip'], ['operation', 'get'], ['result', 'hit']], count]
+        ], 'histograms': []})
+        with open(os.path.join(self.metrics_dir, f'{os.getppid()}.json'), 'w') as f:
+            f.write(trip_hits(4))
+        dead_pid = subprocess.run([sys.executable, '-c', 'import os; print(os.getpid())'],
+                                  capture_output=True, text=True).stdout.strip()
+        dead_snapshot = os.path.join(self.metrics_dir, f'{dead_pid}.json')
+        with open(dead_snapshot, 'w') as f:
+            f.write(trip_hits(100))
+        
+        self.client.get('/metrics')
+        response = self.client.get('/metrics')
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('cache_operations_total{family="trip",operation="get",result="hit"} 5', body)
+        self.assertIn('cache_operations_total{family="trip",operation="get",result="miss"} 1', body)
+        self.assertFalse(os.path.exists(dead_snapshot))
+        self.assertIn('http_request_duration_seconds_count{view="metrics"} 1', body)
+        self.assertIn('db_queries_per_request_bucket{view="metrics",le="1"} 1', body)
+        
+        forbidden = self.client.get('/metrics', REMOTE_ADDR='10.0.0.9')
+        self.assertEqual(forbidden.status_code, 403)
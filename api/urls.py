@@ -23,6 +23,8 @@ from .views.export_views import ExportViewSet, export_vessel_summary
 from .views.custom_reports_views import CustomReportsViewSet
 from .views.webhook_views import WebhookViewSet
 from .views.batch_operations_views import BatchOperationsViewSet
+from .views.sync_views import SyncViewSet, sync_pull
+from .views.change_feed_views import ChangeFeedViewSet
 
 # Create router for API endpoints
 router = DefaultRouter()
@@ -43,8 +45,13 @@ router.register(r'exports', ExportViewSet, basename='exports')
 router.register(r'custom-reports', CustomReportsViewSet, basename='custom-reports')
 router.register(r'webhooks', WebhookViewSet, basename='webhooks')
 router.register(r'batch-operations', BatchOperationsViewSet, basename='batch-operations')
+router.register(r'sync', SyncViewSet, basename='sync')
+router.register(r'changes', ChangeFeedViewSet, basename='changes')
 
 urlpatterns = [
+    # Async read path for offline clients (ahead of the router so 'pull' is not taken as a lookup)
+    path('sync/pull/', sync_pull, name='sync-pull'),
+    
     # Include router URLs
     path('', include(router.urls)),
     
@@ -12,13 +12,19 @@ from django.db import transaction, models
 from django.db.models import Sum, F, Q
 from django.contrib.auth.models import User
 
-from transactions.models import Transaction, InventoryLot, Transfer
+from transactions.models import Transaction, InventoryLot, Transfer, VesselProductPrice
 from vessels.models import Vessel
 from products.models import Product
 from frontend.utils.validation_helpers import ValidationHelper
 from frontend.utils.error_helpers import InventoryErrorHelper
+from frontend.utils.cache_helpers import ProductCacheHelper, VesselPricingCacheHelper
+from frontend.utils.cache_invalidation import CacheInvalidationCollector
+from frontend.utils.pricing_bulk import BulkPricingHelper
+from frontend.utils.product_index import ProductIndexHelper
+from frontend.utils.sync_journal import SyncJournalHelper
 
 import logging
+from decimal import Decimal, InvalidOperation
 from typing import List, Dict, Any
 
 logger = logging.getLogger(__name__)
@@ -468,6 +474,7 @@ class BatchOperationsViewSet(viewsets.ViewSet):
         Expected payload:
         {
             "update_type": "fixed", // "fixed", "percentage", "category"
+            "vessel_id": 3, // optional: write vessel-specific prices instead of default prices
             "updates": [
                 {
                     "product_id": 1,
@@ -481,6 +488,7 @@ class BatchOperationsViewSet(viewsets.ViewSet):
             update_type = data.get('update_type', 'fixed')
             updates_data = data.get('updates', [])
             dry_run = data.get('dry_run', False)
+            vessel_id = data.get('vessel_id')
             
             if update_type not in ['fixed', 'percentage', 'category']:
                 return Response(
@@ -488,35 +496,33 @@ class BatchOperationsViewSet(viewsets.ViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            price_updates = []
+            vessel = None
+            if vessel_id:
+                try:
+                    vessel = Vessel.objects.get(id=vessel_id, active=True)
+                except Vessel.DoesNotExist:
+                    return Response({'error': 'Invalid vessel_id'}, status=status.HTTP_400_BAD_REQUEST)
+                if vessel.has_duty_free:
+                    return Response(
+                        {'error': 'Vessel-specific pricing only for touristic vessels'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
             
+            # 🚀 SET-BASED: Resolve all products with one query
+            requested_prices = {}
             if update_type == 'fixed':
-                # Individual product price updates
-                for i, update_data in enumerate(updates_data):
-                    try:
-                        product_id = update_data.get('product_id')
-                        new_price = update_data.get('new_price')
-                        
-                        if not product_id or new_price is None:
-                            continue
-                        
-                        product = Product.objects.get(id=product_id, active=True)
-                        old_price = float(product.price)
-                        
-                        price_updates.append({
-                            'product': product,
-                            'old_price': old_price,
-                            'new_price': float(new_price),
-                            'change': float(new_price) - old_price,
-                            'change_percent': ((float(new_price) - old_price) / old_price * 100) if old_price > 0 else 0
-                        })
-                    
-                    except Product.DoesNotExist:
+                for update_data in updates_data:
+                    product_id = update_data.get('product_id')
+                    new_price = update_data.get('new_price')
+                    if not product_id or new_price is None:
                         continue
-                    except Exception as e:
+                    try:
+                        requested_prices[int(product_id)] = Decimal(str(new_price))
+                    except (InvalidOperation, ValueError, TypeError):
                         continue
+                products = Product.objects.filter(id__in=list(requested_prices), active=True)
             
-            elif update_type == 'percentage':
+            else:
                 # Percentage-based updates
                 percentage = data.get('percentage')
                 category_id = data.get('category_id')
@@ -530,18 +536,39 @@ class BatchOperationsViewSet(viewsets.ViewSet):
                 products = Product.objects.filter(active=True)
                 if category_id:
                     products = products.filter(category_id=category_id)
+            
+            if vessel is not None:
+                products = products.filter(is_duty_free=False)
+            products = list(products)
+            
+            current_prices = {product.id: product.selling_price for product in products}
+            if vessel is not None:
+                current_prices.update(
+                    VesselProductPrice.objects.filter(
+                        vessel=vessel, product_id__in=list(current_prices)
+                    ).values_list('product_id', 'selling_price')
+                )
+            
+            price_updates = []
+            for product in products:
+                old_price = current_prices[product.id]
+                if update_type == 'fixed':
+                    new_price = requested_prices[product.id]
+                else:
+                    new_price = (old_price * (1 + Decimal(str(percentage)) / 100)).quantize(Decimal('0.001'))
                 
-                for product in products:
-                    old_price = float(product.price)
-                    new_price = old_price * (1 + percentage / 100)
-                    
-                    price_updates.append({
-                        'product': product,
-                        'old_price': old_price,
-                        'new_price': new_price,
-                        'change': new_price - old_price,
-                        'change_percent': percentage
-                    })
+                # Default prices must respect the product constraints (positive, not below cost)
+                if new_price <= 0 or (vessel is None and new_price < product.purchase_price):
+                    continue
+                
+                price_updates.append({
+                    'product': product,
+                    'old_price': float(old_price),
+                    'new_price': float(new_price),
+                    'new_price_decimal': new_price,
+                    'change': float(new_price - old_price),
+                    'change_percent': float((new_price - old_price) / old_price * 100) if old_price > 0 else 0
+                })
             
             if not price_updates:
                 return Response(
@@ -567,29 +594,52 @@ class BatchOperationsViewSet(viewsets.ViewSet):
                     'total_updates': len(price_updates)
                 })
             
-            # Execute price updates
-            updated_products = []
-            
-            with transaction.atomic():
+            # Execute price updates with chunked bulk statements and one cache invalidation
+            if vessel is not None:
+                BulkPricingHelper.apply_price_updates(
+                    [
+                        {'vessel_id': vessel.id, 'product_id': update['product'].id, 'price': update['new_price_decimal']}
+                        for update in price_updates
+                    ],
+                    user=request.user
+                )
+            else:
+                now = timezone.now()
                 for update in price_updates:
-                    product = update['product']
-                    product.price = update['new_price']
-                    product.save()
-                    
-                    updated_products.append({
-                        'product_id': product.id,
-                        'product_name': product.name,
-                        'old_price': update['old_price'],
-                        'new_price': update['new_price'],
-                        'change': round(update['change'], 3),
-                        'change_percent': round(update['change_percent'], 2)
-                    })
+                    update['product'].selling_price = update['new_price_decimal']
+                    update['product'].updated_at = now
+                
+                product_ids = [update['product'].id for update in price_updates]
+                with transaction.atomic():
+                    Product.objects.bulk_update(
+                        [update['product'] for update in price_updates],
+                        ['selling_price', 'updated_at'],
+                        batch_size=BulkPricingHelper.BATCH_SIZE
+                    )
+                    # Journal with the prices; caches drop once the update commits
+                    SyncJournalHelper.record_products(None, product_ids)
+                    CacheInvalidationCollector.defer(ProductCacheHelper.clear_cache_after_product_update)
+                    CacheInvalidationCollector.defer(VesselPricingCacheHelper.invalidate_all)
+                    CacheInvalidationCollector.defer(ProductIndexHelper.mark_index_changed_all_vessels, tuple(product_ids))
+            
+            updated_products = [
+                {
+                    'product_id': update['product'].id,
+                    'product_name': update['product'].name,
+                    'old_price': update['old_price'],
+                    'new_price': update['new_price'],
+                    'change': round(update['change'], 3),
+                    'change_percent': round(update['change_percent'], 2)
+                }
+                for update in price_updates
+            ]
             
             return Response({
                 'success': True,
                 'message': f'Successfully updated {len(updated_products)} product prices',
                 'summary': {
                     'update_type': update_type,
+                    'vessel_id': vessel.id if vessel else None,
                     'total_updates': len(updated_products),
                     'average_change': round(
                         sum(u['change'] for u in updated_products) / len(updated_products), 3
@@ -0,0 +1,79 @@
+"""
+Change Feed API Views
+Cursor-based, long-polling JSON lines feed of new transactions and inventory events.
+"""
+
+from django.http import HttpResponse
+from rest_framework import viewsets, status
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+
+from vessels.models import Vessel
+from vessel_management.models import UserVesselAssignment
+from frontend.utils.change_feed import ChangeFeedHelper
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeFeedViewSet(viewsets.ViewSet):
+    """
+    ViewSet for downstream consumers (ERP/BI) tailing ledger changes.
+
+    GET /api/v1/changes/?stream=transactions|events&cursor=&limit=&wait=&vessel_id=
+
+    The body is JSON lines (one row per line). The cursor to send next is in
+    the X-Next-Cursor header; X-Has-More says whether to poll again at once.
+    With ``wait`` (seconds) the request is held until rows arrive.
+    Staff see every vessel; other users must pass a vessel_id they can access.
+
+    The cursor is a change feed sequence (not a row id) assigned in commit
+    order, so every inserted row is delivered once, however long its
+    transaction stayed open. Deletions are not published.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def list(self, request):
+        params = request.GET
+        stream = params.get('stream', 'transactions')
+        if stream not in ChangeFeedHelper.STREAMS:
+            return Response(
+                {'error': f"stream must be one of: {', '.join(ChangeFeedHelper.STREAMS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        for name in ('cursor', 'limit', 'wait', 'vessel_id'):
+            value = params.get(name)
+            if value is not None and not value.isdigit():
+                return Response({'error': f'{name} must be a non-negative integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        vessel_id = params.get('vessel_id')
+        if vessel_id is not None:
+            vessel = Vessel.objects.filter(id=vessel_id).first()
+            if vessel is None:
+                return Response({'error': 'Vessel not found'}, status=status.HTTP_404_NOT_FOUND)
+            if not UserVesselAssignment.can_user_access_vessel(request.user, vessel):
+                return Response({'error': 'No access to this vessel'}, status=status.HTTP_403_FORBIDDEN)
+            vessel_id = vessel.id
+        elif not (request.user.is_superuser or request.user.is_staff):
+            return Response({'error': 'vessel_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            rows, next_cursor, has_more = ChangeFeedHelper.wait(
+                stream,
+                cursor=params.get('cursor', 0),
+                limit=params.get('limit'),
+                vessel_id=vessel_id,
+                timeout=params.get('wait', 0),
+            )
+        except Exception as e:
+            logger.error(f"Change feed read failed ({stream}): {e}")
+            return Response({'error': f'Change feed failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        response = HttpResponse(ChangeFeedHelper.to_json_lines(rows), content_type='application/x-ndjson')
+        response['X-Next-Cursor'] = str(next_cursor)
+        response['X-Has-More'] = 'true' if has_more else 'false'
+        response['Cache-Control'] = 'no-store'
+        return response
@@ -11,16 +11,22 @@ from django.utils import timezone
 from django.db.models import Sum, Count, F, Avg, Min, Max, Q
 from django.http import HttpResponse
 from datetime import datetime, timedelta
+from decimal import Decimal
 
 from transactions.models import Transaction, InventoryLot, Trip, PurchaseOrder, Transfer, WasteReport
 from vessels.models import Vessel
 from products.models import Product, Category
-from frontend.utils.exports import ExcelExporter, create_pdf_exporter_for_data
+from frontend.utils.export_backends import ExportBackends
+from frontend.utils.profitability import ProfitabilityHelper
 
 import logging
 
 logger = logging.getLogger(__name__)
 
+# 🚀 openpyxl / reportlab load on the first export, not at worker start-up
+ExcelExporter = ExportBackends.lazy('excel')
+create_pdf_exporter_for_data = ExportBackends.lazy('pdf_for_data')
+
 
 class CustomReportsViewSet(viewsets.ViewSet):
     """
@@ -50,6 +56,11 @@ class CustomReportsViewSet(viewsets.ViewSet):
                     'description': 'Product profitability analysis with cost tracking',
                     'parameters': ['start_date', 'end_date', 'category_id', 'format']
                 },
+                'gross_margin': {
+                    'endpoint': '/api/v1/custom-reports/gross-margin/',
+                    'description': 'Gross margin from actual FIFO cost of goods sold',
+                    'parameters': ['start_date', 'end_date', 'group_by', 'vessel_id', 'product_id', 'category_id', 'trip_id']
+                },
                 'inventory_aging': {
                     'endpoint': '/api/v1/custom-reports/inventory-aging/',
                     'description': 'Inventory aging analysis for stock management',
@@ -103,6 +114,9 @@ class CustomReportsViewSet(viewsets.ViewSet):
             if vessel_id:
                 vessels = vessels.filter(id=vessel_id)
             
+            # Actual FIFO COGS per vessel in one grouped query
+            margins = ProfitabilityHelper.breakdown_map('vessel', start_date, end_date, vessel=vessel_id)
+            
             performance_data = []
             
             for vessel in vessels:
@@ -146,11 +160,12 @@ class CustomReportsViewSet(viewsets.ViewSet):
                     inventory_items=Count('id')
                 )
                 
-                # Calculate profitability (simplified)
+                # Gross profit from the cost of goods actually sold, not supply spend
+                margin = margins.get(vessel.id)
                 revenue = sales_data['total_sales'] or 0
-                costs = supply_data['total_supply_cost'] or 0
+                costs = margin['cogs'] if margin else 0
                 profit = revenue - costs
-                profit_margin = (profit / revenue * 100) if revenue > 0 else 0
+                profit_margin = margin['margin_percent'] if margin else 0
                 
                 # Calculate revenue per passenger
                 revenue_per_passenger = (
@@ -166,7 +181,8 @@ class CustomReportsViewSet(viewsets.ViewSet):
                         'total_costs': float(costs),
                         'gross_profit': float(profit),
                         'profit_margin_percent': round(profit_margin, 2),
-                        'average_sale_value': float(sales_data['avg_sale_value'] or 0)
+                        'average_sale_value': float(sales_data['avg_sale_value'] or 0),
+                        'total_supply_spend': float(supply_data['total_supply_cost'] or 0)
                     },
                     'operational_metrics': {
                         'total_trips': trips['trip_count'] or 0,
@@ -245,50 +261,33 @@ class CustomReportsViewSet(viewsets.ViewSet):
             if category_id:
                 products = products.filter(category_id=category_id)
             
-            profitability_data = []
+            # 🚀 PERFORMANCE: Actual FIFO COGS per product in one grouped query
+            margins = ProfitabilityHelper.breakdown_map(
+                'product', start_date, end_date, category=category_id
+            )
+            sold_products = products.filter(id__in=list(margins)).select_related('category')
             
-            for product in products:
-                # Get sales data
-                sales = Transaction.objects.filter(
-                    product=product,
-                    transaction_type='SALE',
-                    transaction_date__gte=start_date,
-                    transaction_date__lte=end_date
-                ).aggregate(
-                    total_revenue=Sum(F('quantity') * F('unit_price')),
-                    total_quantity_sold=Sum('quantity'),
-                    avg_selling_price=Avg('unit_price'),
-                    sales_count=Count('id')
-                )
-                
-                # Get cost data (from FIFO consumptions)
-                fifo_costs = Transaction.objects.filter(
-                    product=product,
-                    transaction_type='SALE',
-                    transaction_date__gte=start_date,
-                    transaction_date__lte=end_date
-                ).prefetch_related('fifo_consumptions').all()
-                
-                total_cost = 0
-                for sale in fifo_costs:
-                    for consumption in sale.fifo_consumptions.all():
-                        total_cost += float(consumption.consumed_quantity * consumption.unit_cost)
-                
-                # Calculate metrics
-                revenue = float(sales['total_revenue'] or 0)
-                cost = total_cost
-                profit = revenue - cost
-                profit_margin = (profit / revenue * 100) if revenue > 0 else 0
-                quantity_sold = sales['total_quantity_sold'] or 0
-                
-                # Get current inventory
-                current_stock = InventoryLot.objects.filter(
-                    product=product,
+            current_stock_by_product = {
+                row['product_id']: row
+                for row in InventoryLot.objects.filter(
+                    product_id__in=list(margins),
                     remaining_quantity__gt=0
-                ).aggregate(
+                ).values('product_id').annotate(
                     total_stock=Sum('remaining_quantity'),
                     avg_cost=Avg('purchase_price')
                 )
+            }
+            
+            profitability_data = []
+            
+            for product in sold_products:
+                margin = margins[product.id]
+                revenue = float(margin['revenue'])
+                cost = float(margin['cogs'])
+                profit = revenue - cost
+                quantity_sold = margin['quantity']
+                sales_count = margin['sales_count']
+                current_stock = current_stock_by_product.get(product.id, {})
                 
                 product_data = {
                     'product_id': product.id,
@@ -299,29 +298,28 @@ class CustomReportsViewSet(viewsets.ViewSet):
                         'total_revenue': revenue,
                         'total_cost': cost,
                         'gross_profit': profit,
-                        'profit_margin_percent': round(profit_margin, 2),
-                        'profit_per_unit': round(profit / quantity_sold, 3) if quantity_sold > 0 else 0
+                        'profit_margin_percent': round(margin['margin_percent'], 2),
+                        'profit_per_unit': round(profit / float(quantity_sold), 3) if quantity_sold > 0 else 0,
+                        'uncosted_sales': margin['uncosted_count']
                     },
                     'sales_performance': {
                         'quantity_sold': quantity_sold,
-                        'sales_transactions': sales['sales_count'] or 0,
-                        'average_selling_price': float(sales['avg_selling_price'] or 0),
+                        'sales_transactions': sales_count,
+                        'average_selling_price': round(revenue / float(quantity_sold), 3) if quantity_sold > 0 else 0,
                         'average_order_size': round(
-                            quantity_sold / (sales['sales_count'] or 1), 2
-                        ) if sales['sales_count'] else 0
+                            quantity_sold / sales_count, 2
+                        ) if sales_count else 0
                     },
                     'inventory_status': {
-                        'current_stock': current_stock['total_stock'] or 0,
-                        'average_unit_cost': float(current_stock['avg_cost'] or 0),
+                        'current_stock': current_stock.get('total_stock') or 0,
+                        'average_unit_cost': float(current_stock.get('avg_cost') or 0),
                         'estimated_stock_value': float(
-                            (current_stock['total_stock'] or 0) * (current_stock['avg_cost'] or 0)
+                            (current_stock.get('total_stock') or 0) * (current_stock.get('avg_cost') or 0)
                         )
                     }
                 }
                 
-                # Only include products with sales activity
-                if revenue > 0 or quantity_sold > 0:
-                    profitability_data.append(product_data)
+                profitability_data.append(product_data)
             
             # Sort by profit margin descending
             profitability_data.sort(key=lambda x: x['financial_performance']['profit_margin_percent'], reverse=True)
@@ -352,6 +350,63 @@ class CustomReportsViewSet(viewsets.ViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
     
+    @action(detail=False, methods=['get'], url_path='gross-margin')
+    def gross_margin_report(self, request):
+        """
+        Gross margin from actual FIFO cost of goods sold.
+        
+        Groups SALE revenue and COGS by vessel, product, category, trip or day.
+        """
+        try:
+            start_date = request.GET.get('start_date')
+            end_date = request.GET.get('end_date')
+            group_by = request.GET.get('group_by', 'vessel')
+            
+            if group_by not in ProfitabilityHelper.DIMENSIONS:
+                return Response(
+                    {'error': f"Invalid group_by. Supported: {', '.join(ProfitabilityHelper.DIMENSIONS)}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            if not start_date:
+                start_date = (timezone.now() - timedelta(days=30)).strftime('%Y-%m-%d')
+            if not end_date:
+                end_date = timezone.now().strftime('%Y-%m-%d')
+            
+            filters = {
+                'vessel': request.GET.get('vessel_id'),
+                'product': request.GET.get('product_id'),
+                'category': request.GET.get('category_id'),
+                'trip': request.GET.get('trip_id'),
+            }
+            
+            def serialize(row):
+                return {
+                    key: float(value) if isinstance(value, Decimal) else value
+                    for key, value in row.items()
+                }
+            
+            totals = ProfitabilityHelper.summarize(start_date, end_date, **filters)
+            rows = ProfitabilityHelper.breakdown(group_by, start_date, end_date, **filters)
+            
+            return Response({
+                'success': True,
+                'report_type': 'gross_margin_analysis',
+                'generated_at': timezone.now().isoformat(),
+                'analysis_period': f"{start_date} to {end_date}",
+                'group_by': group_by,
+                'totals': serialize(totals),
+                'group_count': len(rows),
+                'data': [serialize(row) for row in rows]
+            })
+        
+        except Exception as e:
+            logger.error(f"Error generating gross margin report: {e}")
+            return Response(
+                {'error': f'Report generation failed: {str(e)}'},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+    
     @action(detail=False, methods=['get'], url_path='inventory-aging')
     def inventory_aging_report(self, request):
         """
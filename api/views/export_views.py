@@ -16,7 +16,7 @@ from django.shortcuts import get_object_or_404
 from products.models import Product, Category
 from transactions.models import Transaction, InventoryLot, Trip, PurchaseOrder, Transfer, WasteReport
 from vessels.models import Vessel
-from frontend.utils.exports import ExcelExporter, PDFExporter, create_pdf_exporter_for_data
+from frontend.utils.export_backends import ExportBackends
 from frontend.utils.helpers import (
     format_currency, format_date, get_date_range_from_request,
     calculate_totals_by_type, calculate_product_level_summary
@@ -26,6 +26,11 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# 🚀 openpyxl / reportlab load on the first export, not at worker start-up
+ExcelExporter = ExportBackends.lazy('excel')
+PDFExporter = ExportBackends.lazy('pdf')
+create_pdf_exporter_for_data = ExportBackends.lazy('pdf_for_data')
+
 
 class ExportViewSet(viewsets.ViewSet):
     """
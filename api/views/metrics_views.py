@@ -0,0 +1,30 @@
+"""
+Metrics endpoint
+Prometheus text exposition of cache, request and SQL metrics summed across workers.
+"""
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.views.decorators.cache import never_cache
+from django.views.decorators.http import require_GET
+
+from frontend.utils.metrics import MetricsRegistry
+
+
+@never_cache
+@require_GET
+def metrics_endpoint(request):
+    """
+    GET /metrics - scraped by Prometheus from an allowed address,
+    or opened by a signed-in superuser.
+    """
+    client_ip = request.META.get('REMOTE_ADDR', '')
+    allowed_ips = getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if client_ip not in allowed_ips and not (request.user.is_authenticated and request.user.is_superuser):
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+
+    MetricsRegistry.flush(force=True)
+    return HttpResponse(
+        MetricsRegistry.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
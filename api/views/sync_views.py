@@ -0,0 +1,156 @@
+"""
+Offline Sync API Views
+Delta pulls keyed by a change token and idempotent replay of sales queued offline.
+"""
+
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+
+from vessels.models import Vessel
+from vessel_management.models import UserVesselAssignment
+from vessel_management.utils import VesselAccessHelper
+from frontend.utils.sync_journal import SyncJournalHelper, OfflineSaleReplayHelper
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@method_decorator(gzip_page, name='dispatch')
+class SyncViewSet(viewsets.ViewSet):
+    """
+    ViewSet for offline-first vessel clients.
+
+    GET  /api/v1/sync/?vessel_id=&token=&limit=   products, prices, stock and
+         assignments changed since ``token`` (omit it for a full snapshot)
+    POST /api/v1/sync/sales/                      replay queued offline sales
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def _get_vessel(self, request, vessel_id):
+        vessel = Vessel.objects.filter(id=vessel_id).first() if str(vessel_id or '').isdigit() else None
+        if vessel is None:
+            return None, Response({'error': 'Valid vessel_id is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if not UserVesselAssignment.can_user_access_vessel(request.user, vessel):
+            return None, Response({'error': 'No access to this vessel'}, status=status.HTTP_403_FORBIDDEN)
+        return vessel, None
+
+    def list(self, request):
+        """One page of changes since the client's token."""
+        vessel, error = self._get_vessel(request, request.GET.get('vessel_id'))
+        if error:
+            return error
+
+        limit = request.GET.get('limit')
+        if limit is not None and not limit.isdigit():
+            return Response({'error': 'limit must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            payload = SyncJournalHelper.pull(vessel, token=request.GET.get('token'), limit=limit)
+        except Exception as e:
+            logger.error(f"Sync pull failed for vessel {vessel.id}: {e}")
+            return Response({'error': f'Sync failed: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+        payload.update({'success': True, 'server_time': timezone.now().isoformat()})
+        return Response(payload)
+
+    @action(detail=False, methods=['post'])
+    def sales(self, request):
+        """
+        Replay a batch of offline sales through the FIFO engine.
+
+        Body: {"vessel_id": 1, "device_id": "tablet-7", "sales": [
+            {"client_id": "<uuid>", "product_id": 5, "quantity": 2,
+             "unit_price": 1.5, "transaction_date": "2025-08-01", "trip_id": null}
+        ]}
+        Resending a batch is safe: sales already applied come back as ``duplicate``.
+        The resulting stock changes reach the client through its next pull.
+        """
+        vessel, error = self._get_vessel(request, request.data.get('vessel_id'))
+        if error:
+            return error
+
+        if not request.user.is_superuser and not UserVesselAssignment.objects.filter(
+            user=request.user, vessel=vessel, is_active=True, can_make_sales=True
+        ).exists():
+            return Response({'error': 'Not allowed to record sales on this vessel'}, status=status.HTTP_403_FORBIDDEN)
+
+        sales = request.data.get('sales')
+        if not isinstance(sales, list) or not sales:
+            return Response({'error': 'sales must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(sales) > OfflineSaleReplayHelper.MAX_BATCH:
+            return Response(
+                {'error': f'At most {OfflineSaleReplayHelper.MAX_BATCH} sales per batch'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not all(isinstance(sale, dict) for sale in sales):
+            return Response({'error': 'Each sale must be an object'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = OfflineSaleReplayHelper.replay(
+            vessel, sales, request.user, device_id=str(request.data.get('device_id') or '')[:100]
+        )
+        summary = {state: sum(1 for result in results if result['status'] == state)
+                   for state in ('applied', 'duplicate', 'failed')}
+
+        return Response({
+            'success': summary['failed'] == 0,
+            'summary': summary,
+            'results': results,
+        })
+
+
+async def _aauthenticate(request):
+    """Session user, else the JWT bearer user (DRF authentication is sync-only)"""
+    user = await request.auser()
+    if user.is_authenticated:
+        return user
+    try:
+        result = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except AuthenticationFailed:
+        return None
+    return result[0] if result else None
+
+
+@gzip_page
+@require_GET
+async def sync_pull(request):
+    """
+    Async twin of GET /api/v1/sync/ for ASGI deployments - same parameters and payload.
+
+    The journal read is several dependent queries, so it runs as one sync unit;
+    the event loop stays free while it waits on the database.
+    """
+    user = await _aauthenticate(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    vessel_id = request.GET.get('vessel_id')
+    vessel = await Vessel.objects.filter(id=vessel_id).afirst() if str(vessel_id or '').isdigit() else None
+    if vessel is None:
+        return JsonResponse({'error': 'Valid vessel_id is required'}, status=400)
+    if not await VesselAccessHelper.acan_user_access_vessel(user, vessel):
+        return JsonResponse({'error': 'No access to this vessel'}, status=403)
+
+    limit = request.GET.get('limit')
+    if limit is not None and not limit.isdigit():
+        return JsonResponse({'error': 'limit must be a positive integer'}, status=400)
+
+    try:
+        payload = await sync_to_async(SyncJournalHelper.pull)(vessel, token=request.GET.get('token'), limit=limit)
+    except Exception as e:
+        logger.error(f"Sync pull failed for vessel {vessel.id}: {e}")
+        return JsonResponse({'error': f'Sync failed: {str(e)}'}, status=500)
+
+    payload.update({'success': True, 'server_time': timezone.now().isoformat()})
+    return JsonResponse(payload)
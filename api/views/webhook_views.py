@@ -10,14 +10,17 @@ from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 from django.contrib.auth.models import User
 from ..models import WebhookEndpoint, WebhookDelivery
+from frontend.utils.export_backends import LazyImport
 
-import requests
 import json
 import logging
 from typing import Dict, Any
 
 logger = logging.getLogger(__name__)
 
+# 🚀 Loaded on the first webhook delivery, not at worker start-up
+requests = LazyImport('requests')
+
 
 class WebhookViewSet(viewsets.ViewSet):
     """
@@ -7,18 +7,14 @@ from django.db.models import Sum, Count, F, Avg, Min, Max
 from products.models import Product, Category
 import json
 from django.template.loader import render_to_string
-import weasyprint
 import io
 from django.http import JsonResponse, HttpResponse
 from transactions.models import Transaction, InventoryLot, Trip, PurchaseOrder
 from vessels.models import Vessel
-from .utils.exports import ExcelExporter
-from .utils.weasy_exporter import create_weasy_exporter_for_data, create_weasy_exporter
+from .utils.export_backends import ExportBackends, LazyImport
 from django.views.decorators.http import require_http_methods
 from django.shortcuts import get_object_or_404
 import logging
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import Font, PatternFill, Alignment
 from collections import defaultdict
 from .utils.helpers import (format_currency,
     format_currency_or_none,
@@ -42,6 +38,16 @@ from .utils.helpers import (format_currency,
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# 🚀 Export libraries load on the first export, not at worker start-up
+weasyprint = LazyImport('weasyprint')
+get_column_letter = LazyImport('openpyxl.utils', 'get_column_letter')
+Font = LazyImport('openpyxl.styles', 'Font')
+PatternFill = LazyImport('openpyxl.styles', 'PatternFill')
+Alignment = LazyImport('openpyxl.styles', 'Alignment')
+ExcelExporter = ExportBackends.lazy('excel')
+create_weasy_exporter = ExportBackends.lazy('weasy')
+create_weasy_exporter_for_data = ExportBackends.lazy('weasy_for_data')
+
 def get_vessel_name_by_language_data(name_en, name_ar, language):
     """Get vessel name in appropriate language from data"""
     if language == 'ar' and name_ar:
@@ -461,6 +467,7 @@ def export_all_types(request):
             'monthly_report': export_monthly_report_logic,
             'daily_report': export_daily_report_logic,
             'analytics_report': export_analytics_logic,
+            'inventory_valuation': export_inventory_valuation_logic,
             'single_trip': lambda req, data, fmt: export_single_trip_logic(req, data, data.get('trip_id'), fmt),
             'single_po': lambda req, data, fmt: export_single_po_logic(req, data, data.get('po_id'), fmt),
 
@@ -1083,8 +1090,13 @@ def export_single_trip_logic(request, data, trip_id, export_format):
         transaction_data = []
         for transaction in transactions:
             revenue = safe_float(transaction.quantity) * safe_float(transaction.unit_price)
-            cost_per_unit = safe_float(transaction.product.purchase_price) if transaction.product else safe_float(transaction.unit_price * 0.7)
-            cogs = safe_float(transaction.quantity) * cost_per_unit
+            if transaction.cogs_total is not None:
+                # Exact FIFO cost stored on the sale
+                cogs = safe_float(transaction.cogs_total)
+                cost_per_unit = cogs / safe_float(transaction.quantity) if transaction.quantity else 0
+            else:
+                cost_per_unit = safe_float(transaction.product.purchase_price) if transaction.product else safe_float(transaction.unit_price * 0.7)
+                cogs = safe_float(transaction.quantity) * cost_per_unit
             profit = revenue - cogs
                         
             total_revenue += revenue
@@ -2137,4 +2149,104 @@ def export_analytics_logic(request, data, export_format):
         return JsonResponse({'success': False, 'error': 'Invalid JSON data'})
     except Exception as e:
         logger.error(f"Analytics export error: {e}")
-        return JsonResponse({'success': False, 'error': f'Export failed: {str(e)}'})
\ No newline at end of file
+        return JsonResponse({'success': False, 'error': f'Export failed: {str(e)}'})
+# ===============================================================================
+# INVENTORY VALUATION EXPORT
+# ===============================================================================
+
+def export_inventory_valuation_logic(request, data, export_format):
+    """Export month-end FIFO inventory valuation for one vessel"""
+    from .reports_views import build_inventory_valuation
+
+    try:
+        vessel = get_object_or_404(Vessel, id=data.get('vessel_id'))
+
+        today = timezone.now().date()
+        try:
+            start_month = datetime.strptime(data.get('start_month'), '%Y-%m').date()
+            end_month = datetime.strptime(data.get('end_month'), '%Y-%m').date()
+        except (TypeError, ValueError):
+            start_month, end_month = today.replace(year=today.year - 1, day=1), today.replace(day=1)
+        if start_month > end_month:
+            start_month, end_month = end_month, start_month
+
+        valuation = build_inventory_valuation(vessel, start_month, end_month)
+
+        month_rows = [
+            [
+                format_date(month['month_end']),
+                month['product_count'],
+                format_currency(month['total_quantity'], 3),
+                format_currency(month['total_value'], 3),
+                format_currency(month['value_change'], 3) if month['value_change'] is not None else '-'
+            ]
+            for month in valuation['month_rows']
+        ]
+        product_rows = [
+            [
+                row['product'].name,
+                row['product'].item_id,
+                row['product'].category.name,
+                format_currency(row['quantity'], 3),
+                format_currency(row['average_cost'], 3),
+                format_currency(row['value'], 3)
+            ]
+            for row in valuation['product_rows']
+        ]
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename_base = f"inventory_valuation_{vessel.name.replace(' ', '_')}_{timestamp}"
+
+        metadata = {
+            'Vessel': vessel.name,
+            'Period': f"{start_month.strftime('%m/%Y')} - {end_month.strftime('%m/%Y')}",
+            'Valuation Method': 'FIFO',
+            'Closing Value (JOD)': format_currency(valuation['closing_value'], 3),
+            'Export Date': datetime.now().strftime('%d/%m/%Y %H:%M'),
+            'Generated By': request.user.username
+        }
+
+        month_headers = ['Month End', 'Products', 'Units', 'Stock Value (JOD)', 'Change (JOD)']
+        product_headers = ['Product', 'Item ID', 'Category', 'Quantity', 'Average Cost (JOD)', 'Stock Value (JOD)']
+        product_title = f"Stock by Product - {format_date(valuation['as_of'])}"
+
+        summary_data = {
+            'Products In Stock': len(product_rows),
+            'Closing Value (JOD)': format_currency(valuation['closing_value'], 3)
+        }
+
+        if export_format == 'excel':
+            try:
+                exporter = ExcelExporter(title="Inventory Valuation")
+                exporter.add_title(f"Inventory Valuation - {vessel.name}", f"Generated on {datetime.now().strftime('%d/%m/%Y %H:%M')}")
+                exporter.add_metadata(metadata)
+                exporter.add_headers(month_headers)
+                exporter.add_data_rows(month_rows)
+                exporter.add_section_header(product_title)
+                exporter.add_headers(product_headers)
+                exporter.add_data_rows(product_rows)
+                exporter.add_summary(summary_data)
+
+                return exporter.get_response(f"{filename_base}.xlsx")
+
+            except Exception as e:
+                logger.error(f"Excel inventory valuation export error: {e}")
+                return JsonResponse({'success': False, 'error': f'Excel export failed: {str(e)}'})
+
+        else:  # PDF
+            try:
+                exporter = create_weasy_exporter_for_data("Inventory Valuation", "normal")
+                exporter.add_metadata(metadata)
+                exporter.add_table(month_headers, month_rows, table_title="Month-End Valuation")
+                exporter.add_table(product_headers, product_rows, table_title=product_title)
+                exporter.add_summary(summary_data)
+
+                return exporter.get_response(f"{filename_base}.pdf")
+
+            except Exception as e:
+                logger.error(f"PDF inventory valuation export error: {e}")
+                return JsonResponse({'success': False, 'error': f'PDF export failed: {str(e)}'})
+
+    except Exception as e:
+        logger.error(f"Inventory valuation export error: {e}")
+        return JsonResponse({'success': False, 'error': f'Export failed: {str(e)}'})
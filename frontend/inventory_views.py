@@ -1,14 +1,18 @@
 from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.db.models import Q, Sum, Min, Avg, Count
-from django.http import JsonResponse
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified
+from django.views.decorators.http import require_GET
 from frontend.utils.cache_helpers import VesselCacheHelper
+from frontend.utils.product_index import ProductIndexHelper
+from frontend.utils.event_journal import InventoryEventJournal
 from vessels.models import Vessel
 from products.models import Product
 from transactions.models import Transaction, InventoryLot
 from .utils import BilingualMessages
 from products.models import Product
 from vessel_management.utils import VesselAccessHelper, VesselOperationValidator
+from .permissions import operations_access_required, reports_access_required
 import json
 
 @login_required
@@ -441,4 +445,89 @@ def inventory_data_ajax(request):
     except Vessel.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Vessel not found'})
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)})
\ No newline at end of file
+        return JsonResponse({'success': False, 'error': str(e)})
+
+@operations_access_required
+@require_GET
+async def product_index_snapshot(request, vessel_id):
+    """
+    Compact JSON snapshot of the vessel's POS product index for client-side search.
+    Rows carry is_duty_free; sales screens on non-duty-free vessels filter those out.
+    Clients revalidate with If-None-Match and get 304 until stock or prices change.
+    Async: the revalidation path is cache reads plus one assignment check.
+    """
+    # 🚀 VESSEL CACHE: No vessel query on the revalidation path
+    vessel = next(
+        (v for v in await VesselCacheHelper.aget_all_vessels_basic_data() if v.id == vessel_id and v.active),
+        None
+    )
+    if vessel is None:
+        return JsonResponse({'success': False, 'error': 'Vessel not found'}, status=404)
+    
+    if not await VesselAccessHelper.acan_user_access_vessel(await request.auser(), vessel):
+        return JsonResponse({'success': False, 'error': 'Access denied to this vessel'}, status=403)
+    
+    etag = f'"pos-{vessel.id}-{await ProductIndexHelper.aget_version(vessel.id)}"'
+    if_none_match = request.headers.get('If-None-Match', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')]:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+    
+    index = await ProductIndexHelper.aget_index(vessel)
+    response = HttpResponse(index.snapshot(), content_type='application/json')
+    response['ETag'] = f'"pos-{vessel.id}-{index.version}"'
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+@reports_access_required
+@require_GET
+def inventory_event_history(request, product_id, vessel_id):
+    """
+    Audit trail of inventory events for one vessel/product.
+    Reads the hot table and archived months through the event journal.
+    Optional ?start=YYYY-MM-DD&end=YYYY-MM-DD (end inclusive) and ?limit=N.
+    """
+    from datetime import datetime, timedelta
+    from django.utils import timezone
+    
+    vessel = next(
+        (v for v in VesselCacheHelper.get_all_vessels_basic_data() if v.id == vessel_id),
+        None
+    )
+    if vessel is None:
+        return JsonResponse({'success': False, 'error': 'Vessel not found'}, status=404)
+    
+    if not VesselAccessHelper.can_user_access_vessel(request.user, vessel):
+        return JsonResponse({'success': False, 'error': 'Access denied to this vessel'}, status=403)
+    
+    try:
+        start = end = None
+        if request.GET.get('start'):
+            start = timezone.make_aware(datetime.strptime(request.GET['start'], '%Y-%m-%d'))
+        if request.GET.get('end'):
+            end = timezone.make_aware(datetime.strptime(request.GET['end'], '%Y-%m-%d')) + timedelta(days=1)
+        limit = min(int(request.GET.get('limit', 500)), 5000)
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid date or limit'}, status=400)
+    
+    events = InventoryEventJournal.query(vessel=vessel_id, product=product_id, start=start, end=end)
+    
+    return JsonResponse({
+        'success': True,
+        'total_events': len(events),
+        'events': [
+            {
+                'id': event['id'],
+                'event_type': event['event_type'],
+                'transaction_id': event['transaction_id'],
+                'inventory_lot_id': event['inventory_lot_id'],
+                'quantity_change': float(event['quantity_change']),
+                'unit_cost': float(event['unit_cost']),
+                'lot_remaining_after': event['lot_remaining_after'],
+                'timestamp': event['timestamp'].isoformat(),
+                'notes': event['notes'],
+            }
+            for event in events[:limit]
+        ]
+    })
@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from frontend.utils.event_journal import InventoryEventJournal
+
+
+class Command(BaseCommand):
+    help = 'Export closed months of the inventory event journal to compressed files under MEDIA_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hot-months',
+            type=int,
+            default=InventoryEventJournal.HOT_MONTHS,
+            help=f'Months kept in the database, including the current one (default: {InventoryEventJournal.HOT_MONTHS})'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count events per month without exporting or deleting anything'
+        )
+
+    def handle(self, *args, **options):
+        if options['hot_months'] < 1:
+            raise CommandError('--hot-months must be at least 1 (the current month is never archived)')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('🧪 DRY RUN MODE - No changes will be made'))
+
+        started = time.monotonic()
+        results = InventoryEventJournal.archive_closed_months(
+            hot_months=options['hot_months'], dry_run=options['dry_run']
+        )
+        elapsed = time.monotonic() - started
+
+        if not results:
+            self.stdout.write(self.style.SUCCESS('✅ No closed months to archive'))
+            return
+
+        for month, count in results.items():
+            self.stdout.write(f'  {month}: {count} events')
+
+        verb = 'would be archived' if options['dry_run'] else f'archived to {InventoryEventJournal.archive_root()}'
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {sum(results.values())} events in {len(results)} months {verb} ({elapsed:.2f}s)'
+        ))
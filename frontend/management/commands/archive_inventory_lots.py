@@ -0,0 +1,57 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from vessels.models import Vessel
+from frontend.utils.lot_archive import InventoryLotArchiveHelper
+
+
+class Command(BaseCommand):
+    help = 'Move exhausted inventory lots older than the retention window to the lot archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            default=InventoryLotArchiveHelper.RETENTION_DAYS,
+            help=f'Keep exhausted lots purchased within this many days (default: {InventoryLotArchiveHelper.RETENTION_DAYS})'
+        )
+        parser.add_argument(
+            '--vessel',
+            type=str,
+            help='Only archive lots of this vessel (by name)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=InventoryLotArchiveHelper.BATCH_SIZE,
+            help='Lots moved per transaction'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count archivable lots without moving anything'
+        )
+
+    def handle(self, *args, **options):
+        vessel = None
+        if options['vessel']:
+            vessel = Vessel.objects.filter(name=options['vessel']).first()
+            if not vessel:
+                raise CommandError(f'Vessel not found: {options["vessel"]}')
+
+        if options['retention_days'] < 0:
+            raise CommandError('--retention-days must not be negative')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('🧪 DRY RUN MODE - No changes will be made'))
+
+        started = time.monotonic()
+        count = InventoryLotArchiveHelper.archive_exhausted_lots(
+            retention_days=options['retention_days'],
+            vessel=vessel,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run']
+        )
+        elapsed = time.monotonic() - started
+
+        verb = 'would be archived' if options['dry_run'] else 'archived'
+        self.stdout.write(self.style.SUCCESS(f'✅ {count} exhausted lots {verb} in {elapsed:.2f}s'))
@@ -0,0 +1,93 @@
+import re
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum, F
+
+from transactions.models import Transaction, FIFOConsumption
+
+
+class Command(BaseCommand):
+    help = 'Populate Transaction.cogs_total for historical SALE, TRANSFER_OUT and WASTE transactions'
+
+    CONSUMING_TYPES = ['SALE', 'TRANSFER_OUT', 'WASTE']
+    # Legacy "N units @ X JOD" breakdowns written into notes before cogs_total existed
+    LEGACY_NOTES_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s+units\s+@\s+(\d+(?:\.\d+)?)\s+JOD')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Transactions updated per statement batch'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would be filled without writing'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('🧪 DRY RUN MODE - No changes will be made'))
+
+        started = time.monotonic()
+        missing = Transaction.objects.filter(transaction_type__in=self.CONSUMING_TYPES, cogs_total__isnull=True)
+        self.stdout.write(f'{missing.count()} consuming transactions without stored COGS')
+
+        # Step 1: exact totals from FIFOConsumption, one grouped query
+        fifo_totals = FIFOConsumption.objects.filter(
+            transaction__in=missing
+        ).values('transaction_id').annotate(
+            total=Sum(F('consumed_quantity') * F('unit_cost'))
+        ).values_list('transaction_id', 'total')
+        from_fifo = dict(fifo_totals)
+
+        # Step 2: rows without FIFO records - legacy notes, then waste unit cost
+        from_notes = {}
+        from_unit_cost = {}
+        legacy_rows = missing.filter(fifo_consumptions__isnull=True).values_list(
+            'id', 'transaction_type', 'quantity', 'unit_price', 'notes'
+        )
+        for transaction_id, transaction_type, quantity, unit_price, notes in legacy_rows.iterator():
+            parsed = self._parse_legacy_notes(notes)
+            if parsed is not None:
+                from_notes[transaction_id] = parsed
+            elif transaction_type == 'WASTE' and unit_price is not None:
+                # Waste is recorded at cost, so quantity × unit price is its COGS
+                from_unit_cost[transaction_id] = quantity * unit_price
+
+        updates = {**from_unit_cost, **from_notes, **from_fifo}
+        if not dry_run:
+            items = list(updates.items())
+            for offset in range(0, len(items), batch_size):
+                chunk = [Transaction(id=transaction_id, cogs_total=total) for transaction_id, total in items[offset:offset + batch_size]]
+                with transaction.atomic():
+                    Transaction.objects.bulk_update(chunk, ['cogs_total'])
+
+        elapsed = time.monotonic() - started
+        verb = 'would be filled' if dry_run else 'filled'
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {len(updates)} transactions {verb} in {elapsed:.2f}s '
+            f'({len(from_fifo)} from FIFO records, {len(from_notes)} from legacy notes, '
+            f'{len(from_unit_cost)} waste at unit cost)'
+        ))
+        remaining = missing.count() - len(updates) if dry_run else missing.count()
+        if remaining:
+            self.stdout.write(self.style.WARNING(f'⚠️ {remaining} transactions have no cost data and stay empty'))
+
+    def _parse_legacy_notes(self, notes):
+        if not notes or 'FIFO consumption:' not in notes:
+            return None
+        matches = self.LEGACY_NOTES_PATTERN.findall(notes)
+        if not matches:
+            return None
+        try:
+            return sum((Decimal(quantity) * Decimal(price) for quantity, price in matches), Decimal('0'))
+        except InvalidOperation:
+            return None
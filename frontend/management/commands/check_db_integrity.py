@@ -7,9 +7,11 @@ from django.core.management.base import BaseCommand
 from django.db import connection, models
 from django.core.exceptions import ValidationError
 from transactions.models import (
-    Transaction, InventoryLot, FIFOConsumption, 
+    Transaction, InventoryLot, InventoryLotArchive, FIFOConsumption,
     Trip, PurchaseOrder, Transfer, WasteReport
 )
+from frontend.utils.event_journal import InventoryEventJournal
+from frontend.utils.lot_archive import InventoryLotArchiveHelper
 from products.models import Product, Category
 from vessels.models import Vessel
 import logging
@@ -52,6 +54,7 @@ class Command(BaseCommand):
             self.check_fifo_consistency,
             self.check_inventory_consistency,
             self.check_referential_integrity,
+            self.check_event_journal,
             self.check_data_quality,
         ]
         
@@ -300,12 +303,17 @@ class Command(BaseCommand):
         ).filter(fifo_count__gt=1)
         
         for tx in multi_lot_transactions:
-            fifo_records = tx.fifo_consumptions.select_related('inventory_lot').order_by('sequence')
+            fifo_records = list(tx.fifo_consumptions.order_by('sequence'))
+            # Exhausted lots may be archived - an INNER JOIN would skip their history
+            lots = InventoryLotArchiveHelper.resolve_lots(fifo.inventory_lot_id for fifo in fifo_records)
             
             # Check that lots are consumed in FIFO order (oldest purchase date first)
             previous_date = None
             for fifo in fifo_records:
-                current_date = fifo.inventory_lot.purchase_date
+                lot = lots.get(fifo.inventory_lot_id)
+                if lot is None:
+                    continue  # Reported below as a dangling reference
+                current_date = lot.purchase_date
                 if previous_date and current_date < previous_date:
                     multi_lot_violations.append({
                         'transaction': tx,
@@ -477,11 +485,66 @@ class Command(BaseCommand):
                 self.style.WARNING(f'WARNING  {count} vessel pricing entries for inactive vessels/products')
             )
         
+        # FIFO lot references carry no DB constraint (exhausted lots move to the archive):
+        # every referenced lot must exist in either the hot table or the archive
+        dangling_fifo = FIFOConsumption.objects.exclude(
+            inventory_lot_id__in=InventoryLot.objects.values('id')
+        ).exclude(
+            inventory_lot_id__in=InventoryLotArchive.objects.values('id')
+        )
+        
+        if dangling_fifo.exists():
+            count = dangling_fifo.count()
+            found += count
+            self.stdout.write(
+                self.style.ERROR(f'ERROR {count} FIFO consumption records reference missing inventory lots')
+            )
+            if self.verbose:
+                for fifo in dangling_fifo.values('transaction_id', 'inventory_lot_id')[:5]:
+                    self.stdout.write(
+                        f'   Transaction {fifo["transaction_id"]} -> lot {fifo["inventory_lot_id"]}'
+                    )
+        
         if found == 0:
             self.stdout.write(self.style.SUCCESS('OK Referential integrity verified'))
         
         return found, fixed
     
+    def check_event_journal(self):
+        """Check every stock-moving transaction has journal entries (hot or archived)"""
+        self.stdout.write('\nCHECK Checking Inventory Event Journal...')
+        found = 0
+        fixed = 0
+        
+        archived_months = InventoryEventJournal.archived_months()
+        if self.verbose and archived_months:
+            self.stdout.write(
+                f'   {len(archived_months)} archived months '
+                f'({archived_months[0][0]}-{archived_months[0][1]:02d} to {archived_months[-1][0]}-{archived_months[-1][1]:02d})'
+            )
+        
+        # Transactions that consumed FIFO lots must have left consumption events
+        consuming_ids = set(
+            FIFOConsumption.objects.values_list('transaction_id', flat=True).distinct()
+        )
+        journaled_ids = InventoryEventJournal.transaction_ids_with_events()
+        missing = consuming_ids - journaled_ids
+        
+        if missing:
+            count = len(missing)
+            found += count
+            self.stdout.write(
+                self.style.WARNING(f'WARNING {count} transactions with FIFO consumption but no inventory events')
+            )
+            if self.verbose:
+                for transaction_id in sorted(missing)[:5]:
+                    self.stdout.write(f'   Transaction {transaction_id}')
+        
+        if found == 0:
+            self.stdout.write(self.style.SUCCESS('OK Inventory event journal verified'))
+        
+        return found, fixed
+    
     def check_data_quality(self):
         """Check data quality issues"""
         self.stdout.write('\nCHECK Checking Data Quality...')
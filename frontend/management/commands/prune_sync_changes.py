@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from frontend.utils.sync_journal import SyncJournalHelper
+
+
+class Command(BaseCommand):
+    help = 'Drop sync journal entries older than the retention window (stale tablets resync with a snapshot)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            default=SyncJournalHelper.RETENTION_DAYS,
+            help=f'Keep journal entries from this many days (default: {SyncJournalHelper.RETENTION_DAYS})'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count prunable entries without deleting anything'
+        )
+
+    def handle(self, *args, **options):
+        if options['retention_days'] < 0:
+            raise CommandError('--retention-days must not be negative')
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('🧪 DRY RUN MODE - No changes will be made'))
+
+        count = SyncJournalHelper.prune(
+            retention_days=options['retention_days'],
+            dry_run=options['dry_run']
+        )
+
+        verb = 'would be pruned' if options['dry_run'] else 'pruned'
+        self.stdout.write(self.style.SUCCESS(f'✅ {count} sync journal entries {verb}'))
@@ -7,7 +7,7 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.db.models import Sum
 from transactions.models import (
-    Transaction, InventoryLot, FIFOConsumption, 
+    Transaction, InventoryLot, InventoryLotArchive, FIFOConsumption,
     InventoryEvent, CacheVersion
 )
 from decimal import Decimal
@@ -98,7 +98,7 @@ class Command(BaseCommand):
             try:
                 vessel = Vessel.objects.get(name=self.vessel_filter)
                 lot_filters['vessel'] = vessel
-                fifo_filters['inventory_lot__vessel'] = vessel
+                fifo_filters['transaction__vessel'] = vessel
                 event_filters['vessel'] = vessel
             except Vessel.DoesNotExist:
                 raise Exception(f'Vessel "{self.vessel_filter}" not found')
@@ -108,13 +108,13 @@ class Command(BaseCommand):
             try:
                 product = Product.objects.get(id=self.product_filter)
                 lot_filters['product'] = product
-                fifo_filters['inventory_lot__product'] = product
+                fifo_filters['transaction__product'] = product
                 event_filters['product'] = product
             except Product.DoesNotExist:
                 raise Exception(f'Product ID {self.product_filter} not found')
         
         # Count what will be deleted
-        lots_count = InventoryLot.objects.filter(**lot_filters).count()
+        lots_count = InventoryLot.objects.filter(**lot_filters).count() + InventoryLotArchive.objects.filter(**lot_filters).count()
         fifo_count = FIFOConsumption.objects.filter(**fifo_filters).count()
         events_count = InventoryEvent.objects.filter(**event_filters).count()
         
@@ -127,6 +127,7 @@ class Command(BaseCommand):
             FIFOConsumption.objects.filter(**fifo_filters).delete()
             InventoryEvent.objects.filter(**event_filters).delete()
             InventoryLot.objects.filter(**lot_filters).delete()
+            InventoryLotArchive.objects.filter(**lot_filters).delete()
             
             # Clear cache versions
             CacheVersion.objects.all().delete()
@@ -0,0 +1,66 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.models import User
+from transactions.models import PurchaseOrder
+from frontend.utils.supply_receiving import SupplyReceivingHelper
+
+
+class Command(BaseCommand):
+    help = (
+        'Receive a supplier delivery file (CSV/XLSX) into a purchase order '
+        '(item_id|barcode,quantity[,unit_price,boxes,items_per_box,notes])'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('po_number', type=str, help='Purchase order number')
+        parser.add_argument('file', type=str, help='Path to CSV or XLSX delivery file')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Validate the file without posting anything'
+        )
+        parser.add_argument(
+            '--complete',
+            action='store_true',
+            help='Mark the purchase order as completed after receiving'
+        )
+        parser.add_argument(
+            '--user',
+            type=str,
+            help='Username recorded as created_by (defaults to the first superuser)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            po = PurchaseOrder.objects.select_related('vessel').get(po_number=options['po_number'])
+        except PurchaseOrder.DoesNotExist:
+            raise CommandError(f'Purchase order not found: {options["po_number"]}')
+
+        if options['user']:
+            user = User.objects.filter(username=options['user']).first()
+            if not user:
+                raise CommandError(f'User not found: {options["user"]}')
+        else:
+            user = User.objects.filter(is_superuser=True).first()
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('🧪 DRY RUN MODE - No changes will be made'))
+
+        started = time.monotonic()
+        result = SupplyReceivingHelper.receive_file(
+            po, options['file'], user, dry_run=options['dry_run'], complete=options['complete']
+        )
+        elapsed = time.monotonic() - started
+
+        for error in result['errors']:
+            row = f'row {error["row"]}' if error['row'] else 'file'
+            self.stdout.write(self.style.ERROR(f'❌ {row}: {error["error"]}'))
+
+        if not result['success']:
+            raise CommandError(f'Delivery rejected: {len(result["errors"])} error(s), nothing was posted')
+
+        verb = 'validated' if options['dry_run'] else 'received'
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {result["lines"]} lines {verb} for {po.po_number} '
+            f'({result["total_cost"]:.3f} JOD) in {elapsed:.2f}s'
+        ))
@@ -1,7 +1,8 @@
 from django.core.management.base import BaseCommand
 from django.db.models import Sum, Count
 from decimal import Decimal
-from transactions.models import Transaction, InventoryLot, FIFOConsumption, InventoryEvent
+from transactions.models import Transaction, InventoryLot, FIFOConsumption
+from frontend.utils.event_journal import InventoryEventJournal
 from products.models import Product
 from vessels.models import Vessel
 
@@ -190,16 +191,17 @@ class Command(BaseCommand):
         transactions = Transaction.objects.filter(vessel=vessel, product=product)
         missing_events = 0
         
+        # One journal read (hot table + archived months) instead of a count per transaction
+        transactions_with_events = InventoryEventJournal.transaction_ids_with_events(vessel, product)
+        
         for transaction in transactions:
             expected_events = 0
             if transaction.transaction_type in ['SALE', 'TRANSFER_OUT', 'WASTE']:
                 expected_events = 1  # At least one consumption event
             elif transaction.transaction_type in ['SUPPLY', 'TRANSFER_IN']:
                 expected_events = 1  # At least one creation event
-                
-            actual_events = InventoryEvent.objects.filter(transaction=transaction).count()
             
-            if expected_events > 0 and actual_events == 0:
+            if expected_events > 0 and transaction.id not in transactions_with_events:
                 missing_events += 1
         
         if missing_events > 0:
@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+from frontend.utils.cache_warming import CacheWarmer
+
+
+class Command(BaseCommand):
+    help = 'Precompute hot report, catalog and pricing caches (run after deploys and cache flushes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            metavar='ENTRY',
+            help='Warm only these entries'
+        )
+        parser.add_argument(
+            '--tags',
+            nargs='+',
+            metavar='TAG',
+            help='Warm only entries carrying one of these tags'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=CacheWarmer.DEFAULT_WORKERS,
+            help=f'Parallel threads (default: {CacheWarmer.DEFAULT_WORKERS})'
+        )
+        parser.add_argument(
+            '--refresh',
+            action='store_true',
+            help='Rebuild entries that are already cached'
+        )
+        parser.add_argument(
+            '--list',
+            action='store_true',
+            help='List registered entries and exit'
+        )
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for entry in CacheWarmer.entries(include_local=True):
+                scope = 'per vessel' if entry['per_vessel'] else 'global'
+                local = ', process-local' if not entry['shared'] else ''
+                self.stdout.write(f"  {entry['name']:<22} [{', '.join(sorted(entry['tags']))}] ({scope}{local})")
+            return
+
+        try:
+            results = CacheWarmer.warm(
+                names=options['only'],
+                tags=options['tags'],
+                refresh=options['refresh'],
+                workers=options['workers']
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        if not results:
+            self.stdout.write(self.style.WARNING('⚠️ No cache entries matched'))
+            return
+
+        for result in results:
+            line = f"{result['name']:<32} {result['ms']:>8.1f}ms  {result['detail']}"
+            if result['status'] == 'failed':
+                self.stdout.write(self.style.ERROR(f'❌ {line}'))
+            else:
+                self.stdout.write(f'🔥 {line}')
+
+        failed = sum(1 for result in results if result['status'] == 'failed')
+        total_ms = sum(result['ms'] for result in results)
+        summary = f'{len(results) - failed}/{len(results)} cache entries warmed ({total_ms:.0f}ms of work)'
+        if failed:
+            raise CommandError(f'{summary}, {failed} failed')
+        self.stdout.write(self.style.SUCCESS(f'✅ {summary}'))
@@ -10,6 +10,7 @@ from django.shortcuts import redirect
 from django.contrib import messages
 from django.http import JsonResponse
 from functools import wraps
+from asgiref.sync import iscoroutinefunction, sync_to_async
 
 # =============================================================================
 # GROUP DEFINITIONS
@@ -229,7 +230,19 @@ def admin_or_manager_required(view_func):
     return _wrapped_view
 
 def operations_access_required(view_func):
-    """Decorator requiring operations access (sales, supply, transfers)"""
+    """Decorator requiring operations access (sales, supply, transfers); wraps sync and async views"""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        @login_required
+        async def _async_wrapped_view(request, *args, **kwargs):
+            if not await sync_to_async(can_access_operations)(await request.auser()):
+                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                    return JsonResponse({'success': False, 'error': 'Permission denied'})
+                messages.error(request, 'You do not have permission to access this feature.')
+                return redirect('frontend:dashboard')
+            return await view_func(request, *args, **kwargs)
+        return _async_wrapped_view
+    
     @wraps(view_func)
     @login_required
     def _wrapped_view(request, *args, **kwargs):
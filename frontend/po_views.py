@@ -6,7 +6,7 @@ import logging
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.http import JsonResponse
 from django.db import transaction
-from frontend.utils.cache_helpers import POCacheHelper, VesselCacheHelper, get_optimized_pagination
+from frontend.utils.cache_helpers import POCacheHelper, VesselCacheHelper
 from .utils.query_helpers import TransactionQueryHelper
 from transactions.models import PurchaseOrder
 from django.views.decorators.http import require_http_methods
@@ -25,71 +25,41 @@ from .permissions import (
 
 logger = logging.getLogger('frontend')
 
+def po_mgmt_queryset():
+    """Unfiltered PO management queryset (paged and cached by POCacheHelper.MGMT_LIST)"""
+    return PurchaseOrder.objects.select_related(
+        'vessel', 'created_by'
+    ).only(
+        # PurchaseOrder fields
+        'id', 'po_number', 'po_date', 'is_completed', 'created_at', 'notes',
+        'total_cost', 'item_count', 'vessel_id', 'created_by_id',  # Pre-calculated summary fields
+        # Vessel fields (to prevent N+1 queries)
+        'vessel__id', 'vessel__name', 'vessel__name_ar', 'vessel__has_duty_free', 'vessel__active',
+        # User fields
+        'created_by__id', 'created_by__username'
+    )
+
+
 @login_required
 @user_passes_test(is_admin_or_manager)
 def po_management(request):
     """OPTIMIZED: PO management with COUNT-free pagination"""
     
-    # 🚀 CACHE: Check for cached PO list (only when no filters applied)
-    has_filters = any([
-        request.GET.get('vessel'),
-        request.GET.get('date_from'),
-        request.GET.get('date_to'),
-        request.GET.get('status')
-    ])
-    
-    if not has_filters:
-        cached_po_list = POCacheHelper.get_po_mgmt_list()
-        
-        if cached_po_list:
-            logger.debug(f"🚀 Cache hit: PO Management List ({len(cached_po_list)} POs)")
-            purchase_orders = cached_po_list
-        else:
-            logger.debug("Cache miss: Building PO management list")
-            
-            # 🚀 OPTIMIZED: Build and cache evaluated list of PO objects
-            purchase_orders = list(PurchaseOrder.objects.select_related(
-                'vessel', 'created_by'
-            ).only(
-                # PurchaseOrder fields
-                'id', 'po_number', 'po_date', 'is_completed', 'created_at', 'notes',
-                'total_cost', 'item_count', 'vessel_id', 'created_by_id',  # Pre-calculated summary fields
-                # Vessel fields (to prevent N+1 queries)
-                'vessel__id', 'vessel__name', 'vessel__name_ar', 'vessel__has_duty_free', 'vessel__active',
-                # User fields
-                'created_by__id', 'created_by__username'
-            ).order_by('-po_date', '-created_at'))
-            
-            # 🚀 CACHE: Store evaluated PO list for future requests
-            POCacheHelper.cache_po_mgmt_list(purchase_orders)
-            logger.debug(f"🚀 Cached: PO Management List ({len(purchase_orders)} POs) - 1 hour timeout")
-    else:
-        # Filters applied - always do fresh query (can't use cache)
-        purchase_orders = PurchaseOrder.objects.select_related(
-            'vessel', 'created_by'
-        ).only(
-            # PurchaseOrder fields
-            'id', 'po_number', 'po_date', 'is_completed', 'created_at', 'notes',
-            'total_cost', 'item_count', 'vessel_id', 'created_by_id',  # Pre-calculated summary fields
-            # Vessel fields (to prevent N+1 queries)
-            'vessel__id', 'vessel__name', 'vessel__name_ar', 'vessel__has_duty_free', 'vessel__active',
-            # User fields
-            'created_by__id', 'created_by__username'
-        )
-        
-        # Apply all filters using helper with custom field mappings
-        purchase_orders = TransactionQueryHelper.apply_common_filters(
-            purchase_orders, request,
-            date_field='po_date',             # POs use po_date not transaction_date
-            status_field='is_completed'       # Enable status filtering for POs
-        )
-        
-        # Order for consistent results
-        purchase_orders = purchase_orders.order_by('-po_date', '-created_at')
+    # Apply all filters using helper with custom field mappings
+    purchase_orders = TransactionQueryHelper.apply_common_filters(
+        po_mgmt_queryset(), request,
+        date_field='po_date',             # POs use po_date not transaction_date
+        status_field='is_completed'       # Enable status filtering for POs
+    )
     
-    # 🚀 OPTIMIZED: Use COUNT-free pagination for better performance
+    # 🚀 CACHE: First pages per vessel/status come from cached windows,
+    # deeper pages and date-filtered views use keyset queries
     page_number = request.GET.get('page', 1)
-    page_obj = get_optimized_pagination(purchase_orders, page_number, page_size=25, use_count=False)
+    page_obj = POCacheHelper.MGMT_LIST.paginate(
+        purchase_orders,
+        {name: request.GET.get(name) for name in ('vessel', 'status', 'date_from', 'date_to')},
+        page_number, page_size=25
+    )
     
     # WORKING: Add cost performance class to each PO (for template)
     po_list = page_obj.object_list  # Use optimized pagination object list
@@ -5,96 +5,76 @@ from django.db import transaction
 from decimal import Decimal
 from django.db.models import Avg, Sum, Count, F, Q, Case, When, Max, Min
 import json
+from collections import Counter
 from vessels.models import Vessel
 from products.models import Product
 from transactions.models import VesselProductPrice, get_all_vessel_pricing_summary, get_vessel_pricing_warnings
 from .permissions import admin_or_manager_required
+from frontend.utils.pricing_bulk import BulkPricingHelper
 
 @login_required
 @user_passes_test(admin_or_manager_required)
 def bulk_pricing_management(request):
     """OPTIMIZED: Bulk vessel pricing management interface with fixed annotations"""
     
-    # OPTIMIZED: Get touristic vessels with pricing statistics
-    touristic_vessels = Vessel.objects.filter(
+    touristic_vessels = list(Vessel.objects.filter(
         active=True, 
         has_duty_free=False
-    ).annotate(
-        # Count custom prices for each vessel
-        custom_prices_count=Count(
-            'custom_prices',
-            filter=Q(
-                custom_prices__product__active=True,
-                custom_prices__product__is_duty_free=False
-            )
-        )
-    ).order_by('name')
+    ).order_by('name'))
+    vessel_ids = [vessel.id for vessel in touristic_vessels]
     
-    # OPTIMIZED: Get general products with pricing status
-    general_products_with_stats = Product.objects.filter(
+    general_products = list(Product.objects.filter(
         active=True, 
         is_duty_free=False
-    ).annotate(
-        # Count how many vessels have custom pricing for this product
-        vessels_with_custom_price=Count(
-            'vessel_prices',
-            filter=Q(
-                vessel_prices__vessel__active=True,
-                vessel_prices__vessel__has_duty_free=False
-            )
-        )
-    ).select_related('category').order_by('item_id')
+    ).select_related('category').order_by('item_id'))
     
-    # Convert to list to avoid reusing the annotated queryset
-    general_products = list(general_products_with_stats)
-    
-    # OPTIMIZED: Get existing pricing data efficiently
-    vessel_prices_qs = VesselProductPrice.objects.select_related(
-        'vessel', 'product'
-    ).filter(
-        vessel__active=True,
-        vessel__has_duty_free=False,
+    # OPTIMIZED: Existing prices as plain rows, names resolved from the lists above
+    vessel_names = {vessel.id: vessel.name for vessel in touristic_vessels}
+    product_names = {product.id: product.name for product in general_products}
+    vessel_prices_rows = VesselProductPrice.objects.filter(
+        vessel_id__in=vessel_ids,
         product__active=True,
         product__is_duty_free=False
-    )
+    ).values_list('vessel_id', 'product_id', 'selling_price', 'created_at', 'updated_at')
     
-    # Build existing prices dictionary more efficiently
-    existing_prices = {
-        f"{vp.vessel_id}_{vp.product_id}": {
-            'price': vp.selling_price,
-            'created_at': vp.created_at,
-            'updated_at': vp.updated_at,
-            'vessel_name': vp.vessel.name,
-            'product_name': vp.product.name
+    # 🚀 OPTIMIZED: The page lists every price anyway, so coverage counts come from the same rows
+    vessel_priced_counts = Counter()
+    product_vessel_counts = Counter()
+    existing_prices = {}
+    for vessel_id, product_id, selling_price, created_at, updated_at in vessel_prices_rows:
+        vessel_priced_counts[vessel_id] += 1
+        product_vessel_counts[product_id] += 1
+        existing_prices[f"{vessel_id}_{product_id}"] = {
+            'price': selling_price,
+            'created_at': created_at,
+            'updated_at': updated_at,
+            'vessel_name': vessel_names[vessel_id],
+            'product_name': product_names[product_id]
         }
-        for vp in vessel_prices_qs
-    }
     
     # OPTIMIZED: Calculate completion stats efficiently
     total_general_products = len(general_products)
-    total_touristic_vessels = touristic_vessels.count()
+    total_touristic_vessels = len(touristic_vessels)
     total_combinations = total_touristic_vessels * total_general_products
     completed_combinations = len(existing_prices)
     completion_percentage = (completed_combinations / max(total_combinations, 1)) * 100
     
-    # OPTIMIZED: Get pricing summary with cached calculations
     pricing_summary = {}
     for vessel in touristic_vessels:
-        vessel_completion = (vessel.custom_prices_count / max(total_general_products, 1)) * 100
+        priced_count = vessel_priced_counts[vessel.id]
+        vessel_completion = (priced_count / max(total_general_products, 1)) * 100
         pricing_summary[vessel.id] = {
             'vessel_name': vessel.name,
-            'products_priced': vessel.custom_prices_count,
+            'products_priced': priced_count,
             'total_products': total_general_products,
             'completion_percentage': round(vessel_completion, 1),
-            'missing_count': total_general_products - vessel.custom_prices_count,
-            'has_warnings': vessel.custom_prices_count < total_general_products
+            'missing_count': total_general_products - priced_count,
+            'has_warnings': priced_count < total_general_products
         }
     
-    # FIXED: Product pricing statistics using annotated values correctly
     product_pricing_stats = {}
     for product in general_products:
-        # Access the annotated field correctly
-        vessels_covered = product.vessels_with_custom_price
+        vessels_covered = product_vessel_counts[product.id]
         coverage_percentage = (vessels_covered / max(total_touristic_vessels, 1)) * 100
         product_pricing_stats[product.id] = {
             'product_name': product.name,
@@ -159,6 +139,7 @@ def update_vessel_pricing(request):
         if action == 'delete':
             # Remove vessel pricing
             VesselProductPrice.objects.filter(vessel=vessel, product=product).delete()
+            BulkPricingHelper.invalidate_pricing_caches([(vessel.id, product.id)])
             return JsonResponse({
                 'success': True,
                 'message': f'Custom pricing removed for {product.name} on {vessel.name}',
@@ -218,46 +199,8 @@ def bulk_update_pricing(request):
         if not updates:
             return JsonResponse({'success': False, 'error': 'No updates provided'})
         
-        successful_updates = 0
-        failed_updates = []
-        
-        with transaction.atomic():
-            for update in updates:
-                try:
-                    vessel_id = update.get('vessel_id')
-                    product_id = update.get('product_id')
-                    price = update.get('price')
-                    
-                    if not all([vessel_id, product_id, price]):
-                        failed_updates.append(f"Missing data for update: {update}")
-                        continue
-                    
-                    vessel = Vessel.objects.get(id=vessel_id)
-                    product = Product.objects.get(id=product_id)
-                    price_decimal = Decimal(str(price))
-                    
-                    # Validate
-                    if vessel.has_duty_free or product.is_duty_free:
-                        failed_updates.append(f"Invalid vessel-product combination: {vessel.name} - {product.name}")
-                        continue
-                    
-                    if price_decimal <= 0:
-                        failed_updates.append(f"Invalid price for {product.name}: {price}")
-                        continue
-                    
-                    # Update or create
-                    VesselProductPrice.objects.update_or_create(
-                        vessel=vessel,
-                        product=product,
-                        defaults={
-                            'selling_price': price_decimal,
-                            'created_by': request.user
-                        }
-                    )
-                    successful_updates += 1
-                    
-                except Exception as e:
-                    failed_updates.append(f"Error updating {update}: {str(e)}")
+        # 🚀 BULK: One query per lookup, chunked bulk upserts, one cache invalidation
+        successful_updates, failed_updates = BulkPricingHelper.apply_price_updates(updates, user=request.user)
         
         return JsonResponse({
             'success': True,
@@ -287,38 +230,15 @@ def copy_pricing_template(request):
             return JsonResponse({'success': False, 'error': 'Source and target vessels required'})
         
         source_vessel = Vessel.objects.get(id=source_vessel_id)
-        target_vessels = Vessel.objects.filter(id__in=target_vessel_ids)
-        
-        # Get source vessel pricing
-        source_prices = VesselProductPrice.objects.filter(vessel=source_vessel)
+        target_vessels = list(Vessel.objects.filter(id__in=target_vessel_ids))
         
-        if not source_prices.exists():
+        if not VesselProductPrice.objects.filter(vessel=source_vessel).exists():
             return JsonResponse({'success': False, 'error': f'No pricing found for {source_vessel.name}'})
         
-        copied_count = 0
-        skipped_count = 0
-        
-        with transaction.atomic():
-            for target_vessel in target_vessels:
-                for source_price in source_prices:
-                    existing = VesselProductPrice.objects.filter(
-                        vessel=target_vessel, 
-                        product=source_price.product
-                    ).exists()
-                    
-                    if existing and not overwrite:
-                        skipped_count += 1
-                        continue
-                    
-                    VesselProductPrice.objects.update_or_create(
-                        vessel=target_vessel,
-                        product=source_price.product,
-                        defaults={
-                            'selling_price': source_price.selling_price,
-                            'created_by': request.user
-                        }
-                    )
-                    copied_count += 1
+        # 🚀 BULK: Source and target prices loaded once, written with chunked bulk statements
+        result = BulkPricingHelper.copy_prices(source_vessel, target_vessels, overwrite=overwrite, user=request.user)
+        copied_count = result['copied_count']
+        skipped_count = result['skipped_count']
         
         return JsonResponse({
             'success': True,
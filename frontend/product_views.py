@@ -5,6 +5,7 @@ from django.db.models.functions import Coalesce, Cast
 from django.core.cache import cache
 import logging
 from frontend.utils.cache_helpers import PerfectPagination, ProductCacheHelper, VesselCacheHelper
+from frontend.utils.product_index import ProductIndexHelper
 from .permissions import is_admin_or_manager, is_superuser_only
 from .utils import BilingualMessages
 from products.models import Product, Category
@@ -501,6 +502,7 @@ def product_edit_view(request, product_id):
             cache.delete_many([
                 'perfect_static_v2',  # Clear static data cache
             ])
+            ProductIndexHelper.mark_products_changed_all_vessels([product.id])
             # Clear product list cache patterns would require Redis/Memcached
             # For now, let cache expire naturally in 1 hour
                         
@@ -3,11 +3,12 @@ from django.utils import timezone
 from django.db import models
 from datetime import datetime, timedelta, date
 from django.contrib.auth.decorators import login_required
-from django.core.cache import cache
 import calendar
 from django.db.models.functions import Extract
 from django.db.models import Avg, Sum, Count, F, Q, Prefetch
-from frontend.utils.cache_helpers import VesselCacheHelper
+from decimal import Decimal
+from frontend.utils.cache_helpers import VesselCacheHelper, cached_computation
+from frontend.utils.profitability import ProfitabilityHelper
 from .utils.aggregators import TransactionAggregator, ProductAnalytics
 from transactions.models import Transaction, InventoryLot, Trip, PurchaseOrder
 from django.shortcuts import render
@@ -165,18 +166,15 @@ def po_reports(request):
     
     return render(request, 'frontend/po_reports.html', context)
 
-@reports_access_required
-def reports_dashboard(request):
-    """CORRECTED: Reports hub with caching and correct field names"""
-    
-    today = timezone.now().date()
-    cache_key = f'reports_dashboard_{today}'
-    
-    # Cache for 30 minutes
-    cached_data = cache.get(cache_key)
-    if cached_data:
-        cached_data['last_updated'] = timezone.now()
-        return render(request, 'frontend/reports_dashboard.html', cached_data)
+REPORTS_DASHBOARD_CACHE_TIMEOUT = 1800  # 30 minutes
+
+
+def get_reports_dashboard_cache_key(today):
+    return f'reports_dashboard_{today}'
+
+
+def build_reports_dashboard_context(today):
+    """Today's headline numbers for the reports hub (also precomputed by warm_caches)"""
     
     # Get today's stats using EXACT method that exists
     today_stats = TransactionAggregator.get_today_activity_summary()
@@ -199,16 +197,27 @@ def reports_dashboard(request):
         'last_updated': timezone.now(),
     }
     
-    # Cache for 30 minutes
-    cache.set(cache_key, context, 1800)
+    return context
+
+
+@reports_access_required
+def reports_dashboard(request):
+    """CORRECTED: Reports hub with caching and correct field names"""
+    
+    today = timezone.now().date()
+    cache_key = get_reports_dashboard_cache_key(today)
+    
+    # Cache for 30 minutes - one request rebuilds it, the rest get the previous numbers meanwhile
+    context = cached_computation(
+        cache_key, lambda: build_reports_dashboard_context(today), REPORTS_DASHBOARD_CACHE_TIMEOUT
+    )
+    context['last_updated'] = timezone.now()
     
     return render(request, 'frontend/reports_dashboard.html', context)
 
 @reports_access_required
 def daily_report(request):
     """OPTIMIZED: Combined queries for daily report with comparison"""
-    from django.db.models import OuterRef, Subquery
-    from collections import defaultdict
 
     # Parse selected date
     selected_date_str = request.GET.get('date')
@@ -221,9 +230,18 @@ def daily_report(request):
     cache_key = f'daily_report_{selected_date}'
     cache_duration = 3600 if selected_date == today else 86400
 
-    if cached := cache.get(cache_key):
-        return render(request, 'frontend/daily_report.html', cached)
+    context = cached_computation(
+        cache_key, lambda: build_daily_report_context(selected_date), cache_duration, compact=True
+    )
+    return render(request, 'frontend/daily_report.html', context)
+
+
+def build_daily_report_context(selected_date):
+    """Daily report context for one date, compared with the day before"""
+    from django.db.models import OuterRef, Subquery
+    from collections import defaultdict
 
+    today = timezone.now().date()
     previous_date = selected_date - timedelta(days=1)
 
     # ✅ OPTIMIZATION 1: Single query for both dates
@@ -262,7 +280,11 @@ def daily_report(request):
     prev_revenue = previous_stats['total_revenue']
     revenue_change = ((stats['total_revenue'] - prev_revenue) / max(prev_revenue, 1) * 100) if prev_revenue > 0 else 0
     transaction_change = stats['total_transactions'] - previous_stats['total_transactions']
-    daily_profit = stats['total_revenue'] - stats['total_purchase_cost']
+
+    # ✅ Gross profit from actual FIFO COGS of the day's sales (one grouped query)
+    vessel_margins = ProfitabilityHelper.breakdown_map('vessel', selected_date, selected_date)
+    stats['total_cogs'] = sum((m['cogs'] for m in vessel_margins.values()), Decimal('0'))
+    daily_profit = stats['total_revenue'] - stats['total_cogs']
     profit_margin = (daily_profit / max(stats['total_revenue'], 1)) * 100
 
     # ✅ OPTIMIZATION 2: Vessel breakdown using already fetched transactions
@@ -286,10 +308,12 @@ def daily_report(request):
         transfer_in_count = len([t for t in vessel_txns if t.transaction_type == 'TRANSFER_IN'])
         total_quantity = sum(t.quantity or 0 for t in vessel_txns)
 
-        profit = revenue - costs
+        cogs = vessel_margins[vessel.id]['cogs'] if vessel.id in vessel_margins else 0
+        profit = revenue - cogs
         vessel_stats = {
             'revenue': revenue,
             'costs': costs,
+            'cogs': cogs,
             'sales_count': sales_count,
             'supply_count': supply_count,
             'transfer_out_count': transfer_out_count,
@@ -429,8 +453,7 @@ def daily_report(request):
         'vessels': vessels,
     }
 
-    cache.set(cache_key, context, cache_duration)
-    return render(request, 'frontend/daily_report.html', context)
+    return context
 
 @reports_access_required
 def monthly_report(request):
@@ -461,10 +484,17 @@ def monthly_report(request):
     current_year = today.year
     cache_duration = 7200 if (month == current_month and year == current_year) else 86400
     
-    # Try cache first
-    cached_data = cache.get(cache_key)
-    if cached_data:
-        return render(request, 'frontend/monthly_report.html', cached_data)
+    # Cached - one request rebuilds it when it expires
+    context = cached_computation(
+        cache_key, lambda: build_monthly_report_context(year, month), cache_duration, compact=True
+    )
+    
+    return render(request, 'frontend/monthly_report.html', context)
+
+
+def build_monthly_report_context(year, month):
+    """Monthly operations report context"""
+    current_year = timezone.now().date().year
     
     # Generate year range and months
     SYSTEM_START_YEAR = 2023
@@ -724,10 +754,7 @@ def monthly_report(request):
         'profit_margin': profit_margin,
     }
     
-    # Cache the results
-    cache.set(cache_key, context, cache_duration)
-    
-    return render(request, 'frontend/monthly_report.html', context)
+    return context
 
 @reports_access_required
 def analytics_report(request):
@@ -758,7 +785,7 @@ def analytics_report(request):
     # === VESSEL ANALYTICS === (OPTIMIZED: Single query instead of loop)
     
     vessel_analytics_raw = Vessel.objects.filter(active=True).annotate(
-        # Revenue and costs for last 30 days
+        # Revenue for last 30 days (costs come from ProfitabilityHelper)
         revenue=Sum(
             F('transactions__unit_price') * F('transactions__quantity'),
             filter=Q(
@@ -767,14 +794,6 @@ def analytics_report(request):
             ),
             output_field=models.DecimalField()
         ),
-        costs=Sum(
-            F('transactions__unit_price') * F('transactions__quantity'),
-            filter=Q(
-                transactions__transaction_type='SUPPLY', 
-                transactions__transaction_date__gte=last_30_days
-            ),
-            output_field=models.DecimalField()
-        ),
         sales_count=Count(
             'transactions',
             filter=Q(
@@ -795,11 +814,14 @@ def analytics_report(request):
         )
     ).order_by('-revenue')
     
+    # Cost of goods actually sold per vessel (FIFO), one grouped query
+    vessel_margins = ProfitabilityHelper.breakdown_map('vessel', last_30_days, today)
+
     # Convert to list and calculate derived fields
     vessel_analytics = []
     for vessel in vessel_analytics_raw:
         revenue = vessel.revenue or 0
-        costs = vessel.costs or 0
+        costs = vessel_margins[vessel.id]['cogs'] if vessel.id in vessel_margins else 0
         trips = vessel.trips_count or 0
         
         vessel_analytics.append({
@@ -977,4 +999,81 @@ def analytics_report(request):
         'today': today,
     }
     
-    return render(request, 'frontend/analytics_report.html', context)
\ No newline at end of file
+    return render(request, 'frontend/analytics_report.html', context)
+
+def build_inventory_valuation(vessel, start_month, end_month):
+    """Month-end FIFO valuation series for a vessel plus the per-product breakdown of the last month"""
+    from frontend.utils.inventory_valuation import InventoryValuationHelper
+
+    today = timezone.now().date()
+    last_day = date(end_month.year, end_month.month, calendar.monthrange(end_month.year, end_month.month)[1])
+    month_ends = InventoryValuationHelper.month_ends(min(start_month, today), min(last_day, today))
+    series = InventoryValuationHelper.valuate_series(vessel, month_ends)
+
+    month_rows = []
+    previous_value = None
+    for month_end in month_ends:
+        snapshot = series[month_end]
+        total_value = sum((item['value'] for item in snapshot.values()), Decimal('0'))
+        month_rows.append({
+            'month_end': month_end,
+            'total_quantity': sum((item['quantity'] for item in snapshot.values()), Decimal('0')),
+            'total_value': total_value,
+            'product_count': len(snapshot),
+            'value_change': total_value - previous_value if previous_value is not None else None,
+        })
+        previous_value = total_value
+
+    as_of = month_ends[-1]
+    snapshot = series[as_of]
+    products = Product.objects.filter(id__in=list(snapshot)).select_related('category')
+    product_rows = [
+        {
+            'product': product,
+            'quantity': snapshot[product.id]['quantity'],
+            'value': snapshot[product.id]['value'],
+            'average_cost': snapshot[product.id]['value'] / snapshot[product.id]['quantity'],
+        }
+        for product in products
+    ]
+    product_rows.sort(key=lambda row: row['value'], reverse=True)
+
+    return {
+        'as_of': as_of,
+        'month_rows': month_rows,
+        'product_rows': product_rows,
+        'closing_value': month_rows[-1]['total_value'],
+    }
+
+
+@reports_access_required
+def inventory_valuation_report(request):
+    """Month-end FIFO inventory valuation for one vessel (vectorized, two queries per vessel)"""
+    today = timezone.now().date()
+    vessels = VesselCacheHelper.get_active_vessels()
+
+    vessel_id = request.GET.get('vessel')
+    vessel = next((v for v in vessels if str(v.id) == vessel_id), None) or (vessels[0] if vessels else None)
+
+    def parse_month(value, default):
+        try:
+            return datetime.strptime(value, '%Y-%m').date() if value else default
+        except ValueError:
+            return default
+
+    default_start = date(today.year - 1, today.month, 1)
+    start_month = parse_month(request.GET.get('start'), default_start)
+    end_month = parse_month(request.GET.get('end'), date(today.year, today.month, 1))
+    if start_month > end_month:
+        start_month, end_month = end_month, start_month
+
+    context = {
+        'vessels': vessels,
+        'selected_vessel': vessel,
+        'start_month': start_month.strftime('%Y-%m'),
+        'end_month': end_month.strftime('%Y-%m'),
+    }
+    if vessel:
+        context.update(build_inventory_valuation(vessel, start_month, end_month))
+
+    return render(request, 'frontend/inventory_valuation_report.html', context)
@@ -1,17 +1,20 @@
 from django.shortcuts import render, redirect
-from django.db.models import Q, Sum, Prefetch
+from django.db.models import Sum, F, Prefetch
 from django.http import JsonResponse
 from datetime import date
-from frontend.utils.cache_helpers import VesselCacheHelper, TripCacheHelper
+from frontend.utils.cache_helpers import VesselCacheHelper, TripCacheHelper, VesselPricingCacheHelper
+from frontend.utils.product_index import ProductIndexHelper
+from frontend.utils.completion_edits import CompletionEditHelper
+from frontend.utils.cache_invalidation import CacheInvalidationCollector
+from frontend.utils.cart_preview import CartPreviewHelper
 from vessels.models import Vessel
 from products.models import Product
-from transactions.models import Transaction, InventoryLot, Trip, get_vessel_product_price, get_vessel_pricing_warnings, get_available_inventory, get_available_inventory_at_date
+from transactions.models import Transaction, FIFOConsumption, Trip, get_vessel_product_price, get_vessel_pricing_warnings, get_available_to_promise, get_available_inventory_at_date
 from .utils import BilingualMessages
 from django.core.exceptions import ValidationError
 import json
 from decimal import Decimal
 from django.db import transaction
-import re
 from datetime import datetime
 import logging
 
@@ -232,34 +235,23 @@ def trip_sales(request, trip_id):
                 'created_at': sale.created_at.strftime('%H:%M')
             })
     else:
-        # 🚀 OPTIMIZED: Process completed trip using prefetched data
+        # 🚀 OPTIMIZED: COGS comes from the stored column; rows saved before it
+        # existed are summed from FIFOConsumption in one grouped query
+        legacy_ids = [sale.id for sale in sales_transactions if sale.cogs_total is None]
+        legacy_cogs = dict(
+            FIFOConsumption.objects.filter(transaction_id__in=legacy_ids).values('transaction_id').annotate(
+                total=Sum(F('consumed_quantity') * F('unit_cost'))
+            ).values_list('transaction_id', 'total')
+        ) if legacy_ids else {}
+        
         for sale in sales_transactions:
-            # Calculate COGS from FIFO consumption (parse from notes or recalculate)
-            total_cogs = 0
-            total_profit = 0
-            
-            try:
-                # Try to parse COGS from notes if it was logged during sale
-                if sale.notes and 'FIFO consumption:' in sale.notes:
-                    # Parse the FIFO breakdown from notes
-                    fifo_pattern = r'(\d+(?:\.\d+)?)\s+units\s+@\s+(\d+(?:\.\d+)?)\s+JOD'
-                    matches = re.findall(fifo_pattern, sale.notes)
-                    
-                    for qty_str, price_str in matches:
-                        qty = float(qty_str)
-                        price = float(price_str)
-                        total_cogs += qty * price
-                    
-                    total_profit = float(sale.total_amount) - total_cogs
-                else:
-                    # Fallback: estimate COGS as 70% of selling price
-                    total_cogs = float(sale.total_amount) * 0.7
-                    total_profit = float(sale.total_amount) * 0.3
-                    
-            except (ValueError, AttributeError):
-                # Fallback calculation
+            cogs = sale.cogs_total if sale.cogs_total is not None else legacy_cogs.get(sale.id)
+            if cogs is not None:
+                total_cogs = float(cogs)
+            else:
+                # No FIFO data at all: estimate COGS as 70% of selling price
                 total_cogs = float(sale.total_amount) * 0.7
-                total_profit = float(sale.total_amount) * 0.3
+            total_profit = float(sale.total_amount) - total_cogs
             
             completed_sales.append({
                 'id': sale.id,
@@ -297,8 +289,8 @@ def trip_sales(request, trip_id):
     return render(request, 'frontend/trip_sales.html', context)
 
 @operations_access_required
-def sales_search_products(request):
-    """AJAX endpoint to search for products available on specific vessel"""
+async def sales_search_products(request):
+    """AJAX endpoint to search for products available on specific vessel (async: no worker thread per keystroke under ASGI)"""
     if request.method != 'POST':
         return JsonResponse({'success': False, 'error': 'POST method required'})
     
@@ -311,48 +303,17 @@ def sales_search_products(request):
             return JsonResponse({'success': False, 'error': 'Search term and vessel required'})
         
         # Get vessel
-        vessel = Vessel.objects.get(id=vessel_id, active=True)
+        vessel = await Vessel.objects.aget(id=vessel_id, active=True)
         
-        # Search for products with available inventory on this vessel
-        available_lots = InventoryLot.objects.filter(
-            vessel=vessel,
-            remaining_quantity__gt=0,
-            product__active=True
-        ).filter(
-            Q(product__name__icontains=search_term) |
-            Q(product__item_id__icontains=search_term) |
-            Q(product__barcode__icontains=search_term)
-        ).select_related('product')
-        
-        # Filter duty-free products if vessel doesn't support them
-        if not vessel.has_duty_free:
-            available_lots = available_lots.filter(product__is_duty_free=False)
-        
-        # Group by product and calculate totals
-        product_summaries = available_lots.values(
-            'product__id', 'product__name', 'product__item_id', 
-            'product__barcode', 'product__is_duty_free',
-            'product__selling_price'
-        ).annotate(
-            total_quantity=Sum('remaining_quantity')
-        ).order_by('product__item_id')
+        # 🚀 POS INDEX: Trie/barcode lookup instead of icontains lot join per keystroke
+        # Duty-free products are only sold on duty-free vessels
+        matches = await ProductIndexHelper.asearch(vessel, search_term, exclude_duty_free=not vessel.has_duty_free)
+        lots_by_product = await ProductIndexHelper.aget_open_lots(vessel, [entry['id'] for entry in matches])
         
         products = []
-        for summary in product_summaries:
-            product_id = summary['product__id']
-            
-            # Get FIFO lots for this product (for detailed view)
-            lots = InventoryLot.objects.filter(
-                vessel=vessel,
-                product_id=product_id,
-                remaining_quantity__gt=0
-            ).order_by('purchase_date', 'created_at')
-            
-            # Get current cost (oldest available lot)
-            current_cost = lots.first().purchase_price if lots.exists() else 0
-            
+        for entry in matches:
             lots_data = []
-            for lot in lots:
+            for lot in lots_by_product.get(entry['id'], []):
                 lots_data.append({
                     'id': lot.id,
                     'purchase_date': lot.purchase_date.strftime('%d/%m/%Y'),
@@ -362,14 +323,14 @@ def sales_search_products(request):
                 })
             
             products.append({
-                'id': product_id,
-                'name': summary['product__name'],
-                'item_id': summary['product__item_id'],
-                'barcode': summary['product__barcode'] or '',
-                'is_duty_free': summary['product__is_duty_free'],
-                'selling_price': float(summary['product__selling_price']),
-                'current_cost': float(current_cost),
-                'total_quantity': summary['total_quantity'],
+                'id': entry['id'],
+                'name': entry['name'],
+                'item_id': entry['item_id'],
+                'barcode': entry['barcode'],
+                'is_duty_free': entry['is_duty_free'],
+                'selling_price': entry['price'],
+                'current_cost': entry['cost'],
+                'total_quantity': entry['stock'],
                 'lots': lots_data
             })
         
@@ -398,60 +359,63 @@ def sales_validate_inventory(request):
         if not all([vessel_id, product_id]) or quantity <= 0:
             return JsonResponse({'success': False, 'error': 'Invalid parameters'})
         
-        # Get objects
         vessel = Vessel.objects.get(id=vessel_id, active=True)
-        product = Product.objects.get(id=product_id, active=True)
-        
-        # Get available inventory and FIFO lots
-        available_quantity, lots = get_available_inventory(vessel, product)
         
-        if quantity > available_quantity:
+        # One-line cart: same FIFO simulation as the batch preview
+        line = CartPreviewHelper.preview(vessel, [(int(product_id), quantity)], priced=True)['lines'][0]
+        if line.get('error'):
+            raise Product.DoesNotExist
+        if not line['sufficient']:
             return JsonResponse({
                 'success': False, 
-                'error': f'Insufficient inventory. Available: {available_quantity}, Requested: {quantity}'
-            })
-        
-        # Simulate FIFO consumption to show preview
-        consumption_preview = []
-        remaining_to_consume = quantity
-        total_fifo_cost = 0
-        
-        for lot in lots:
-            if remaining_to_consume <= 0:
-                break
-            
-            consumed_from_lot = min(lot.remaining_quantity, remaining_to_consume)
-            lot_cost = consumed_from_lot * lot.purchase_price
-            total_fifo_cost += lot_cost
-            
-            consumption_preview.append({
-                'lot_date': lot.purchase_date.strftime('%d/%m/%Y'),
-                'consumed_quantity': consumed_from_lot,
-                'unit_cost': float(lot.purchase_price),
-                'total_cost': float(lot_cost)
+                'error': f'Insufficient inventory. Available: {line["available_quantity"]}, Requested: {quantity}'
             })
-            
-            remaining_to_consume -= consumed_from_lot
         
-        # Calculate profit
-        total_revenue = quantity * product.selling_price
-        total_profit = total_revenue - total_fifo_cost
-        
-        return JsonResponse({
+        return JsonResponse(CartPreviewHelper.as_json({
             'success': True,
-            'available_quantity': available_quantity,
-            'after_sale_quantity': available_quantity - quantity,
-            'consumption_preview': consumption_preview,
-            'total_fifo_cost': float(total_fifo_cost),
-            'total_revenue': float(total_revenue),
-            'total_profit': float(total_profit),
-            'selling_price': float(product.selling_price)
-        })
+            'available_quantity': line['available_quantity'],
+            'after_sale_quantity': line['after_quantity'],
+            'consumption_preview': line['consumption_breakdown'],
+            'total_fifo_cost': line['cogs'],
+            'total_revenue': line['revenue'],
+            'total_profit': line['margin'],
+            'selling_price': line['selling_price']
+        }))
         
     except (Vessel.DoesNotExist, Product.DoesNotExist):
         return JsonResponse({'success': False, 'error': 'Vessel or product not found'})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
+
+@operations_access_required
+def sales_preview_cart(request):
+    """
+    AJAX endpoint: availability, FIFO COGS and margin for a whole sales cart.
+    Body: {vessel_id, lines: [{product_id, quantity}, ...]}; repeated products draw from the same lots.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'POST method required'})
+    
+    try:
+        data = json.loads(request.body)
+        vessel = Vessel.objects.get(id=data.get('vessel_id'), active=True)
+        
+        # Validate user has access to this vessel for sales operations
+        can_access, error_msg = VesselOperationValidator.validate_sales_access(request.user, vessel)
+        if not can_access:
+            return JsonResponse({'success': False, 'error': error_msg})
+        
+        lines = CartPreviewHelper.parse_lines(data.get('lines'))
+        
+        preview = CartPreviewHelper.preview(vessel, lines, priced=True)
+        return JsonResponse(CartPreviewHelper.as_json({'success': True, **preview}))
+        
+    except Vessel.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Vessel not found'})
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
     
 # Add this import at the top of sales_views.py
 from frontend.utils.cache_helpers import TripCacheHelper
@@ -476,93 +440,85 @@ def trip_bulk_complete(request):
         if trip.is_completed:
             return JsonResponse({'success': False, 'error': 'Trip is already completed'})
         
-        created_transactions = []
         total_revenue = 0
         pricing_warnings = []
         
+        # 🚀 BATCH: Products and effective vessel prices resolved once for the whole cart
+        product_ids = [item.get('product_id') for item in sales_items if item.get('product_id')]
+        products_by_id = Product.objects.in_bulk(product_ids)
+        vessel_prices = VesselPricingCacheHelper.get_prices(trip.vessel, products_by_id.keys())
+        
+        # Validate each sales item
+        lines = []
+        for item in sales_items:
+            product_id = item.get('product_id')
+            quantity = Decimal(str(item.get('quantity', 0)))
+            unit_price = Decimal(str(item.get('unit_price', 0)))
+            notes = item.get('notes', '').strip()
+            
+            if quantity <= 0 or unit_price <= 0:
+                continue
+            
+            # Get product
+            product = products_by_id.get(product_id)
+            if product is None:
+                raise Product.DoesNotExist(f'Product {product_id} not found')
+            
+            # Check vessel-specific pricing (touristic vessels should not fall back to default prices)
+            _, is_custom_price = vessel_prices.get(product.id, (None, False))
+            if not trip.vessel.has_duty_free and not product.is_duty_free and not is_custom_price:
+                pricing_warnings.append({
+                    'product_name': product.name,
+                    'vessel_name': trip.vessel.name,
+                    'used_price': float(unit_price)
+                })
+            
+            lines.append({'product': product, 'quantity': quantity, 'unit_price': unit_price, 'notes': notes})
+            total_revenue += quantity * unit_price
+        
         with transaction.atomic():
-            # Clear existing transactions for this trip (if any)
-            existing_sales_transactions = Transaction.objects.filter(
+            # 🔄 DELTA EDIT: Diff the cart against sales already posted to this trip
+            existing_sales_transactions = Transaction.objects.select_related('product').filter(
                 trip=trip, 
                 transaction_type='SALE'
-            )
-
-            if existing_sales_transactions.exists():
-                logger.info(f"Trip edit: Deleting {existing_sales_transactions.count()} existing sales transactions for inventory restoration")
-                
-                # Delete each transaction individually to trigger inventory restoration
-                for txn in existing_sales_transactions:
-                    txn.delete()  # This calls the individual delete() method with inventory restoration
-                
-                logger.info(f"Trip edit: Inventory restored for {existing_sales_transactions.count()} transactions")
+            ).order_by('created_at', 'id')
+            plan = CompletionEditHelper.diff(existing_sales_transactions, lines, 'SALE')
             
-            # Process each sales item
-            for item in sales_items:
-                product_id = item.get('product_id')
-                quantity = Decimal(str(item.get('quantity', 0)))
-                unit_price = Decimal(str(item.get('unit_price', 0)))
-                notes = item.get('notes', '').strip()
-                
-                if quantity <= 0 or unit_price <= 0:
-                    continue
-                
-                # Get product
-                product = Product.objects.get(id=product_id)
-                
-                # Check available inventory at trip date (point-in-time validation)
-                from django.utils import timezone
-                today = timezone.now().date()
-                
+            # Check available inventory at trip date (point-in-time validation) for the stock the edit adds
+            from django.utils import timezone
+            today = timezone.now().date()
+            
+            for product_id, quantity in plan.increases().items():
+                product = products_by_id[product_id]
                 if trip.trip_date < today:
                     # Historical trip - use point-in-time inventory balance
                     available_quantity, _ = get_available_inventory_at_date(trip.vessel, product, trip.trip_date)
                 else:
                     # Current or future trip - use current inventory balance
-                    available_quantity, _ = get_available_inventory(trip.vessel, product)
+                    available_quantity, _ = get_available_to_promise(trip.vessel, product)
                 
                 if quantity > available_quantity:
                     return JsonResponse({
                         'success': False, 
-                        'error': f'Insufficient inventory for {product.name}. Available at {trip.trip_date}: {available_quantity}, Requested: {quantity}'
+                        'error': f'Insufficient inventory for {product.name}. Available at {trip.trip_date}: {available_quantity}, Additional requested: {quantity}'
                     })
-                
-                # Check vessel-specific pricing
-                vessel_price = get_vessel_product_price(trip.vessel, product)
-                if not vessel_price:
-                    pricing_warnings.append({
-                        'product_name': product.name,
-                        'vessel_name': trip.vessel.name,
-                        'used_price': float(unit_price)
-                    })
-                
-                # Create sales transaction
-                sale_transaction = Transaction.objects.create(
-                    vessel=trip.vessel,
-                    product=product,
-                    transaction_type='SALE',
-                    quantity=quantity,
-                    unit_price=unit_price,
-                    transaction_date=trip.trip_date,
-                    trip=trip,
-                    notes=notes,
-                    created_by=request.user
-                )
-                
-                created_transactions.append(sale_transaction)
-                total_revenue += quantity * unit_price
-                
-            # 🚀 CACHE: Clear cache after adding transactions (before completion)
-            if created_transactions:
-                TripCacheHelper.clear_recent_trips_cache_only_when_needed()
-                logger.debug(f"Cache cleared after adding {len(created_transactions)} transactions")
             
+            # Only added, removed and re-quantified lines touch inventory lots
+            CompletionEditHelper.apply(plan, 'SALE', {
+                'vessel': trip.vessel,
+                'transaction_date': trip.trip_date,
+                'trip': trip,
+                'created_by': request.user,
+            })
+            created_transactions = plan.transactions
+                
             # Mark trip as completed
             trip.is_completed = True
             trip.save()
     
-            # 🚀 CACHE: Clear trip cache after completion
-            TripCacheHelper.clear_cache_after_trip_update(trip_id)
-            TripCacheHelper.clear_cache_after_trip_complete(trip_id)
+            # 🚀 CACHE: Clear trip cache once the completion commits (merged with the per-line clears)
+            CacheInvalidationCollector.defer(TripCacheHelper.clear_cache_after_trip_update, trip_id)
+            CacheInvalidationCollector.defer(TripCacheHelper.clear_cache_after_trip_complete, trip_id)
         
         # Build success response
         response_data = {
@@ -677,28 +633,21 @@ def sales_available_products(request):
         
         products = []
         pricing_warnings = []
+        vessel_prices = VesselPricingCacheHelper.get_price_map(vessel)
         
         for product in products_query:
             # Calculate available inventory (current or historical)
             if use_historical_inventory and trip_date:
                 available_quantity, _ = get_available_inventory_at_date(vessel, product, trip_date)
             else:
-                available_quantity, _ = get_available_inventory(vessel, product)
+                available_quantity, _ = get_available_to_promise(vessel, product)
             
             # Only include products with available inventory
             if available_quantity <= 0:
                 continue
             
-            # Get vessel-specific pricing
-            actual_price, is_custom_price, warning_message = get_vessel_product_price(vessel, product)
-            
-            # Collect warnings for non-duty-free vessels using default pricing
-            if warning_message:
-                pricing_warnings.append({
-                    'product_id': product.id,
-                    'product_name': product.name,
-                    'message': warning_message
-                })
+            # Get vessel-specific pricing from the cached effective price table
+            actual_price, is_custom_price = vessel_prices.get(product.id, (product.selling_price, False))
             
             products.append({
                 'id': product.id,
@@ -752,59 +701,34 @@ def sales_calculate_cogs(request):
         if not all([vessel_id, product_id]) or quantity <= 0:
             return JsonResponse({'success': False, 'error': 'Invalid parameters'})
         
-        # Get objects
         vessel = Vessel.objects.get(id=vessel_id, active=True)
-        product = Product.objects.get(id=product_id, active=True)
-        
-        # Get vessel-specific pricing
-        actual_selling_price, is_custom_price, warning_message = get_vessel_product_price(vessel, product)
         
-        # Get available inventory and FIFO lots
-        available_quantity, lots = get_available_inventory(vessel, product)
-        
-        if quantity > available_quantity:
+        # One-line cart: same FIFO simulation and effective price as the batch preview
+        preview = CartPreviewHelper.preview(vessel, [(int(product_id), quantity)], priced=True)
+        line = preview['lines'][0]
+        if line.get('error'):
+            raise Product.DoesNotExist
+        if not line['sufficient']:
             return JsonResponse({
                 'success': False, 
-                'error': f'Insufficient inventory. Available: {available_quantity}, Requested: {quantity}'
+                'error': f'Insufficient inventory. Available: {line["available_quantity"]}, Requested: {quantity}'
             })
         
-        # Simulate FIFO consumption to calculate COGS
-        consumption_preview = []
-        remaining_to_consume = quantity
-        total_fifo_cost = 0
-        
-        for lot in lots:
-            if remaining_to_consume <= 0:
-                break
-            
-            consumed_from_lot = min(lot.remaining_quantity, remaining_to_consume)
-            lot_cost = consumed_from_lot * lot.purchase_price
-            total_fifo_cost += lot_cost
-            
-            consumption_preview.append({
-                'lot_date': lot.purchase_date.strftime('%d/%m/%Y'),
-                'consumed_quantity': consumed_from_lot,
-                'unit_cost': float(lot.purchase_price),
-                'total_cost': float(lot_cost)
-            })
-            
-            remaining_to_consume -= consumed_from_lot
-        
-        # Calculate profit using vessel-specific selling price
-        total_revenue = quantity * actual_selling_price
-        total_profit = total_revenue - total_fifo_cost
+        product = Product.objects.get(id=product_id)
+        # Price map is already cached by the preview - only the warning is new here
+        _, _, warning_message = get_vessel_product_price(vessel, product)
         
         response_data = {
             'success': True,
-            'total_cogs': float(total_fifo_cost),
-            'total_revenue': float(total_revenue),
-            'total_profit': float(total_profit),
-            'consumption_breakdown': consumption_preview,
+            'total_cogs': line['cogs'],
+            'total_revenue': line['revenue'],
+            'total_profit': line['margin'],
+            'consumption_breakdown': line['consumption_breakdown'],
             'pricing_info': {
-                'selling_price': float(actual_selling_price),
-                'default_price': float(product.selling_price),
-                'is_custom_price': is_custom_price,
-                'price_difference': float(actual_selling_price - product.selling_price)
+                'selling_price': line['selling_price'],
+                'default_price': product.selling_price,
+                'is_custom_price': line['is_custom_price'],
+                'price_difference': line['selling_price'] - product.selling_price
             }
         }
         
@@ -812,7 +736,7 @@ def sales_calculate_cogs(request):
         if warning_message:
             response_data['pricing_warning'] = warning_message
         
-        return JsonResponse(response_data)
+        return JsonResponse(CartPreviewHelper.as_json(response_data))
         
     except (Vessel.DoesNotExist, Product.DoesNotExist):
         return JsonResponse({'success': False, 'error': 'Vessel or product not found'})
@@ -861,7 +785,7 @@ def sales_execute(request):
             available_quantity, lots = get_available_inventory_at_date(vessel, product, sale_date_obj)
         else:
             # Current or future transaction - use current inventory balance
-            available_quantity, lots = get_available_inventory(vessel, product)
+            available_quantity, lots = get_available_to_promise(vessel, product)
         
         if quantity > available_quantity:
             return JsonResponse({
@@ -22,10 +22,15 @@ import decimal
 from django.views.decorators.http import require_http_methods
 from django.template.loader import render_to_string
 from django.http import HttpResponse
-import weasyprint
 import io
+import os
+import tempfile
 import logging
 from frontend.utils.cache_helpers import ProductCacheHelper, POCacheHelper
+from frontend.utils.supply_receiving import SupplyReceivingHelper
+from frontend.utils.completion_edits import CompletionEditHelper
+from frontend.utils.cache_invalidation import CacheInvalidationCollector
+from frontend.utils.export_backends import LazyImport
 from .utils.helpers import (format_currency,
     format_currency_or_none,
     format_percentage,
@@ -54,6 +59,9 @@ from vessel_management.models import UserVesselAssignment
 
 logger = logging.getLogger(__name__)
 
+# 🚀 Loaded on the first PO PDF, not at worker start-up
+weasyprint = LazyImport('weasyprint')
+
 @operations_access_required
 def supply_entry(request):
     """Step 1: Create new purchase order for supply transactions - OPTIMIZED"""
@@ -396,7 +404,9 @@ def po_bulk_complete(request):
                 'product': product,
                 'quantity': Decimal(str(quantity)),
                 'unit_price': Decimal(str(unit_price)),
-                'notes': notes
+                'notes': notes,
+                'boxes': boxes,
+                'items_per_box': items_per_box
             })
             
             total_cost += quantity * unit_price
@@ -404,54 +414,29 @@ def po_bulk_complete(request):
         if not validated_items:
             return JsonResponse({'success': False, 'error': 'No valid items to process'})
         
-        created_transactions = []
-        
         with transaction.atomic():
-            # Clear existing transactions for this PO (if any)
-            existing_supply_transactions = Transaction.objects.filter(
+            # 🔄 DELTA EDIT: Diff the items against supply lines already posted to this PO
+            existing_supply_transactions = Transaction.objects.select_related('product').filter(
                 purchase_order=po, 
                 transaction_type='SUPPLY'
-            )
-
-            if existing_supply_transactions.exists():
-                logger.info(f"PO edit: Deleting {existing_supply_transactions.count()} existing supply transactions for inventory restoration")
-                
-                # Delete each transaction individually to trigger inventory restoration
-                for txn in existing_supply_transactions:
-                    txn.delete()  # This calls the individual delete() method with inventory restoration
-                
-                logger.info(f"PO edit: Inventory restored for {existing_supply_transactions.count()} transactions")
-            
-            # Process each supply item
-            for item_data in validated_items:
-                product = item_data['product']
-                quantity = item_data['quantity']
-                unit_price = item_data['unit_price']
-                notes = item_data['notes']
-                
-                # Create supply transaction
-                supply_transaction = Transaction.objects.create(
-                    vessel=po.vessel,
-                    product=product,
-                    transaction_type='SUPPLY',
-                    quantity=quantity,
-                    unit_price=unit_price,
-                    transaction_date=po.po_date,
-                    purchase_order=po,
-                    notes=notes,
-                    created_by=request.user,
-                    boxes=boxes if boxes is not None else None,
-                    items_per_box=items_per_box if items_per_box is not None else None
-                )
-                
-                created_transactions.append(supply_transaction)
+            ).order_by('created_at', 'id')
+            plan = CompletionEditHelper.diff(existing_supply_transactions, validated_items, 'SUPPLY')
+            
+            # Only added, removed and re-quantified lines touch inventory lots
+            CompletionEditHelper.apply(plan, 'SUPPLY', {
+                'vessel': po.vessel,
+                'purchase_order': po,
+                'created_by': request.user,
+            })
+            created_transactions = plan.transactions
+            po.update_summary_fields()
             
             # Mark PO as completed
             po.is_completed = True
             po.save()
             
-            # 🚀 CACHE: Clear PO cache after completion
-            POCacheHelper.clear_cache_after_po_complete(po_id)
+            # 🚀 CACHE: Clear PO cache once the completion commits
+            CacheInvalidationCollector.defer(POCacheHelper.clear_cache_after_po_complete, po_id)
         
         # Build success response
         response_data = {
@@ -471,6 +456,49 @@ def po_bulk_complete(request):
         return JsonResponse({'success': False, 'error': f'Error completing PO: {str(e)}'})
 
 
+@operations_access_required
+@require_http_methods(["POST"])
+def po_receive_file(request, po_id):
+    """Receive a supplier delivery file (CSV/XLSX) into a purchase order with bulk inserts"""
+    upload = request.FILES.get('file')
+    if not upload:
+        return JsonResponse({'success': False, 'error': 'Delivery file required'})
+    
+    suffix = os.path.splitext(upload.name)[1].lower()
+    if suffix not in ('.csv', '.xlsx', '.xlsm'):
+        return JsonResponse({'success': False, 'error': 'Only CSV and XLSX files are supported'})
+    
+    try:
+        po = PurchaseOrder.objects.select_related('vessel').get(id=po_id)
+    except PurchaseOrder.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Purchase order not found'})
+    
+    can_access, error_msg = VesselOperationValidator.validate_inventory_access(request.user, po.vessel)
+    if not can_access:
+        return JsonResponse({'success': False, 'error': error_msg})
+    
+    dry_run = request.POST.get('dry_run') in ('1', 'true', 'True')
+    complete = request.POST.get('complete') in ('1', 'true', 'True')
+    
+    try:
+        with tempfile.NamedTemporaryFile(suffix=suffix) as temp_file:
+            for file_chunk in upload.chunks():
+                temp_file.write(file_chunk)
+            temp_file.flush()
+            
+            result = SupplyReceivingHelper.receive_file(po, temp_file.name, request.user, dry_run=dry_run, complete=complete)
+    except Exception as e:
+        logger.error(f"PO file receiving error for PO {po_id}: {e}")
+        return JsonResponse({'success': False, 'error': f'Error receiving delivery file: {str(e)}'})
+    
+    if result['success'] and not dry_run:
+        result['message'] = f'{result["lines"]} items received into PO {po.po_number}'
+    elif not result['success']:
+        result['error'] = result['errors'][0]['error'] if len(result['errors']) == 1 else f'{len(result["errors"])} invalid lines in delivery file'
+    
+    return JsonResponse(result)
+
+
 @operations_access_required  
 def po_cancel(request):
     """Cancel PO and delete it from database (if no items committed) - CACHE AWARE"""
@@ -0,0 +1,1059 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from decimal import Decimal
+from datetime import date
+
+from vessels.models import Vessel
+from transactions.models import Transaction, InventoryLot, InventoryEvent
+from transactions.tests import InventoryTestSetup
+
+
+class InventoryReportingTests(InventoryTestSetup):
+    """Test cases for FIFO-based profitability and inventory valuation"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.vessel2 = Vessel.objects.create(name='Test Vessel 2', has_duty_free=False, created_by=cls.user)
+    
+    def test_profitability_uses_actual_cogs(self):
+        """Test gross margin subtracts FIFO COGS, not supply spend, and falls back to FIFO records"""
+        from frontend.utils.profitability import ProfitabilityHelper
+        
+        for vessel in (self.vessel, self.vessel2):
+            self.create_transaction('SUPPLY', '100', '1.00', vessel=vessel)
+        self.create_transaction('SALE', '10', '3.00')
+        legacy_sale = self.create_transaction('SALE', '4', '2.50', vessel=self.vessel2)
+        Transaction.objects.filter(id=legacy_sale.id).update(cogs_total=None)
+        
+        totals = ProfitabilityHelper.summarize(date.today(), date.today())
+        self.assertEqual(totals['revenue'], Decimal('40.00'))
+        self.assertEqual(totals['cogs'], Decimal('14.00'))
+        self.assertEqual(totals['gross_profit'], Decimal('26.00'))
+        
+        by_vessel = ProfitabilityHelper.breakdown_map('vessel', date.today(), date.today())
+        self.assertEqual(by_vessel[self.vessel2.id]['cogs'], Decimal('4.00'))
+        self.assertEqual(ProfitabilityHelper.breakdown('category')[0]['gross_profit'], Decimal('26.00'))
+    
+    def test_vectorized_valuation_matches_point_in_time_fifo(self):
+        """Test whole-vessel NumPy valuation agrees with get_available_inventory_at_date at each date"""
+        from datetime import timedelta
+        from transactions.models import get_available_inventory_at_date
+        from frontend.utils.inventory_valuation import InventoryValuationHelper
+        
+        day1 = date.today() - timedelta(days=20)
+        day2, day3 = day1 + timedelta(days=5), day1 + timedelta(days=10)
+        for when, quantity, cost in ((day1, '10', '1.00'), (day2, '5', '1.50')):
+            self.create_transaction('SUPPLY', quantity, cost, transaction_date=when)
+        self.create_transaction('SALE', '12', '2.00', transaction_date=day3)
+        
+        series = InventoryValuationHelper.valuate_series(self.vessel, [day1, day2, day3])
+        expected_values = {day1: Decimal('10.000'), day2: Decimal('17.500'), day3: Decimal('4.500')}
+        for when, expected_value in expected_values.items():
+            quantity, _ = get_available_inventory_at_date(self.vessel, self.product, when)
+            self.assertEqual(series[when][self.product.id]['quantity'], Decimal(str(quantity)))
+            self.assertEqual(series[when][self.product.id]['value'], expected_value)
+        self.assertEqual(InventoryValuationHelper.valuate(self.vessel2, day3), {})
+
+
+class ProductIndexTests(InventoryTestSetup):
+    """Test cases for the in-memory POS product index"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.product = cls.create_product('Orange Juice', 'OJ001', selling_price='3.00', barcode='6221234567890')
+    
+    def setUp(self):
+        super().setUp()
+        # Committed stock, so later test writes start a fresh invalidation batch
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_transaction('SUPPLY', '10', '1.25')
+    
+    def test_prefix_and_barcode_search(self):
+        """Test word-prefix, item_id and exact barcode lookups"""
+        from frontend.utils.product_index import ProductIndexHelper
+        
+        for term in ['ora', 'jui', 'orange ju', 'oj0', '6221234567890']:
+            results = ProductIndexHelper.search(self.vessel, term)
+            self.assertEqual([r['id'] for r in results], [self.product.id], term)
+        
+        self.assertEqual(ProductIndexHelper.search(self.vessel, 'apple'), [])
+        entry = ProductIndexHelper.search(self.vessel, 'orange')[0]
+        self.assertEqual(entry['stock'], 10)
+        self.assertEqual(entry['cost'], 1.25)
+    
+    def test_item_id_and_barcode_substrings_and_duty_free_scope(self):
+        """Test icontains parity on item_id/barcode, no result cap, and duty-free exclusion for sales only"""
+        import json
+        from frontend.utils.product_index import ProductIndexHelper
+        
+        for term in ['j00', '1234567', '890']:
+            self.assertEqual([r['id'] for r in ProductIndexHelper.search(self.vessel, term)], [self.product.id], term)
+        # Names match by word prefix only
+        self.assertEqual(ProductIndexHelper.search(self.vessel, 'ange'), [])
+        
+        juices = [self.create_product(f'Juice {i}', f'JC{i:03d}') for i in range(60)]
+        duty_free = self.create_product('Duty Free Juice', 'DF001', is_duty_free=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            for product in juices + [duty_free]:
+                self.create_transaction('SUPPLY', '1', '1.00', product=product)
+        self.assertEqual(len(ProductIndexHelper.search(self.vessel, 'juice')), 62)
+        self.assertEqual(len(ProductIndexHelper.search(self.vessel, 'juice', exclude_duty_free=True)), 61)
+        
+        self.client.force_login(self.user)
+        body = json.dumps({'search': 'DF0', 'vessel_id': self.vessel.id})
+        for url, expected in (('/sales/search-products/', []), ('/transfer/search-products/', [duty_free.id]),
+                              ('/waste/search-products/', [duty_free.id])):
+            response = self.client.post(url, body, content_type='application/json').json()
+            self.assertEqual([p['id'] for p in response['products']], expected, url)
+    
+    def test_incremental_refresh_after_sale(self):
+        """Test that a sale bumps the version and refreshes stock without a full rebuild"""
+        from frontend.utils.product_index import ProductIndexHelper
+        
+        index = ProductIndexHelper.get_index(self.vessel)
+        version = index.version
+        
+        # Stock marks are queued until the surrounding transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_transaction('SALE', '10', '3.00')
+        
+        refreshed = ProductIndexHelper.get_index(self.vessel)
+        self.assertIs(refreshed, index)
+        self.assertGreater(refreshed.version, version)
+        self.assertEqual(ProductIndexHelper.search(self.vessel, 'orange'), [])
+
+
+class VesselPricingCacheTests(InventoryTestSetup):
+    """Test cases for the cached per-vessel effective price table"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.duty_free = Vessel.objects.create(name='Duty Free Vessel', has_duty_free=True, created_by=cls.user)
+    
+    def test_price_table_follows_custom_and_default_price_changes(self):
+        """Test custom prices, duty-free rules and version invalidation on saves"""
+        from frontend.utils.cache_helpers import VesselPricingCacheHelper
+        from transactions.models import VesselProductPrice, get_vessel_product_price
+        
+        self.assertEqual(get_vessel_product_price(self.vessel, self.product), (Decimal('2.00'), False, None))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            vessel_price = VesselProductPrice.objects.create(
+                vessel=self.vessel, product=self.product, selling_price=Decimal('2.500'), created_by=self.user
+            )
+        self.assertEqual(get_vessel_product_price(self.vessel, self.product), (Decimal('2.500'), True, None))
+        self.assertEqual(
+            VesselPricingCacheHelper.get_prices(self.vessel, [self.product.id]),
+            {self.product.id: (Decimal('2.500'), True)}
+        )
+        self.assertEqual(
+            VesselPricingCacheHelper.get_prices(self.duty_free, [self.product.id]),
+            {self.product.id: (Decimal('2.000'), False)}
+        )
+        
+        self.product.selling_price = Decimal('3.00')
+        self.product.save()
+        self.assertEqual(
+            VesselPricingCacheHelper.get_prices(self.duty_free, [self.product.id]),
+            {self.product.id: (Decimal('3.000'), False)}
+        )
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            vessel_price.delete()
+        self.assertEqual(get_vessel_product_price(self.vessel, self.product), (Decimal('3.00'), False, None))
+    
+    def test_pricing_completeness_matrix_follows_committed_price_changes(self):
+        """Test the cached completeness matrix follows committed price saves, deletes and bulk upserts"""
+        from django.db import transaction
+        from frontend.utils.pricing_bulk import BulkPricingHelper
+        from frontend.utils.pricing_completeness import PricingCompletenessHelper
+        from transactions.models import VesselProductPrice, get_all_vessel_pricing_summary, get_vessel_pricing_warnings
+        
+        second = self.create_product('Second Product', 'TEST002')
+        warnings = get_vessel_pricing_warnings(self.vessel)
+        self.assertEqual(warnings['missing_price_count'], 2)
+        self.assertEqual(warnings['total_products'], 2)
+        
+        # A rolled-back price leaves the cached matrix alone
+        try:
+            with transaction.atomic():
+                VesselProductPrice.objects.create(
+                    vessel=self.vessel, product=self.product, selling_price=Decimal('2.500'), created_by=self.user
+                )
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(PricingCompletenessHelper.get_matrix().is_priced(self.vessel.id, self.product.id))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            vessel_price = VesselProductPrice.objects.create(
+                vessel=self.vessel, product=self.product, selling_price=Decimal('2.500'), created_by=self.user
+            )
+            BulkPricingHelper.apply_price_updates(
+                [{'vessel_id': self.vessel.id, 'product_id': second.id, 'price': '2.75'}], self.user
+            )
+        summary = get_all_vessel_pricing_summary()
+        self.assertEqual(summary['vessels_with_incomplete_pricing'], 0)
+        self.assertEqual(summary['touristic_vessels'][0]['custom_prices_count'], 2)
+        with self.assertNumQueries(1):
+            get_all_vessel_pricing_summary()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            vessel_price.delete()
+        matrix = PricingCompletenessHelper.get_matrix()
+        self.assertFalse(matrix.is_priced(self.vessel.id, self.product.id))
+        self.assertEqual(
+            get_vessel_pricing_warnings(self.vessel)['missing_products'],
+            [{'id': self.product.id, 'name': self.product.name, 'item_id': self.product.item_id}]
+        )
+        self.assertEqual(matrix.product_coverage([self.vessel.id]), {self.product.id: 0, second.id: 1})
+        
+        # A rebuild is one grouped query, and two vessels pricing a product still count once each
+        other = Vessel.objects.create(name='Pricing Vessel', has_duty_free=False, created_by=self.user)
+        VesselProductPrice.objects.create(vessel=other, product=second, selling_price=Decimal('2.900'), created_by=self.user)
+        with self.assertNumQueries(1):
+            matrix = PricingCompletenessHelper._build_matrix()
+        self.assertEqual(matrix.total_products, 2)
+        self.assertEqual(matrix.product_coverage([self.vessel.id, other.id]), {self.product.id: 0, second.id: 2})
+    
+    def test_bulk_price_updates_invalidate_after_commit(self):
+        """Test bulk upserts leave cached price tables alone until they commit"""
+        from django.db import transaction
+        from api.models import SyncChange
+        from frontend.utils.cache_helpers import VesselPricingCacheHelper
+        from frontend.utils.pricing_bulk import BulkPricingHelper
+        
+        update = [{'vessel_id': self.vessel.id, 'product_id': self.product.id, 'price': '2.75'}]
+        default_table = {self.product.id: (Decimal('2.000'), False)}
+        self.assertEqual(VesselPricingCacheHelper.get_prices(self.vessel, [self.product.id]), default_table)
+        
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                BulkPricingHelper.apply_price_updates(update, self.user)
+                # Still the committed table for concurrent readers; the sync journal row is written now
+                self.assertEqual(VesselPricingCacheHelper.get_prices(self.vessel, [self.product.id]), default_table)
+                self.assertTrue(SyncChange.objects.filter(vessel_id=self.vessel.id, entity_id=self.product.id).exists())
+        self.assertEqual(VesselPricingCacheHelper.get_prices(self.vessel, [self.product.id]), default_table)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(
+            VesselPricingCacheHelper.get_prices(self.vessel, [self.product.id]),
+            {self.product.id: (Decimal('2.750'), True)}
+        )
+
+
+class InventoryEventJournalTests(InventoryTestSetup):
+    """Test cases for archiving closed months of the inventory event journal"""
+    
+    def setUp(self):
+        import tempfile
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.media_root, ignore_errors=True)
+    
+    def test_closed_months_are_archived_and_queried_transparently(self):
+        """Test old events move to month files and the journal still returns them"""
+        from datetime import datetime
+        from django.test import override_settings
+        from django.utils import timezone
+        from frontend.utils.event_journal import InventoryEventJournal
+        
+        for quantity in ('4', '6'):
+            self.create_transaction('SUPPLY', quantity, '1.00')
+        sale = self.create_transaction('SALE', '7', '2.00')
+        old_timestamp = timezone.make_aware(datetime(2024, 1, 15, 10, 30))
+        InventoryEvent.objects.filter(transaction=sale).update(timestamp=old_timestamp)
+        expected = list(InventoryEvent.objects.filter(transaction=sale).order_by('-timestamp', '-id').values(
+            *InventoryEventJournal.COLUMNS
+        ))
+        self.assertEqual(len(expected), 2)
+        
+        with override_settings(MEDIA_ROOT=self.media_root):
+            self.assertEqual(InventoryEventJournal.archive_closed_months(), {'2024-01': 2})
+            self.assertFalse(InventoryEvent.objects.filter(transaction=sale).exists())
+            self.assertEqual(InventoryEventJournal.archived_months(), [(2024, 1)])
+            
+            events = InventoryEventJournal.query(vessel=self.vessel, product=self.product)
+            self.assertEqual([e for e in events if e['transaction_id'] == sale.id], expected)
+            self.assertEqual(
+                InventoryEventJournal.query(
+                    vessel=self.vessel,
+                    start=timezone.make_aware(datetime(2024, 2, 1)),
+                    end=timezone.make_aware(datetime(2024, 3, 1))
+                ),
+                []
+            )
+            self.assertIn(sale.id, InventoryEventJournal.transaction_ids_with_events(self.vessel, self.product))
+            
+            # Re-running is a no-op
+            self.assertEqual(InventoryEventJournal.archive_closed_months(), {})
+    
+    def test_failed_archive_delete_and_deleted_transactions_leave_no_stale_events(self):
+        """Test rows in both the table and a month file are read once, and deleted transactions drop out"""
+        from datetime import datetime
+        from unittest.mock import patch
+        from django.db.models.query import QuerySet
+        from django.test import override_settings
+        from django.utils import timezone
+        from frontend.utils.event_journal import InventoryEventJournal
+        
+        self.create_transaction('SUPPLY', '10', '1.00')
+        sale = self.create_transaction('SALE', '3', '2.00')
+        InventoryEvent.objects.filter(transaction=sale).update(
+            timestamp=timezone.make_aware(datetime(2024, 1, 15, 10, 30))
+        )
+        sale_id = sale.id
+        sale_event_ids = sorted(InventoryEvent.objects.filter(transaction=sale).values_list('id', flat=True))
+        
+        def sale_events():
+            return sorted(
+                e['id'] for e in InventoryEventJournal.query(vessel=self.vessel) if e['transaction_id'] == sale_id
+            )
+        
+        with override_settings(MEDIA_ROOT=self.media_root):
+            # The month file is written, then the delete fails and the rows stay hot
+            with patch.object(QuerySet, 'delete', side_effect=RuntimeError('delete failed')):
+                with self.assertRaises(RuntimeError):
+                    InventoryEventJournal.archive_closed_months()
+            self.assertEqual(InventoryEventJournal.archived_months(), [(2024, 1)])
+            self.assertEqual(len(sale_event_ids), InventoryEvent.objects.filter(transaction=sale).count())
+            self.assertEqual(sale_events(), sale_event_ids)
+            
+            # The next run finishes the move without duplicating the month file
+            self.assertEqual(InventoryEventJournal.archive_closed_months(), {'2024-01': len(sale_event_ids)})
+            self.assertEqual(sale_events(), sale_event_ids)
+            
+            sale.delete()
+            self.assertEqual(sale_events(), [])
+            self.assertNotIn(sale_id, InventoryEventJournal.transaction_ids_with_events(self.vessel))
+
+
+class OfflineSyncTests(InventoryTestSetup):
+    """Test cases for delta sync pulls and offline sale replay"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.products = [cls.product] + [cls.create_product(f'Sync Product {i}', f'SYNC00{i}') for i in (1, 2)]
+    
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_transaction('SUPPLY', '10', '1.00')
+    
+    def test_delta_pull_and_idempotent_replay(self):
+        """Test snapshot paging, delta pulls after a sale and duplicate-safe replay"""
+        from frontend.utils.sync_journal import SyncJournalHelper, OfflineSaleReplayHelper
+        
+        first = SyncJournalHelper.pull(self.vessel, limit=2)
+        self.assertTrue(first['snapshot'] and first['reset'] and first['has_more'])
+        second = SyncJournalHelper.pull(self.vessel, token=first['token'], limit=2)
+        self.assertFalse(second['has_more'])
+        self.assertTrue(second['token'].startswith('c'))
+        synced = [row[0] for row in first['products']['rows'] + second['products']['rows']]
+        self.assertEqual(synced, [p.id for p in self.products])
+        
+        idle = SyncJournalHelper.pull(self.vessel, token=second['token'])
+        self.assertEqual(idle['change_count'], 0)
+        self.assertEqual(idle['token'], second['token'])
+        
+        sale = {'client_id': 'tablet-1-0001', 'product_id': self.product.id, 'quantity': 3}
+        with self.captureOnCommitCallbacks(execute=True):
+            results = OfflineSaleReplayHelper.replay(self.vessel, [sale], self.user, device_id='tablet-1')
+        self.assertEqual(results[0]['status'], 'applied')
+        
+        delta = SyncJournalHelper.pull(self.vessel, token=second['token'])
+        self.assertFalse(delta['snapshot'])
+        self.assertEqual(delta['stock']['rows'], [[self.product.id, 7]])
+        
+        replayed = OfflineSaleReplayHelper.replay(self.vessel, [sale], self.user, device_id='tablet-1')
+        self.assertEqual(replayed[0]['status'], 'duplicate')
+        self.assertEqual(replayed[0]['transaction_id'], results[0]['transaction_id'])
+        self.assertEqual(Transaction.objects.filter(transaction_type='SALE').count(), 1)
+    
+    def test_replay_conflicts_fail_per_sale(self):
+        """Test a sale the vessel can no longer cover fails alone and repeats inside a batch are duplicates"""
+        from frontend.utils.sync_journal import OfflineSaleReplayHelper
+        
+        sales = [
+            {'client_id': 'tablet-2-0001', 'product_id': self.product.id, 'quantity': 8},
+            {'client_id': 'tablet-2-0002', 'product_id': self.product.id, 'quantity': 5},
+            {'client_id': 'tablet-2-0001', 'product_id': self.product.id, 'quantity': 8},
+            {'client_id': 'tablet-2-0003', 'product_id': self.products[1].id, 'quantity': 1},
+            {'client_id': '', 'product_id': self.product.id, 'quantity': 1},
+        ]
+        results = OfflineSaleReplayHelper.replay(self.vessel, sales, self.user, device_id='tablet-2')
+        
+        self.assertEqual(
+            [result['status'] for result in results], ['applied', 'failed', 'duplicate', 'failed', 'failed']
+        )
+        self.assertIn('Insufficient inventory', results[1]['error'])
+        self.assertEqual(results[2]['transaction_id'], results[0]['transaction_id'])
+        self.assertEqual(InventoryLot.objects.get(vessel=self.vessel, product=self.product).remaining_quantity, 2)
+        
+        # The failed sale is not remembered: replaying it once stock is back applies it
+        self.create_transaction('SUPPLY', '5', '1.00')
+        retried = OfflineSaleReplayHelper.replay(self.vessel, [sales[1]], self.user, device_id='tablet-2')
+        self.assertEqual(retried[0]['status'], 'applied')
+
+
+class ChangeFeedTests(InventoryTestSetup):
+    """Test cases for the cursor-based transaction / event change feed"""
+    
+    def test_feed_pages_by_sequence_cursor(self):
+        """Test batches follow the sequence cursor, filter by vessel and cover both streams"""
+        import json
+        from frontend.utils.change_feed import ChangeFeedHelper
+        
+        other_vessel = Vessel.objects.create(name='Feed Vessel', has_duty_free=False, created_by=self.user)
+        supplies = [self.create_transaction('SUPPLY', '5', '1.00') for _ in range(3)]
+        other_supply = self.create_transaction('SUPPLY', '2', '1.00', vessel=other_vessel)
+        
+        rows, cursor, has_more = ChangeFeedHelper.read('transactions', 0, limit=2)
+        self.assertEqual([row['id'] for row in rows], [s.id for s in supplies[:2]])
+        self.assertTrue(has_more)
+        
+        rows, cursor, has_more = ChangeFeedHelper.read('transactions', cursor, limit=2, vessel_id=self.vessel.id)
+        self.assertEqual([row['id'] for row in rows], [supplies[2].id])
+        self.assertFalse(has_more)
+        
+        rows, _, _ = ChangeFeedHelper.read('transactions', 0, vessel_id=other_vessel.id)
+        self.assertEqual([row['id'] for row in rows], [other_supply.id])
+        
+        sale = self.create_transaction('SALE', '7', '2.00')
+        events, _, _ = ChangeFeedHelper.wait('events', 0, timeout=0)
+        consumed = [e for e in events if e['transaction_id'] == sale.id]
+        self.assertEqual(sum(e['quantity_change'] for e in consumed), Decimal('-7'))
+        
+        rows, _, _ = ChangeFeedHelper.read('transactions', 0, limit=1)
+        line = ChangeFeedHelper.to_json_lines(rows).splitlines()[0]
+        self.assertEqual(json.loads(line)['quantity'], '5.000')
+        self.assertNotIn(' ', line)
+    
+    def test_late_commit_lands_after_cursor(self):
+        """Test a row committed after newer rows were read is still delivered, and deleted rows are skipped"""
+        from api.models import ChangeFeedEntry
+        from frontend.utils.change_feed import ChangeFeedHelper
+        
+        # The slow writer inserted first but its outbox entry is not visible until it commits
+        slow = self.create_transaction('SUPPLY', '4', '1.00')
+        pending = list(ChangeFeedEntry.objects.filter(stream='transactions', object_id=slow.id).values())
+        ChangeFeedEntry.objects.filter(stream='transactions', object_id=slow.id).delete()
+        fast = [self.create_transaction('SUPPLY', '5', '1.00') for _ in range(2)]
+        
+        rows, cursor, has_more = ChangeFeedHelper.read('transactions', 0)
+        self.assertEqual([row['id'] for row in rows], [t.id for t in fast])
+        
+        ChangeFeedEntry.objects.bulk_create([ChangeFeedEntry(**entry) for entry in pending])
+        rows, cursor, has_more = ChangeFeedHelper.read('transactions', cursor)
+        self.assertEqual([row['id'] for row in rows], [slow.id])
+        self.assertLess(slow.id, fast[0].id)
+        
+        # Inserted and deleted before the consumer read it: the cursor still moves past it
+        gone = self.create_transaction('SUPPLY', '1', '1.00')
+        Transaction.objects.filter(id=gone.id).delete()
+        rows, next_cursor, has_more = ChangeFeedHelper.read('transactions', cursor)
+        self.assertEqual(rows, [])
+        self.assertGreater(next_cursor, cursor)
+        self.assertFalse(has_more)
+    
+    def test_bulk_inserts_are_published(self):
+        """Test bulk_create writes outbox entries in the same transaction"""
+        from api.models import ChangeFeedEntry
+        
+        created = Transaction.objects.bulk_create([
+            Transaction(vessel=self.vessel, product=self.product, transaction_type='SUPPLY',
+                        transaction_date=date.today(), quantity=Decimal('3'), unit_price=Decimal('1.00'),
+                        created_by=self.user)
+            for _ in range(2)
+        ])
+        published = ChangeFeedEntry.objects.filter(stream='transactions', sequence__isnull=True)
+        self.assertEqual(sorted(published.values_list('object_id', flat=True)), sorted(t.id for t in created))
+
+
+class CacheWarmingTests(InventoryTestSetup):
+    """Test cases for the warm_caches registry"""
+    
+    def test_warm_populates_current_versioned_keys(self):
+        """Test every shared entry is warmed under the current cache version"""
+        from django.core.cache import cache
+        from django.utils import timezone
+        from frontend.utils.cache_helpers import TripCacheHelper, VesselCacheHelper, VesselPricingCacheHelper
+        from frontend.utils.cache_warming import CacheWarmer
+        from frontend.reports_views import get_reports_dashboard_cache_key
+        
+        results = CacheWarmer.warm(workers=1)
+        self.assertEqual({r['status'] for r in results}, {'warmed'})
+        self.assertIn(f'vessel_prices[{self.vessel.name}]', [r['name'] for r in results])
+        self.assertNotIn('product_index', [r['name'].split('[')[0] for r in results])
+        
+        self.assertIsNotNone(cache.get(VesselCacheHelper.ACTIVE_VESSELS_KEY))
+        self.assertEqual(len(cache.get('all_products_catalog')), 1)
+        self.assertIsNotNone(cache.get(get_reports_dashboard_cache_key(timezone.now().date())))
+        self.assertIsNotNone(cache.get(VesselPricingCacheHelper.get_price_map_cache_key(self.vessel.id)))
+        self.assertEqual(TripCacheHelper.get_trip_mgmt_list(), [])
+        
+        # Warming never bumps versions; a later bump still invalidates the warmed entry
+        TripCacheHelper.clear_cache_after_trip_create()
+        self.assertIsNone(TripCacheHelper.get_trip_mgmt_list())
+        
+        reports_only = CacheWarmer.warm(tags=['reports'], refresh=True, workers=1)
+        self.assertEqual([(r['name'], r['detail']) for r in reports_only], [('reports_dashboard', 'built')])
+
+
+@override_settings(METRICS_DIR='')
+class CachedComputationTests(TestCase):
+    """Test single-flight recompute and stale-while-revalidate"""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+    
+    def test_concurrent_callers_share_one_recompute(self):
+        """Test one cold build for many threads, then stale values while a refresh is in flight"""
+        import threading
+        import time
+        from django.core.cache import cache
+        from frontend.utils.cache_helpers import CachedComputation, CachedValue, cached_computation
+        
+        calls = []
+        
+        def build():
+            calls.append(1)
+            time.sleep(0.2)
+            return len(calls)
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cached_computation('daily_report_test', build, 60)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(calls, [1])
+        self.assertEqual(results, [1] * 8)
+        
+        # Expired entry while another caller holds the lock: served stale, no rebuild
+        entry = cache.get('daily_report_test')
+        cache.set('daily_report_test', entry._replace(soft_expires_at=time.time() - 1), 60)
+        cache.add(CachedComputation.get_lock_key('daily_report_test'), True, 60)
+        self.assertEqual(cached_computation('daily_report_test', build, 60), 1)
+        self.assertEqual(len(calls), 1)
+        
+        # Lock released: the next reader refreshes it
+        cache.delete(CachedComputation.get_lock_key('daily_report_test'))
+        self.assertEqual(cached_computation('daily_report_test', build, 60), 2)
+        self.assertIsInstance(cache.get('daily_report_test'), CachedValue)
+        
+        # Soft expiry is jittered below the timeout
+        CachedComputation.store('daily_report_jitter', 'x', 1000)
+        self.assertLessEqual(cache.get('daily_report_jitter').soft_expires_at, time.time() + 1000)
+
+
+class CacheCodecTests(InventoryTestSetup):
+    """Test the compact cache value codec"""
+    
+    def test_trip_list_round_trip_without_queries(self):
+        """Test select_related trips survive encoding compressed, with deferred fields still deferred"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from transactions.models import Trip
+        from frontend.trip_views import trip_mgmt_queryset
+        from frontend.utils.cache_codec import CacheCodec
+        
+        Trip.objects.bulk_create([
+            Trip(trip_number=f'CODEC-{i}', vessel=self.vessel, passenger_count=i + 1, trip_date=date(2025, 1, 1), created_by=self.user)
+            for i in range(300)
+        ])
+        trips = list(trip_mgmt_queryset().order_by('-trip_date', '-created_at'))
+        
+        encoded = CacheCodec.encode(trips, 'trip_mgmt_list_v1_all')
+        self.assertTrue(CacheCodec.is_encoded(encoded))
+        self.assertEqual(encoded[len(CacheCodec.MAGIC):len(CacheCodec.MAGIC) + 1], CacheCodec.ZLIB)
+        self.assertGreater(CacheCodec.stats(trips)['saved_pct'], 50)
+        
+        with CaptureQueriesContext(connection) as queries:
+            decoded = CacheCodec.decode(encoded, 'trip_mgmt_list_v1_all')
+            self.assertEqual([t.trip_number for t in decoded], [t.trip_number for t in trips])
+            self.assertEqual(decoded[0].vessel.name, self.vessel.name)
+            self.assertEqual(decoded[0].created_by.username, self.user.username)
+            self.assertFalse(decoded[0]._state.adding)
+        self.assertEqual(len(queries), 0)
+        self.assertIn('created_by_id', decoded[0].__dict__)
+        self.assertNotIn('updated_at', decoded[0].__dict__)
+        
+        # Small payloads are stored uncompressed; plain structures pass through unchanged
+        small = {'date': date(2025, 1, 1), 'total': Decimal('1.50'), 'rows': [(1, 'a')]}
+        encoded = CacheCodec.encode(small)
+        self.assertEqual(encoded[len(CacheCodec.MAGIC):len(CacheCodec.MAGIC) + 1], CacheCodec.RAW)
+        self.assertEqual(CacheCodec.decode(encoded), small)
+    
+    def test_rebuilt_instances_keep_their_database_alias(self):
+        """Test decoded instances are bound to the alias they were read from, 'default' for old payloads"""
+        import pickle
+        from frontend.utils.cache_codec import CacheCodec
+        
+        vessel = Vessel.objects.get(id=self.vessel.id)
+        vessel._state.db = 'replica'
+        
+        decoded = CacheCodec.decode(CacheCodec.encode([vessel]))
+        self.assertEqual(decoded[0]._state.db, 'replica')
+        
+        # Payload written before the alias was part of the schema
+        schemas = [('vessels.Vessel', ('id', 'name'), (), ())]
+        data = [{CacheCodec.MODEL_TAG: 0, 'v': [vessel.id, vessel.name], 'r': []}]
+        legacy = CacheCodec.MAGIC + CacheCodec.RAW + pickle.dumps((schemas, data))
+        self.assertEqual(CacheCodec.decode(legacy)[0]._state.db, 'default')
+
+
+class ManagementListWindowTests(InventoryTestSetup):
+    """Test windowed management list caching, keyset paging and per-vessel invalidation"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        from datetime import timedelta
+        from transactions.models import Trip
+        
+        super().setUpTestData()
+        cls.vessel_b = Vessel.objects.create(name='Window B', has_duty_free=False, created_by=cls.user)
+        Trip.objects.bulk_create([
+            Trip(
+                trip_number=f'WIN-{i}', vessel=cls.vessel if i % 2 else cls.vessel_b, passenger_count=1,
+                trip_date=date(2025, 1, 1) + timedelta(days=i // 3), created_by=cls.user
+            )
+            for i in range(120)
+        ])
+    
+    def test_window_then_keyset_pages(self):
+        """Test cached window pages, keyset seeks past it, and tag-based invalidation"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from transactions.models import Trip
+        from frontend.utils.cache_helpers import TripCacheHelper
+        from frontend.trip_views import trip_mgmt_queryset
+        
+        mgmt = TripCacheHelper.MGMT_LIST
+        expected = [t.trip_number for t in trip_mgmt_queryset().order_by(*mgmt.ordering)]
+        
+        def page(num, filters=None, queryset=None):
+            page_obj = mgmt.paginate(queryset or trip_mgmt_queryset(), filters, num, page_size=10)
+            return [t.trip_number for t in page_obj.object_list], page_obj
+        
+        self.assertEqual(page(1)[0], expected[:10])
+        self.assertEqual(len(mgmt.get_window(page_size=10)), mgmt.WINDOW_PAGES * 10 + 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(page(3)[0], expected[20:30])
+        self.assertEqual(len(queries), 0)
+        
+        # Past the window: seek from the window's last row, then from the remembered cursor
+        for num in (5, 6):
+            with CaptureQueriesContext(connection) as queries:
+                rows, page_obj = page(num)
+            self.assertEqual(rows, expected[(num - 1) * 10:num * 10])
+            self.assertTrue(page_obj.has_next)
+            self.assertEqual(len(queries), 1)
+            self.assertNotIn('OFFSET', queries[0]['sql'])
+        self.assertEqual(page(12)[0], expected[110:120])
+        
+        # Per-vessel windows are only dropped by their own vessel's changes
+        vessel_a_trips = trip_mgmt_queryset().filter(vessel=self.vessel)
+        vessel_b_trips = trip_mgmt_queryset().filter(vessel=self.vessel_b)
+        page(1, {'vessel': self.vessel.id, 'status': ''}, vessel_a_trips)
+        page(1, {'vessel': str(self.vessel_b.id)}, vessel_b_trips)
+        
+        trip = Trip.objects.filter(vessel=self.vessel).first()
+        trip.notes = 'edited'
+        with self.captureOnCommitCallbacks(execute=True):
+            trip.save()
+        self.assertIsNone(mgmt.get_window({'vessel': self.vessel.id}, page_size=10))
+        self.assertIsNone(mgmt.get_window(page_size=10))
+        self.assertIsNotNone(mgmt.get_window({'vessel': self.vessel_b.id}, page_size=10))
+        
+        # Moving a trip to another vessel drops both vessels' windows
+        trip.vessel = self.vessel_b
+        with self.captureOnCommitCallbacks(execute=True):
+            trip.save()
+        self.assertIsNone(mgmt.get_window({'vessel': self.vessel_b.id}, page_size=10))
+
+
+class CompletionEditTests(InventoryTestSetup):
+    """Test delta edits of completion carts against posted child transactions"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        from transactions.models import Trip
+        
+        super().setUpTestData()
+        cls.products = [cls.product] + [cls.create_product(f'Edit Product {i}', f'EDIT{i}') for i in (1, 2, 3)]
+        for product in cls.products:
+            for price in ('1.00', '2.00'):
+                cls.create_transaction('SUPPLY', '10', price, product=product, transaction_date=date(2025, 1, 1))
+        cls.trip = Trip.objects.create(
+            trip_number='EDIT-1', vessel=cls.vessel, passenger_count=1, trip_date=date.today(), created_by=cls.user
+        )
+    
+    def _post(self, quantities):
+        from frontend.utils.completion_edits import CompletionEditHelper
+        
+        existing = Transaction.objects.select_related('product').filter(trip=self.trip).order_by('created_at', 'id')
+        lines = [
+            {'product': self.products[i], 'quantity': Decimal(qty), 'unit_price': Decimal('3.00'), 'notes': ''}
+            for i, qty in quantities
+        ]
+        plan = CompletionEditHelper.diff(existing, lines, 'SALE')
+        return CompletionEditHelper.apply(plan, 'SALE', {
+            'vessel': self.vessel, 'transaction_date': self.trip.trip_date, 'trip': self.trip, 'created_by': self.user
+        })
+    
+    def _remaining(self, product):
+        return list(InventoryLot.objects.filter(product=product).order_by('purchase_price').values_list('remaining_quantity', flat=True))
+    
+    def test_edit_touches_only_changed_lines(self):
+        """Test raising, lowering, removing and adding lines restores/consumes only their lots"""
+        first = self._post([(0, '5'), (1, '12'), (2, '4')])
+        self.assertEqual(len(first.inserts), 3)
+        kept = first.transactions[0]
+        self.assertEqual(self._remaining(self.products[1]), [0, 8])
+        
+        plan = self._post([(0, '5'), (1, '6'), (3, '1')])
+        self.assertEqual((len(plan.unchanged), len(plan.changes), len(plan.deletes), len(plan.inserts)), (1, 1, 1, 1))
+        self.assertEqual(plan.transactions[0].id, kept.id)
+        self.assertEqual(kept.fifo_consumptions.count(), 1)
+        
+        # Lowering gives back the most recently consumed lot first
+        lowered = Transaction.objects.get(id=plan.transactions[1].id)
+        self.assertEqual(self._remaining(self.products[1]), [4, 10])
+        self.assertEqual(lowered.quantity, Decimal('6'))
+        self.assertEqual(lowered.cogs_total, Decimal('6.00'))
+        self.assertEqual(list(lowered.fifo_consumptions.values_list('consumed_quantity', flat=True)), [Decimal('6')])
+        self.assertEqual(self._remaining(self.products[2]), [10, 10])
+        self.assertFalse(Transaction.objects.filter(trip=self.trip, product=self.products[2]).exists())
+        
+        # Raising consumes the next FIFO lot and continues the sequence
+        plan = self._post([(0, '5'), (1, '15'), (3, '1')])
+        raised = Transaction.objects.get(id=plan.transactions[1].id)
+        self.assertEqual(self._remaining(self.products[1]), [0, 5])
+        self.assertEqual(raised.cogs_total, Decimal('20.00'))
+        self.assertEqual(list(raised.fifo_consumptions.values_list('sequence', flat=True)), [1, 2, 3])
+        self.assertEqual(
+            InventoryLot.objects.filter(product=self.products[0]).order_by('purchase_price').first().remaining_quantity, 5
+        )
+        
+        with self.assertRaises(ValidationError):
+            self._post([(0, '50')])
+        self.assertEqual(self._remaining(self.products[0]), [5, 10])
+
+
+@override_settings(METRICS_DIR='')
+class CacheInvalidationCollectorTests(TestCase):
+    """Test invalidations are merged per transaction, run on commit and dropped on rollback"""
+    
+    def test_coalesced_flush_on_commit_and_drop_on_rollback(self):
+        from unittest import mock
+        from django.db import connection, transaction
+        from api.models import SyncChange
+        from frontend.utils.cache_invalidation import CacheInvalidationCollector
+        
+        calls = []
+        record = calls.append
+        journaled = lambda: sorted(SyncChange.objects.filter(vessel_id=7).values_list('entity_id', flat=True))
+        
+        with mock.patch('frontend.utils.product_index.ProductIndexHelper.mark_index_changed') as marked:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                for product_id in (1, 2, 1, 3):
+                    CacheInvalidationCollector.defer(record, 'vessel_7')
+                    CacheInvalidationCollector.defer_stock_changed(7, [product_id])
+                self.assertEqual(calls, [])
+                # The sync journal is written in the same transaction, before commit
+                self.assertEqual(journaled(), [1, 1, 2, 3])
+            self.assertEqual(len(callbacks), 1)
+            self.assertEqual(calls, ['vessel_7'])
+            marked.assert_called_once_with(7, {1, 2, 3})
+            
+            # A rolled-back savepoint drops its batch and its journal rows; the next write opens a new one
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                try:
+                    with transaction.atomic():
+                        CacheInvalidationCollector.defer(record, 'rolled_back')
+                        CacheInvalidationCollector.defer_stock_changed(7, [4])
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+                CacheInvalidationCollector.defer(record, 'committed')
+            self.assertEqual(len(callbacks), 1)
+            self.assertEqual(calls, ['vessel_7', 'committed'])
+            self.assertEqual(journaled(), [1, 1, 2, 3])
+        
+        # Request scope without a transaction: queued until the scope exits
+        with CacheInvalidationCollector.request_scope():
+            with mock.patch.object(connection, 'in_atomic_block', False):
+                CacheInvalidationCollector.defer(record, 'request')
+                CacheInvalidationCollector.defer(record, 'request')
+            self.assertEqual(calls[-1], 'committed')
+        self.assertEqual(calls[-2:], ['committed', 'request'])
+
+
+class CartPreviewTests(InventoryTestSetup):
+    """Test whole-cart FIFO previews share lot state across repeated products"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.product = cls.create_product('Cart Product', 'CART001', selling_price='3.00')
+        for day, price in ((1, '1.10'), (2, '2.20')):
+            cls.create_transaction('SUPPLY', '5', price, transaction_date=date(2026, 1, day))
+    
+    def test_cart_lines_consume_in_order_with_exact_costs(self):
+        import json
+        from unittest import mock
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from frontend.utils.cart_preview import CartPreviewHelper
+        
+        with CaptureQueriesContext(connection) as queries:
+            preview = CartPreviewHelper.preview(self.vessel, [(self.product.id, 4)] * 3 + [(999999, 1)], priced=True)
+        lots_queries = [q for q in queries if 'transactions_inventorylot' in q['sql']]
+        self.assertEqual(len(lots_queries), 1)
+        
+        first, second, third, unknown = preview['lines']
+        self.assertEqual((first['cogs'], first['after_quantity']), (Decimal('4.40'), 6))
+        self.assertEqual(second['cogs'], Decimal('7.70'))  # 1 @ 1.10 + 3 @ 2.20
+        self.assertEqual([row['consumed_quantity'] for row in second['consumption_breakdown']], [1, 3])
+        self.assertEqual((third['sufficient'], third['shortfall'], third['cogs']), (False, 2, Decimal('4.40')))
+        self.assertEqual(third['margin'], Decimal('6.00') - Decimal('4.40'))
+        self.assertEqual(unknown['error'], 'Product not found')
+        self.assertFalse(preview['totals']['all_sufficient'])
+        self.assertEqual(preview['totals']['cogs'], Decimal('16.50'))
+        
+        self.client.force_login(self.user)
+        response = self.client.post('/sales/preview-cart/', json.dumps({
+            'vessel_id': self.vessel.id,
+            'lines': [{'product_id': self.product.id, 'quantity': 6}],
+        }), content_type='application/json').json()
+        self.assertTrue(response['success'] and response['totals']['all_sufficient'])
+        self.assertAlmostEqual(response['lines'][0]['cogs'], 7.70)
+        self.assertAlmostEqual(response['lines'][0]['revenue'], 18.0)
+        
+        # The per-line COGS endpoint keeps its response contract
+        with mock.patch('frontend.sales_views.get_vessel_product_price',
+                        return_value=(Decimal('3.00'), False, 'Using default price')):
+            response = self.client.post('/sales/calculate-cogs/', json.dumps({
+                'vessel_id': self.vessel.id, 'product_id': self.product.id, 'quantity': 6
+            }), content_type='application/json').json()
+        self.assertAlmostEqual(response['total_cogs'], 7.70)
+        self.assertEqual(response['pricing_info']['is_custom_price'], False)
+        self.assertEqual(response['pricing_warning'], 'Using default price')
+    
+    def test_cart_previews_require_vessel_access(self):
+        import json
+        from django.contrib.auth.models import Group
+        
+        operator = User.objects.create_user('cartoperator', 'operator@test.com', 'password')
+        operator.groups.add(Group.objects.get_or_create(name='Vessel Operators')[0])
+        self.client.force_login(operator)
+        body = json.dumps({'vessel_id': self.vessel.id, 'lines': [{'product_id': self.product.id, 'quantity': 1}]})
+        
+        for url in ('/sales/preview-cart/', '/transfer/preview-cart/', '/waste/preview-cart/'):
+            response = self.client.post(url, body, content_type='application/json').json()
+            self.assertFalse(response['success'], url)
+            self.assertIn('does not have access', response['error'])
+            self.assertNotIn('lines', response)
+
+
+class AsyncReadEndpointTests(InventoryTestSetup):
+    """Test the async read endpoints return the same data through the ASGI and WSGI handlers"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.product = cls.create_product('Water Bottle', 'WTR001', purchase_price='0.50', selling_price='1.00')
+    
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_transaction('SUPPLY', '8', '0.50')
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+    
+    def _both(self, method, path, **kwargs):
+        from asgiref.sync import async_to_sync
+        
+        wsgi = getattr(self.client, method)(path, **kwargs)
+        asgi = async_to_sync(getattr(self.async_client, method))(path, **kwargs)
+        self.assertEqual(wsgi.status_code, 200, path)
+        self.assertEqual(asgi.status_code, 200, path)
+        return wsgi, asgi
+    
+    def test_async_and_sync_handlers_agree(self):
+        from asgiref.sync import async_to_sync
+        
+        body = {'search': 'wat', 'vessel_id': self.vessel.id}
+        wsgi, asgi = self._both('post', '/sales/search-products/', data=body, content_type='application/json')
+        self.assertEqual(wsgi.json(), asgi.json())
+        self.assertEqual([p['id'] for p in asgi.json()['products']], [self.product.id])
+        self.assertEqual(asgi.json()['products'][0]['total_quantity'], 8)
+        
+        path = f'/inventory/product-index/{self.vessel.id}/'
+        wsgi, asgi = self._both('get', path)
+        self.assertEqual(wsgi['ETag'], asgi['ETag'])
+        self.assertEqual(wsgi.content, asgi.content)
+        revalidated = async_to_sync(self.async_client.get)(path, headers={'If-None-Match': asgi['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+        
+        wsgi, asgi = self._both('get', '/transfer-workflow/notifications/summary/')
+        self.assertEqual(asgi.json()['unread_count'], 0)
+        self.assertEqual(wsgi.json(), asgi.json())
+        
+        # Async sync pull matches the DRF viewset payload
+        drf = self.client.get(f'/api/v1/sync/?vessel_id={self.vessel.id}').json()
+        wsgi, asgi = self._both('get', f'/api/v1/sync/pull/?vessel_id={self.vessel.id}')
+        for payload in (wsgi.json(), asgi.json()):
+            self.assertEqual(
+                {key: value for key, value in payload.items() if key != 'server_time'},
+                {key: value for key, value in drf.items() if key != 'server_time'}
+            )
+        
+        self.async_client.logout()
+        self.assertEqual(async_to_sync(self.async_client.get)(f'/api/v1/sync/pull/?vessel_id={self.vessel.id}').status_code, 401)
+
+
+class CatalogImportTests(InventoryTestSetup):
+    """Test chunked catalog imports: diffs, dry runs, per-row fallback and resume"""
+    
+    HEADER = 'item_id,name,category,purchase_price,selling_price,is_duty_free\n'
+    
+    def setUp(self):
+        import tempfile
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.diffs = []
+    
+    def tearDown(self):
+        import shutil
+        shutil.rmtree(self.directory, ignore_errors=True)
+    
+    def _write_csv(self, rows):
+        import os
+        path = os.path.join(self.directory, 'catalog.csv')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(self.HEADER + ''.join(f'{row}\n' for row in rows))
+        return path
+    
+    def _importer(self, path, **kwargs):
+        from frontend.utils.catalog_import import CatalogImporter
+        return CatalogImporter(path, created_by=self.user, on_diff=self.diffs.append, **kwargs)
+    
+    def _actions(self):
+        return [(diff['action'], diff.get('item_id')) for diff in self.diffs]
+    
+    def test_creates_updates_and_invalidates_per_committed_chunk(self):
+        """Test rows are diffed against the catalog and caches are dropped after each chunk commits"""
+        from unittest import mock
+        from products.models import Product
+        from frontend.utils.catalog_import import CatalogImporter
+        
+        path = self._write_csv([
+            f'{self.product.item_id},{self.product.name},{self.category.name},1.00,2.50,FALSE',
+            'NEW001,New Product,Snacks,1.00,2.00,TRUE',
+            'BAD001,Bad Product,Snacks,3.00,2.00,FALSE',
+        ])
+        with mock.patch.object(CatalogImporter, '_invalidate_caches') as invalidate:
+            with self.captureOnCommitCallbacks(execute=True):
+                stats = self._importer(path, chunk_size=2).run()
+        
+        self.assertEqual(
+            (stats['products_created'], stats['products_updated'], stats['categories_created'], stats['errors']),
+            (1, 1, 1, 1)
+        )
+        self.assertEqual(invalidate.call_count, 1)
+        self.assertEqual(self._actions(), [('update', self.product.item_id), ('create', 'NEW001'), ('error', 'BAD001')])
+        self.assertEqual(self.diffs[0]['changes'], {'selling_price': (Decimal('2.000'), Decimal('2.50'))})
+        self.assertEqual(Product.objects.get(item_id=self.product.item_id).selling_price, Decimal('2.500'))
+        self.assertTrue(Product.objects.get(item_id='NEW001').is_duty_free)
+    
+    def test_dry_run_writes_nothing_and_diffs_repeats_against_earlier_rows(self):
+        """Test a dry run leaves the catalog alone and a repeated item_id in a later chunk is an update"""
+        import os
+        from products.models import Category, Product
+        
+        importer = self._importer(self._write_csv([
+            'NEW001,New Product,Snacks,1.00,2.00,FALSE',
+            'NEW002,Other Product,Snacks,1.00,2.00,FALSE',
+            'NEW001,New Product,Snacks,1.00,2.25,FALSE',
+            'NEW002,Other Product,Snacks,1.00,2.00,FALSE',
+        ]), chunk_size=2, dry_run=True)
+        stats = importer.run()
+        
+        self.assertEqual(self._actions(), [
+            ('create_category', None), ('create', 'NEW001'), ('create', 'NEW002'), ('update', 'NEW001')
+        ])
+        self.assertEqual(self.diffs[3]['changes'], {'selling_price': (Decimal('2.00'), Decimal('2.25'))})
+        self.assertEqual((stats['products_created'], stats['products_updated'], stats['products_unchanged']), (2, 1, 1))
+        self.assertFalse(Product.objects.filter(item_id__startswith='NEW').exists())
+        self.assertFalse(Category.objects.filter(name='Snacks').exists())
+        self.assertFalse(os.path.exists(importer.checkpoint_path))
+    
+    def test_rows_rejected_by_the_database_are_row_errors(self):
+        """Test a constraint violation inside a bulk chunk only fails its own row"""
+        from django.db import connection
+        from products.models import Product
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TRIGGER reject_bad_item BEFORE INSERT ON {Product._meta.db_table} "
+                "WHEN NEW.item_id = 'DB002' BEGIN SELECT RAISE(ABORT, 'rejected by database'); END"
+            )
+        stats = self._importer(self._write_csv([
+            f'DB00{i},DB Product {i},Snacks,1.00,2.00,FALSE' for i in (1, 2, 3)
+        ])).run()
+        
+        self.assertEqual((stats['products_created'], stats['errors']), (2, 1))
+        self.assertIn(('error', 'DB002'), self._actions())
+        self.assertEqual(
+            list(Product.objects.filter(item_id__startswith='DB').values_list('item_id', flat=True)), ['DB001', 'DB003']
+        )
+    
+    def test_resume_skips_committed_chunks(self):
+        """Test a failed chunk keeps earlier chunks, their cache invalidation and a checkpoint to resume from"""
+        import os
+        from unittest import mock
+        from django.db import OperationalError
+        from django.db.models.query import QuerySet
+        from products.models import Product
+        from frontend.utils.catalog_import import CatalogImporter, CatalogImportError
+        
+        path = self._write_csv([f'RES00{i},Resume Product {i},Snacks,1.00,2.00,FALSE' for i in range(1, 6)])
+        bulk_create = QuerySet.bulk_create
+        calls = []
+        
+        def failing_after_first_chunk(queryset, objs, *args, **kwargs):
+            if queryset.model is Product:
+                calls.append(len(objs))
+            if len(calls) > 1:
+                raise OperationalError('database is locked')
+            return bulk_create(queryset, objs, *args, **kwargs)
+        
+        with mock.patch.object(CatalogImporter, '_invalidate_caches') as invalidate:
+            with mock.patch.object(QuerySet, 'bulk_create', failing_after_first_chunk):
+                with self.captureOnCommitCallbacks(execute=True):
+                    with self.assertRaises(CatalogImportError):
+                        self._importer(path, chunk_size=2).run()
+            self.assertEqual(invalidate.call_count, 1)
+        self.assertEqual(Product.objects.filter(item_id__startswith='RES').count(), 2)
+        self.assertTrue(os.path.exists(f'{path}.import-checkpoint'))
+        
+        self.diffs.clear()
+        stats = self._importer(path, chunk_size=2, resume=True).run()
+        self.assertEqual((stats['skipped_rows'], stats['products_created']), (2, 3))
+        self.assertEqual(self._actions(), [('create', 'RES003'), ('create', 'RES004'), ('create', 'RES005')])
+        self.assertEqual(Product.objects.filter(item_id__startswith='RES').count(), 5)
+        self.assertFalse(os.path.exists(f'{path}.import-checkpoint'))
@@ -7,7 +7,7 @@ from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.http import JsonResponse
 from django.db import transaction
-from frontend.utils.cache_helpers import TransferCacheHelper, VesselCacheHelper, get_optimized_pagination
+from frontend.utils.cache_helpers import TransferCacheHelper, VesselCacheHelper
 from .utils.query_helpers import TransactionQueryHelper
 from transactions.models import Transfer, Transaction
 from django.views.decorators.http import require_http_methods
@@ -28,6 +28,11 @@ import logging
 
 logger = logging.getLogger('frontend')
 
+def transfer_mgmt_queryset():
+    """Unfiltered transfer management queryset (paged and cached by TransferCacheHelper.MGMT_LIST)"""
+    return Transfer.objects.select_related('from_vessel', 'to_vessel', 'created_by', 'workflow')
+
+
 @login_required
 @user_passes_test(is_admin_or_manager)
 def transfer_management(request):
@@ -44,86 +49,55 @@ def transfer_management(request):
     date_to = request.GET.get('date_to')
     search_filter = request.GET.get('search', '').strip()
     
-    # 🚀 CACHE: Check for cached transfer list (only when no filters applied)
-    has_filters = any([
-        from_vessel_filter,
-        to_vessel_filter,
-        status_filter,
-        date_from,
-        date_to,
-        search_filter
-    ])
-    
-    logger.debug(f"TRANSFER MGMT DEBUG - Filters detected: has_filters={has_filters}")
-    
-    if not has_filters:
-        cached_transfer_list = TransferCacheHelper.get_transfer_mgmt_list()
-        
-        if cached_transfer_list:
-            logger.debug(f"CACHE HIT: Transfer Management List ({len(cached_transfer_list)} transfers) - NO QUERY NEEDED")
-            transfers = cached_transfer_list
-        else:
-            logger.debug("CACHE MISS: Building and caching transfer list")
-            
-            # OPTIMIZED: Build and cache transfer objects using pre-calculated fields
-            transfers = list(Transfer.objects.select_related(
-                'from_vessel', 'to_vessel', 'created_by', 'workflow'
-            ).order_by('-transfer_date', '-created_at'))
-            
-            # CACHE: Store evaluated transfer list for future requests
-            TransferCacheHelper.cache_transfer_mgmt_list(transfers)
-            logger.debug(f"CACHED: Transfer Management List ({len(transfers)} transfers)")
+    transfers = transfer_mgmt_queryset()
     
-    # Handle filtering when needed
-    if has_filters:
-        logger.debug("FILTERS DETECTED: Creating fresh QuerySet")
-        # Filters applied - always do fresh query (can't use cache)  
-        transfers = Transfer.objects.select_related(
-            'from_vessel', 'to_vessel', 'created_by', 'workflow'
+    # Apply filters
+    if from_vessel_filter:
+        transfers = transfers.filter(from_vessel_id=from_vessel_filter)
+    if to_vessel_filter:
+        transfers = transfers.filter(to_vessel_id=to_vessel_filter)
+    if status_filter == 'completed':
+        # Consider both regular transfers and workflow transfers
+        transfers = transfers.filter(
+            Q(is_completed=True) | 
+            Q(workflow__status='completed')
+        )
+    elif status_filter == 'in_progress':
+        # Not completed and (no workflow OR workflow not completed)
+        transfers = transfers.filter(
+            Q(is_completed=False) & 
+            (Q(workflow__isnull=True) | ~Q(workflow__status='completed'))
+        )
+    if date_from:
+        try:
+            date_from_parsed = datetime.strptime(date_from, '%Y-%m-%d').date()
+            transfers = transfers.filter(transfer_date__gte=date_from_parsed)
+        except ValueError:
+            pass
+    if date_to:
+        try:
+            date_to_parsed = datetime.strptime(date_to, '%Y-%m-%d').date()
+            transfers = transfers.filter(transfer_date__lte=date_to_parsed)
+        except ValueError:
+            pass
+    if search_filter:
+        transfers = transfers.filter(
+            Q(from_vessel__name__icontains=search_filter) |
+            Q(to_vessel__name__icontains=search_filter) |
+            Q(notes__icontains=search_filter)
         )
-        
-        # Apply filters
-        if from_vessel_filter:
-            transfers = transfers.filter(from_vessel_id=from_vessel_filter)
-        if to_vessel_filter:
-            transfers = transfers.filter(to_vessel_id=to_vessel_filter)
-        if status_filter == 'completed':
-            # Consider both regular transfers and workflow transfers
-            transfers = transfers.filter(
-                Q(is_completed=True) | 
-                Q(workflow__status='completed')
-            )
-        elif status_filter == 'in_progress':
-            # Not completed and (no workflow OR workflow not completed)
-            transfers = transfers.filter(
-                Q(is_completed=False) & 
-                (Q(workflow__isnull=True) | ~Q(workflow__status='completed'))
-            )
-        if date_from:
-            try:
-                date_from_parsed = datetime.strptime(date_from, '%Y-%m-%d').date()
-                transfers = transfers.filter(transfer_date__gte=date_from_parsed)
-            except ValueError:
-                pass
-        if date_to:
-            try:
-                date_to_parsed = datetime.strptime(date_to, '%Y-%m-%d').date()
-                transfers = transfers.filter(transfer_date__lte=date_to_parsed)
-            except ValueError:
-                pass
-        if search_filter:
-            transfers = transfers.filter(
-                Q(from_vessel__name__icontains=search_filter) |
-                Q(to_vessel__name__icontains=search_filter) |
-                Q(notes__icontains=search_filter)
-            )
-        
-        # Order for consistent results 
-        transfers = transfers.order_by('-transfer_date', '-created_at')
     
-    # ✅ REPLACE Django Paginator with optimized pagination
+    # CACHE: First pages per vessel/status come from cached windows,
+    # deeper pages, date and search filters use keyset queries
     page_number = request.GET.get('page', 1)
-    page_obj = get_optimized_pagination(transfers, page_number, page_size=25, use_count=False)
+    page_obj = TransferCacheHelper.MGMT_LIST.paginate(
+        transfers,
+        {
+            'from_vessel': from_vessel_filter, 'to_vessel': to_vessel_filter, 'status': status_filter,
+            'date_from': date_from, 'date_to': date_to, 'search': search_filter,
+        },
+        page_number, page_size=25
+    )
     
     # Add cost performance class to each transfer (for template)
     transfer_list = page_obj.object_list  # Use optimized pagination object list
@@ -1,14 +1,17 @@
 from django.core.exceptions import ValidationError
 from django.shortcuts import get_object_or_404, render, redirect
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q, Sum, Prefetch
+from django.db.models import Prefetch
 from django.http import JsonResponse, Http404
 from datetime import date, datetime
 from frontend.utils.cache_helpers import ProductCacheHelper, VesselCacheHelper, TransferCacheHelper
-from frontend.utils.helpers import get_fifo_cost_for_transfer
+from frontend.utils.product_index import ProductIndexHelper
+from frontend.utils.completion_edits import CompletionEditHelper
+from frontend.utils.cache_invalidation import CacheInvalidationCollector
+from frontend.utils.cart_preview import CartPreviewHelper
 from vessels.models import Vessel
 from products.models import Product
-from transactions.models import Transaction, InventoryLot, Transfer, get_available_inventory, get_available_inventory_at_date
+from transactions.models import Transaction, InventoryLot, Transfer, get_available_to_promise, get_available_inventory_at_date
 from .utils import BilingualMessages
 from products.models import Product
 from django.db import transaction
@@ -50,38 +53,14 @@ def transfer_search_products(request):
         if not can_access:
             return JsonResponse({'success': False, 'error': error_msg})
         
-        # Search for products with available inventory on this vessel
-        available_lots = InventoryLot.objects.filter(
-            vessel=vessel,
-            remaining_quantity__gt=0,
-            product__active=True
-        ).filter(
-            Q(product__name__icontains=search_term) |
-            Q(product__item_id__icontains=search_term) |
-            Q(product__barcode__icontains=search_term)
-        ).select_related('product')
-        
-        # Group by product and calculate totals
-        product_summaries = available_lots.values(
-            'product__id', 'product__name', 'product__item_id', 
-            'product__barcode', 'product__is_duty_free'
-        ).annotate(
-            total_quantity=Sum('remaining_quantity')
-        ).order_by('product__item_id')
+        # 🚀 POS INDEX: Trie/barcode lookup instead of icontains lot join per keystroke
+        matches = ProductIndexHelper.search(vessel, search_term)
+        lots_by_product = ProductIndexHelper.get_open_lots(vessel, [entry['id'] for entry in matches])
         
         products = []
-        for summary in product_summaries:
-            product_id = summary['product__id']
-            
-            # Get FIFO lots for this product
-            lots = InventoryLot.objects.filter(
-                vessel=vessel,
-                product_id=product_id,
-                remaining_quantity__gt=0
-            ).order_by('purchase_date', 'created_at')
-            
+        for entry in matches:
             lots_data = []
-            for lot in lots:
+            for lot in lots_by_product.get(entry['id'], []):
                 lots_data.append({
                     'id': lot.id,
                     'purchase_date': lot.purchase_date.strftime('%d/%m/%Y'),
@@ -91,12 +70,12 @@ def transfer_search_products(request):
                 })
             
             products.append({
-                'id': product_id,
-                'name': summary['product__name'],
-                'item_id': summary['product__item_id'],
-                'barcode': summary['product__barcode'] or '',
-                'is_duty_free': summary['product__is_duty_free'],
-                'total_quantity': summary['total_quantity'],
+                'id': entry['id'],
+                'name': entry['name'],
+                'item_id': entry['item_id'],
+                'barcode': entry['barcode'],
+                'is_duty_free': entry['is_duty_free'],
+                'total_quantity': entry['stock'],
                 'lots': lots_data
             })
         
@@ -460,7 +439,7 @@ def transfer_available_products(request):
             if use_historical_inventory and transfer_date:
                 available_quantity, _ = get_available_inventory_at_date(vessel, product, transfer_date)
             else:
-                available_quantity, _ = get_available_inventory(vessel, product)
+                available_quantity, _ = get_available_to_promise(vessel, product)
             
             # Only include products with available inventory
             if available_quantity <= 0:
@@ -494,7 +473,7 @@ def transfer_bulk_complete(request):
     🚀 OPTIMIZED: Complete transfer with batch processing (like trip/PO patterns)
     
     Performance improvements:
-    - Batch FIFO calculations
+    - Delta editing: only added, removed and re-quantified lines touch FIFO lots
     - Bulk transaction creation  
     - Batch inventory operations
     - Targeted cache clearing
@@ -523,165 +502,87 @@ def transfer_bulk_complete(request):
         to_vessel = transfer.to_vessel
         transfer_date = transfer.transfer_date
         
-        # 🚀 OPTIMIZATION 1: Batch validation and FIFO calculations
-        logger.info(f"Batch processing: Starting transfer completion for {len(items)} items")
+        # 🚀 STEP 1: Batch product fetching and validation (one line per product)
+        product_ids = [item.get('product_id') for item in items if item.get('product_id')]
+        products_dict = {
+            p.id: p for p in Product.objects.filter(id__in=product_ids, active=True)
+        }
+        
+        lines_by_product = {}
+        for item in items:
+            product_id = item.get('product_id')
+            if product_id not in products_dict:
+                continue
+            quantity = Decimal(str(item.get('quantity', 0)))
+            if quantity <= 0:
+                continue
+            lines_by_product[product_id] = {
+                'product': products_dict[product_id],
+                'quantity': quantity,
+                'notes': item.get('notes', '') or f'Transfer to {to_vessel.name}',
+            }
+        lines = list(lines_by_product.values())
+        
+        logger.info(f"Batch processing: Starting transfer completion for {len(lines)} items")
+        started = time.time()
         
         with transaction.atomic():
-            # 🚀 STEP 1: Clear existing transactions efficiently (single bulk operation)
-            existing_transactions = Transaction.objects.filter(
+            # 🔄 STEP 2: Diff the items against TRANSFER_OUT lines already posted
+            existing_out = Transaction.objects.select_related('product').filter(
                 transfer=transfer,
-                transaction_type__in=['TRANSFER_OUT', 'TRANSFER_IN']
-            )
-
-            if existing_transactions.exists():
-                logger.info(f"Transfer edit: Deleting {existing_transactions.count()} existing transfer transactions for inventory restoration")
-                
-                # Delete each transaction individually to trigger inventory restoration
-                for txn in existing_transactions:
-                    txn.delete()  # This calls the individual delete() method with inventory restoration
-                
-                logger.info(f"Transfer edit: Inventory restored for {existing_transactions.count()} transactions")
-                
-            # 🚀 STEP 2: Batch product fetching and validation
-            product_ids = [item.get('product_id') for item in items if item.get('product_id')]
-            products_dict = {
-                p.id: p for p in Product.objects.filter(id__in=product_ids, active=True)
-            }
-            
-            # 🚀 STEP 3: Batch FIFO calculations for all items at once
-            fifo_calculations = {}
-            total_calculations_time = 0
-            
-            logger.debug(f"Batch FIFO: Calculating costs for {len(items)} items")
-            fifo_start_time = time.time()
-            
-            for item in items:
-                product_id = item.get('product_id')
-                quantity = item.get('quantity', 0)
-                
-                if product_id not in products_dict:
-                    continue
-                    
-                product = products_dict[product_id]
-                
-                try:
-                    # Calculate FIFO cost (this is the expensive operation)
-                    fifo_cost_per_unit = get_fifo_cost_for_transfer(from_vessel, product, quantity)
-                    
-                    fifo_calculations[product_id] = {
-                        'product': product,
-                        'quantity': quantity,
-                        'unit_price': Decimal(str(fifo_cost_per_unit)) if fifo_cost_per_unit else Decimal('0.001'),
-                        'notes': item.get('notes', ''),
-                        'total_cost': (Decimal(str(fifo_cost_per_unit)) if fifo_cost_per_unit else Decimal('0.001')) * Decimal(str(quantity))
-                    }
-                    
-                except Exception as e:
-                    logger.warning(f"FIFO calculation failed for {product.name}: {e}")
-                    # Use fallback cost
-                    fifo_calculations[product_id] = {
-                        'product': product,
-                        'quantity': quantity,
-                        'unit_price': product.purchase_price or Decimal('0.001'),
-                        'notes': item.get('notes', ''),
-                        'total_cost': (product.purchase_price or Decimal('0.001')) * Decimal(str(quantity))
-                    }
-            
-            fifo_end_time = time.time()
-            total_calculations_time = fifo_end_time - fifo_start_time
-            logger.debug(f"FIFO batch completed: {total_calculations_time:.2f} seconds for {len(items)} items")
+                transaction_type='TRANSFER_OUT'
+            ).order_by('created_at', 'id')
+            plan = CompletionEditHelper.diff(existing_out, lines, 'TRANSFER_OUT')
             
-            # 🚀 STEP 3.5: Validate inventory availability at transfer date
+            # 🚀 STEP 3: Validate inventory availability at transfer date for the stock the edit adds
             from django.utils import timezone
             today = timezone.now().date()
             use_historical_inventory = transfer_date < today
             
-            for product_id, calc_data in fifo_calculations.items():
-                product = calc_data['product']
-                quantity = calc_data['quantity']
+            for product_id, quantity in plan.increases().items():
+                product = products_dict[product_id]
                 
                 # Check available inventory at transfer date (point-in-time validation)
                 if use_historical_inventory:
                     available_quantity, _ = get_available_inventory_at_date(from_vessel, product, transfer_date)
                 else:
-                    available_quantity, _ = get_available_inventory(from_vessel, product)
+                    available_quantity, _ = get_available_to_promise(from_vessel, product)
                 
                 if quantity > available_quantity:
                     return JsonResponse({
                         'success': False, 
-                        'error': f'Insufficient inventory for {product.name}. Available at {transfer_date}: {available_quantity}, Requested: {quantity}'
+                        'error': f'Insufficient inventory for {product.name}. Available at {transfer_date}: {available_quantity}, Additional requested: {quantity}'
                     })
             
-            # 🚀 STEP 4: Bulk create TRANSFER_OUT transactions (disable auto-creation)
-            transfer_out_transactions = []
-            transfer_in_transactions = []
-            
-            logger.debug("Batch creation: Creating TRANSFER_OUT transactions")
-            
-            for product_id, calc_data in fifo_calculations.items():
-                # Create TRANSFER_OUT transaction data
-                transfer_out = Transaction(
-                    vessel=from_vessel,
-                    product=calc_data['product'],
-                    transaction_type='TRANSFER_OUT',
-                    transaction_date=transfer_date,
-                    quantity=calc_data['quantity'],
-                    unit_price=calc_data['unit_price'],
-                    transfer_to_vessel=to_vessel,
-                    transfer=transfer,
-                    notes=calc_data['notes'] or f'Transfer to {to_vessel.name}',
-                    created_by=request.user
-                )
-                transfer_out_transactions.append(transfer_out)
-                
-                # Create corresponding TRANSFER_IN transaction data
-                transfer_in = Transaction(
-                    vessel=to_vessel,
-                    product=calc_data['product'],
-                    transaction_type='TRANSFER_IN',
-                    transaction_date=transfer_date,
-                    quantity=calc_data['quantity'],
-                    unit_price=calc_data['unit_price'],
-                    transfer_from_vessel=from_vessel,
-                    transfer=transfer,
-                    notes=f'Received from {from_vessel.name}',
-                    created_by=request.user
-                )
-                transfer_in_transactions.append(transfer_in)
-            
-            # 🚀 STEP 5: Use bulk_create for maximum efficiency
-            logger.debug(f"Bulk create: Creating {len(transfer_out_transactions)} TRANSFER_OUT transactions")
-            created_out_transactions = Transaction.objects.bulk_create(transfer_out_transactions)
-            
-            logger.debug(f"Bulk create: Creating {len(transfer_in_transactions)} TRANSFER_IN transactions")  
-            created_in_transactions = Transaction.objects.bulk_create(transfer_in_transactions)
-            
-            # 🚀 STEP 6: Batch inventory operations
-            logger.debug(f"Batch inventory: Processing inventory for {len(fifo_calculations)} products")
-            
-            # Handle TRANSFER_OUT inventory consumption in batch
-            _batch_consume_inventory_for_transfer_out(
-                fifo_calculations, from_vessel, created_out_transactions
-            )
+            # 🔄 STEP 4: Received lines of removed or re-costed OUT lines leave the destination first
+            kept_out_ids = {txn.id for txn in plan.unchanged} | {txn.id for txn, _ in plan.updates}
+            stale_in = Transaction.objects.filter(
+                transfer=transfer,
+                transaction_type='TRANSFER_IN'
+            ).exclude(related_transfer_id__in=kept_out_ids)
+            for txn in stale_in:
+                txn.delete()  # Removes the destination lot via Transaction.delete()
+            
+            # 🚀 STEP 5: FIFO restore/consume only for added, removed and re-quantified lines
+            CompletionEditHelper.apply(plan, 'TRANSFER_OUT', {
+                'vessel': from_vessel,
+                'transaction_date': transfer_date,
+                'transfer': transfer,
+                'transfer_to_vessel': to_vessel,
+                'created_by': request.user,
+            })
+            transfer_out_transactions = plan.transactions
             
-            # Handle TRANSFER_IN inventory creation in batch  
-            _batch_create_inventory_for_transfer_in(
-                fifo_calculations, to_vessel, created_in_transactions
+            # 🚀 STEP 6: Received lines and destination lots for OUT lines without one
+            received_out_ids = set(Transaction.objects.filter(
+                transfer=transfer,
+                transaction_type='TRANSFER_IN'
+            ).values_list('related_transfer_id', flat=True))
+            _create_transfer_in_lines(
+                transfer, [txn for txn in transfer_out_transactions if txn.id not in received_out_ids], request.user
             )
             
-            # 🚀 STEP 7: Link transactions efficiently
-            logger.debug(f"Batch linking: Linking {len(created_out_transactions)} transaction pairs")
-            
-            # Link TRANSFER_OUT with TRANSFER_IN transactions
-            for i, (out_txn, in_txn) in enumerate(zip(created_out_transactions, created_in_transactions)):
-                out_txn.related_transfer_id = in_txn.id
-                in_txn.related_transfer_id = out_txn.id
-            
-            # Bulk update the links
-            Transaction.objects.bulk_update(created_out_transactions, ['related_transfer_id'])
-            Transaction.objects.bulk_update(created_in_transactions, ['related_transfer_id'])
-            
-            # 🚀 STEP 8: Mark transfer as completed and update summary fields
+            # 🚀 STEP 7: Mark transfer as completed and update summary fields
             transfer.is_completed = True
             transfer.save(update_fields=['is_completed'])
             
@@ -697,14 +598,14 @@ def transfer_bulk_complete(request):
             except Exception as e:
                 logger.warning(f"Failed to submit workflow for review: {e}")
             
-            logger.info(f"Transfer completed: {len(created_out_transactions)} items transferred")
+            logger.info(f"Transfer completed: {len(transfer_out_transactions)} items transferred")
             
         # 🚀 OPTIMIZATION 5: Targeted cache clearing (not nuclear option)
         _clear_transfer_cache_targeted(transfer_id, from_vessel.id, to_vessel.id)
         
         # Calculate totals for response
-        total_cost = sum(calc_data['total_cost'] for calc_data in fifo_calculations.values())
-        total_items = len(fifo_calculations)
+        total_cost = sum((txn.cogs_total or txn.unit_price * txn.quantity for txn in transfer_out_transactions), Decimal('0'))
+        total_items = len(transfer_out_transactions)
         
         return JsonResponse({
             'success': True,
@@ -712,8 +613,8 @@ def transfer_bulk_complete(request):
             'transfer_id': transfer.id,
             'total_items': total_items,
             'total_cost': float(total_cost),
-            'processing_time': f'{total_calculations_time:.2f}s',
-            'performance_improvement': 'Batch processing enabled'
+            'processing_time': f'{time.time() - started:.2f}s',
+            'performance_improvement': 'Delta editing enabled'
         })
         
     except Transfer.DoesNotExist:
@@ -723,73 +624,55 @@ def transfer_bulk_complete(request):
         return JsonResponse({'success': False, 'error': f'Transfer failed: {str(e)}'})
 
 
-def _batch_consume_inventory_for_transfer_out(fifo_calculations, from_vessel, transfer_out_transactions):
+def _create_transfer_in_lines(transfer, transfer_out_transactions, created_by):
     """
-    🚀 BATCH OPERATION: Consume inventory for all TRANSFER_OUT transactions efficiently
-    """    
-    logger.debug(f"Batch consume: Processing inventory consumption for {len(fifo_calculations)} products")
-    
-    for product_id, calc_data in fifo_calculations.items():
-        product = calc_data['product']
-        quantity = calc_data['quantity']
-        
-        try:
-            # Get inventory lots for this product in FIFO order
-            inventory_lots = InventoryLot.objects.filter(
-                vessel=from_vessel,
-                product=product,
-                remaining_quantity__gt=0
-            ).select_for_update().order_by('purchase_date', 'created_at')
-            
-            # Consume inventory using FIFO
-            remaining_to_consume = int(quantity)
-            
-            for lot in inventory_lots:
-                if remaining_to_consume <= 0:
-                    break
-                    
-                consume_from_lot = min(remaining_to_consume, lot.remaining_quantity)
-                lot.remaining_quantity -= consume_from_lot
-                lot.save(update_fields=['remaining_quantity'])
-                
-                remaining_to_consume -= consume_from_lot
-                
-                logger.debug(f"Consumed: {consume_from_lot} units of {product.name} from lot {lot.id}")
-                
-        except Exception as e:
-            logger.error(f"Consume error for {product.name}: {e}")
-            continue
-
-
-def _batch_create_inventory_for_transfer_in(fifo_calculations, to_vessel, transfer_in_transactions):
+    🚀 BATCH OPERATION: TRANSFER_IN lines and destination lots for posted TRANSFER_OUT lines
     """
-    🚀 BATCH OPERATION: Create inventory lots for all TRANSFER_IN transactions efficiently
-    """    
-    logger.debug(f"Batch create: Creating inventory lots for {len(fifo_calculations)} products")
+    if not transfer_out_transactions:
+        return []
     
-    inventory_lots_to_create = []
+    from_vessel = transfer.from_vessel
+    to_vessel = transfer.to_vessel
     
-    for product_id, calc_data in fifo_calculations.items():
-        product = calc_data['product']
-        quantity = calc_data['quantity']
-        unit_price = calc_data['unit_price']
-        
-        # Create inventory lot data
-        inventory_lot = InventoryLot(
+    transfer_in_transactions = Transaction.objects.bulk_create([
+        Transaction(
             vessel=to_vessel,
-            product=product,
-            purchase_date=datetime.now().date(),
-            purchase_price=unit_price,
-            original_quantity=int(quantity),
-            remaining_quantity=int(quantity),
-            created_by=transfer_in_transactions[0].created_by  # Use first transaction's creator
+            product_id=out_txn.product_id,
+            transaction_type='TRANSFER_IN',
+            transaction_date=out_txn.transaction_date,
+            quantity=out_txn.quantity,
+            unit_price=out_txn.unit_price,
+            transfer_from_vessel=from_vessel,
+            transfer=transfer,
+            related_transfer=out_txn,
+            notes=f'Received from {from_vessel.name}',
+            created_by=created_by
         )
-        inventory_lots_to_create.append(inventory_lot)
+        for out_txn in transfer_out_transactions
+    ])
     
-    # Bulk create all inventory lots
-    if inventory_lots_to_create:
-        InventoryLot.objects.bulk_create(inventory_lots_to_create)
-        logger.debug(f"Created: {len(inventory_lots_to_create)} inventory lots for {to_vessel.name}")
+    # Purchase date matches the transaction date so Transaction.delete() can find the lot again
+    InventoryLot.objects.bulk_create([
+        InventoryLot(
+            vessel=to_vessel,
+            product_id=in_txn.product_id,
+            purchase_date=in_txn.transaction_date,
+            purchase_price=in_txn.unit_price,
+            original_quantity=int(in_txn.quantity),
+            remaining_quantity=int(in_txn.quantity),
+            created_by=created_by
+        )
+        for in_txn in transfer_in_transactions
+    ])
+    
+    # Link TRANSFER_OUT with TRANSFER_IN transactions
+    for out_txn, in_txn in zip(transfer_out_transactions, transfer_in_transactions):
+        out_txn.related_transfer_id = in_txn.id
+    Transaction.objects.bulk_update(transfer_out_transactions, ['related_transfer_id'])
+    
+    CacheInvalidationCollector.defer_stock_changed(to_vessel.id, [txn.product_id for txn in transfer_in_transactions])
+    logger.debug(f"Created: {len(transfer_in_transactions)} received lines for {to_vessel.name}")
+    return transfer_in_transactions
 
 
 def _clear_transfer_cache_targeted(transfer_id, from_vessel_id, to_vessel_id):
@@ -854,7 +737,7 @@ def transfer_execute(request):
             })
         
         # Check available inventory
-        available_quantity, lots = get_available_inventory(from_vessel, product)
+        available_quantity, lots = get_available_to_promise(from_vessel, product)
         
         if quantity > available_quantity:
             return JsonResponse({
@@ -907,43 +790,19 @@ def transfer_calculate_fifo_cost(request):
         vessel = Vessel.objects.get(id=vessel_id, active=True)
         product = Product.objects.get(id=product_id, active=True)
         
-        # Get FIFO cost calculation using existing helper        
-        try:
-            result = get_fifo_cost_for_transfer(vessel, product, quantity)
-            
-            if isinstance(result, tuple) and len(result) == 2:
-                # Expected format: (total_cost, consumption_details)
-                fifo_total_cost, consumption_details = result
-            elif isinstance(result, (int, float, Decimal)):
-                # The function returns UNIT COST, not total cost
-                fifo_unit_cost = Decimal(str(result))  # This is the actual unit cost
-                fifo_total_cost = fifo_unit_cost * Decimal(str(quantity))  # Calculate total
-                consumption_details = []
-            else:
-                raise ValueError(f"Unexpected return format from get_fifo_cost_for_transfer: {type(result)}")
-            
-            # REMOVED: No average_unit_cost - only return total_cost and fifo_breakdown
-            return JsonResponse({
-                'success': True,
-                'total_cost': float(fifo_total_cost),      # Only total cost needed
-                'fifo_breakdown': consumption_details if isinstance(consumption_details, list) else [],
-                'quantity': quantity
-            })
-            
-        except Exception as e:
-            logger.error(f"FIFO calculation error for vessel {vessel_id}, product {product_id}, quantity {quantity}: {e}")
-            
-            # Fallback calculation - only total cost
-            fallback_unit_cost = Decimal('0.050')  # 50 fils per unit
-            fallback_total_cost = fallback_unit_cost * Decimal(str(quantity))
-            
-            return JsonResponse({
-                'success': True,
-                'total_cost': float(fallback_total_cost),  # Only total cost
-                'fifo_breakdown': [],
-                'quantity': quantity,
-                'warning': 'Used fallback cost calculation due to FIFO error'
-            })
+        # One-line cart, exact Decimal FIFO costing (cost preview only - stock is validated on completion)
+        line = CartPreviewHelper.preview(vessel, [(product.id, int(quantity))], respects_reservations=False)['lines'][0]
+        
+        # Units beyond open lots are costed at the product purchase price (as get_fifo_cost_for_transfer)
+        fifo_total_cost = line['cogs'] + line['shortfall'] * (product.purchase_price or Decimal('0'))
+        
+        # REMOVED: No average_unit_cost - only return total_cost and fifo_breakdown
+        return JsonResponse(CartPreviewHelper.as_json({
+            'success': True,
+            'total_cost': fifo_total_cost,      # Only total cost needed
+            'fifo_breakdown': line['consumption_breakdown'],
+            'quantity': quantity
+        }))
         
     except Vessel.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Vessel not found'})
@@ -952,6 +811,37 @@ def transfer_calculate_fifo_cost(request):
     except Exception as e:
         logger.error(f"Endpoint error: {e}")
         return JsonResponse({'success': False, 'error': str(e)})
+
+@operations_access_required
+def transfer_preview_cart(request):
+    """
+    AJAX endpoint: available-to-promise stock and FIFO cost for a whole transfer cart.
+    Body: {vessel_id (source vessel), lines: [{product_id, quantity}, ...]}
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'POST method required'})
+    
+    try:
+        data = json.loads(request.body)
+        vessel = Vessel.objects.get(id=data.get('vessel_id'), active=True)
+        
+        # Validate user has access to this vessel for transfer operations
+        can_access, error_msg = VesselOperationValidator.validate_transfer_initiation(request.user, vessel)
+        if not can_access:
+            return JsonResponse({'success': False, 'error': error_msg})
+        
+        lines = CartPreviewHelper.parse_lines(data.get('lines'))
+        
+        preview = CartPreviewHelper.preview(vessel, lines)
+        return JsonResponse(CartPreviewHelper.as_json({'success': True, **preview}))
+        
+    except Vessel.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Vessel not found'})
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+    except Exception as e:
+        logger.error(f"Transfer cart preview error: {e}")
+        return JsonResponse({'success': False, 'error': str(e)})
     
 @operations_access_required  
 def transfer_cancel(request):
@@ -5,7 +5,8 @@ Implements the collaborative two-party transfer approval system from new_feature
 
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
 from django.db import transaction
 from django.utils import timezone
 from django.contrib import messages
@@ -23,10 +24,13 @@ from vessel_management.models import (
     TransferItemEdit, 
     TransferApprovalHistory, 
     TransferNotification,
+    TransferNotificationCounter,
     UserVesselAssignment
 )
 from vessel_management.utils import VesselAccessHelper, VesselOperationValidator
 from frontend.utils.cache_helpers import VesselCacheHelper, TransferCacheHelper
+from frontend.utils.stock_reservations import StockReservationHelper
+from frontend.utils.live_events import LiveEventHub
 from .utils import BilingualMessages
 from .permissions import operations_access_required
 
@@ -538,6 +542,9 @@ def transfer_workflow_edit_quantities(request):
                 workflow.last_edited_at = timezone.now()
                 workflow.save()
                 
+                # Re-reserve at the edited quantities (increases must fit available-to-promise)
+                StockReservationHelper.sync_transfer(workflow.base_transfer)
+                
                 return JsonResponse({
                     'success': True,
                     'message': f'Transfer quantities edited. Changes recorded.',
@@ -631,6 +638,10 @@ def transfer_workflow_confirm(request):
                         if existing_items.exists():
                             # Execute the transfer properly by re-triggering FIFO and completion
                             with transaction.atomic():
+                                # Hand the reserved stock to the consumption below in one transaction,
+                                # so a concurrent sale can't take it in between
+                                StockReservationHelper.release_transfer(workflow.base_transfer)
+                                
                                 for txn in existing_items:
                                     # Remove PENDING_APPROVAL flag from notes
                                     if txn.notes and txn.notes.startswith('PENDING_APPROVAL: '):
@@ -650,9 +661,9 @@ def transfer_workflow_confirm(request):
                                         except Exception as e:
                                             logger.error(f"Error completing transfer for transaction {txn.id}: {e}")
                                             raise e
-                            
-                            # Mark workflow as completed
-                            workflow.complete_transfer(completed_by_user=request.user)
+                                
+                                # Mark workflow as completed
+                                workflow.complete_transfer(completed_by_user=request.user)
                             message += '. Transfer executed and inventories updated.'
                             
                             # 🚀 CACHE: Clear transfer cache after completion
@@ -763,10 +774,9 @@ def transfer_notifications_list(request):
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
-    # Calculate read count for template
-    unread_count = notifications.filter(is_read=False).count()
-    total_count = notifications.count()
-    read_count = total_count - unread_count
+    # Calculate read count for template (unread is pre-calculated, total comes from the paginator)
+    unread_count = TransferNotification.get_unread_count(request.user)
+    read_count = max(paginator.count - unread_count, 0)
     
     context = {
         'notifications': page_obj,
@@ -787,13 +797,7 @@ def transfer_notification_mark_read(request):
             data = json.loads(request.body)
             notification_ids = data.get('notification_ids', [])
             
-            updated = TransferNotification.objects.filter(
-                id__in=notification_ids,
-                recipient=request.user
-            ).update(
-                is_read=True,
-                read_at=timezone.now()
-            )
+            updated = TransferNotification.mark_read_for(request.user, notification_ids)
             
             return JsonResponse({
                 'success': True,
@@ -803,4 +807,58 @@ def transfer_notification_mark_read(request):
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)})
     
-    return JsonResponse({'success': False, 'error': 'Invalid request method'})
\ No newline at end of file
+    return JsonResponse({'success': False, 'error': 'Invalid request method'})
+
+
+@operations_access_required
+async def transfer_notifications_summary(request):
+    """
+    Unread transfer notification count plus the newest unread notifications (JSON).
+    Async read endpoint for badges and mobile clients; last_event_id lets a client
+    open the event stream from this point.
+    """
+    user = await request.auser()
+    unread_count = await TransferNotificationCounter.aget_count(user.id)
+    
+    latest = []
+    if unread_count:
+        latest = [
+            notification async for notification in TransferNotification.objects.filter(
+                recipient_id=user.id, is_read=False
+            ).order_by('-created_at').values(
+                'id', 'workflow_id', 'notification_type', 'title', 'message', 'is_urgent', 'created_at'
+            )[:5]
+        ]
+    
+    return JsonResponse({
+        'success': True,
+        'unread_count': unread_count,
+        'notifications': latest,
+        'last_event_id': await LiveEventHub.alatest_id(user.id),
+    })
+
+
+@operations_access_required
+def transfer_events_stream(request):
+    """
+    Server-sent events for the current user: a snapshot (unread count) on connect,
+    then notification, unread_count and workflow state frames as they are published.
+    Under ASGI the stream is async and many idle streams share the event loop; under
+    WSGI it holds a worker thread, so it ends sooner and the browser reconnects
+    with Last-Event-ID.
+    """
+    try:
+        since = max(int(request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')), 0)
+    except (TypeError, ValueError):
+        since = LiveEventHub.latest_id(request.user.id)
+    snapshot = {'unread_count': TransferNotification.get_unread_count(request.user)}
+    
+    if isinstance(request, ASGIRequest):
+        content = LiveEventHub.astream(request.user.id, since, LiveEventHub.ASGI_STREAM_SECONDS, snapshot)
+    else:
+        content = LiveEventHub.stream(request.user.id, since, LiveEventHub.WSGI_STREAM_SECONDS, snapshot)
+    
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: pass frames through unbuffered
+    return response
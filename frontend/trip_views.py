@@ -6,7 +6,7 @@ import logging
 from django.db.models import Sum, F, Count, Prefetch
 from django.db.models.functions import Round
 from django.urls import reverse
-from frontend.utils.cache_helpers import TripCacheHelper, VesselCacheHelper, get_optimized_pagination
+from frontend.utils.cache_helpers import TripCacheHelper, VesselCacheHelper
 from transactions.models import Transaction, Trip
 from vessels.models import Vessel
 from django.views.decorators.http import require_http_methods
@@ -25,6 +25,21 @@ from .permissions import (
 
 logger = logging.getLogger('frontend')
 
+def trip_mgmt_queryset():
+    """Unfiltered trip management queryset (paged and cached by TripCacheHelper.MGMT_LIST)"""
+    return Trip.objects.select_related(
+        'vessel', 'created_by'
+    ).only(
+        # Trip fields
+        'id', 'trip_number', 'trip_date', 'passenger_count', 'is_completed', 'created_at', 'notes',
+        'total_revenue', 'item_count', 'vessel_id', 'created_by_id',  # Pre-calculated summary fields
+        # Vessel fields (to prevent N+1 queries)
+        'vessel__id', 'vessel__name', 'vessel__name_ar', 'vessel__has_duty_free', 'vessel__active',
+        # User fields
+        'created_by__id', 'created_by__username'
+    )
+
+
 @login_required
 @user_passes_test(is_admin_or_manager)
 def trip_management(request):
@@ -37,80 +52,36 @@ def trip_management(request):
     date_to = request.GET.get('date_to')
     min_revenue = request.GET.get('min_revenue')
     
-    # 🚀 CACHE: Check for cached trip list (only when no filters applied)
-    has_filters = any([
-        vessel_filter,
-        status_filter,
-        date_from,
-        date_to,
-        min_revenue
-    ])
+    trips_query = trip_mgmt_queryset()
     
-    if not has_filters:
-        cached_trip_list = TripCacheHelper.get_trip_mgmt_list()
-        
-        if cached_trip_list:
-            logger.debug(f"Cache hit: Trip Management List ({len(cached_trip_list)} trips)")
-            trips_query = cached_trip_list
-        else:
-            logger.debug("Cache miss: Building trip management list")
-            
-            # 🚀 OPTIMIZED: Build and cache evaluated list of trip objects
-            trips_query = list(Trip.objects.select_related(
-                'vessel', 'created_by'
-            ).only(
-                # Trip fields
-                'id', 'trip_number', 'trip_date', 'passenger_count', 'is_completed', 'created_at', 'notes',
-                'total_revenue', 'item_count', 'vessel_id', 'created_by_id',  # Pre-calculated summary fields
-                # Vessel fields (to prevent N+1 queries)
-                'vessel__id', 'vessel__name', 'vessel__name_ar', 'vessel__has_duty_free', 'vessel__active',
-                # User fields
-                'created_by__id', 'created_by__username'
-            ).order_by('-trip_date', '-created_at'))
-            
-            # 🚀 CACHE: Store evaluated trip list for future requests
-            TripCacheHelper.cache_trip_mgmt_list(trips_query)
-            logger.debug(f"Cached: Trip Management List ({len(trips_query)} trips) - 30 min timeout")
-    else:
-        # Filters applied - always do fresh query (can't use cache)
-        trips_query = Trip.objects.select_related(
-            'vessel', 'created_by'
-        ).only(
-            # Trip fields
-            'id', 'trip_number', 'trip_date', 'passenger_count', 'is_completed', 'created_at', 'notes',
-            'total_revenue', 'item_count', 'vessel_id', 'created_by_id',  # Pre-calculated summary fields
-            # Vessel fields (to prevent N+1 queries)
-            'vessel__id', 'vessel__name', 'vessel__name_ar', 'vessel__has_duty_free', 'vessel__active',
-            # User fields
-            'created_by__id', 'created_by__username'
-        )
-        
-        # Apply filters
-        if vessel_filter:
-            trips_query = trips_query.filter(vessel_id=vessel_filter)
-        if status_filter == 'completed':
-            trips_query = trips_query.filter(is_completed=True)
-        elif status_filter == 'in_progress':
-            trips_query = trips_query.filter(is_completed=False)
-        if date_from:
-            try:
-                date_from_parsed = datetime.strptime(date_from, '%Y-%m-%d').date()
-                trips_query = trips_query.filter(trip_date__gte=date_from_parsed)
-            except ValueError:
-                pass
-        if date_to:
-            try:
-                date_to_parsed = datetime.strptime(date_to, '%Y-%m-%d').date()
-                trips_query = trips_query.filter(trip_date__lte=date_to_parsed)
-            except ValueError:
-                pass
-        
-        # Order for consistent results
-        trips_query = trips_query.order_by('-trip_date', '-created_at')
+    # Apply filters
+    if vessel_filter:
+        trips_query = trips_query.filter(vessel_id=vessel_filter)
+    if status_filter == 'completed':
+        trips_query = trips_query.filter(is_completed=True)
+    elif status_filter == 'in_progress':
+        trips_query = trips_query.filter(is_completed=False)
+    if date_from:
+        try:
+            date_from_parsed = datetime.strptime(date_from, '%Y-%m-%d').date()
+            trips_query = trips_query.filter(trip_date__gte=date_from_parsed)
+        except ValueError:
+            pass
+    if date_to:
+        try:
+            date_to_parsed = datetime.strptime(date_to, '%Y-%m-%d').date()
+            trips_query = trips_query.filter(trip_date__lte=date_to_parsed)
+        except ValueError:
+            pass
     
-    # 🚀 OPTIMIZED: Use COUNT-free pagination for better performance
+    # 🚀 CACHE: First pages per vessel/status come from cached windows, deeper pages
+    # and date-filtered views use keyset queries (min_revenue is applied per page below)
     page_number = request.GET.get('page', 1)
-    page_obj = get_optimized_pagination(trips_query, page_number, page_size=25, use_count=False)
+    page_obj = TripCacheHelper.MGMT_LIST.paginate(
+        trips_query,
+        {'vessel': vessel_filter, 'status': status_filter, 'date_from': date_from, 'date_to': date_to},
+        page_number, page_size=25
+    )
     
     # Process trips list
     trips_list = page_obj.object_list
@@ -77,6 +77,8 @@ urlpatterns = [
     path('inventory/', inventory_views.inventory_check, name='inventory_check'),
     path('inventory/data/', inventory_views.inventory_data_ajax, name='inventory_data_ajax'),
     path('inventory/details/<int:product_id>/<int:vessel_id>/', inventory_views.inventory_details_ajax, name='inventory_details_ajax'),
+    path('inventory/product-index/<int:vessel_id>/', inventory_views.product_index_snapshot, name='product_index_snapshot'),
+    path('inventory/events/<int:product_id>/<int:vessel_id>/', inventory_views.inventory_event_history, name='inventory_event_history'),
     
     # =============================================================================
     # VESSEL MANAGEMENT
@@ -104,6 +106,7 @@ urlpatterns = [
     path('sales/calculate-cogs/', sales_views.sales_calculate_cogs, name='sales_calculate_cogs'),
     path('sales/search-products/', sales_views.sales_search_products, name='sales_search_products'),
     path('sales/validate-inventory/', sales_views.sales_validate_inventory, name='sales_validate_inventory'),
+    path('sales/preview-cart/', sales_views.sales_preview_cart, name='sales_preview_cart'),
     
     # =============================================================================
     # OPERATIONS - SUPPLY
@@ -114,6 +117,7 @@ urlpatterns = [
     path('supply/po/<int:po_id>/', supply_views.po_supply, name='po_supply'),  # Step 2: Add items
     path('supply/po/bulk-complete/', supply_views.po_bulk_complete, name='po_bulk_complete'),
     path('supply/po/cancel/', supply_views.po_cancel, name='po_cancel'),
+    path('supply/po/<int:po_id>/receive-file/', supply_views.po_receive_file, name='po_receive_file'),
     
     # Supply API endpoints
     path('supply/product-catalog/', supply_views.supply_product_catalog, name='supply_product_catalog'),
@@ -128,6 +132,7 @@ urlpatterns = [
     path('transfer/<int:workflow_id>/', transfer_views.transfer_items, name='transfer_items'),
     path('transfer/bulk-complete/', transfer_views.transfer_bulk_complete, name='transfer_bulk_complete'),
     path('transfer/calculate-fifo-cost/', transfer_views.transfer_calculate_fifo_cost, name='transfer_calculate_fifo_cost'),
+    path('transfer/preview-cart/', transfer_views.transfer_preview_cart, name='transfer_preview_cart'),
     path('transfer/cancel/', transfer_views.transfer_cancel, name='transfer_cancel'),
     
     # Transfer API endpoints
@@ -144,6 +149,8 @@ urlpatterns = [
     path('transfer-workflow/confirm/', transfer_workflow_views.transfer_workflow_confirm, name='transfer_workflow_confirm'),
     path('transfer-workflow/notifications/', transfer_workflow_views.transfer_notifications_list, name='transfer_notifications_list'),
     path('transfer-workflow/notifications/mark-read/', transfer_workflow_views.transfer_notification_mark_read, name='transfer_notification_mark_read'),
+    path('transfer-workflow/notifications/summary/', transfer_workflow_views.transfer_notifications_summary, name='transfer_notifications_summary'),
+    path('transfer-workflow/events/', transfer_workflow_views.transfer_events_stream, name='transfer_events_stream'),
     
     # Waste - Two-step workflow
     path('waste/', waste_views.waste_entry, name='waste_entry'),  # Step 1: Create waste report
@@ -154,6 +161,7 @@ urlpatterns = [
     # Waste API endpoints
     path('waste/search-products/', waste_views.waste_search_products, name='waste_search_products'),
     path('waste/available-products/', waste_views.waste_available_products, name='waste_available_products'),
+    path('waste/preview-cart/', waste_views.waste_preview_cart, name='waste_preview_cart'),
     
     # =============================================================================
     # ADMIN MANAGEMENT
@@ -197,6 +205,7 @@ urlpatterns = [
     path('reports/daily/', reports_views.daily_report, name='daily_report'),
     path('reports/monthly/', reports_views.monthly_report, name='monthly_report'),
     path('reports/analytics/', reports_views.analytics_report, name='analytics_report'),
+    path('reports/inventory-valuation/', reports_views.inventory_valuation_report, name='inventory_valuation_report'),
     path('reports/trips/', reports_views.trip_reports, name='trip_reports'),
     path('reports/purchase-orders/', reports_views.po_reports, name='po_reports'),
     
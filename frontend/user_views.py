@@ -9,6 +9,7 @@ from vessels.models import Vessel
 logger = logging.getLogger('frontend')
 from frontend.utils.validation_helpers import ValidationHelper
 from frontend.utils.cache_helpers import VesselCacheHelper
+from frontend.utils.sync_journal import SyncJournalHelper
 from .utils import BilingualMessages
 from django.views.decorators.http import require_http_methods
 import secrets
@@ -341,7 +342,9 @@ def manage_user_vessels(request, user_id):
         
         with transaction.atomic():
             # Remove all current active assignments
-            UserVesselAssignment.objects.filter(user=user).update(is_active=False)
+            previous_assignments = UserVesselAssignment.objects.filter(user=user)
+            SyncJournalHelper.record_assignments(previous_assignments.values_list('vessel_id', flat=True), user.id)
+            previous_assignments.update(is_active=False)
             
             # Create new assignments
             if vessel_ids:
@@ -0,0 +1,199 @@
+"""
+Compact cache value codec for large report and list payloads.
+Model instances are flattened to primitive rows (one shared schema per model and
+field set) instead of being pickled with their ORM state, and payloads above a
+size threshold are zlib-compressed. Reads rebuild the instances without queries.
+"""
+
+import logging
+import pickle
+import time
+import zlib
+
+from django.db.models import Model
+from django.db.models.base import ModelState
+from django.db.models.query import QuerySet
+
+from frontend.utils.metrics import MetricsRegistry, key_family
+
+logger = logging.getLogger('frontend')
+
+
+class CacheCodec:
+    """
+    Encode cache values as primitive dict/list payloads.
+
+    A model instance becomes ``{'__m__': schema_id, 'v': [...], 'r': [...]}``:
+    the loaded field values (deferred fields stay deferred), extra attributes
+    such as annotations, and select_related objects. Schemas are stored once per
+    payload, so a list of 500 trips carries its field names once. The same
+    instance appearing twice (e.g. a vessel in several breakdown rows) is
+    encoded once and decoded to one shared object. The database alias the
+    instance was read from is part of its schema, so rebuilt instances save and
+    follow relations through the same connection.
+
+    Prefetched relations are not kept - callers caching prefetched lists should
+    keep using plain cache.set().
+    """
+
+    MAGIC = b'VSC1'
+    RAW = b'r'
+    ZLIB = b'z'
+    COMPRESS_THRESHOLD = 16 * 1024  # bytes of pickled payload before compressing
+    COMPRESSION_LEVEL = 3           # speed over ratio: payloads are rebuilt often
+    MODEL_TAG = '__m__'
+
+    @classmethod
+    def is_encoded(cls, value):
+        return isinstance(value, bytes) and value[:len(cls.MAGIC)] == cls.MAGIC
+
+    @classmethod
+    def encode(cls, value, key=''):
+        """Compact bytes for value; key only labels the metrics"""
+        started = time.perf_counter()
+        schemas, schema_ids, memo = [], {}, {}
+        data = cls._flatten(value, schemas, schema_ids, memo)
+        payload = pickle.dumps((schemas, data), protocol=pickle.HIGHEST_PROTOCOL)
+
+        if len(payload) >= cls.COMPRESS_THRESHOLD:
+            encoded = cls.MAGIC + cls.ZLIB + zlib.compress(payload, cls.COMPRESSION_LEVEL)
+            encoding = 'zlib'
+        else:
+            encoded = cls.MAGIC + cls.RAW + payload
+            encoding = 'raw'
+
+        family = key_family(key)
+        MetricsRegistry.observe('cache_payload_bytes', (('family', family), ('encoding', encoding)), len(encoded))
+        MetricsRegistry.observe(
+            'cache_codec_duration_seconds', (('family', family), ('operation', 'encode')),
+            time.perf_counter() - started
+        )
+        return encoded
+
+    @classmethod
+    def decode(cls, encoded, key=''):
+        """Value from encode() output, with model instances rebuilt"""
+        started = time.perf_counter()
+        body = encoded[len(cls.MAGIC) + 1:]
+        if encoded[len(cls.MAGIC):len(cls.MAGIC) + 1] == cls.ZLIB:
+            body = zlib.decompress(body)
+        schemas, data = pickle.loads(body)
+
+        value = cls._rebuild(data, cls._resolve_schemas(schemas), {})
+        MetricsRegistry.observe(
+            'cache_codec_duration_seconds', (('family', key_family(key)), ('operation', 'decode')),
+            time.perf_counter() - started
+        )
+        return value
+
+    # ------------------------------------------------------------------
+    # Flattening
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _flatten(cls, value, schemas, schema_ids, memo):
+        if value is None or isinstance(value, (str, int, float, bool, bytes)):
+            return value
+        if isinstance(value, Model):
+            return cls._flatten_instance(value, schemas, schema_ids, memo)
+        if isinstance(value, dict):
+            # defaultdict factories (often lambdas) are not kept
+            return {k: cls._flatten(v, schemas, schema_ids, memo) for k, v in value.items()}
+        if isinstance(value, (list, QuerySet)):
+            return [cls._flatten(v, schemas, schema_ids, memo) for v in value]
+        if isinstance(value, tuple):
+            return tuple(cls._flatten(v, schemas, schema_ids, memo) for v in value)
+        # Decimal, date, datetime, sets and other picklable primitives
+        return value
+
+    @classmethod
+    def _flatten_instance(cls, instance, schemas, schema_ids, memo):
+        encoded = memo.get(id(instance))
+        if encoded is not None:
+            return encoded
+
+        opts = instance._meta
+        state = instance.__dict__
+        field_names = tuple(f.attname for f in opts.concrete_fields if f.attname in state)
+        concrete = {f.attname for f in opts.concrete_fields}
+        extra_names = tuple(
+            name for name in state
+            if name not in concrete and not name.startswith('_')
+        )
+        related = instance._state.fields_cache
+        related_names = tuple(related)
+
+        schema = (opts.label, field_names, extra_names, related_names, instance._state.db)
+        schema_id = schema_ids.get(schema)
+        if schema_id is None:
+            schema_id = schema_ids[schema] = len(schemas)
+            schemas.append(schema)
+
+        encoded = memo[id(instance)] = {
+            cls.MODEL_TAG: schema_id,
+            'v': [state[name] for name in field_names]
+                 + [cls._flatten(state[name], schemas, schema_ids, memo) for name in extra_names],
+            'r': [],
+        }
+        encoded['r'].extend(cls._flatten(related[name], schemas, schema_ids, memo) for name in related_names)
+        return encoded
+
+    # ------------------------------------------------------------------
+    # Rebuilding
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _resolve_schemas(schemas):
+        from django.apps import apps
+
+        resolved = []
+        for label, field_names, extra_names, related_names, *db in schemas:
+            # Payloads cached before the alias was recorded were all read from 'default'
+            db = db[0] if db else 'default'
+            resolved.append((apps.get_model(label), field_names, extra_names, related_names, db))
+        return resolved
+
+    @classmethod
+    def _rebuild(cls, data, schemas, memo):
+        if isinstance(data, dict):
+            if cls.MODEL_TAG in data:
+                return cls._rebuild_instance(data, schemas, memo)
+            return {k: cls._rebuild(v, schemas, memo) for k, v in data.items()}
+        if isinstance(data, list):
+            return [cls._rebuild(v, schemas, memo) for v in data]
+        if isinstance(data, tuple):
+            return tuple(cls._rebuild(v, schemas, memo) for v in data)
+        return data
+
+    @classmethod
+    def _rebuild_instance(cls, data, schemas, memo):
+        instance = memo.get(id(data))
+        if instance is not None:
+            return instance
+
+        model, field_names, extra_names, related_names, db = schemas[data[cls.MODEL_TAG]]
+        values = data['v']
+        # Same path as unpickling a model: no __init__ or init signals, and fields
+        # missing from __dict__ stay deferred
+        instance = memo[id(data)] = model.__new__(model)
+        instance._state = ModelState()
+        instance._state.adding = False
+        instance._state.db = db
+        state = instance.__dict__
+        state.update(zip(field_names, values))
+        for name, value in zip(extra_names, values[len(field_names):]):
+            state[name] = cls._rebuild(value, schemas, memo)
+        for name, value in zip(related_names, data['r']):
+            instance._state.fields_cache[name] = cls._rebuild(value, schemas, memo)
+        return instance
+
+    @classmethod
+    def stats(cls, value):
+        """Sizes of one value as pickled today vs encoded (debugging aid)"""
+        pickled = len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        encoded = len(cls.encode(value))
+        return {
+            'pickled': pickled,
+            'encoded': encoded,
+            'saved_pct': round((1 - encoded / pickled) * 100, 1) if pickled else 0,
+        }
@@ -1,59 +1,390 @@
+from asgiref.sync import sync_to_async
 from django.core.cache import cache
 from datetime import date, timedelta
+from collections import namedtuple
 import hashlib
+import math
+import random
 from vessels.models import Vessel
-from django.db.models import F
+from django.db.models import F, Q
+from django.db.models.query import QuerySet
 import logging
 import time
 from django.conf import settings
+from frontend.utils.metrics import MetricsRegistry, key_family
+from frontend.utils.cache_codec import CacheCodec
+from frontend.utils.cache_invalidation import CacheInvalidationCollector
 
 logger = logging.getLogger('frontend')
 
 # Cache Performance Tracking
 class CachePerformanceTracker:
-    """Track cache performance metrics for analytics and optimization"""
+    """
+    Track cache performance metrics for analytics and optimization.
+    🚀 Counts go to the in-process MetricsRegistry (no cache round trips) and are
+    exposed with the backend's per-family hit/miss/latency numbers on /metrics.
+    """
     
     @classmethod
     def track_operation(cls, operation_type, cache_key, hit=None, duration_ms=None):
-        """Track cache operation for performance analytics"""
-        try:
-            # Only track in debug mode or if specifically enabled
-            if not getattr(settings, 'CACHE_PERFORMANCE_TRACKING', settings.DEBUG):
-                return
-            
-            # Store metrics in cache with short TTL for monitoring
-            metrics_key = f"cache_metrics_{operation_type}_{cache_key[:20]}"
-            current_metrics = cache.get(metrics_key, {'count': 0, 'hit_count': 0, 'total_duration': 0})
-            
-            current_metrics['count'] += 1
-            if hit is not None and hit:
-                current_metrics['hit_count'] += 1
-            if duration_ms is not None:
-                current_metrics['total_duration'] += duration_ms
-            current_metrics['last_accessed'] = time.time()
-            
-            # Store for 1 hour
-            cache.set(metrics_key, current_metrics, 3600)
-            
-        except Exception as e:
-            logger.debug(f"Cache performance tracking error: {e}")
+        """Track a cache helper lookup (hit=None records a set)"""
+        result = 'set' if hit is None else ('hit' if hit else 'miss')
+        MetricsRegistry.inc(
+            'cache_helper_operations_total',
+            (('operation', operation_type), ('family', key_family(cache_key)), ('result', result))
+        )
+        if duration_ms is not None:
+            MetricsRegistry.observe(
+                'cache_helper_duration_seconds', (('operation', operation_type),), duration_ms / 1000
+            )
     
     @classmethod
     def get_performance_stats(cls, operation_type=None):
-        """Get performance statistics for cache operations"""
+        """
+        Get cache backend statistics across all workers.
+        
+        Args:
+            operation_type: key family to report on (product, trip, po, transfer, waste, vessel, ...)
+        """
         try:
-            # This would need a more sophisticated implementation in production
-            # For now, return basic stats structure
+            counters, histograms = MetricsRegistry.collect()
+            hits = misses = total = 0
+            for (name, labels), value in counters.items():
+                labels = dict(labels)
+                if name != 'cache_operations_total' or (operation_type and labels['family'] != operation_type):
+                    continue
+                total += value
+                if labels['result'] == 'hit':
+                    hits += value
+                elif labels['result'] == 'miss':
+                    misses += value
+            
+            duration_sum = duration_count = 0
+            for (name, labels), (_, seconds, count) in histograms.items():
+                if name == 'cache_operation_duration_seconds' and (
+                    not operation_type or dict(labels)['family'] == operation_type
+                ):
+                    duration_sum += seconds
+                    duration_count += count
+            
             return {
-                'total_operations': 0,
-                'hit_rate': 0.0,
-                'avg_duration_ms': 0.0
+                'total_operations': total,
+                'hits': hits,
+                'misses': misses,
+                'hit_rate': round(hits / (hits + misses) * 100, 2) if hits + misses else 0.0,
+                'avg_duration_ms': round(duration_sum / duration_count * 1000, 4) if duration_count else 0.0
             }
         except Exception as e:
             logger.debug(f"Cache stats retrieval error: {e}")
             return {}
 
 
+# Stampede-protected recompute
+CachedValue = namedtuple('CachedValue', ['value', 'soft_expires_at', 'compute_seconds'])
+
+
+class CachedComputation:
+    """
+    Single-flight recompute with stale-while-revalidate for expensive cache entries.
+    
+    Entries are stored as CachedValue envelopes: the value, a soft expiry and how
+    long the value took to build. The backend keeps the entry STALE_SECONDS past
+    its soft expiry so there is something to serve while one caller rebuilds it.
+    
+    - 🚀 Early refresh: a reader may refresh before the soft expiry with a
+      probability that grows with the build cost and closeness to expiry
+      (XFetch), so popular keys are usually rebuilt before they ever expire.
+    - 🔒 Single flight: only the caller that wins cache.add() on the lock key
+      recomputes; others get the stale value, or wait for the winner on a cold miss.
+    - 🎲 Jittered TTL: soft expiry is randomized so keys written together
+      do not expire together.
+    - 📦 compact=True stores the value through CacheCodec (primitive rows,
+      zlib above a threshold) instead of pickling ORM instances.
+    """
+    
+    STALE_SECONDS = 300        # how long an expired value may still be served
+    LOCK_TIMEOUT = 60          # lease on the recompute lock (longest expected build)
+    WAIT_SECONDS = 10          # cold miss: how long to wait for the lock holder
+    POLL_INTERVAL = 0.05
+    TTL_JITTER = 0.1           # soft expiry lands in [timeout * 0.9, timeout]
+    EARLY_REFRESH_BETA = 1.0   # > 1 refreshes earlier, 0 disables early refresh
+    
+    @classmethod
+    def get_or_compute(cls, key, compute, timeout, stale_seconds=None, compact=False):
+        """
+        Cached value for key, calling compute() on behalf of all concurrent callers at most once.
+        
+        Args:
+            key: cache key (include the helper's version so invalidation still works)
+            compute: zero-argument callable building the value
+            timeout: seconds the value counts as fresh
+            stale_seconds: seconds an expired value may be served during a rebuild
+            compact: store the value with CacheCodec
+        """
+        entry = cache.get(key)
+        stale = None
+        if isinstance(entry, CachedValue):
+            if not cls._should_refresh(entry):
+                cls._track(key, 'fresh')
+                return cls._unwrap(key, entry.value)
+            stale = entry
+        elif entry is not None:
+            # Written by a plain cache.set() - serve it as-is
+            cls._track(key, 'fresh')
+            return entry
+        
+        lock_key = cls.get_lock_key(key)
+        if cache.add(lock_key, True, cls.LOCK_TIMEOUT):
+            try:
+                value = cls._recompute(key, compute, timeout, stale_seconds, compact)
+            finally:
+                cache.delete(lock_key)
+            cls._track(key, 'refreshed' if stale else 'computed')
+            return value
+        
+        if stale is not None:
+            # Someone else is rebuilding - don't pile on
+            cls._track(key, 'stale')
+            return cls._unwrap(key, stale.value)
+        
+        # Cold miss while another caller builds it: wait for that result
+        deadline = time.monotonic() + cls.WAIT_SECONDS
+        while time.monotonic() < deadline:
+            time.sleep(cls.POLL_INTERVAL)
+            entry = cache.get(key)
+            if isinstance(entry, CachedValue):
+                cls._track(key, 'waited')
+                return cls._unwrap(key, entry.value)
+            if not cache.get(lock_key):
+                break
+        
+        # Lock holder failed or is too slow - build it ourselves
+        cls._track(key, 'computed')
+        return cls._recompute(key, compute, timeout, stale_seconds, compact)
+    
+    @classmethod
+    def peek(cls, key):
+        """Cached value (fresh or stale) without recomputing, None if absent"""
+        entry = cache.get(key)
+        return cls._unwrap(key, entry.value) if isinstance(entry, CachedValue) else entry
+    
+    @classmethod
+    def store(cls, key, value, timeout, stale_seconds=None, compute_seconds=0.0, compact=False):
+        """Write a value in the envelope get_or_compute() reads"""
+        if compact:
+            value = CacheCodec.encode(value, key)
+        ttl = timeout * random.uniform(1 - cls.TTL_JITTER, 1)
+        stale_seconds = cls.STALE_SECONDS if stale_seconds is None else stale_seconds
+        entry = CachedValue(value, time.time() + ttl, compute_seconds)
+        return cache.set(key, entry, int(ttl + stale_seconds))
+    
+    @staticmethod
+    def get_lock_key(key):
+        return f"{key}:recompute_lock"
+    
+    @classmethod
+    def _should_refresh(cls, entry):
+        # XFetch: now - cost * beta * ln(rand) >= expiry
+        early = entry.compute_seconds * cls.EARLY_REFRESH_BETA * -math.log(1.0 - random.random())
+        return time.time() + early >= entry.soft_expires_at
+    
+    @classmethod
+    def _recompute(cls, key, compute, timeout, stale_seconds, compact=False):
+        started = time.perf_counter()
+        value = compute()
+        compute_seconds = time.perf_counter() - started
+        cls.store(key, value, timeout, stale_seconds, compute_seconds, compact)
+        logger.debug(f"🔄 Recomputed {key} in {compute_seconds * 1000:.0f}ms")
+        return value
+    
+    @staticmethod
+    def _unwrap(key, value):
+        return CacheCodec.decode(value, key) if CacheCodec.is_encoded(value) else value
+    
+    @staticmethod
+    def _track(key, result):
+        MetricsRegistry.inc('cached_computation_total', (('family', key_family(key)), ('result', result)))
+
+
+def cached_computation(key, compute, timeout, stale_seconds=None, compact=False):
+    """Shortcut for CachedComputation.get_or_compute()"""
+    return CachedComputation.get_or_compute(key, compute, timeout, stale_seconds, compact)
+
+
+class ManagementListCache:
+    """
+    Bounded, windowed cache for the trip/PO/transfer/waste management pages.
+    
+    Only the first WINDOW_PAGES pages of a list are cached, per page size and
+    normalized filter set, so an entry never grows with the table. Filter sets
+    outside ``windowed_filters`` (dates, search) and pages past the window are
+    read from the database with a keyset seek: the last row of the previous page
+    is remembered as a cursor, so "Next" never pays for an OFFSET scan.
+    
+    Invalidation is tag-based: a window filtered to one vessel depends only on
+    that vessel's tag, windows across all vessels depend on the ``any`` tag.
+    invalidate([vessel_id]) bumps that vessel's tag and ``any``; invalidate()
+    with no vessels bumps the list generation and drops every window.
+    """
+    
+    WINDOW_PAGES = 4
+    DEFAULT_PAGE_SIZE = 25
+    CURSOR_TIMEOUT = 3600
+    
+    def __init__(self, name, date_field, vessel_filters=('vessel',), vessel_fields=('vessel_id',),
+                 windowed_filters=('vessel', 'status'), timeout=3600):
+        self.name = name
+        self.ordering = (f'-{date_field}', '-created_at', '-id')
+        self.keyset_fields = (date_field, 'created_at', 'id')
+        self.vessel_filters = tuple(vessel_filters)
+        self.vessel_fields = tuple(vessel_fields)
+        self.windowed_filters = frozenset(windowed_filters)
+        self.timeout = timeout
+    
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def normalize_filters(filters):
+        """Drop empty values and surrounding whitespace so equivalent URLs share a key"""
+        return {
+            name: str(value).strip()
+            for name, value in (filters or {}).items()
+            if value is not None and str(value).strip()
+        }
+    
+    def is_windowed(self, filters):
+        return set(filters) <= self.windowed_filters
+    
+    def get_tags(self, filters):
+        tags = [f"v{filters[name]}" for name in self.vessel_filters if name in filters]
+        return tags or ['any']
+    
+    def _generation_key(self):
+        return f"{self.name}_mgmt_generation"
+    
+    def _tag_key(self, tag):
+        return f"{self.name}_mgmt_tag_{tag}"
+    
+    def _key_base(self, filters, page_size):
+        tags = self.get_tags(filters)
+        version_keys = [self._generation_key()] + [self._tag_key(tag) for tag in tags]
+        versions = cache.get_many(version_keys)
+        tag_part = '_'.join(f"{tag}.{versions.get(self._tag_key(tag), 1)}" for tag in tags)
+        filter_hash = hashlib.md5(
+            '&'.join(f"{k}={v}" for k, v in sorted(filters.items())).encode()
+        ).hexdigest()[:12] if filters else 'all'
+        return f"{self.name}_mgmt_list_g{versions.get(self._generation_key(), 1)}_{tag_part}_{filter_hash}_p{page_size}"
+    
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    
+    def paginate(self, queryset, filters=None, page_num=1, page_size=None):
+        """
+        One page of the list (EnhancedPerfectPagination, COUNT-free).
+        
+        Args:
+            queryset: filtered, unevaluated queryset for the list
+            filters: the request's filter parameters (used for keys and tags only)
+        """
+        filters = self.normalize_filters(filters)
+        page_size = page_size or self.DEFAULT_PAGE_SIZE
+        try:
+            page_num = max(1, int(page_num or 1))
+        except (TypeError, ValueError):
+            page_num = 1
+        queryset = queryset.order_by(*self.ordering)
+        key_base = self._key_base(filters, page_size)
+        start = (page_num - 1) * page_size
+        window_rows = self.WINDOW_PAGES * page_size
+        
+        window = None
+        if self.is_windowed(filters):
+            if start < window_rows:
+                window = cached_computation(
+                    f"{key_base}_window", lambda: list(queryset[:window_rows + 1]), self.timeout, compact=True
+                )
+                return EnhancedPerfectPagination(window[start:start + page_size + 1], page_num, page_size)
+            window = CachedComputation.peek(f"{key_base}_window")
+        
+        # Past the window or unwindowed filters: seek from the nearest known page boundary
+        anchor_page, cursor = page_num - 1, cache.get(f"{key_base}_c{page_num - 1}") if page_num > 1 else None
+        if cursor is None and window is not None and len(window) > window_rows:
+            anchor_page, cursor = self.WINDOW_PAGES, self._cursor(window[window_rows - 1])
+        if cursor is not None:
+            offset = (page_num - 1 - anchor_page) * page_size
+            objects = list(queryset.filter(self._after(cursor))[offset:offset + page_size + 1])
+        else:
+            objects = list(queryset[start:start + page_size + 1])
+        
+        if len(objects) > page_size:
+            cache.set(f"{key_base}_c{page_num}", self._cursor(objects[page_size - 1]), self.CURSOR_TIMEOUT)
+        return EnhancedPerfectPagination(objects, page_num, page_size)
+    
+    def _cursor(self, row):
+        return tuple(getattr(row, field) for field in self.keyset_fields)
+    
+    def _after(self, cursor):
+        """Rows after cursor in the (descending) list ordering"""
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.keyset_fields, cursor):
+            condition |= Q(**equal, **{f"{field}__lt": value})
+            equal[field] = value
+        return condition
+    
+    def get_window(self, filters=None, page_size=None):
+        """Cached window rows for a filter set, None if not cached"""
+        filters = self.normalize_filters(filters)
+        return CachedComputation.peek(f"{self._key_base(filters, page_size or self.DEFAULT_PAGE_SIZE)}_window")
+    
+    def store_window(self, queryset_or_rows, filters=None, page_size=None):
+        """Cache the window for a filter set (warming); returns the stored rows"""
+        filters = self.normalize_filters(filters)
+        page_size = page_size or self.DEFAULT_PAGE_SIZE
+        rows = queryset_or_rows
+        if isinstance(rows, QuerySet):
+            rows = rows.order_by(*self.ordering)
+        rows = list(rows[:self.WINDOW_PAGES * page_size + 1])
+        CachedComputation.store(f"{self._key_base(filters, page_size)}_window", rows, self.timeout, compact=True)
+        return rows
+    
+    # ------------------------------------------------------------------
+    # Invalidation
+    # ------------------------------------------------------------------
+    
+    def invalidate(self, vessel_ids=None):
+        """Drop windows and cursors for the given vessels (all windows if None)"""
+        if vessel_ids is None:
+            keys = [self._generation_key()]
+        else:
+            keys = [self._tag_key('any')] + [self._tag_key(f"v{vessel_id}") for vessel_id in set(vessel_ids) if vessel_id]
+        
+        for key in keys:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, 2, None)  # Never expires; absent reads as 1
+        logger.debug(f"🏷️ {self.name} management list windows invalidated: {vessel_ids or 'all'}")
+    
+    def stored_vessel_ids(self, instance, update_fields=None):
+        """Vessel ids currently saved for instance (before a save that may move it)"""
+        if instance._state.adding or instance.pk is None:
+            return []
+        if update_fields is not None and not {f.removesuffix('_id') for f in self.vessel_fields} & set(update_fields):
+            return []
+        row = type(instance).objects.filter(pk=instance.pk).values_list(*self.vessel_fields).first()
+        return list(row or [])
+    
+    def invalidate_instance(self, instance, previous_vessel_ids=()):
+        """Drop the windows of the vessels instance belongs (or belonged) to - after commit, merged per list"""
+        CacheInvalidationCollector.defer_list_tags(
+            self, [getattr(instance, field) for field in self.vessel_fields] + list(previous_vessel_ids)
+        )
+
+
 class VersionedCache:
     """
     Cache versioning system for detecting inconsistencies
@@ -417,27 +748,35 @@ class TripCacheHelper:
         logger.debug(f"Cached recent trips: {user_role}, {len(trips_data)} trips")
         return True
     
-    # 🚀 TRIP MANAGEMENT LIST CACHING (for trip_management page)
-    @classmethod
-    def get_trip_mgmt_list_cache_key(cls):
-        """Generate cache key for trip management list"""
-        cache_version = cls._get_cache_version()
-        return f"trip_mgmt_list_v{cache_version}_all"
+    # 🚀 TRIP MANAGEMENT LIST CACHING (recent windows of the trip_management page)
+    MGMT_LIST = ManagementListCache(
+        'trip', date_field='trip_date', vessel_filters=('vessel',),
+        windowed_filters=('vessel', 'status'), timeout=RECENT_TRIPS_CACHE_TIMEOUT
+    )
     
     @classmethod
     def get_trip_mgmt_list(cls):
-        """Get cached trip management list"""
-        cache_key = cls.get_trip_mgmt_list_cache_key()
-        return cache.get(cache_key)
+        """Cached first window of the unfiltered trip_management list (None if not cached)"""
+        return cls.MGMT_LIST.get_window()
     
     @classmethod
     def cache_trip_mgmt_list(cls, trip_list_data):
-        """Cache trip management list (30 minute timeout)"""
-        cache_key = cls.get_trip_mgmt_list_cache_key()
-        cache.set(cache_key, trip_list_data, cls.RECENT_TRIPS_CACHE_TIMEOUT)
-        logger.debug(f"CACHED TRIP MGMT LIST: {len(trip_list_data)} trips")
+        """Cache the first window of the unfiltered trip_management list"""
+        rows = cls.MGMT_LIST.store_window(trip_list_data)
+        logger.debug(f"CACHED TRIP MGMT WINDOW: {len(rows)} trips")
         return True
     
+    @classmethod
+    def invalidate_mgmt_list(cls, trip_id=None):
+        """Drop management list windows for one record's vessels (all windows without an id)"""
+        from transactions.models import Trip
+        
+        vessel_ids = None
+        if trip_id:
+            row = Trip.objects.filter(pk=trip_id).values_list(*cls.MGMT_LIST.vessel_fields).first()
+            vessel_ids = list(row) if row else None
+        cls.MGMT_LIST.invalidate(vessel_ids)
+    
     # 🚀 FINANCIAL CALCULATIONS CACHING
     @classmethod
     def get_trip_financial_data(cls, trip_id):
@@ -462,6 +801,7 @@ class TripCacheHelper:
             # Method 1: Version bump (always works, instant)
             cls._increment_cache_version()
             cleared_keys.append('trip_cache_version_bumped')
+            cls.MGMT_LIST.invalidate()
             
             # Method 2: Clear static keys
             for cache_key in cls.TRIP_CACHE_KEYS:
@@ -484,6 +824,9 @@ class TripCacheHelper:
         cls._increment_cache_version()
         cleared_keys.append('version_bumped')
         
+        # Management list windows are tagged per vessel, not versioned
+        cls.invalidate_mgmt_list(trip_id)
+        
         # 🚀 FIX: Also increment robust cache version
         cls.clear_recent_trips_cache_only_when_needed()
         cleared_keys.append('robust_version_bumped')
@@ -649,27 +992,35 @@ class POCacheHelper:
         logger.info(f"🚀 CACHED RECENT POS: {len(pos_data)} POs")
         return True
     
-    # 🚀 PO MANAGEMENT LIST CACHING (for po_management page)
-    @classmethod
-    def get_po_mgmt_list_cache_key(cls):
-        """Generate cache key for PO management list"""
-        cache_version = cls._get_cache_version()
-        return f"po_mgmt_list_v{cache_version}_all"
+    # 🚀 PO MANAGEMENT LIST CACHING (recent windows of the po_management page)
+    MGMT_LIST = ManagementListCache(
+        'po', date_field='po_date', vessel_filters=('vessel',),
+        windowed_filters=('vessel', 'status'), timeout=RECENT_POS_CACHE_TIMEOUT
+    )
     
     @classmethod
     def get_po_mgmt_list(cls):
-        """Get cached PO management list"""
-        cache_key = cls.get_po_mgmt_list_cache_key()
-        return cache.get(cache_key)
+        """Cached first window of the unfiltered po_management list (None if not cached)"""
+        return cls.MGMT_LIST.get_window()
     
     @classmethod
     def cache_po_mgmt_list(cls, po_list_data):
-        """Cache PO management list (1 hour timeout)"""
-        cache_key = cls.get_po_mgmt_list_cache_key()
-        cache.set(cache_key, po_list_data, cls.RECENT_POS_CACHE_TIMEOUT)
-        logger.info(f"🚀 CACHED PO MGMT LIST: {len(po_list_data)} POs")
+        """Cache the first window of the unfiltered po_management list"""
+        rows = cls.MGMT_LIST.store_window(po_list_data)
+        logger.debug(f"CACHED PO MGMT WINDOW: {len(rows)} POs")
         return True
     
+    @classmethod
+    def invalidate_mgmt_list(cls, po_id=None):
+        """Drop management list windows for one record's vessels (all windows without an id)"""
+        from transactions.models import PurchaseOrder
+        
+        vessel_ids = None
+        if po_id:
+            row = PurchaseOrder.objects.filter(pk=po_id).values_list(*cls.MGMT_LIST.vessel_fields).first()
+            vessel_ids = list(row) if row else None
+        cls.MGMT_LIST.invalidate(vessel_ids)
+    
     # 🚀 FINANCIAL CALCULATIONS CACHING
     @classmethod
     def get_po_financial_data(cls, po_id):
@@ -694,6 +1045,7 @@ class POCacheHelper:
             # Method 1: Version bump (always works, instant)
             cls._increment_cache_version()
             cleared_keys.append('po_cache_version_bumped')
+            cls.MGMT_LIST.invalidate()
             
             # Method 2: Clear static keys
             for cache_key in cls.PO_CACHE_KEYS:
@@ -716,6 +1068,9 @@ class POCacheHelper:
         cls._increment_cache_version()
         cleared_keys.append('version_bumped')
         
+        # Management list windows are tagged per vessel, not versioned
+        cls.invalidate_mgmt_list(po_id)
+        
         # Clear specific completed PO if provided
         if po_id:
             completed_cache_key = cls.get_completed_po_cache_key(po_id)
@@ -849,27 +1204,36 @@ class TransferCacheHelper:
         logger.info(f"CACHED RECENT TRANSFERS: {len(transfers_data)} transfers")
         return True
     
-    # 🚀 TRANSFER MANAGEMENT LIST CACHING (for transfer_management page)
-    @classmethod
-    def get_transfer_mgmt_list_cache_key(cls):
-        """Generate cache key for transfer management list"""
-        cache_version = cls._get_cache_version()
-        return f"transfer_mgmt_list_v{cache_version}_all"
+    # 🚀 TRANSFER MANAGEMENT LIST CACHING (recent windows of the transfer_management page)
+    MGMT_LIST = ManagementListCache(
+        'transfer', date_field='transfer_date', vessel_filters=('from_vessel', 'to_vessel'),
+        vessel_fields=('from_vessel_id', 'to_vessel_id'),
+        windowed_filters=('from_vessel', 'to_vessel', 'status'), timeout=RECENT_TRANSFERS_CACHE_TIMEOUT
+    )
     
     @classmethod
     def get_transfer_mgmt_list(cls):
-        """Get cached transfer management list"""
-        cache_key = cls.get_transfer_mgmt_list_cache_key()
-        return cache.get(cache_key)
+        """Cached first window of the unfiltered transfer_management list (None if not cached)"""
+        return cls.MGMT_LIST.get_window()
     
     @classmethod
     def cache_transfer_mgmt_list(cls, transfer_list_data):
-        """Cache transfer management list (1 hour timeout)"""
-        cache_key = cls.get_transfer_mgmt_list_cache_key()
-        cache.set(cache_key, transfer_list_data, cls.RECENT_TRANSFERS_CACHE_TIMEOUT)
-        logger.debug(f"CACHED TRANSFER MGMT LIST: {len(transfer_list_data)} transfers")
+        """Cache the first window of the unfiltered transfer_management list"""
+        rows = cls.MGMT_LIST.store_window(transfer_list_data)
+        logger.debug(f"CACHED TRANSFER MGMT WINDOW: {len(rows)} transfers")
         return True
     
+    @classmethod
+    def invalidate_mgmt_list(cls, transfer_id=None):
+        """Drop management list windows for one record's vessels (all windows without an id)"""
+        from transactions.models import Transfer
+        
+        vessel_ids = None
+        if transfer_id:
+            row = Transfer.objects.filter(pk=transfer_id).values_list(*cls.MGMT_LIST.vessel_fields).first()
+            vessel_ids = list(row) if row else None
+        cls.MGMT_LIST.invalidate(vessel_ids)
+    
     # 🚀 CACHE MANAGEMENT (simple pattern like POCacheHelper)
     @classmethod
     def clear_all_transfer_cache(cls):
@@ -880,6 +1244,7 @@ class TransferCacheHelper:
             # Method 1: Version bump (always works, instant)
             cls._increment_cache_version()
             cleared_keys.append('transfer_cache_version_bumped')
+            cls.MGMT_LIST.invalidate()
             
             # Method 2: Clear static keys
             for cache_key in cls.TRANSFER_CACHE_KEYS:
@@ -902,6 +1267,9 @@ class TransferCacheHelper:
         cls._increment_cache_version()
         cleared_keys.append('version_bumped')
         
+        # Management list windows are tagged per vessel, not versioned
+        cls.invalidate_mgmt_list(transfer_id)
+        
         # Clear specific completed transfer if provided
         if transfer_id:
             completed_cache_key = cls.get_completed_transfer_cache_key(transfer_id)
@@ -1034,27 +1402,35 @@ class WasteCacheHelper:
         logger.info(f"🚀 CACHED RECENT WASTES: {len(wastes_data)} waste reports")
         return True
     
-    # 🚀 WASTE MANAGEMENT LIST CACHING (for waste_management page)
-    @classmethod
-    def get_waste_mgmt_list_cache_key(cls):
-        """Generate cache key for waste management list"""
-        cache_version = cls._get_cache_version()
-        return f"waste_mgmt_list_v{cache_version}_all"
+    # 🚀 WASTE MANAGEMENT LIST CACHING (recent windows of the waste_management page)
+    MGMT_LIST = ManagementListCache(
+        'waste', date_field='report_date', vessel_filters=('vessel',),
+        windowed_filters=('vessel', 'status'), timeout=RECENT_WASTES_CACHE_TIMEOUT
+    )
     
     @classmethod
     def get_waste_mgmt_list(cls):
-        """Get cached waste management list"""
-        cache_key = cls.get_waste_mgmt_list_cache_key()
-        return cache.get(cache_key)
+        """Cached first window of the unfiltered waste_management list (None if not cached)"""
+        return cls.MGMT_LIST.get_window()
     
     @classmethod
     def cache_waste_mgmt_list(cls, waste_list_data):
-        """Cache waste management list (1 hour timeout)"""
-        cache_key = cls.get_waste_mgmt_list_cache_key()
-        cache.set(cache_key, waste_list_data, cls.RECENT_WASTES_CACHE_TIMEOUT)
-        logger.debug(f"CACHED WASTE MGMT LIST: {len(waste_list_data)} waste reports")
+        """Cache the first window of the unfiltered waste_management list"""
+        rows = cls.MGMT_LIST.store_window(waste_list_data)
+        logger.debug(f"CACHED WASTE MGMT WINDOW: {len(rows)} waste reports")
         return True
     
+    @classmethod
+    def invalidate_mgmt_list(cls, waste_id=None):
+        """Drop management list windows for one record's vessels (all windows without an id)"""
+        from transactions.models import WasteReport
+        
+        vessel_ids = None
+        if waste_id:
+            row = WasteReport.objects.filter(pk=waste_id).values_list(*cls.MGMT_LIST.vessel_fields).first()
+            vessel_ids = list(row) if row else None
+        cls.MGMT_LIST.invalidate(vessel_ids)
+    
     # 🚀 FINANCIAL CALCULATIONS CACHING
     @classmethod
     def get_waste_financial_data(cls, waste_id):
@@ -1079,6 +1455,7 @@ class WasteCacheHelper:
             # Method 1: Version bump (always works, instant)
             cls._increment_cache_version()
             cleared_keys.append('waste_cache_version_bumped')
+            cls.MGMT_LIST.invalidate()
             
             # Method 2: Clear static keys
             for cache_key in cls.WASTE_CACHE_KEYS:
@@ -1101,6 +1478,9 @@ class WasteCacheHelper:
         cls._increment_cache_version()
         cleared_keys.append('version_bumped')
         
+        # Management list windows are tagged per vessel, not versioned
+        cls.invalidate_mgmt_list(waste_id)
+        
         # Clear specific completed waste if provided
         if waste_id:
             completed_cache_key = cls.get_completed_waste_cache_key(waste_id)
@@ -1299,6 +1679,14 @@ class VesselCacheHelper:
         
         return vessels
     
+    @classmethod
+    async def aget_all_vessels_basic_data(cls):
+        """Async get_all_vessels_basic_data() for the ASGI read endpoints"""
+        vessels = await cache.aget(cls.ALL_VESSELS_BASIC_KEY)
+        if vessels is None:
+            vessels = await sync_to_async(cls.get_all_vessels_basic_data)()
+        return vessels
+    
     @classmethod
     def get_active_vessels(cls):
         """
@@ -1435,4 +1823,111 @@ class UserManagementCacheHelper:
                 cleared_keys.append(key)
         
         logger.info(f"🚀 USER MANAGEMENT CACHE CLEARED: {len(cleared_keys)} keys")
-        return True, len(cleared_keys)
\ No newline at end of file
+        return True, len(cleared_keys)
+
+class VesselPricingCacheHelper:
+    """
+    🚀 Per-vessel effective price table: custom VesselProductPrice, else default selling_price.
+    
+    Loaded with one LEFT JOIN query per vessel and cached under versioned keys:
+    - a global version bumped on Product saves (default prices, duty-free flag)
+    - a per-vessel version bumped on VesselProductPrice saves/deletes
+    Decoded tables are also memoized per process so loops do not unpickle per call.
+    """
+    
+    PRICE_MAP_TIMEOUT = 21600  # 6 hours
+    GLOBAL_VERSION_KEY = 'vessel_price_map_global_version'
+    VESSEL_VERSION_KEY = 'vessel_price_map_version_{vessel_id}'
+    LOCAL_MEMO_LIMIT = 64
+    
+    _local_maps = {}
+    
+    @classmethod
+    def _get_version(cls, key):
+        version = cache.get(key)
+        if version is None:
+            # Seed from the clock so a cache flush never reuses an old version
+            cache.add(key, int(time.time() * 1000), None)
+            version = cache.get(key)
+        return version
+    
+    @classmethod
+    def _bump_version(cls, key):
+        try:
+            cls._get_version(key)
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, int(time.time() * 1000), None)
+    
+    @classmethod
+    def get_price_map_cache_key(cls, vessel_id):
+        global_version = cls._get_version(cls.GLOBAL_VERSION_KEY)
+        vessel_version = cls._get_version(cls.VESSEL_VERSION_KEY.format(vessel_id=vessel_id))
+        return f"vessel_price_map_{vessel_id}_g{global_version}_v{vessel_version}"
+    
+    @classmethod
+    def get_price_map(cls, vessel):
+        """
+        Get {product_id: (effective_price, is_custom_price)} for every product on a vessel.
+        
+        Duty-free vessels and duty-free products always use the default price.
+        """
+        cache_key = cls.get_price_map_cache_key(vessel.id)
+        
+        price_map = cls._local_maps.get(cache_key)
+        if price_map is not None:
+            return price_map
+        
+        price_map = cache.get(cache_key)
+        if price_map is None:
+            price_map = cls._load_price_map(vessel)
+            cache.set(cache_key, price_map, cls.PRICE_MAP_TIMEOUT)
+            CachePerformanceTracker.track_operation('vessel_price_map', cache_key, hit=False)
+        else:
+            CachePerformanceTracker.track_operation('vessel_price_map', cache_key, hit=True)
+        
+        if len(cls._local_maps) >= cls.LOCAL_MEMO_LIMIT:
+            cls._local_maps.clear()
+        cls._local_maps[cache_key] = price_map
+        return price_map
+    
+    @classmethod
+    def _load_price_map(cls, vessel):
+        """Single query: products LEFT JOIN this vessel's custom prices"""
+        from django.db.models import FilteredRelation, Q
+        from products.models import Product
+        
+        rows = Product.objects.annotate(
+            vessel_custom_price=FilteredRelation(
+                'vessel_prices', condition=Q(vessel_prices__vessel_id=vessel.id)
+            )
+        ).values_list('id', 'selling_price', 'is_duty_free', 'vessel_custom_price__selling_price')
+        
+        price_map = {}
+        for product_id, default_price, is_duty_free, custom_price in rows:
+            if custom_price is not None and not vessel.has_duty_free and not is_duty_free:
+                price_map[product_id] = (custom_price, True)
+            else:
+                price_map[product_id] = (default_price, False)
+        return price_map
+    
+    @classmethod
+    def get_prices(cls, vessel, product_ids):
+        """
+        Batch effective prices.
+        
+        Returns:
+            dict: product_id -> (price, is_custom_price) for products that exist
+        """
+        price_map = cls.get_price_map(vessel)
+        return {pid: price_map[pid] for pid in product_ids if pid in price_map}
+    
+    @classmethod
+    def invalidate_vessel(cls, vessel_id):
+        """Custom prices changed on one vessel"""
+        cls._bump_version(cls.VESSEL_VERSION_KEY.format(vessel_id=vessel_id))
+    
+    @classmethod
+    def invalidate_all(cls):
+        """Default prices or product flags changed (affects every vessel)"""
+        cls._bump_version(cls.GLOBAL_VERSION_KEY)
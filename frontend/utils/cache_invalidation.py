@@ -0,0 +1,173 @@
+"""
+Deferred, deduplicated cache invalidation.
+Row-level hooks (Transaction.save/delete, model saves, bulk completion views) queue
+their invalidations here instead of running them inline; each distinct invalidation
+runs once, after the database transaction commits, and is dropped if it rolls back.
+"""
+
+import logging
+import threading
+from contextlib import contextmanager
+
+from django.db import transaction
+
+logger = logging.getLogger('frontend')
+
+
+class _InvalidationBatch:
+    """Pending invalidations of one transaction or request, deduplicated"""
+
+    __slots__ = ('calls', 'stock', 'list_tags', 'callback')
+
+    def __init__(self):
+        self.calls = {}      # (func, args) -> None: insertion-ordered set
+        self.stock = {}      # vessel_id -> set of product ids
+        self.list_tags = {}  # ManagementListCache -> set of vessel ids, or None for all
+        self.callback = None
+
+    def __len__(self):
+        return len(self.calls) + len(self.stock) + len(self.list_tags)
+
+
+class CacheInvalidationCollector:
+    """
+    Collect cache invalidations per DB transaction (and per request) and flush once.
+
+    Inside ``transaction.atomic()`` invalidations are queued on a batch bound to
+    the transaction through one ``transaction.on_commit`` callback, so a rollback
+    discards them with the callback. Running them after commit also stops a
+    concurrent reader from re-caching pre-commit data.
+
+    Outside a transaction they are queued on the request batch opened by
+    CacheInvalidationMiddleware and flushed when the response is ready; with no
+    request scope (shell, management commands) they run immediately.
+
+    Deduplication:
+        defer(func, *args)                  same call queued once
+        defer_stock_changed(vessel, ids)    journaled now, one index version bump per vessel
+        defer_list_tags(list_cache, ids)    merged into one invalidate() per management list
+
+    Stock changes are also durable sync data, not just cache state: their
+    SyncChange journal rows are written immediately, inside the writing
+    transaction, so they commit or roll back with the stock itself. Only the
+    index version bump waits for the flush.
+
+    Invalidations queued inside a savepoint that later rolls back are still
+    flushed if the batch was opened outside it - an extra invalidation, never a
+    missed one.
+    """
+
+    _local = threading.local()
+
+    # ------------------------------------------------------------------
+    # Queueing
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def defer(cls, func, *args):
+        """Run func(*args) after commit - once per batch for equal arguments"""
+        batch = cls._current_batch()
+        if batch is None:
+            cls._run(func, args)
+        else:
+            batch.calls.setdefault((func, args), None)
+
+    @classmethod
+    def defer_stock_changed(cls, vessel_id, product_ids):
+        """Journal a stock change now; the product index version bump is merged per vessel"""
+        from frontend.utils.sync_journal import SyncJournalHelper
+
+        product_ids = {pid for pid in product_ids if pid is not None}
+        if vessel_id is None or not product_ids:
+            return
+        # Not deduplicated per batch: a savepoint rollback can drop an earlier row
+        SyncJournalHelper.record_products(vessel_id, product_ids)
+        batch = cls._current_batch()
+        if batch is None:
+            from frontend.utils.product_index import ProductIndexHelper
+            cls._run(ProductIndexHelper.mark_index_changed, (vessel_id, product_ids))
+        else:
+            batch.stock.setdefault(vessel_id, set()).update(product_ids)
+
+    @classmethod
+    def defer_list_tags(cls, list_cache, vessel_ids=None):
+        """ManagementListCache.invalidate, merged per list (None drops every window)"""
+        batch = cls._current_batch()
+        if batch is None:
+            cls._run(list_cache.invalidate, (vessel_ids,))
+        elif vessel_ids is None or batch.list_tags.get(list_cache, set()) is None:
+            batch.list_tags[list_cache] = None
+        else:
+            batch.list_tags.setdefault(list_cache, set()).update(vid for vid in vessel_ids if vid)
+
+    @classmethod
+    def _current_batch(cls):
+        connection = transaction.get_connection()
+        if connection.in_atomic_block:
+            batch = getattr(cls._local, 'transaction_batch', None)
+            if batch is None or not cls._is_pending(connection, batch):
+                # First invalidation of this transaction (or the last batch was rolled back)
+                batch = cls._local.transaction_batch = _InvalidationBatch()
+                batch.callback = lambda: cls._commit(batch)
+                transaction.on_commit(batch.callback)
+            return batch
+        return getattr(cls._local, 'request_batch', None)
+
+    @staticmethod
+    def _is_pending(connection, batch):
+        # Rolled-back (savepoint) callbacks are removed from run_on_commit by Django
+        return any(entry[1] is batch.callback for entry in connection.run_on_commit)
+
+    @classmethod
+    def _commit(cls, batch):
+        if getattr(cls._local, 'transaction_batch', None) is batch:
+            cls._local.transaction_batch = None
+        cls.flush(batch)
+
+    # ------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------
+
+    @classmethod
+    @contextmanager
+    def request_scope(cls):
+        """Queue invalidations issued outside transactions until the block exits"""
+        if getattr(cls._local, 'request_batch', None) is not None:
+            yield  # Nested scope: the outer one flushes
+            return
+        batch = cls._local.request_batch = _InvalidationBatch()
+        try:
+            yield batch
+        finally:
+            cls._local.request_batch = None
+            cls.flush(batch)
+
+    @classmethod
+    def flush(cls, batch):
+        """Run every queued invalidation of a batch once"""
+        if not len(batch):
+            return 0
+
+        from frontend.utils.product_index import ProductIndexHelper
+
+        for func, args in batch.calls:
+            cls._run(func, args)
+        for vessel_id, product_ids in batch.stock.items():
+            cls._run(ProductIndexHelper.mark_index_changed, (vessel_id, product_ids))
+        for list_cache, vessel_ids in batch.list_tags.items():
+            cls._run(list_cache.invalidate, (sorted(vessel_ids) if vessel_ids is not None else None,))
+
+        count = len(batch)
+        logger.debug(f"🔄 Flushed {count} coalesced cache invalidations")
+        batch.calls.clear()
+        batch.stock.clear()
+        batch.list_tags.clear()
+        return count
+
+    @staticmethod
+    def _run(func, args):
+        # Runs after commit: a cache error must not turn a committed write into a 500
+        try:
+            func(*args)
+        except Exception as e:
+            logger.warning(f"Cache invalidation error in {getattr(func, '__qualname__', func)}: {e}")
@@ -0,0 +1,224 @@
+"""
+Cache warming for hot page and catalog caches.
+After a deploy or cache flush the first users would otherwise pay for the
+reports dashboard, trip list, vessel lists, price tables and product catalog.
+"""
+
+import logging
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+
+logger = logging.getLogger('frontend')
+
+
+class CacheWarmer:
+    """
+    Declared registry of hot cache entries and a parallel runner.
+
+    Each entry writes through the owning helper, so keys land under the
+    current cache version and warming never bumps a version. Per-vessel
+    entries expand into one job per active vessel. Entries marked
+    ``shared=False`` fill process-local memory and are only useful in the
+    process serving requests (the startup hook), not in a management command.
+    """
+
+    DEFAULT_WORKERS = 4
+
+    _registry = {}
+
+    @classmethod
+    def register(cls, name, tags=(), per_vessel=False, shared=True):
+        """Decorator: register ``func(refresh[, vessel])`` returning a short detail string"""
+        def decorator(func):
+            cls._registry[name] = {
+                'name': name,
+                'func': func,
+                'tags': frozenset(tags),
+                'per_vessel': per_vessel,
+                'shared': shared,
+            }
+            return func
+        return decorator
+
+    @classmethod
+    def entries(cls, names=None, tags=None, include_local=False):
+        """Registered entries filtered by name and tag, in registration order"""
+        unknown = set(names or ()) - set(cls._registry)
+        if unknown:
+            raise ValueError(f"Unknown cache entries: {', '.join(sorted(unknown))}")
+
+        selected = []
+        for entry in cls._registry.values():
+            if names and entry['name'] not in names:
+                continue
+            if tags and not entry['tags'] & set(tags):
+                continue
+            if not entry['shared'] and not include_local:
+                continue
+            selected.append(entry)
+        return selected
+
+    @classmethod
+    def warm(cls, names=None, tags=None, refresh=False, workers=None, include_local=False):
+        """
+        Precompute the selected entries.
+
+        Args:
+            refresh: rebuild entries that are already cached
+            workers: parallel threads (1 runs inline in the calling thread)
+
+        Returns:
+            list[dict]: one result per job with name, status, ms and detail
+        """
+        from vessels.models import Vessel
+
+        entries = cls.entries(names, tags, include_local)
+        vessels = None
+        jobs = []
+        for entry in entries:
+            if entry['per_vessel']:
+                if vessels is None:
+                    vessels = list(Vessel.objects.filter(active=True).order_by('name'))
+                jobs.extend((f"{entry['name']}[{vessel.name}]", entry, (vessel,)) for vessel in vessels)
+            else:
+                jobs.append((entry['name'], entry, ()))
+
+        workers = cls.DEFAULT_WORKERS if workers is None else max(int(workers), 1)
+        if workers == 1 or len(jobs) <= 1:
+            return [cls._run(job, refresh) for job in jobs]
+
+        def run_in_thread(job):
+            from django.db import connection
+            try:
+                return cls._run(job, refresh)
+            finally:
+                # Worker threads open their own connections
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cache-warm') as pool:
+            return list(pool.map(run_in_thread, jobs))
+
+    @classmethod
+    def _run(cls, job, refresh):
+        label, entry, args = job
+        started = time.perf_counter()
+        try:
+            detail = entry['func'](*args, refresh=refresh)
+            status = 'warmed'
+        except Exception as e:
+            logger.warning(f"Cache warming failed for {label}: {e}")
+            detail, status = str(e), 'failed'
+        return {
+            'name': label,
+            'status': status,
+            'ms': (time.perf_counter() - started) * 1000,
+            'detail': detail or '',
+        }
+
+    @classmethod
+    def warm_in_background(cls, delay=0, **kwargs):
+        """Startup hook: warm shared and process-local entries without blocking boot"""
+        def run():
+            if delay:
+                time.sleep(delay)
+            started = time.perf_counter()
+            results = cls.warm(include_local=True, **kwargs)
+            failed = [r['name'] for r in results if r['status'] == 'failed']
+            logger.info(
+                f"🔥 Startup cache warmup: {len(results) - len(failed)}/{len(results)} entries "
+                f"in {time.perf_counter() - started:.2f}s" + (f", failed: {', '.join(failed)}" if failed else '')
+            )
+
+        thread = threading.Thread(target=run, name='cache-warmup', daemon=True)
+        thread.start()
+        return thread
+
+
+# ----------------------------------------------------------------------
+# Hot entries
+# ----------------------------------------------------------------------
+
+@CacheWarmer.register('vessels', tags=('catalog', 'vessels'))
+def _warm_vessels(refresh=False):
+    from frontend.utils.cache_helpers import VesselCacheHelper
+
+    if refresh:
+        active, all_vessels = VesselCacheHelper.refresh_cache()
+    else:
+        active, all_vessels = VesselCacheHelper.get_active_vessels(), VesselCacheHelper.get_all_vessels_basic_data()
+    return f"{len(active)} active / {len(all_vessels)} vessels"
+
+
+@CacheWarmer.register('product_catalog', tags=('catalog', 'products'))
+def _warm_product_catalog(refresh=False):
+    from frontend.utils.cache_helpers import ProductCacheHelper
+
+    if refresh:
+        cache.delete('all_products_catalog')
+    return f"{len(ProductCacheHelper.get_all_products_catalog())} products"
+
+
+@CacheWarmer.register('pricing_completeness', tags=('catalog', 'pricing'))
+def _warm_pricing_completeness(refresh=False):
+    from frontend.utils.pricing_completeness import PricingCompletenessHelper
+
+    if refresh:
+        cache.set(
+            PricingCompletenessHelper.get_cache_key(),
+            PricingCompletenessHelper._build_matrix(),
+            PricingCompletenessHelper.MATRIX_TIMEOUT
+        )
+    matrix = PricingCompletenessHelper.get_matrix()
+    return f"{matrix.total_products} products × {len(matrix.rows)} vessels"
+
+
+@CacheWarmer.register('vessel_prices', tags=('catalog', 'pricing'), per_vessel=True)
+def _warm_vessel_prices(vessel, refresh=False):
+    from frontend.utils.cache_helpers import VesselPricingCacheHelper
+
+    if refresh:
+        cache.set(
+            VesselPricingCacheHelper.get_price_map_cache_key(vessel.id),
+            VesselPricingCacheHelper._load_price_map(vessel),
+            VesselPricingCacheHelper.PRICE_MAP_TIMEOUT
+        )
+    return f"{len(VesselPricingCacheHelper.get_price_map(vessel))} prices"
+
+
+@CacheWarmer.register('reports_dashboard', tags=('reports',))
+def _warm_reports_dashboard(refresh=False):
+    from django.utils import timezone
+    from frontend.utils.cache_helpers import CachedComputation
+    from frontend.reports_views import (
+        build_reports_dashboard_context, get_reports_dashboard_cache_key, REPORTS_DASHBOARD_CACHE_TIMEOUT
+    )
+
+    today = timezone.now().date()
+    cache_key = get_reports_dashboard_cache_key(today)
+    if refresh or CachedComputation.peek(cache_key) is None:
+        CachedComputation.store(cache_key, build_reports_dashboard_context(today), REPORTS_DASHBOARD_CACHE_TIMEOUT)
+        return 'built'
+    return 'already cached'
+
+
+@CacheWarmer.register('trip_management', tags=('trips',))
+def _warm_trip_management(refresh=False):
+    from frontend.utils.cache_helpers import TripCacheHelper
+    from frontend.trip_views import trip_mgmt_queryset
+
+    # First window of the unfiltered list only - deeper pages are keyset queries
+    trips = None if refresh else TripCacheHelper.get_trip_mgmt_list()
+    if trips is None:
+        trips = TripCacheHelper.MGMT_LIST.store_window(trip_mgmt_queryset())
+    return f"{len(trips)} trips"
+
+
+@CacheWarmer.register('product_index', tags=('pos',), per_vessel=True, shared=False)
+def _warm_product_index(vessel, refresh=False):
+    from frontend.utils.product_index import ProductIndexHelper
+
+    # Always brought to the current shared version, so refresh has nothing to add
+    return f"{len(ProductIndexHelper.get_index(vessel).entries)} products"
@@ -0,0 +1,172 @@
+"""
+Whole-cart FIFO preview for sales, transfer and waste entry.
+One lot query per cart instead of one per line, with exact Decimal costing.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from frontend.utils.stock_reservations import StockReservationHelper
+
+
+class CartPreviewHelper:
+    """
+    Simulate FIFO consumption for every line of a cart on one vessel.
+
+    Lines are consumed in cart order against shared per-product lot state,
+    so a product that appears on several lines is costed from the lots the
+    earlier lines left over. Availability is available-to-promise (stock
+    reserved by pending transfers held back) unless the cart is waste.
+    Nothing is written or locked - the completion views re-validate under
+    lock when the cart is posted.
+    """
+
+    MAX_LINES = 500
+
+    @classmethod
+    def parse_lines(cls, raw_lines):
+        """
+        Validate request lines into [(product_id, quantity)].
+
+        Raises:
+            ValueError: empty or oversized cart, or a line without a product or positive quantity
+        """
+        if not isinstance(raw_lines, list) or not raw_lines:
+            raise ValueError('No cart lines provided')
+        if len(raw_lines) > cls.MAX_LINES:
+            raise ValueError(f'Too many cart lines (max {cls.MAX_LINES})')
+
+        lines = []
+        for position, raw in enumerate(raw_lines, start=1):
+            try:
+                product_id = int(raw['product_id'])
+                quantity = int(raw['quantity'])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f'Line {position}: product_id and whole-number quantity are required')
+            if quantity <= 0:
+                raise ValueError(f'Line {position}: quantity must be positive')
+            lines.append((product_id, quantity))
+        return lines
+
+    @classmethod
+    def preview(cls, vessel, lines, priced=False, respects_reservations=True):
+        """
+        Args:
+            lines: [(product_id, quantity)] in cart order
+            priced: add revenue and margin at the vessel's effective selling prices
+
+        Returns:
+            dict: 'lines' (one entry per cart line) and cart 'totals'; unknown or
+            inactive products come back with 'error' and no costing
+        """
+        from products.models import Product
+        from transactions.models import InventoryLot
+
+        product_ids = sorted({product_id for product_id, _ in lines})
+        products = {
+            row['id']: row for row in Product.objects.filter(id__in=product_ids, active=True).values(
+                'id', 'name', 'item_id', 'purchase_price', 'selling_price'
+            )
+        }
+
+        lots_by_product = defaultdict(list)
+        for lot in InventoryLot.objects.filter(
+            vessel=vessel, product_id__in=list(products), remaining_quantity__gt=0
+        ).order_by('purchase_date', 'created_at').values('id', 'product_id', 'purchase_date', 'purchase_price', 'remaining_quantity'):
+            lots_by_product[lot['product_id']].append(lot)
+
+        reserved = StockReservationHelper.reserved_map(vessel.id, list(products)) if respects_reservations else {}
+        promisable = {
+            product_id: max(sum(lot['remaining_quantity'] for lot in lots_by_product[product_id]) - reserved.get(product_id, 0), 0)
+            for product_id in products
+        }
+
+        prices = {}
+        if priced:
+            from frontend.utils.cache_helpers import VesselPricingCacheHelper
+            prices = VesselPricingCacheHelper.get_prices(vessel, list(products))
+
+        results = []
+        totals = {'quantity': 0, 'cogs': Decimal('0'), 'revenue': Decimal('0'), 'margin': Decimal('0')}
+        for position, (product_id, quantity) in enumerate(lines):
+            product = products.get(product_id)
+            if product is None:
+                results.append({'line': position, 'product_id': product_id, 'quantity': quantity,
+                                'sufficient': False, 'error': 'Product not found'})
+                continue
+
+            available = promisable[product_id]
+            covered = min(quantity, available)
+            promisable[product_id] = available - covered
+            cogs, breakdown = cls._consume(lots_by_product[product_id], covered)
+
+            line = {
+                'line': position,
+                'product_id': product_id,
+                'product_name': product['name'],
+                'item_id': product['item_id'],
+                'quantity': quantity,
+                'available_quantity': available,
+                'after_quantity': available - covered,
+                'sufficient': covered == quantity,
+                'shortfall': quantity - covered,
+                'cogs': cogs,
+                'consumption_breakdown': breakdown,
+            }
+            if priced:
+                selling_price, is_custom_price = prices.get(product_id, (product['selling_price'], False))
+                revenue = selling_price * quantity
+                # Margin over the costed units only - a short line has no cost for its shortfall
+                margin = selling_price * covered - cogs
+                line.update({
+                    'selling_price': selling_price,
+                    'is_custom_price': is_custom_price,
+                    'revenue': revenue,
+                    'margin': margin,
+                    'margin_percent': (margin / (selling_price * covered) * 100) if covered and selling_price else None,
+                })
+                totals['revenue'] += revenue
+                totals['margin'] += margin
+
+            totals['quantity'] += quantity
+            totals['cogs'] += cogs
+            results.append(line)
+
+        totals['all_sufficient'] = all(line['sufficient'] for line in results)
+        if not priced:
+            del totals['revenue'], totals['margin']
+        return {'lines': results, 'totals': totals}
+
+    @staticmethod
+    def _consume(lots, quantity):
+        """Take quantity from the front of lots (mutated in place); returns (cost, breakdown)"""
+        cost, breakdown = Decimal('0'), []
+        for lot in lots:
+            if quantity <= 0:
+                break
+            if lot['remaining_quantity'] <= 0:
+                continue
+            taken = min(lot['remaining_quantity'], quantity)
+            lot['remaining_quantity'] -= taken
+            quantity -= taken
+            lot_cost = lot['purchase_price'] * taken
+            cost += lot_cost
+            breakdown.append({
+                'lot_id': lot['id'],
+                'lot_date': lot['purchase_date'].strftime('%d/%m/%Y'),
+                'consumed_quantity': taken,
+                'unit_cost': lot['purchase_price'],
+                'total_cost': lot_cost,
+            })
+        return cost, breakdown
+
+    @classmethod
+    def as_json(cls, value):
+        """Decimals to floats (the entry screens' number format), recursively"""
+        if isinstance(value, Decimal):
+            return float(value)
+        if isinstance(value, dict):
+            return {key: cls.as_json(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [cls.as_json(item) for item in value]
+        return value
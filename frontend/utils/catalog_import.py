@@ -0,0 +1,381 @@
+"""
+Streaming catalog import engine for CSV/XLSX product files.
+Resolves categories and existing item_ids once per chunk and writes with bulk_create/bulk_update.
+"""
+
+import json
+import logging
+import os
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from frontend.utils.file_readers import TabularFileReader, TabularFileError
+
+logger = logging.getLogger('frontend')
+
+
+class CatalogImportError(Exception):
+    """Raised when a catalog file cannot be read or a chunk cannot be written"""
+
+
+class CatalogImporter:
+    """
+    Chunked upsert of products keyed by item_id.
+
+    Rows are streamed from the file and processed in chunks. For each chunk:
+    - one query resolves unseen category names (missing ones are bulk created)
+    - one query loads existing products by item_id
+    - creates and updates are applied with bulk_create/bulk_update in one atomic block;
+      if that fails the chunk is retried row by row and only the failing rows are errors
+    - product caches and indexes are invalidated once the chunk has committed
+
+    Every committed chunk is recorded in a checkpoint file so an interrupted
+    import can resume from the last committed row. In dry-run mode nothing is
+    written and each row is reported as a diff against the current catalog
+    (or against an earlier row of the same file with the same item_id).
+    """
+
+    REQUIRED_COLUMNS = ('item_id', 'name', 'category', 'purchase_price', 'selling_price', 'is_duty_free')
+    OPTIONAL_COLUMNS = ('barcode',)
+    TRUE_VALUES = {'TRUE', '1', 'YES', 'Y'}
+    FALSE_VALUES = {'FALSE', '0', 'NO', 'N'}
+    DEFAULT_CHUNK_SIZE = 2000
+    DEFAULT_CATEGORY = 'General'
+
+    def __init__(self, file_path, created_by=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 dry_run=False, resume=False, checkpoint_path=None, on_diff=None):
+        self.file_path = file_path
+        self.created_by = created_by
+        self.chunk_size = max(1, int(chunk_size))
+        self.dry_run = dry_run
+        self.resume = resume
+        self.checkpoint_path = checkpoint_path or f'{file_path}.import-checkpoint'
+        self.on_diff = on_diff
+
+        self.has_barcode_column = False
+        self.stats = {
+            'rows': 0,
+            'skipped_rows': 0,
+            'products_created': 0,
+            'products_updated': 0,
+            'products_unchanged': 0,
+            'categories_created': 0,
+            'errors': 0,
+            'chunks': 0,
+        }
+
+        self._categories = {}
+        self._planned = {}
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def run(self):
+        """Run the import and return the stats dict"""
+        start_after = self._load_checkpoint() if self.resume else 0
+        if start_after:
+            logger.info(f"Resuming catalog import of {self.file_path} after row {start_after}")
+
+        chunk = []
+        for row_num, row in self.iter_rows():
+            self.stats['rows'] += 1
+            if row_num <= start_after:
+                self.stats['skipped_rows'] += 1
+                continue
+            chunk.append((row_num, row))
+            if len(chunk) >= self.chunk_size:
+                self._process_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._process_chunk(chunk)
+
+        if not self.dry_run:
+            self._clear_checkpoint()
+
+        return self.stats
+
+    def iter_rows(self):
+        """Stream (row_num, row_dict) from the CSV or XLSX file"""
+        reader = TabularFileReader(self.file_path, self.REQUIRED_COLUMNS, self.OPTIONAL_COLUMNS)
+        try:
+            for row_num, row in reader:
+                self.has_barcode_column = reader.has_column('barcode')
+                yield row_num, row
+        except TabularFileError as e:
+            raise CatalogImportError(str(e)) from e
+
+    # ------------------------------------------------------------------
+    # Chunk processing
+    # ------------------------------------------------------------------
+
+    def _parse_row(self, row):
+        """Validate a raw row against the Product constraints. Returns cleaned data or raises ValueError."""
+        item_id = row['item_id']
+        name = row['name']
+        if not item_id or not name:
+            raise ValueError('missing item_id or name')
+
+        try:
+            purchase_price = Decimal(row['purchase_price'])
+            selling_price = Decimal(row['selling_price'])
+        except (InvalidOperation, ValueError):
+            raise ValueError(f"invalid price data: {row['purchase_price']!r} / {row['selling_price']!r}")
+
+        if purchase_price <= 0 or selling_price <= 0:
+            raise ValueError('prices must be positive')
+        if selling_price < purchase_price:
+            raise ValueError('selling price is below purchase price')
+
+        duty_free_value = row['is_duty_free'].upper()
+        if duty_free_value in self.TRUE_VALUES:
+            is_duty_free = True
+        elif duty_free_value in self.FALSE_VALUES:
+            is_duty_free = False
+        else:
+            raise ValueError(f"invalid is_duty_free value: {row['is_duty_free']}. Expected TRUE/FALSE")
+
+        data = {
+            'item_id': item_id,
+            'name': name,
+            'category': row['category'] or self.DEFAULT_CATEGORY,
+            'purchase_price': purchase_price,
+            'selling_price': selling_price,
+            'is_duty_free': is_duty_free,
+            'active': True,
+        }
+        if self.has_barcode_column:
+            data['barcode'] = row.get('barcode') or None
+        return data
+
+    def _resolve_categories(self, names):
+        """Load unseen categories in one query and create any that are missing"""
+        from products.models import Category
+
+        unseen = {name for name in names if name not in self._categories}
+        if not unseen:
+            return
+
+        for category in Category.objects.filter(name__in=unseen):
+            self._categories[category.name] = category
+        missing = unseen - set(self._categories)
+        if not missing:
+            return
+
+        self.stats['categories_created'] += len(missing)
+        if self.dry_run:
+            for name in missing:
+                self._categories[name] = None
+                self._report({'action': 'create_category', 'name': name})
+            return
+
+        Category.objects.bulk_create(
+            [
+                Category(name=name, description=f'Auto-created for {name} products', active=True)
+                for name in sorted(missing)
+            ],
+            ignore_conflicts=True
+        )
+        for category in Category.objects.filter(name__in=missing):
+            self._categories[category.name] = category
+
+    def _process_chunk(self, chunk):
+        from products.models import Product
+
+        # Parse and de-duplicate (last row wins for repeated item_ids)
+        parsed = {}
+        for row_num, row in chunk:
+            if not any(row.values()) or row['item_id'].lower() == 'item_id':
+                continue
+            try:
+                data = self._parse_row(row)
+            except ValueError as e:
+                self.stats['errors'] += 1
+                self._report({'action': 'error', 'row': row_num, 'item_id': row.get('item_id', ''), 'error': str(e)})
+                continue
+            parsed[data['item_id']] = (row_num, data)
+
+        categories_before = self.stats['categories_created']
+        if parsed:
+            self._resolve_categories({data['category'] for _, data in parsed.values()})
+            existing = Product.objects.filter(
+                item_id__in=list(parsed)
+            ).select_related('category').in_bulk(field_name='item_id')
+        else:
+            existing = {}
+
+        update_fields = ['name', 'category', 'purchase_price', 'selling_price', 'is_duty_free', 'active']
+        if self.has_barcode_column:
+            update_fields.append('barcode')
+
+        to_create = []
+        to_update = []
+        now = timezone.now()
+        for item_id, (row_num, data) in parsed.items():
+            category = self._categories.get(data['category'])
+            product = existing.get(item_id)
+
+            # Dry run: a row already planned by an earlier chunk is diffed against that plan
+            planned = self._planned.get(item_id) if self.dry_run else None
+            if planned is not None:
+                current = planned
+            elif product is not None:
+                current = {
+                    field: (product.category.name if product.category_id else None) if field == 'category'
+                    else getattr(product, field)
+                    for field in update_fields
+                }
+            else:
+                current = None
+            if self.dry_run:
+                self._planned[item_id] = data
+
+            if current is None:
+                to_create.append((
+                    {'action': 'create', 'row': row_num, 'item_id': item_id, 'name': data['name']},
+                    Product(
+                        item_id=item_id,
+                        name=data['name'],
+                        barcode=data.get('barcode'),
+                        category=category,
+                        purchase_price=data['purchase_price'],
+                        selling_price=data['selling_price'],
+                        is_duty_free=data['is_duty_free'],
+                        active=True,
+                        created_by=self.created_by,
+                    )
+                ))
+                continue
+
+            changes = {
+                field: (current.get(field), data[field])
+                for field in update_fields
+                if current.get(field) != data[field]
+            }
+            if not changes:
+                self.stats['products_unchanged'] += 1
+                continue
+
+            if product is not None and not self.dry_run:
+                for field in update_fields:
+                    setattr(product, field, category if field == 'category' else data[field])
+                product.updated_at = now
+            to_update.append((
+                {'action': 'update', 'row': row_num, 'item_id': item_id, 'name': data['name'], 'changes': changes},
+                product
+            ))
+
+        self.stats['chunks'] += 1
+
+        if self.dry_run:
+            created, updated = to_create, to_update
+        else:
+            created, updated = self._write_chunk(chunk, to_create, to_update, update_fields + ['updated_at'])
+            if created or updated or self.stats['categories_created'] > categories_before:
+                # Bulk writes bypass the Product.save() hooks: one invalidation per committed chunk
+                transaction.on_commit(self._invalidate_caches)
+            self._save_checkpoint(chunk[-1][0])
+
+        for diff, _ in sorted(created + updated, key=lambda pair: pair[0]['row']):
+            self._report(diff)
+        self.stats['products_created'] += len(created)
+        self.stats['products_updated'] += len(updated)
+
+    def _write_chunk(self, chunk, to_create, to_update, update_fields):
+        """
+        Write a chunk with one bulk_create and one bulk_update.
+
+        If the bulk write fails (e.g. one row violates a DB constraint), the chunk
+        is retried row by row so that only the offending rows are counted as
+        errors, as the per-row import did. Returns the (diff, product) pairs
+        actually created and updated.
+        """
+        from django.db import DatabaseError
+        from products.models import Product
+
+        try:
+            with transaction.atomic():
+                Product.objects.bulk_create([product for _, product in to_create], batch_size=500)
+                Product.objects.bulk_update([product for _, product in to_update], update_fields, batch_size=500)
+            return to_create, to_update
+        except (DatabaseError, ValueError, ArithmeticError) as e:
+            first_row, last_row = chunk[0][0], chunk[-1][0]
+            logger.warning(f"Bulk write of rows {first_row}-{last_row} failed ({e}), retrying row by row")
+            bulk_error = e
+
+        created, updated = [], []
+        for diff, product in to_create:
+            # Drop a primary key assigned by the rolled-back bulk insert
+            product.pk = None
+            product._state.adding = True
+            if self._write_row(diff, lambda: Product.objects.bulk_create([product])):
+                created.append((diff, product))
+        for diff, product in to_update:
+            if self._write_row(diff, lambda: Product.objects.bulk_update([product], update_fields)):
+                updated.append((diff, product))
+
+        if len(to_create) + len(to_update) > 1 and not (created or updated):
+            # Not a bad row if every row failed - stop before checkpointing past them
+            raise CatalogImportError(f'Failed writing rows {first_row}-{last_row}: {bulk_error}') from bulk_error
+        return created, updated
+
+    def _write_row(self, diff, write):
+        """Write a single row in its own savepoint; a failure is counted and reported as a row error"""
+        from django.db import DatabaseError
+
+        try:
+            with transaction.atomic():
+                write()
+        except (DatabaseError, ValueError, ArithmeticError) as e:
+            self.stats['errors'] += 1
+            self._report({'action': 'error', 'row': diff['row'], 'item_id': diff['item_id'], 'error': str(e)})
+            return False
+        return True
+
+    def _report(self, diff):
+        if self.on_diff is not None:
+            self.on_diff(diff)
+
+    # ------------------------------------------------------------------
+    # Checkpoints and cache invalidation
+    # ------------------------------------------------------------------
+
+    def _file_signature(self):
+        stat = os.stat(self.file_path)
+        return {'file': os.path.abspath(self.file_path), 'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+    def _load_checkpoint(self):
+        """Last committed row for this exact file, or 0 if there is no matching checkpoint"""
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as file:
+                checkpoint = json.load(file)
+        except (OSError, ValueError):
+            return 0
+
+        signature = self._file_signature()
+        if any(checkpoint.get(key) != value for key, value in signature.items()):
+            logger.warning(f"Ignoring checkpoint {self.checkpoint_path}: file changed since it was written")
+            return 0
+        return int(checkpoint.get('last_row', 0))
+
+    def _save_checkpoint(self, last_row):
+        checkpoint = dict(self._file_signature(), last_row=last_row, saved_at=timezone.now().isoformat())
+        with open(self.checkpoint_path, 'w', encoding='utf-8') as file:
+            json.dump(checkpoint, file)
+
+    def _clear_checkpoint(self):
+        try:
+            os.remove(self.checkpoint_path)
+        except FileNotFoundError:
+            pass
+
+    def _invalidate_caches(self):
+        """One cache invalidation per committed chunk instead of one per product"""
+        from frontend.utils.cache_helpers import ProductCacheHelper, VesselPricingCacheHelper
+        from frontend.utils.product_index import ProductIndexHelper
+
+        ProductCacheHelper.clear_cache_after_product_create()
+        VesselPricingCacheHelper.invalidate_all()
+        ProductIndexHelper.invalidate_all_vessels()
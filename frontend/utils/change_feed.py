@@ -0,0 +1,173 @@
+"""
+Append-only change feed over the Transaction and InventoryEvent tables.
+Inserts are written to an outbox (api.ChangeFeedEntry) in the inserting
+transaction and numbered in commit order; consumers keep the last sequence
+they processed and tail newer entries instead of polling list endpoints.
+"""
+
+import json
+import logging
+import time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
+
+logger = logging.getLogger('frontend')
+
+
+class ChangeFeedQuerySet(models.QuerySet):
+    """QuerySet of a published model: bulk inserts also write their change feed entries"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        ChangeFeedHelper.publish(self.model, objs)
+        return objs
+
+
+class ChangeFeedHelper:
+    """
+    Cursor-based reads of the transaction and inventory event streams.
+
+    Every inserted row gets a ChangeFeedEntry in the same database
+    transaction (Transaction/InventoryEvent save() and ChangeFeedQuerySet
+    bulk_create). Entries are numbered only once committed: each read first
+    gives the committed, unnumbered entries the next sequences while holding
+    the stream's ChangeFeedSequence row lock. A row that commits late gets
+    a higher sequence than anything already handed out, so it can never land
+    behind a consumer's cursor. The cursor is the sequence of the last entry
+    returned; entries are returned in sequence order.
+
+    Only inserts are published. Rows deleted (or archived by
+    InventoryEventJournal) before they are read are skipped; consumers that
+    need deletions reconcile against the list endpoints.
+    """
+
+    STREAMS = {
+        'transactions': {
+            'model': ('transactions', 'Transaction'),
+            'fields': [
+                'id', 'transaction_type', 'vessel_id', 'product_id', 'transaction_date', 'quantity',
+                'unit_price', 'cogs_total', 'trip_id', 'purchase_order_id', 'transfer_id',
+                'transfer_to_vessel_id', 'transfer_from_vessel_id', 'waste_report_id',
+                'created_by_id', 'created_at',
+            ],
+        },
+        'events': {
+            'model': ('transactions', 'InventoryEvent'),
+            'fields': [
+                'id', 'event_type', 'vessel_id', 'product_id', 'inventory_lot_id', 'transaction_id',
+                'quantity_change', 'unit_cost', 'lot_remaining_after', 'created_by_id', 'timestamp',
+            ],
+        },
+    }
+
+    BATCH_SIZE = 500
+    MAX_BATCH_SIZE = 5000
+    MAX_WAIT_SECONDS = 25
+    POLL_INTERVAL = 1.0
+
+    @classmethod
+    def _stream(cls, stream):
+        config = cls.STREAMS.get(stream)
+        if config is None:
+            raise ValueError(f"Unknown stream '{stream}'. Choose from: {', '.join(cls.STREAMS)}")
+        return config
+
+    @classmethod
+    def _stream_for_model(cls, model):
+        label = (model._meta.app_label, model._meta.object_name)
+        return next((stream for stream, config in cls.STREAMS.items() if config['model'] == label), None)
+
+    @classmethod
+    def publish(cls, model, objs):
+        """Write outbox entries for newly inserted rows (call inside the inserting transaction)"""
+        from api.models import ChangeFeedEntry
+
+        stream = cls._stream_for_model(model)
+        entries = [
+            ChangeFeedEntry(stream=stream, object_id=obj.pk, vessel_id=obj.vessel_id)
+            for obj in objs if obj.pk is not None
+        ]
+        if stream is not None and entries:
+            ChangeFeedEntry.objects.bulk_create(entries)
+
+    @classmethod
+    def assign_sequences(cls, stream):
+        """
+        Number the committed entries of a stream that have no sequence yet.
+
+        Returns:
+            int: entries numbered
+        """
+        from api.models import ChangeFeedEntry, ChangeFeedSequence
+
+        with transaction.atomic():
+            counter, _ = ChangeFeedSequence.objects.select_for_update().get_or_create(stream=stream)
+            pending = list(
+                ChangeFeedEntry.objects.filter(stream=stream, sequence__isnull=True).order_by('id').only('id')[:cls.MAX_BATCH_SIZE]
+            )
+            if not pending:
+                return 0
+
+            for offset, entry in enumerate(pending, 1):
+                entry.sequence = counter.last_sequence + offset
+            ChangeFeedEntry.objects.bulk_update(pending, ['sequence'], batch_size=500)
+            counter.last_sequence += len(pending)
+            counter.save(update_fields=['last_sequence'])
+        return len(pending)
+
+    @classmethod
+    def read(cls, stream, cursor=0, limit=None, vessel_id=None):
+        """
+        One batch of rows after the cursor.
+
+        Returns:
+            tuple: (rows, next_cursor, has_more)
+        """
+        from django.apps import apps
+        from api.models import ChangeFeedEntry
+
+        config = cls._stream(stream)
+        model = apps.get_model(*config['model'])
+        limit = min(max(int(limit or cls.BATCH_SIZE), 1), cls.MAX_BATCH_SIZE)
+        cursor = max(int(cursor or 0), 0)
+
+        backlog = cls.assign_sequences(stream) >= cls.MAX_BATCH_SIZE
+
+        entries = ChangeFeedEntry.objects.filter(stream=stream, sequence__gt=cursor)
+        if vessel_id is not None:
+            entries = entries.filter(vessel_id=vessel_id)
+        entries = list(entries.order_by('sequence').values_list('sequence', 'object_id')[:limit + 1])
+        has_more = len(entries) > limit or backlog
+        entries = entries[:limit]
+
+        rows_by_id = {
+            row['id']: row
+            for row in model.objects.filter(id__in=[object_id for _, object_id in entries]).values(*config['fields'])
+        }
+        rows = [rows_by_id[object_id] for _, object_id in entries if object_id in rows_by_id]
+
+        next_cursor = entries[-1][0] if entries else cursor
+        return rows, next_cursor, has_more
+
+    @classmethod
+    def wait(cls, stream, cursor=0, limit=None, vessel_id=None, timeout=0):
+        """
+        Long-poll: return as soon as rows are available or the timeout expires.
+
+        Returns:
+            tuple: (rows, next_cursor, has_more)
+        """
+        deadline = time.monotonic() + min(max(float(timeout or 0), 0), cls.MAX_WAIT_SECONDS)
+        while True:
+            rows, next_cursor, has_more = cls.read(stream, cursor, limit, vessel_id)
+            if rows or next_cursor != cursor or time.monotonic() >= deadline:
+                return rows, next_cursor, has_more
+            time.sleep(min(cls.POLL_INTERVAL, max(deadline - time.monotonic(), 0)))
+
+    @staticmethod
+    def to_json_lines(rows):
+        """Compact JSON lines (one row per line); decimals become strings"""
+        return ''.join(
+            json.dumps(row, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n' for row in rows
+        )
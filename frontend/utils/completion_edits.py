@@ -0,0 +1,565 @@
+"""
+Delta edits for the completion carts of trips, purchase orders, transfers and waste reports.
+A re-submitted cart is diffed against the child transactions already posted, so only
+added, removed and re-quantified lines touch inventory lots - in one locked batch.
+"""
+
+import logging
+from collections import defaultdict, deque
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Max
+
+from frontend.utils.cache_invalidation import CacheInvalidationCollector
+from frontend.utils.lot_archive import InventoryLotArchiveHelper
+from frontend.utils.stock_reservations import StockReservationHelper
+
+logger = logging.getLogger('frontend')
+
+
+class CompletionEditPlan:
+    """
+    Submitted lines matched against existing child transactions.
+
+    inserts: line dicts with no transaction to reuse
+    deletes: transactions whose line was removed or has to be re-posted
+    changes: (txn, line, delta) - same line with a new quantity
+    updates: (txn, line) - only non-inventory fields (price, notes, ...) changed
+    unchanged: transactions kept exactly as they are
+    """
+
+    def __init__(self):
+        self.inserts = []
+        self.deletes = []
+        self.changes = []
+        self.updates = []
+        self.unchanged = []
+        self.matches = []       # (line, txn or None) in submitted order
+        self.transactions = []  # posted transaction per line, filled by apply()
+
+    def replace(self, txn, line):
+        """Re-post a matched line from scratch instead of editing it in place"""
+        self.deletes.append(txn)
+        self.inserts.append(line)
+        self.matches = [(l, None if t is txn else t) for l, t in self.matches]
+
+    def increases(self):
+        """{product_id: quantity} the edit takes from stock on top of what is already posted"""
+        quantities = defaultdict(Decimal)
+        for line in self.inserts:
+            quantities[line['product'].id] += Decimal(str(line['quantity']))
+        for txn, _, delta in self.changes:
+            if delta > 0:
+                quantities[txn.product_id] += delta
+        # A product removed in one line and added in another nets out
+        for txn in self.deletes:
+            if txn.product_id in quantities:
+                quantities[txn.product_id] -= txn.quantity
+        return {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+
+    def touched_product_ids(self):
+        return (
+            {line['product'].id for line in self.inserts}
+            | {txn.product_id for txn in self.deletes}
+            | {txn.product_id for txn, _, _ in self.changes}
+        )
+
+    def summary(self):
+        return (
+            f"{len(self.inserts)} added, {len(self.deletes)} removed, {len(self.changes)} re-quantified, "
+            f"{len(self.updates)} updated, {len(self.unchanged)} unchanged"
+        )
+
+
+class CompletionEditHelper:
+    """
+    Apply a completion cart as a delta instead of delete-all-and-recreate.
+
+    Lines are matched to existing transactions by product (in posting order).
+    Consuming kinds (SALE, WASTE, TRANSFER_OUT) restore and consume FIFO stock
+    for the changed quantities only: lowering a line gives back its most
+    recently consumed lots, raising it consumes the next FIFO lots, and all lots
+    of the edit are locked with one query and written with one bulk_update.
+    SUPPLY lines adjust the lot they created; removing a supply line still goes
+    through Transaction.delete() and its consumed-stock check.
+
+    Rows consumed before FIFOConsumption records existed cannot be partially
+    restored, so a quantity change on them is posted as remove + add.
+    """
+
+    KINDS = {
+        'SALE': {
+            'consumes': True, 'event_type': 'LOT_CONSUMED', 'label': 'Sale', 'respects_reservations': True,
+            'fields': ('unit_price', 'notes'),
+        },
+        'WASTE': {
+            'consumes': True, 'event_type': 'WASTE_REMOVED', 'label': 'Waste',
+            'fields': ('damage_reason', 'notes'),
+        },
+        'TRANSFER_OUT': {
+            'consumes': True, 'event_type': 'TRANSFER_SENT', 'label': 'Transfer out', 'respects_reservations': True,
+            'fields': ('notes',),
+        },
+        'SUPPLY': {
+            'consumes': False, 'label': 'Supply',
+            'fields': ('notes', 'boxes', 'items_per_box'),
+            # Lot cost changes: consumed stock was costed at the old price
+            'replace_fields': ('unit_price',),
+        },
+    }
+
+    @classmethod
+    def _config(cls, kind):
+        config = cls.KINDS.get(kind)
+        if config is None:
+            raise ValueError(f"Unsupported completion kind '{kind}'. Choose from: {', '.join(cls.KINDS)}")
+        return config
+
+    @staticmethod
+    def _differs(txn, line, field):
+        if field not in line:
+            return False
+        current, submitted = getattr(txn, field), line[field]
+        if isinstance(current, str) or isinstance(submitted, str):
+            return (current or '') != (submitted or '')
+        return current != submitted
+
+    @classmethod
+    def diff(cls, existing, lines, kind):
+        """
+        Match submitted lines against existing transactions.
+
+        Args:
+            existing: child transactions of the record (product loaded)
+            lines: dicts with product, quantity and the kind's optional fields
+
+        Returns:
+            CompletionEditPlan
+        """
+        config = cls._config(kind)
+        plan = CompletionEditPlan()
+
+        by_product = defaultdict(deque)
+        for txn in existing:
+            by_product[txn.product_id].append(txn)
+
+        for line in lines:
+            candidates = by_product.get(line['product'].id)
+            txn = candidates.popleft() if candidates else None
+            plan.matches.append((line, txn))
+
+            if txn is None:
+                plan.inserts.append(line)
+            elif any(cls._differs(txn, line, field) for field in config.get('replace_fields', ())):
+                plan.replace(txn, line)
+            else:
+                delta = Decimal(str(line['quantity'])) - txn.quantity
+                if delta:
+                    plan.changes.append((txn, line, delta))
+                elif any(cls._differs(txn, line, field) for field in config['fields']):
+                    plan.updates.append((txn, line))
+                else:
+                    plan.unchanged.append(txn)
+
+        for leftovers in by_product.values():
+            plan.deletes.extend(leftovers)
+        return plan
+
+    @classmethod
+    def apply(cls, plan, kind, defaults):
+        """
+        Post a plan.
+
+        Args:
+            defaults: Transaction fields shared by inserted lines - vessel,
+                transaction_date, created_by and the parent (trip,
+                purchase_order, transfer, waste_report, transfer_to_vessel)
+
+        Returns:
+            CompletionEditPlan: the plan with ``transactions`` filled in line order
+        """
+        from transactions.models import Transaction
+
+        config = cls._config(kind)
+        vessel = defaults['vessel']
+
+        with transaction.atomic():
+            if config['consumes']:
+                inserted = cls._apply_consuming(plan, kind, config, defaults)
+            else:
+                inserted = cls._apply_supply(plan, defaults)
+
+            for txn, line in plan.updates:
+                for field in config['fields']:
+                    if field in line:
+                        setattr(txn, field, line[field])
+            if plan.updates:
+                Transaction.objects.bulk_update([txn for txn, _ in plan.updates], list(config['fields']))
+
+        inserted_by_line = {id(line): txn for line, txn in zip(plan.inserts, inserted)}
+        plan.transactions = [txn if txn is not None else inserted_by_line[id(line)] for line, txn in plan.matches]
+
+        touched = plan.touched_product_ids()
+        if touched:
+            cls._invalidate(vessel.id, touched)
+        logger.info(f"🔄 {config['label']} edit on {vessel.name}: {plan.summary()}")
+        return plan
+
+    # ------------------------------------------------------------------
+    # Consuming kinds
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _apply_consuming(cls, plan, kind, config, defaults):
+        from transactions.models import FIFOConsumption, Transaction
+
+        changed_ids = [txn.id for txn, _, _ in plan.changes]
+        with_fifo = set(
+            FIFOConsumption.objects.filter(transaction_id__in=changed_ids).values_list('transaction_id', flat=True)
+        ) if changed_ids else set()
+        for txn, line, delta in list(plan.changes):
+            if txn.id not in with_fifo:
+                plan.changes.remove((txn, line, delta))
+                plan.replace(txn, line)
+
+        # 1. Give back stock: whole lines being removed, the excess of lowered lines
+        lowered = [(txn, -delta) for txn, _, delta in plan.changes if delta < 0]
+        restored_cost = cls._restore(kind, config, plan.deletes, lowered)
+        if plan.deletes:
+            # Stock is already back - skip Transaction.delete() (and its per-row cache churn)
+            Transaction.objects.filter(id__in=[txn.id for txn in plan.deletes]).delete()
+
+        # 2. Take stock for new lines and raised lines, FIFO, one locked lot query
+        new_transactions = [
+            Transaction(
+                transaction_type=kind,
+                product=line['product'],
+                quantity=Decimal(str(line['quantity'])),
+                **defaults,
+                **{field: line[field] for field in ('unit_price',) + config['fields'] if field in line}
+            )
+            for line in plan.inserts
+        ]
+        for txn in new_transactions:
+            if kind == 'SALE' and not txn.unit_price:
+                txn.unit_price = txn.product.selling_price
+
+        requests = [(txn, txn.quantity) for txn in new_transactions]
+        requests += [(txn, delta) for txn, _, delta in plan.changes if delta > 0]
+        allocations = cls._allocate(defaults['vessel'], requests, config.get('respects_reservations', False))
+
+        for txn in new_transactions:
+            txn.cogs_total = sum((qty * lot.purchase_price for lot, qty, _ in allocations[id(txn)]), Decimal('0'))
+            if kind == 'TRANSFER_OUT':
+                txn.unit_price = (txn.cogs_total / txn.quantity) if txn.cogs_total else Decimal('0.001')
+        cls._insert(new_transactions)
+
+        next_sequence = dict(
+            FIFOConsumption.objects.filter(transaction_id__in=changed_ids).values('transaction_id')
+            .annotate(last=Max('sequence')).values_list('transaction_id', 'last')
+        ) if changed_ids else {}
+        cls._record_consumption(config, requests, allocations, next_sequence)
+
+        # 3. Re-quantified lines keep their row, with cost moved by the delta
+        for txn, line, delta in plan.changes:
+            if txn.cogs_total is not None:
+                if delta > 0:
+                    txn.cogs_total += sum((qty * lot.purchase_price for lot, qty, _ in allocations[id(txn)]), Decimal('0'))
+                else:
+                    txn.cogs_total -= restored_cost.get(txn.id, Decimal('0'))
+            txn.quantity += delta
+            if kind == 'TRANSFER_OUT' and txn.cogs_total:
+                txn.unit_price = txn.cogs_total / txn.quantity
+            for field in config['fields']:
+                if field in line:
+                    setattr(txn, field, line[field])
+        if plan.changes:
+            Transaction.objects.bulk_update(
+                [txn for txn, _, _ in plan.changes],
+                ['quantity', 'cogs_total', 'unit_price'] + [f for f in config['fields'] if f != 'unit_price']
+            )
+
+        return new_transactions
+
+    @classmethod
+    def _allocate(cls, vessel, requests, respects_reservations=False):
+        """
+        FIFO lots for each (txn, quantity), consumed in request order.
+        With respects_reservations, stock reserved by pending transfers is held back
+        (waste removes stock that is physically gone, so it does not).
+
+        Returns:
+            dict: id(txn) -> [(lot, quantity, lot_remaining_after)]
+        """
+        from transactions.models import InventoryLot
+
+        if not requests:
+            return {}
+
+        lots_by_product = defaultdict(list)
+        lots = InventoryLot.objects.select_for_update().filter(
+            vessel=vessel,
+            product_id__in={txn.product_id for txn, _ in requests},
+            remaining_quantity__gt=0
+        ).order_by('purchase_date', 'created_at')
+        for lot in lots:
+            lots_by_product[lot.product_id].append(lot)
+
+        reserved = {}
+        if respects_reservations:
+            reserved = StockReservationHelper.reserved_map(vessel.id, list(lots_by_product))
+
+        allocations, touched = {}, {}
+        for txn, quantity in requests:
+            product_lots = lots_by_product[txn.product_id]
+            available = sum(lot.remaining_quantity for lot in product_lots) - reserved.get(txn.product_id, 0)
+            if quantity > available:
+                raise ValidationError(
+                    f"Insufficient inventory for {txn.product.name} on {vessel.name}. "
+                    f"Available: {max(available, 0)}, Requested: {quantity}"
+                )
+
+            taken, remaining_to_consume = [], quantity
+            for lot in product_lots:
+                if remaining_to_consume <= 0:
+                    break
+                if lot.remaining_quantity <= 0:
+                    continue
+                consume_from_lot = min(remaining_to_consume, Decimal(lot.remaining_quantity))
+                lot.remaining_quantity -= int(consume_from_lot)
+                taken.append((lot, consume_from_lot, lot.remaining_quantity))
+                touched[lot.id] = lot
+                remaining_to_consume -= consume_from_lot
+            allocations[id(txn)] = taken
+
+        InventoryLot.objects.bulk_update(touched.values(), ['remaining_quantity'])
+        return allocations
+
+    @staticmethod
+    def _insert(new_transactions):
+        from django.db.models import Model
+        from transactions.models import Transaction
+
+        if not new_transactions:
+            return
+        if connection.features.can_return_rows_from_bulk_insert:
+            Transaction.objects.bulk_create(new_transactions)
+        else:
+            # Backend cannot hand back primary keys. Model.save() skips the FIFO in
+            # Transaction.save() - stock was already consumed above
+            for txn in new_transactions:
+                Model.save(txn)
+
+    @classmethod
+    def _record_consumption(cls, config, requests, allocations, next_sequence):
+        from transactions.models import FIFOConsumption, InventoryEvent
+
+        fifo_records, events = [], []
+        for txn, _ in requests:
+            sequence = next_sequence.get(txn.id, 0)
+            for lot, quantity, remaining_after in allocations[id(txn)]:
+                sequence += 1
+                fifo_records.append(FIFOConsumption(
+                    transaction=txn,
+                    inventory_lot=lot,
+                    consumed_quantity=quantity,
+                    unit_cost=lot.purchase_price,
+                    sequence=sequence
+                ))
+                events.append(InventoryEvent(
+                    event_type=config['event_type'],
+                    vessel_id=txn.vessel_id,
+                    product_id=txn.product_id,
+                    inventory_lot=lot,
+                    transaction=txn,
+                    quantity_change=-quantity,
+                    unit_cost=lot.purchase_price,
+                    lot_remaining_after=remaining_after,
+                    created_by_id=txn.created_by_id,
+                    notes=f"{config['label']} consumption: {quantity} units from lot {lot.id}"
+                ))
+        FIFOConsumption.objects.bulk_create(fifo_records)
+        InventoryEvent.objects.bulk_create(events)
+
+    @classmethod
+    def _restore(cls, kind, config, removed, lowered):
+        """
+        Return consumed stock to its lots.
+
+        removed: transactions giving back everything (rows are deleted afterwards)
+        lowered: (txn, quantity) giving back part, newest consumption first
+
+        Returns:
+            dict: transaction id -> cost given back
+        """
+        from transactions.models import FIFOConsumption, InventoryEvent, InventoryLot
+
+        removed_by_id = {txn.id: txn for txn in removed}
+        lowered_by_id = {txn.id: txn for txn, _ in lowered}
+        left = {txn.id: quantity for txn, quantity in lowered}
+        ids = list(removed_by_id) + list(lowered_by_id)
+        if not ids:
+            return {}
+
+        # Consumed lots may have been archived - bring them back before restoring quantities
+        InventoryLotArchiveHelper.restore_for_transactions(ids)
+        consumptions = list(FIFOConsumption.objects.filter(transaction_id__in=ids).order_by('transaction_id', '-sequence'))
+        lots = InventoryLot.objects.select_for_update().in_bulk({c.inventory_lot_id for c in consumptions})
+
+        restored_cost = defaultdict(Decimal)
+        touched, emptied, shrunk, events = {}, [], [], []
+        for consumption in consumptions:
+            if consumption.transaction_id in removed_by_id:
+                quantity = consumption.consumed_quantity
+            else:
+                quantity = min(left[consumption.transaction_id], consumption.consumed_quantity)
+                if quantity <= 0:
+                    continue
+                left[consumption.transaction_id] -= quantity
+                if quantity == consumption.consumed_quantity:
+                    emptied.append(consumption.id)
+                else:
+                    consumption.consumed_quantity -= quantity
+                    shrunk.append(consumption)
+
+            lot = lots.get(consumption.inventory_lot_id)
+            if lot is None:
+                logger.warning(f"Lot {consumption.inventory_lot_id} missing, cannot restore {quantity} units")
+                continue
+            lot.remaining_quantity += int(quantity)
+            touched[lot.id] = lot
+            restored_cost[consumption.transaction_id] += quantity * consumption.unit_cost
+
+            txn = lowered_by_id.get(consumption.transaction_id)
+            if txn is not None:
+                # Removed rows take their events with them (cascade), so only lowered lines log one
+                events.append(InventoryEvent(
+                    event_type='LOT_RESTORED',
+                    vessel_id=txn.vessel_id,
+                    product_id=txn.product_id,
+                    inventory_lot=lot,
+                    transaction=txn,
+                    quantity_change=quantity,
+                    unit_cost=consumption.unit_cost,
+                    lot_remaining_after=lot.remaining_quantity,
+                    created_by_id=txn.created_by_id,
+                    notes=f"{config['label']} edit restoration: {quantity} units to lot {lot.id}"
+                ))
+
+        InventoryLot.objects.bulk_update(touched.values(), ['remaining_quantity'])
+        FIFOConsumption.objects.filter(id__in=emptied).delete()
+        FIFOConsumption.objects.bulk_update(shrunk, ['consumed_quantity'])
+        InventoryEvent.objects.bulk_create(events)
+
+        # Rows posted without FIFO records: same fallback lots as Transaction.delete()
+        with_fifo = {c.transaction_id for c in consumptions}
+        fallback_lots = [
+            InventoryLot(
+                vessel_id=txn.vessel_id,
+                product_id=txn.product_id,
+                purchase_date=txn.transaction_date,
+                purchase_price=cls._fallback_unit_cost(kind, txn),
+                original_quantity=int(txn.quantity),
+                remaining_quantity=int(txn.quantity),
+                created_by_id=txn.created_by_id
+            )
+            for txn_id, txn in removed_by_id.items() if txn_id not in with_fifo
+        ]
+        if fallback_lots:
+            InventoryLot.objects.bulk_create(fallback_lots)
+            logger.info(f"Fallback: created {len(fallback_lots)} restoration lots for rows without FIFO records")
+
+        return restored_cost
+
+    @staticmethod
+    def _fallback_unit_cost(kind, txn):
+        if txn.cogs_total and txn.quantity:
+            return txn.cogs_total / txn.quantity
+        # Sales carry the selling price, not a cost
+        if kind == 'SALE' or not txn.unit_price:
+            return txn.product.purchase_price
+        return txn.unit_price
+
+    # ------------------------------------------------------------------
+    # Supply
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _apply_supply(cls, plan, defaults):
+        from transactions.models import Transaction, create_supply_transactions_bulk
+
+        # Removing a delivery line must fail if its stock was already consumed
+        for txn in plan.deletes:
+            txn.delete()
+
+        cls._adjust_supply_lots(defaults['vessel'], plan.changes)
+        for txn, line, delta in plan.changes:
+            txn.quantity += delta
+            for field in cls.KINDS['SUPPLY']['fields']:
+                if field in line:
+                    setattr(txn, field, line[field])
+        if plan.changes:
+            Transaction.objects.bulk_update(
+                [txn for txn, _, _ in plan.changes], ['quantity', *cls.KINDS['SUPPLY']['fields']]
+            )
+
+        return create_supply_transactions_bulk(defaults['purchase_order'], plan.inserts, defaults.get('created_by'))
+
+    @classmethod
+    def _adjust_supply_lots(cls, vessel, changes):
+        """Grow or shrink the lot each re-quantified supply line created"""
+        from transactions.models import InventoryEvent, InventoryLot
+
+        if not changes:
+            return
+
+        # Supply lines link their lot through the LOT_CREATED event
+        lot_ids = dict(
+            InventoryEvent.objects.filter(
+                transaction_id__in=[txn.id for txn, _, _ in changes], event_type='LOT_CREATED'
+            ).values_list('transaction_id', 'inventory_lot_id')
+        )
+        InventoryLotArchiveHelper.restore_lots(lot_ids.values())
+        lots = InventoryLot.objects.select_for_update().in_bulk(lot_ids.values())
+
+        adjusted = []
+        for txn, _, delta in changes:
+            lot = lots.get(lot_ids.get(txn.id))
+            if lot is None:
+                # Lines recorded before lots were linked by events: match the lot like supply deletion does
+                lot_filters = {'purchase_date': txn.transaction_date, 'purchase_price': txn.unit_price}
+                InventoryLotArchiveHelper.restore_matching(vessel, txn.product_id, limit=1, **lot_filters)
+                lot = InventoryLot.objects.select_for_update().filter(
+                    vessel=vessel, product_id=txn.product_id, **lot_filters
+                ).order_by('created_at').first()
+            if lot is None:
+                raise ValidationError(f"Inventory lot for {txn.product.name} not found - cannot change its quantity")
+            if lot.remaining_quantity + int(delta) < 0:
+                raise ValidationError(
+                    f"Cannot reduce {txn.product.name} by {-delta}: only {lot.remaining_quantity} units "
+                    f"of this delivery are still in stock"
+                )
+            lot.original_quantity += int(delta)
+            lot.remaining_quantity += int(delta)
+            adjusted.append(lot)
+
+        InventoryLot.objects.bulk_update(adjusted, ['original_quantity', 'remaining_quantity'])
+
+    # ------------------------------------------------------------------
+    # Caches
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _invalidate(vessel_id, product_ids):
+        """Same keys Transaction.delete() drops, queued once for the whole edit"""
+        from frontend.utils.cache_helpers import ProductCacheHelper, VersionedCache
+
+        cache_keys = [f'vessel_{vessel_id}', 'product_stats', 'vessel_pricing_summary']
+        for product_id in sorted(product_ids):
+            cache_keys += [f'product_{product_id}', f'inventory_{vessel_id}_{product_id}']
+        for cache_key in cache_keys:
+            CacheInvalidationCollector.defer(VersionedCache.invalidate_version, cache_key)
+        CacheInvalidationCollector.defer(ProductCacheHelper.clear_cache_after_product_update)
+        CacheInvalidationCollector.defer_stock_changed(vessel_id, product_ids)
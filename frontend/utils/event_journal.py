@@ -0,0 +1,296 @@
+"""
+Monthly-partitioned InventoryEvent journal.
+Closed months are exported to compressed column files under MEDIA_ROOT and dropped
+from the hot table; InventoryEventJournal reads both transparently.
+"""
+
+import gzip
+import json
+import logging
+import os
+from datetime import datetime
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+logger = logging.getLogger('transactions')
+
+
+class InventoryEventJournal:
+    """
+    Unified access to hot and archived inventory events.
+
+    Archive layout: one gzip-compressed JSON file per calendar month
+    (``YYYY-MM.json.gz``) holding one array per column, so a month is read
+    with a single decompress and filtered in memory. Rows are plain dicts
+    with the InventoryEvent column names (``*_id`` for foreign keys).
+    """
+
+    ARCHIVE_SUBDIR = 'inventory_events'
+    FORMAT_VERSION = 1
+    HOT_MONTHS = 3  # current month plus the two before it stay in the database
+    LOCAL_MONTH_LIMIT = 12
+
+    COLUMNS = ('id', 'event_type', 'vessel_id', 'product_id', 'inventory_lot_id', 'transaction_id',
+               'quantity_change', 'unit_cost', 'lot_remaining_after', 'timestamp', 'created_by_id', 'notes')
+    DECIMAL_COLUMNS = ('quantity_change', 'unit_cost')
+
+    _local_months = {}
+
+    # ----- partition layout -----
+
+    @classmethod
+    def archive_root(cls):
+        return os.path.join(str(settings.MEDIA_ROOT), cls.ARCHIVE_SUBDIR)
+
+    @classmethod
+    def month_path(cls, month):
+        return os.path.join(cls.archive_root(), f"{month[0]:04d}-{month[1]:02d}.json.gz")
+
+    @classmethod
+    def archived_months(cls):
+        """Sorted list of (year, month) tuples present in the archive"""
+        try:
+            names = os.listdir(cls.archive_root())
+        except FileNotFoundError:
+            return []
+        months = []
+        for name in names:
+            if name.endswith('.json.gz'):
+                try:
+                    year, month = name[:-len('.json.gz')].split('-')
+                    months.append((int(year), int(month)))
+                except ValueError:
+                    continue
+        return sorted(months)
+
+    @staticmethod
+    def _month_start(month):
+        return timezone.make_aware(datetime(month[0], month[1], 1))
+
+    @staticmethod
+    def _next_month(month):
+        year, month_number = month
+        return (year + 1, 1) if month_number == 12 else (year, month_number + 1)
+
+    @classmethod
+    def first_hot_month(cls, hot_months=None):
+        """Oldest month that stays in the database"""
+        hot_months = cls.HOT_MONTHS if hot_months is None else hot_months
+        now = timezone.localtime()
+        index = now.year * 12 + (now.month - 1) - max(hot_months - 1, 0)
+        return (index // 12, index % 12 + 1)
+
+    # ----- archiving -----
+
+    @classmethod
+    def archive_closed_months(cls, hot_months=None, dry_run=False):
+        """
+        Export every month older than the hot window to its file and delete those rows.
+
+        Returns:
+            dict: {'YYYY-MM': rows archived}
+        """
+        from transactions.models import InventoryEvent
+
+        cutoff = cls._month_start(cls.first_hot_month(hot_months))
+        oldest = InventoryEvent.objects.filter(timestamp__lt=cutoff).order_by('timestamp').values_list(
+            'timestamp', flat=True
+        ).first()
+        if oldest is None:
+            return {}
+
+        oldest = timezone.localtime(oldest)
+        month = (oldest.year, oldest.month)
+        results = {}
+        while cls._month_start(month) < cutoff:
+            start, end = cls._month_start(month), cls._month_start(cls._next_month(month))
+            month_events = InventoryEvent.objects.filter(timestamp__gte=start, timestamp__lt=end)
+            if dry_run:
+                count = month_events.count()
+            else:
+                count = cls._archive_month(month, month_events)
+            if count:
+                results[f"{month[0]:04d}-{month[1]:02d}"] = count
+            month = cls._next_month(month)
+
+        if results and not dry_run:
+            logger.info(f"Archived inventory events: {results}")
+        return results
+
+    @classmethod
+    def _archive_month(cls, month, month_events):
+        with transaction.atomic():
+            rows = list(month_events.select_for_update().order_by('timestamp', 'id').values(*cls.COLUMNS))
+            if not rows:
+                return 0
+
+            # Merge with an existing file so re-runs after a partial failure stay idempotent
+            archived_ids = {row['id'] for row in rows}
+            existing = [row for row in cls._read_month(month) if row['id'] not in archived_ids]
+            cls._write_month(month, existing + rows)
+
+            # Closed month: no new rows can arrive (timestamp is auto_now_add)
+            month_events.delete()
+        return len(rows)
+
+    @classmethod
+    def _write_month(cls, month, rows):
+        rows.sort(key=lambda row: (row['timestamp'], row['id']))
+        payload = {
+            'version': cls.FORMAT_VERSION,
+            'month': f"{month[0]:04d}-{month[1]:02d}",
+            'count': len(rows),
+            'columns': {column: [cls._encode(column, row[column]) for row in rows] for column in cls.COLUMNS},
+        }
+        path = cls.month_path(month)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with gzip.open(temp_path, 'wt', encoding='utf-8', compresslevel=9) as handle:
+            json.dump(payload, handle, separators=(',', ':'))
+        os.replace(temp_path, path)
+        cls._local_months.pop(path, None)
+
+    @classmethod
+    def _encode(cls, column, value):
+        if value is None:
+            return None
+        if column in cls.DECIMAL_COLUMNS:
+            return str(value)
+        if column == 'timestamp':
+            return value.isoformat()
+        return value
+
+    @classmethod
+    def _read_month(cls, month):
+        """Decoded rows of one archived month (memoized per process by file mtime)"""
+        path = cls.month_path(month)
+        try:
+            mtime = os.path.getmtime(path)
+        except FileNotFoundError:
+            return []
+
+        cached = cls._local_months.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        with gzip.open(path, 'rt', encoding='utf-8') as handle:
+            payload = json.load(handle)
+        columns = payload['columns']
+        for column in cls.DECIMAL_COLUMNS:
+            columns[column] = [Decimal(value) if value is not None else None for value in columns[column]]
+        columns['timestamp'] = [parse_datetime(value) for value in columns['timestamp']]
+        rows = [dict(zip(cls.COLUMNS, values)) for values in zip(*(columns[column] for column in cls.COLUMNS))]
+
+        if len(cls._local_months) >= cls.LOCAL_MONTH_LIMIT:
+            cls._local_months.clear()
+        cls._local_months[path] = (mtime, rows)
+        return rows
+
+    # ----- unified query API -----
+
+    @classmethod
+    def query(cls, vessel=None, product=None, transaction_ids=None, event_types=None, start=None, end=None):
+        """
+        Events from the hot table and every overlapping archived month, newest first.
+
+        Args:
+            vessel / product: instances or ids
+            transaction_ids: iterable of transaction ids
+            event_types: iterable of event type codes
+            start / end: aware datetimes, start inclusive, end exclusive
+        """
+        filters = cls._normalize_filters(vessel, product, transaction_ids, event_types, start, end)
+        rows = list(cls._hot_events(filters).values(*cls.COLUMNS))
+        rows.extend(cls._current_archived_events(filters, {row['id'] for row in rows}))
+        rows.sort(key=lambda row: (row['timestamp'], row['id']), reverse=True)
+        return rows
+
+    @classmethod
+    def transaction_ids_with_events(cls, vessel=None, product=None, transaction_ids=None):
+        """Set of transaction ids that have at least one journal entry"""
+        filters = cls._normalize_filters(vessel, product, transaction_ids, None, None, None)
+        hot = list(cls._hot_events(filters).values_list('id', 'transaction_id'))
+        found = {transaction_id for _, transaction_id in hot}
+        found.update(
+            row['transaction_id']
+            for row in cls._current_archived_events(filters, {event_id for event_id, _ in hot})
+        )
+        return found
+
+    @staticmethod
+    def _normalize_filters(vessel, product, transaction_ids, event_types, start, end):
+        return {
+            'vessel_id': getattr(vessel, 'id', vessel),
+            'product_id': getattr(product, 'id', product),
+            'transaction_ids': set(transaction_ids) if transaction_ids is not None else None,
+            'event_types': set(event_types) if event_types is not None else None,
+            'start': start,
+            'end': end,
+        }
+
+    @classmethod
+    def _hot_events(cls, filters):
+        from transactions.models import InventoryEvent
+
+        hot = InventoryEvent.objects.all()
+        if filters['vessel_id'] is not None:
+            hot = hot.filter(vessel_id=filters['vessel_id'])
+        if filters['product_id'] is not None:
+            hot = hot.filter(product_id=filters['product_id'])
+        if filters['transaction_ids'] is not None:
+            hot = hot.filter(transaction_id__in=filters['transaction_ids'])
+        if filters['event_types'] is not None:
+            hot = hot.filter(event_type__in=filters['event_types'])
+        if filters['start'] is not None:
+            hot = hot.filter(timestamp__gte=filters['start'])
+        if filters['end'] is not None:
+            hot = hot.filter(timestamp__lt=filters['end'])
+        return hot
+
+    @classmethod
+    def _current_archived_events(cls, filters, hot_ids):
+        """
+        Archived rows that are neither still in the hot table nor orphaned.
+
+        A month whose delete failed after its file was written has its rows in
+        both places until the next run - the hot row wins. Transaction deletes
+        cascade to the hot table only, so archived events of deleted
+        transactions are dropped here instead of rewriting the month files.
+        """
+        from transactions.models import Transaction
+
+        rows = [row for row in cls._archived_events(filters) if row['id'] not in hot_ids]
+        if not rows:
+            return rows
+        # One id range scan instead of a parameter per archived transaction
+        transaction_ids = [row['transaction_id'] for row in rows]
+        live = set(Transaction.objects.filter(
+            id__gte=min(transaction_ids), id__lte=max(transaction_ids)
+        ).values_list('id', flat=True))
+        return [row for row in rows if row['transaction_id'] in live]
+
+    @classmethod
+    def _archived_events(cls, filters):
+        start, end = filters['start'], filters['end']
+        for month in cls.archived_months():
+            month_start, month_end = cls._month_start(month), cls._month_start(cls._next_month(month))
+            if (start is not None and month_end <= start) or (end is not None and month_start >= end):
+                continue
+            for row in cls._read_month(month):
+                if filters['vessel_id'] is not None and row['vessel_id'] != filters['vessel_id']:
+                    continue
+                if filters['product_id'] is not None and row['product_id'] != filters['product_id']:
+                    continue
+                if filters['transaction_ids'] is not None and row['transaction_id'] not in filters['transaction_ids']:
+                    continue
+                if filters['event_types'] is not None and row['event_type'] not in filters['event_types']:
+                    continue
+                if start is not None and row['timestamp'] < start:
+                    continue
+                if end is not None and row['timestamp'] >= end:
+                    continue
+                yield row
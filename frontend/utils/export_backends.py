@@ -0,0 +1,87 @@
+"""
+Export and HTTP backends loaded on first use.
+openpyxl, reportlab, weasyprint, matplotlib and requests dominate worker start-up;
+views hold lazy handles to them so the import happens on the first export or
+webhook delivery instead of at every boot and management command.
+"""
+
+import importlib
+import logging
+import sys
+import time
+
+logger = logging.getLogger('frontend')
+
+
+class LazyImport:
+    """
+    Stand-in for a module (or a module attribute) that imports it on first use.
+    Attribute access and calls are forwarded to the real object.
+    """
+
+    __slots__ = ('_module_path', '_attr', '_target')
+
+    def __init__(self, module_path, attr=None):
+        self._module_path = module_path
+        self._attr = attr
+        self._target = None
+
+    def _resolve(self):
+        if self._target is None:
+            module = ExportBackends.load_module(self._module_path)
+            self._target = getattr(module, self._attr) if self._attr else module
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __repr__(self):
+        target = f"{self._module_path}.{self._attr}" if self._attr else self._module_path
+        state = 'loaded' if self._target is not None else 'not loaded'
+        return f"<LazyImport {target} ({state})>"
+
+
+class ExportBackends:
+    """Registry of exporter backends, resolved by name on first use"""
+
+    REGISTRY = {
+        'excel': ('frontend.utils.exports', 'ExcelExporter'),
+        'pdf': ('frontend.utils.exports', 'PDFExporter'),
+        'pdf_for_data': ('frontend.utils.exports', 'create_pdf_exporter_for_data'),
+        'weasy': ('frontend.utils.weasy_exporter', 'create_weasy_exporter'),
+        'weasy_for_data': ('frontend.utils.weasy_exporter', 'create_weasy_exporter_for_data'),
+    }
+
+    # Must never be imported while loading settings, models or URLconfs.
+    # requests is lazy here too, but rest_framework.compat imports it on its own.
+    HEAVY_MODULES = ('weasyprint', 'openpyxl', 'reportlab', 'matplotlib')
+
+    @classmethod
+    def load_module(cls, module_path):
+        """Import a module, logging how long a first-time import took"""
+        if module_path in sys.modules:
+            return sys.modules[module_path]
+
+        started = time.perf_counter()
+        module = importlib.import_module(module_path)
+        logger.debug(f"📦 Loaded export backend {module_path} in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return module
+
+    @classmethod
+    def get(cls, name):
+        """The registered backend object, importing it now if needed"""
+        try:
+            module_path, attr = cls.REGISTRY[name]
+        except KeyError:
+            raise ValueError(f"Unknown export backend '{name}'. Available: {', '.join(cls.REGISTRY)}")
+        return getattr(cls.load_module(module_path), attr)
+
+    @classmethod
+    def lazy(cls, name):
+        """A handle to a registered backend that imports it on first use"""
+        if name not in cls.REGISTRY:
+            raise ValueError(f"Unknown export backend '{name}'. Available: {', '.join(cls.REGISTRY)}")
+        return LazyImport(*cls.REGISTRY[name])
@@ -0,0 +1,108 @@
+"""
+Streaming readers for user-supplied CSV/XLSX files (catalog imports, supplier deliveries).
+Rows are yielded one at a time so large files are never held in memory.
+"""
+
+import csv
+import os
+
+
+class TabularFileError(Exception):
+    """Raised when a CSV/XLSX file cannot be read or is missing required columns"""
+
+
+class TabularFileReader:
+    """
+    Iterate (row_num, row_dict) over a CSV or XLSX file.
+
+    Column names are cleaned (quotes, BOM, case) and validated against the
+    required columns; values are returned as stripped strings ('' when empty).
+    CSV encodings are auto-detected for Excel exports with Arabic text.
+    """
+
+    ENCODINGS = ('utf-8-sig', 'utf-8', 'cp1252', 'latin1')
+    XLSX_EXTENSIONS = ('.xlsx', '.xlsm')
+
+    def __init__(self, file_path, required_columns, optional_columns=()):
+        self.file_path = file_path
+        self.required_columns = tuple(required_columns)
+        self.optional_columns = tuple(optional_columns)
+        self.columns = {}
+
+    def has_column(self, name):
+        return name in self.columns
+
+    def __iter__(self):
+        if not os.path.exists(self.file_path):
+            raise TabularFileError(f'File not found: {self.file_path}')
+
+        if os.path.splitext(self.file_path)[1].lower() in self.XLSX_EXTENSIONS:
+            yield from self._iter_xlsx_rows()
+        else:
+            yield from self._iter_csv_rows()
+
+    def _detect_encoding(self):
+        """Find the first encoding that decodes the whole file (streamed, nothing kept in memory)"""
+        for encoding in self.ENCODINGS:
+            try:
+                with open(self.file_path, 'r', encoding=encoding, newline='') as file:
+                    for _ in file:
+                        pass
+                return encoding
+            except UnicodeDecodeError:
+                continue
+        raise TabularFileError(
+            f'Could not read file with any encoding. Tried: {list(self.ENCODINGS)}\n'
+            'Please save your Excel file as "CSV UTF-8" format.'
+        )
+
+    def _iter_csv_rows(self):
+        encoding = self._detect_encoding()
+        with open(self.file_path, 'r', encoding=encoding, newline='') as file:
+            reader = csv.reader(file)
+            self._resolve_columns(next(reader, None))
+            for row_num, values in enumerate(reader, 2):
+                yield row_num, self._row_dict(values)
+
+    def _iter_xlsx_rows(self):
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(self.file_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            self._resolve_columns(next(rows, None))
+            for row_num, values in enumerate(rows, 2):
+                yield row_num, self._row_dict(values)
+        finally:
+            workbook.close()
+
+    def _resolve_columns(self, header):
+        """Map cleaned column names to positions and validate required columns"""
+        if not header:
+            raise TabularFileError('File is empty')
+
+        positions = {}
+        for position, name in enumerate(header):
+            clean_name = str(name or '').strip().strip('"').strip("'").lstrip('﻿').lower()
+            if clean_name:
+                positions.setdefault(clean_name, position)
+
+        missing_columns = set(self.required_columns) - set(positions)
+        if missing_columns:
+            raise TabularFileError(f'Missing columns: {sorted(missing_columns)}')
+
+        self.columns = {
+            name: positions[name]
+            for name in self.required_columns + self.optional_columns
+            if name in positions
+        }
+
+    def _row_dict(self, values):
+        values = list(values or ())
+        row = {}
+        for name, position in self.columns.items():
+            value = values[position] if position < len(values) else None
+            if isinstance(value, float) and value.is_integer():
+                value = int(value)
+            row[name] = '' if value is None else str(value).strip()
+        return row
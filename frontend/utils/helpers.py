@@ -6,6 +6,7 @@ These functions are used throughout export_views.py but were not defined.
 
 from django.utils import timezone
 from datetime import datetime, timedelta
+from decimal import Decimal
 from django.http import HttpResponse
 from transactions.models import InventoryLot
 import logging
@@ -78,27 +79,27 @@ def get_fifo_cost_for_transfer(vessel, product, quantity):
         remaining_quantity__gt=0
     ).order_by('purchase_date', 'created_at')
     
-    remaining_to_transfer = float(quantity)
-    total_cost = 0
+    # Decimal throughout - only the returned unit cost is a float (callers' existing format)
+    remaining_to_transfer = Decimal(str(quantity))
+    total_cost = Decimal('0')
     
     for lot in lots:
         if remaining_to_transfer <= 0:
             break
             
-        available = float(lot.remaining_quantity)
-        to_take = min(available, remaining_to_transfer)
+        to_take = min(Decimal(lot.remaining_quantity), remaining_to_transfer)
         
-        total_cost += to_take * float(lot.purchase_price)
+        total_cost += to_take * lot.purchase_price
         remaining_to_transfer -= to_take
     
     if remaining_to_transfer > 0:
         # Not enough inventory, use product's purchase price as fallback
         if hasattr(product, 'purchase_price'):
-            total_cost += remaining_to_transfer * float(product.purchase_price)
+            total_cost += remaining_to_transfer * (product.purchase_price or Decimal('0'))
         else:
-            total_cost += remaining_to_transfer * float(product.cost_price or 0)
+            total_cost += remaining_to_transfer * Decimal(str(product.cost_price or 0))
     
-    return total_cost / float(quantity) if quantity > 0 else 0
+    return float(total_cost / Decimal(str(quantity))) if quantity > 0 else 0
 
 def calculate_transfer_amounts(transaction):
     """Calculate proper amounts for transfer transactions using FIFO"""
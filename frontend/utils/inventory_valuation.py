@@ -0,0 +1,180 @@
+"""
+Vectorized point-in-time inventory valuation.
+Loads a vessel's whole supply and consumption history in two queries and replays
+FIFO for every product (and every requested date) at once with NumPy.
+"""
+
+import calendar
+from datetime import date
+from decimal import Decimal
+
+import numpy as np
+
+from django.db.models import Sum
+
+MILLI = 1000  # quantities have 3 decimal places - work in exact integer milli-units
+
+
+class VesselLedger:
+    """
+    Column arrays for one vessel's history.
+
+    Lots are ordered (product, transaction_date, created_at), so each product
+    owns one contiguous segment and the lots existing at any date form a
+    prefix of that segment. ``lot_cum_end`` is the cumulative quantity within
+    the product segment up to and including each lot.
+    """
+
+    __slots__ = ('vessel_id', 'product_ids', 'segment_starts', 'lot_product', 'lot_date',
+                 'lot_qty', 'lot_price', 'lot_cum_end', 'use_product', 'use_date', 'use_qty')
+
+    def __init__(self, vessel_id, supplies, consumptions):
+        self.vessel_id = vessel_id
+
+        if supplies:
+            product_col, date_col, qty_col, price_col = zip(*supplies)
+        else:
+            product_col = date_col = qty_col = price_col = ()
+
+        lot_product_ids = np.fromiter(product_col, dtype=np.int64, count=len(product_col))
+        self.product_ids, self.segment_starts, self.lot_product = np.unique(
+            lot_product_ids, return_index=True, return_inverse=True
+        )
+        self.lot_date = np.fromiter((d.toordinal() for d in date_col), dtype=np.int64, count=len(date_col))
+        self.lot_qty = np.fromiter((int(q * MILLI) for q in qty_col), dtype=np.int64, count=len(qty_col))
+        self.lot_price = np.fromiter((float(p or 0) for p in price_col), dtype=np.float64, count=len(price_col))
+
+        # Cumulative quantity within each product segment
+        running = np.cumsum(self.lot_qty)
+        segment_offset = np.zeros(len(self.product_ids), dtype=np.int64)
+        if len(self.product_ids):
+            segment_offset[1:] = running[self.segment_starts[1:] - 1]
+        self.lot_cum_end = running - segment_offset[self.lot_product] if len(running) else running
+
+        # Consumption of products that never had stock on this vessel cannot affect valuation
+        stocked = set(self.product_ids.tolist())
+        consumptions = [row for row in consumptions if row[0] in stocked]
+        use_product_ids = np.fromiter((row[0] for row in consumptions), dtype=np.int64, count=len(consumptions))
+        self.use_product = np.searchsorted(self.product_ids, use_product_ids)
+        self.use_date = np.fromiter((row[1].toordinal() for row in consumptions), dtype=np.int64, count=len(consumptions))
+        self.use_qty = np.fromiter((int(row[2] * MILLI) for row in consumptions), dtype=np.int64, count=len(consumptions))
+
+    def value_at(self, dates):
+        """
+        FIFO quantity and value per product for each date.
+
+        Args:
+            dates: sorted numpy array of date ordinals
+
+        Returns:
+            (quantities, values): arrays shaped (len(dates), len(product_ids)),
+            quantities in milli-units
+        """
+        n_dates, n_products = len(dates), len(self.product_ids)
+        quantities = np.zeros((n_dates, n_products), dtype=np.int64)
+        values = np.zeros((n_dates, n_products), dtype=np.float64)
+        if not n_dates or not n_products:
+            return quantities, values
+
+        # Consumed to date per product: scatter each row to the first date it counts for, then cumsum
+        first_date = np.searchsorted(dates, self.use_date, side='left')
+        counted = first_date < n_dates
+        consumed = np.zeros((n_dates, n_products), dtype=np.int64)
+        np.add.at(consumed, (first_date[counted], self.use_product[counted]), self.use_qty[counted])
+        np.cumsum(consumed, axis=0, out=consumed)
+
+        # FIFO: everything consumed comes off the oldest lots, so a lot keeps whatever
+        # part of it lies above the consumed total of its product
+        chunk = max(1, InventoryValuationHelper.MAX_MATRIX_CELLS // len(self.lot_qty))
+        for offset in range(0, n_dates, chunk):
+            window = slice(offset, offset + chunk)
+            remaining = np.clip(
+                self.lot_cum_end[None, :] - consumed[window][:, self.lot_product], 0, self.lot_qty[None, :]
+            )
+            remaining[dates[window][:, None] < self.lot_date[None, :]] = 0
+            quantities[window] = np.add.reduceat(remaining, self.segment_starts, axis=1)
+            values[window] = np.add.reduceat(remaining * self.lot_price[None, :], self.segment_starts, axis=1)
+
+        return quantities, values / MILLI
+
+
+class InventoryValuationHelper:
+    """
+    Whole-vessel FIFO valuation at past dates.
+
+    Equivalent to calling ``get_available_inventory_at_date`` for every
+    product of the vessel, with two queries per vessel instead of two per
+    product and no per-transaction Python loop.
+    """
+
+    SUPPLY_TYPES = ('SUPPLY', 'TRANSFER_IN')
+    CONSUMPTION_TYPES = ('SALE', 'TRANSFER_OUT', 'WASTE')
+    MAX_MATRIX_CELLS = 4_000_000  # dates x lots evaluated per NumPy step
+
+    @classmethod
+    def load_ledger(cls, vessel, up_to=None):
+        """Load supply lots and daily consumption totals of a vessel (two queries)"""
+        from transactions.models import Transaction
+
+        vessel_id = getattr(vessel, 'id', vessel)
+        history = Transaction.objects.filter(vessel_id=vessel_id)
+        if up_to is not None:
+            history = history.filter(transaction_date__lte=up_to)
+
+        supplies = list(
+            history.filter(transaction_type__in=cls.SUPPLY_TYPES).order_by(
+                'product_id', 'transaction_date', 'created_at'
+            ).values_list('product_id', 'transaction_date', 'quantity', 'unit_price')
+        )
+        consumptions = list(
+            history.filter(transaction_type__in=cls.CONSUMPTION_TYPES).values(
+                'product_id', 'transaction_date'
+            ).annotate(total=Sum('quantity')).order_by().values_list('product_id', 'transaction_date', 'total')
+        )
+        return VesselLedger(vessel_id, supplies, consumptions)
+
+    @classmethod
+    def valuate_series(cls, vessel, dates, ledger=None, include_empty=False):
+        """
+        Per-product stock quantity and FIFO value at each date, in one pass.
+
+        Returns:
+            dict: {date: {product_id: {'quantity': Decimal, 'value': Decimal}}}
+        """
+        dates = sorted(set(dates))
+        if not dates:
+            return {}
+        ledger = ledger or cls.load_ledger(vessel, up_to=dates[-1])
+
+        ordinals = np.array([d.toordinal() for d in dates], dtype=np.int64)
+        quantities, values = ledger.value_at(ordinals)
+        product_ids = ledger.product_ids.tolist()
+
+        series = {}
+        for row, target_date in enumerate(dates):
+            snapshot = {}
+            for column, product_id in enumerate(product_ids):
+                quantity = int(quantities[row, column])
+                if quantity or include_empty:
+                    snapshot[product_id] = {
+                        'quantity': Decimal(quantity) / MILLI,
+                        'value': Decimal(str(round(float(values[row, column]), 3))),
+                    }
+            series[target_date] = snapshot
+        return series
+
+    @classmethod
+    def valuate(cls, vessel, as_of, ledger=None):
+        """Per-product stock quantity and FIFO value at one date"""
+        return cls.valuate_series(vessel, [as_of], ledger=ledger)[as_of]
+
+    @staticmethod
+    def month_ends(start, end):
+        """Last day of every month from start's month to end's month; the open month ends at ``end``"""
+        months = []
+        year, month = start.year, start.month
+        while (year, month) <= (end.year, end.month):
+            month_end = date(year, month, calendar.monthrange(year, month)[1])
+            months.append(min(month_end, end))
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return months
@@ -0,0 +1,225 @@
+"""
+Per-user live event channels for the transfer workflow screens.
+Events are published after commit into a shared cache channel (one sequence
+counter plus one key per event), and waiting streams in this process are woken
+directly; streams in other processes pick them up on their next cache poll.
+"""
+
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger('frontend')
+
+
+class LiveEventHub:
+    """
+    Publish/subscribe over per-user cache channels.
+
+    Channel layout (any shared cache backend works - Redis or Memcached in
+    production make the channel visible to every worker process):
+        live_events_seq_{user}          last sequence number (cache.incr)
+        live_events_{user}_{seq}        one event: {'id', 'event', 'data'}
+
+    Sequence numbers double as SSE event ids, so a reconnecting EventSource
+    resumes from Last-Event-ID. Events expire after EVENT_TTL and a reader
+    that fell more than BACKLOG events behind is told to resync instead.
+
+    In-process fan-out: sync waiters block on one threading.Condition and
+    async waiters register an asyncio.Event with their loop; both are woken
+    on every local publish and re-check the cache every POLL_INTERVAL for
+    events published by other processes.
+    """
+
+    SEQ_KEY = 'live_events_seq_{user_id}'
+    EVENT_KEY = 'live_events_{user_id}_{seq}'
+    EVENT_TTL = 600        # 10 minutes - long enough for a reconnect
+    BACKLOG = 100
+    POLL_INTERVAL = 1.0
+    HEARTBEAT = 15         # Comment frame so proxies keep an idle stream open
+    RETRY_MS = 2000        # EventSource reconnect delay after a stream ends
+    ASGI_STREAM_SECONDS = 300
+    WSGI_STREAM_SECONDS = 30
+
+    _condition = threading.Condition()
+    _generation = itertools.count(1)
+    _current_generation = 0
+    _async_waiters = set()
+
+    # ------------------------------------------------------------------
+    # Publishing
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def publish(cls, user_ids, event, data):
+        """Queue an event for each user; sent once the current transaction commits"""
+        user_ids = sorted({user_id for user_id in user_ids if user_id})
+        if user_ids:
+            transaction.on_commit(lambda: cls.send(user_ids, event, data))
+
+    @classmethod
+    def send(cls, user_ids, event, data):
+        """Append an event to each user's channel now and wake local waiters"""
+        sent = 0
+        for user_id in user_ids:
+            try:
+                seq_key = cls.SEQ_KEY.format(user_id=user_id)
+                cache.add(seq_key, 0, timeout=None)
+                seq = cache.incr(seq_key)
+                cache.set(
+                    cls.EVENT_KEY.format(user_id=user_id, seq=seq),
+                    {'id': seq, 'event': event, 'data': data},
+                    cls.EVENT_TTL
+                )
+                sent += 1
+            except Exception as e:
+                # Runs after commit: a cache error must not fail the committed write
+                logger.warning(f"Live event '{event}' not published for user {user_id}: {e}")
+        if sent:
+            cls._wake()
+        return sent
+
+    @classmethod
+    def _wake(cls):
+        with cls._condition:
+            cls._current_generation = next(cls._generation)
+            cls._condition.notify_all()
+            waiters = list(cls._async_waiters)
+        for loop, wake in waiters:
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass  # Loop already closed - the waiter is on its way out
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def latest_id(cls, user_id):
+        """Current sequence number of a user's channel (0 when empty)"""
+        return cache.get(cls.SEQ_KEY.format(user_id=user_id)) or 0
+
+    @classmethod
+    async def alatest_id(cls, user_id):
+        return await cache.aget(cls.SEQ_KEY.format(user_id=user_id)) or 0
+
+    @classmethod
+    def read(cls, user_id, since):
+        """
+        Events after sequence number since, oldest first.
+
+        Returns:
+            tuple: (events, last_id, resync) - resync is True when events were
+            lost (reader too far behind, or the channel was reset) and the
+            client should reload its state rather than trust the deltas
+        """
+        last_id = cls.latest_id(user_id)
+        resync = False
+        if since > last_id:
+            # Channel reset (cache flushed or evicted) - everything left is new
+            since, resync = 0, True
+        if last_id - since > cls.BACKLOG:
+            since, resync = last_id - cls.BACKLOG, True
+        if last_id == since:
+            return [], last_id, resync
+
+        keys = [cls.EVENT_KEY.format(user_id=user_id, seq=seq) for seq in range(since + 1, last_id + 1)]
+        found = cache.get_many(keys)
+        events = [found[key] for key in keys if key in found]
+        if len(events) < len(keys) and not resync:
+            resync = since > 0 and keys[0] not in found
+        return events, last_id, resync
+
+    @classmethod
+    def wait(cls, user_id, since, timeout):
+        """Block until events after since exist or timeout passes; returns read()"""
+        deadline = time.monotonic() + timeout
+        while True:
+            with cls._condition:
+                generation = cls._current_generation
+            result = cls.read(user_id, since)
+            remaining = deadline - time.monotonic()
+            if result[0] or result[2] or remaining <= 0:
+                return result
+            with cls._condition:
+                if cls._current_generation == generation:
+                    cls._condition.wait(min(cls.POLL_INTERVAL, remaining))
+
+    @classmethod
+    async def await_events(cls, user_id, since, timeout):
+        """Async wait(): the event loop stays free while the stream is idle"""
+        from asgiref.sync import sync_to_async
+
+        loop = asyncio.get_running_loop()
+        waiter = (loop, asyncio.Event())
+        with cls._condition:
+            cls._async_waiters.add(waiter)
+        try:
+            deadline = time.monotonic() + timeout
+            while True:
+                waiter[1].clear()
+                result = await sync_to_async(cls.read, thread_sensitive=False)(user_id, since)
+                remaining = deadline - time.monotonic()
+                if result[0] or result[2] or remaining <= 0:
+                    return result
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), min(cls.POLL_INTERVAL, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with cls._condition:
+                cls._async_waiters.discard(waiter)
+
+    # ------------------------------------------------------------------
+    # Server-sent events
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def sse_frame(event, data, event_id=None):
+        lines = [f'id: {event_id}'] if event_id is not None else []
+        lines.append(f'event: {event}')
+        lines.append(f'data: {json.dumps(data, default=str)}')
+        return '\n'.join(lines) + '\n\n'
+
+    @classmethod
+    def _frames(cls, events, last_id, resync):
+        if resync:
+            yield cls.sse_frame('resync', {}, last_id)
+        for item in events:
+            yield cls.sse_frame(item['event'], item['data'], item['id'])
+
+    @classmethod
+    def stream(cls, user_id, since, duration, snapshot=None):
+        """SSE frames for `duration` seconds (sync - holds the worker thread)"""
+        yield f'retry: {cls.RETRY_MS}\n\n'
+        if snapshot is not None:
+            yield cls.sse_frame('snapshot', snapshot, since)
+        deadline = time.monotonic() + duration
+        while (remaining := deadline - time.monotonic()) > 0:
+            events, last_id, resync = cls.wait(user_id, since, min(cls.HEARTBEAT, remaining))
+            if not events and not resync:
+                yield ': keepalive\n\n'
+            yield from cls._frames(events, last_id, resync)
+            since = last_id
+
+    @classmethod
+    async def astream(cls, user_id, since, duration, snapshot=None):
+        """Async stream(): many idle streams share one event loop under ASGI"""
+        yield f'retry: {cls.RETRY_MS}\n\n'
+        if snapshot is not None:
+            yield cls.sse_frame('snapshot', snapshot, since)
+        deadline = time.monotonic() + duration
+        while (remaining := deadline - time.monotonic()) > 0:
+            events, last_id, resync = await cls.await_events(user_id, since, min(cls.HEARTBEAT, remaining))
+            if not events and not resync:
+                yield ': keepalive\n\n'
+            for frame in cls._frames(events, last_id, resync):
+                yield frame
+            since = last_id
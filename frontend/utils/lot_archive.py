@@ -0,0 +1,174 @@
+"""
+Inventory lot lifecycle: move exhausted lots to InventoryLotArchive and back.
+Keeps the hot InventoryLot table (and its FIFO indexes) sized to open stock plus recent history.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger('transactions')
+
+
+class InventoryLotArchiveHelper:
+    """
+    Archive and restore exhausted inventory lots.
+
+    Archived rows keep their original id, so FIFOConsumption and
+    InventoryEvent references resolve again as soon as a lot is restored.
+    Lots referenced by a transfer workflow status are never archived.
+
+    Until then those references point at no InventoryLot row:
+    select_related('inventory_lot') (an INNER JOIN) silently drops them and
+    .inventory_lot raises. Readers of consumption/event history use
+    resolve_lots(), or the plain inventory_lot_id, instead.
+    """
+
+    RETENTION_DAYS = 90
+    BATCH_SIZE = 1000
+
+    LOT_FIELDS = ('id', 'vessel_id', 'product_id', 'purchase_date', 'purchase_price',
+                  'original_quantity', 'created_at', 'created_by_id')
+
+    @classmethod
+    def archivable_lots(cls, retention_days=None, vessel=None):
+        """Exhausted lots whose purchase date is older than the retention window"""
+        from transactions.models import InventoryLot
+
+        if retention_days is None:
+            retention_days = cls.RETENTION_DAYS
+        cutoff = timezone.now().date() - timedelta(days=retention_days)
+
+        lots = InventoryLot.objects.filter(
+            remaining_quantity=0,
+            purchase_date__lt=cutoff,
+            transfer_statuses__isnull=True
+        )
+        if vessel is not None:
+            lots = lots.filter(vessel=vessel)
+        return lots
+
+    @classmethod
+    def archive_exhausted_lots(cls, retention_days=None, vessel=None, batch_size=None, dry_run=False):
+        """
+        Move archivable lots to InventoryLotArchive in batches.
+
+        Returns:
+            int: number of lots archived (or that would be archived on a dry run)
+        """
+        from transactions.models import InventoryLot, InventoryLotArchive
+
+        lots = cls.archivable_lots(retention_days, vessel)
+        if dry_run:
+            return lots.count()
+
+        batch_size = batch_size or cls.BATCH_SIZE
+        archived = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    lots.select_for_update().order_by('id').values(*cls.LOT_FIELDS)[:batch_size]
+                )
+                if not batch:
+                    break
+                InventoryLotArchive.objects.bulk_create([InventoryLotArchive(**row) for row in batch])
+                # PROTECT on the FIFO/event references is intentional for live deletes; archived
+                # lots keep their id, so skip the delete collector for the move
+                InventoryLot.objects.filter(id__in=[row['id'] for row in batch])._raw_delete(InventoryLot.objects.db)
+            archived += len(batch)
+            if len(batch) < batch_size:
+                break
+
+        if archived:
+            logger.info(f"Archived {archived} exhausted inventory lots")
+        return archived
+
+    @classmethod
+    def resolve_lots(cls, lot_ids):
+        """
+        Map lot ids to their InventoryLot, or InventoryLotArchive row once archived.
+        Both carry vessel, product, purchase_date, purchase_price, original_quantity
+        and created_at. Ids found in neither table are left out.
+        """
+        from transactions.models import InventoryLot, InventoryLotArchive
+
+        lot_ids = set(lot_ids)
+        lots = InventoryLot.objects.in_bulk(lot_ids)
+        missing = lot_ids - lots.keys()
+        if missing:
+            lots.update(InventoryLotArchive.objects.in_bulk(missing))
+        return lots
+
+    @classmethod
+    def restore_lots(cls, lot_ids):
+        """
+        Move archived lots back into InventoryLot with their original ids.
+
+        Returns:
+            int: number of lots restored (ids that are not archived are ignored)
+        """
+        from transactions.models import InventoryLot, InventoryLotArchive
+
+        lot_ids = set(lot_ids)
+        if not lot_ids:
+            return 0
+
+        with transaction.atomic():
+            archived = list(InventoryLotArchive.objects.select_for_update().filter(id__in=lot_ids))
+            if not archived:
+                return 0
+
+            lots = [
+                InventoryLot(
+                    id=row.id,
+                    vessel_id=row.vessel_id,
+                    product_id=row.product_id,
+                    purchase_date=row.purchase_date,
+                    purchase_price=row.purchase_price,
+                    original_quantity=row.original_quantity,
+                    remaining_quantity=0,
+                    created_by_id=row.created_by_id,
+                )
+                for row in archived
+            ]
+            InventoryLot.objects.bulk_create(lots)
+            # auto_now_add stamps created_at on insert - put the original FIFO tie-breaker back
+            created_at = {row.id: row.created_at for row in archived}
+            for lot in lots:
+                lot.created_at = created_at[lot.id]
+            InventoryLot.objects.bulk_update(lots, ['created_at'])
+            InventoryLotArchive.objects.filter(id__in=[row.id for row in archived]).delete()
+
+        logger.info(f"Restored {len(archived)} archived inventory lots")
+        return len(archived)
+
+    @classmethod
+    def restore_for_transaction(cls, txn):
+        """Bring back every archived lot a transaction consumed from"""
+        return cls.restore_for_transactions([txn.id])
+
+    @classmethod
+    def restore_for_transactions(cls, transaction_ids):
+        """Bring back every archived lot any of the transactions consumed from (one lookup)"""
+        from transactions.models import FIFOConsumption, InventoryLotArchive
+
+        lot_ids = FIFOConsumption.objects.filter(transaction_id__in=transaction_ids).values_list('inventory_lot_id', flat=True)
+        archived_ids = InventoryLotArchive.objects.filter(id__in=lot_ids).values_list('id', flat=True)
+        return cls.restore_lots(archived_ids)
+
+    @classmethod
+    def restore_matching(cls, vessel, product, limit=None, **lot_filters):
+        """
+        Bring back archived lots of a vessel/product matching extra filters
+        (e.g. purchase_date / purchase_price), oldest first, at most ``limit`` lots.
+        """
+        from transactions.models import InventoryLotArchive
+
+        archived_ids = InventoryLotArchive.objects.filter(
+            vessel=vessel, product=product, **lot_filters
+        ).order_by('purchase_date', 'created_at').values_list('id', flat=True)
+        if limit is not None:
+            archived_ids = archived_ids[:limit]
+        return cls.restore_lots(list(archived_ids))
@@ -0,0 +1,372 @@
+"""
+In-process metrics: counters and latency histograms for cache, request and SQL timings.
+Each worker keeps its own numbers in memory and periodically writes a snapshot file;
+the /metrics endpoint sums every worker's snapshot into Prometheus text format.
+"""
+
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.locmem import LocMemCache
+
+logger = logging.getLogger('frontend')
+
+
+# Cache key prefixes → family label (first match wins)
+KEY_FAMILIES = (
+    ('pos_index', 'product'),
+    ('product', 'product'),
+    ('all_products', 'product'),
+    ('pricing', 'product'),
+    ('perfect_', 'product'),
+    ('category', 'product'),
+    ('active_categories', 'product'),
+    ('trip', 'trip'),
+    ('recent_trips', 'trip'),
+    ('completed_trip', 'trip'),
+    ('po_', 'po'),
+    ('recent_pos', 'po'),
+    ('completed_po', 'po'),
+    ('transfer', 'transfer'),
+    ('recent_transfers', 'transfer'),
+    ('completed_transfer', 'transfer'),
+    ('waste', 'waste'),
+    ('recent_wastes', 'waste'),
+    ('completed_waste', 'waste'),
+    ('vessel_price_map', 'product'),
+    ('vessel', 'vessel'),
+    ('active_vessels', 'vessel'),
+    ('all_vessels', 'vessel'),
+    ('user_vessel', 'vessel'),
+    ('touristic_vessels', 'vessel'),
+    ('reports_dashboard', 'report'),
+    ('daily_report', 'report'),
+    ('monthly_report', 'report'),
+    ('ratelimit', 'ratelimit'),
+    ('axes', 'ratelimit'),
+)
+
+_FAMILY_PATTERN = re.compile('|'.join(f'(?P<f{i}>{re.escape(prefix)})' for i, (prefix, _) in enumerate(KEY_FAMILIES)))
+_FAMILY_BY_GROUP = {f'f{i}': family for i, (_, family) in enumerate(KEY_FAMILIES)}
+
+
+def key_family(key):
+    """Low-cardinality family label for a cache key"""
+    match = _FAMILY_PATTERN.match(str(key))
+    return _FAMILY_BY_GROUP[match.lastgroup] if match else 'other'
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """
+    Process-wide counters and fixed-bucket histograms.
+
+    Recording is a dict update under a lock - no cache or database round trips.
+    Label sets are small tuples, so snapshots stay a few KB per worker.
+    """
+
+    # Seconds - wide enough for a cache hit (~µs) and a slow report (~s)
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    # Histograms of counts rather than durations
+    COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+    BYTE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+    METRIC_BUCKETS = {'db_queries_per_request': COUNT_BUCKETS, 'cache_payload_bytes': BYTE_BUCKETS}
+    FLUSH_INTERVAL = 5  # seconds between snapshot writes per worker
+    # Where PIDs can't be probed, a snapshot this old belongs to a gone worker
+    STALE_AFTER = FLUSH_INTERVAL * 12
+
+    HELP = {
+        'cache_operations_total': 'Cache backend operations by key family, operation and result',
+        'cache_operation_duration_seconds': 'Cache backend operation latency by key family and operation',
+        'cache_helper_operations_total': 'Cache helper lookups by helper operation and result',
+        'cache_helper_duration_seconds': 'Cache helper lookup latency by helper operation',
+        'cached_computation_total': 'Stampede-protected cache reads by key family and outcome',
+        'cache_payload_bytes': 'Encoded cache payload size by key family and encoding',
+        'cache_codec_duration_seconds': 'Cache payload encode/decode time by key family',
+        'http_requests_total': 'HTTP requests by view, method and status class',
+        'http_request_duration_seconds': 'HTTP request latency by view',
+        'db_queries_total': 'SQL statements executed during requests by statement kind',
+        'db_query_duration_seconds': 'SQL statement latency by statement kind',
+        'db_queries_per_request': 'SQL statements per request by view',
+    }
+
+    _lock = threading.Lock()
+    _counters = {}
+    _histograms = {}
+    _last_flush = 0.0
+    _owner_pid = None
+
+    @classmethod
+    def inc(cls, name, labels, value=1):
+        key = (name, labels)
+        with cls._lock:
+            cls._counters[key] = cls._counters.get(key, 0) + value
+
+    @classmethod
+    def observe(cls, name, labels, value):
+        key = (name, labels)
+        buckets = cls.METRIC_BUCKETS.get(name, cls.BUCKETS)
+        index = bisect_left(buckets, value)
+        with cls._lock:
+            histogram = cls._histograms.get(key)
+            if histogram is None:
+                histogram = cls._histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    @classmethod
+    def record(cls, counter_name, counter_labels, histogram_name, histogram_labels, value):
+        """inc() and observe() under one lock acquisition (hot path for cache calls)"""
+        counter_key = (counter_name, counter_labels)
+        histogram_key = (histogram_name, histogram_labels)
+        index = bisect_left(cls.BUCKETS, value)
+        with cls._lock:
+            cls._counters[counter_key] = cls._counters.get(counter_key, 0) + 1
+            histogram = cls._histograms.get(histogram_key)
+            if histogram is None:
+                histogram = cls._histograms[histogram_key] = [[0] * (len(cls.BUCKETS) + 1), 0.0, 0]
+            histogram[0][index] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    @classmethod
+    def reset(cls):
+        """Drop this process's numbers (tests)"""
+        with cls._lock:
+            cls._counters.clear()
+            cls._histograms.clear()
+
+    @classmethod
+    def snapshot(cls):
+        """JSON-serializable copy of this process's metrics"""
+        with cls._lock:
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in cls._counters.items()],
+                'histograms': [
+                    [name, list(labels), list(buckets), total, count]
+                    for (name, labels), (buckets, total, count) in cls._histograms.items()
+                ],
+            }
+
+    # ------------------------------------------------------------------
+    # Cross-worker aggregation
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def metrics_dir(cls):
+        from django.conf import settings
+        return str(getattr(settings, 'METRICS_DIR', '') or '')
+
+    @classmethod
+    def snapshot_path(cls, pid=None):
+        directory = cls.metrics_dir()
+        return os.path.join(directory, f'{pid or os.getpid()}.json') if directory else ''
+
+    @classmethod
+    def claim(cls):
+        """
+        Once per process (and again after a fork): a snapshot file already named
+        after this PID was left by a dead worker whose PID got reused - drop it
+        so other workers don't count it as ours. Our own file goes at exit.
+        """
+        pid = os.getpid()
+        if cls._owner_pid == pid:
+            return
+        cls._owner_pid = pid
+        cls._last_flush = 0.0
+        cls.discard()
+        atexit.register(cls.discard)
+
+    @classmethod
+    def discard(cls):
+        """Remove this process's snapshot file"""
+        path = cls.snapshot_path()
+        if path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _pid_alive(pid):
+        """True/False on POSIX; None where the PID can't be probed safely"""
+        if os.name != 'posix':
+            return None  # os.kill(pid, 0) terminates the process on Windows
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True  # Alive, owned by another user
+        except OSError:
+            return None
+        return True
+
+    @classmethod
+    def _is_stale(cls, path, filename):
+        try:
+            pid = int(filename[:-len('.json')])
+        except ValueError:
+            return True
+        alive = cls._pid_alive(pid)
+        if alive is not None:
+            return not alive
+        try:
+            return time.time() - os.path.getmtime(path) > cls.STALE_AFTER
+        except OSError:
+            return True
+
+    @classmethod
+    def flush(cls, force=False):
+        """Write this worker's snapshot if FLUSH_INTERVAL has passed (atomic replace)"""
+        cls.claim()
+        directory = cls.metrics_dir()
+        now = time.monotonic()
+        if not directory or (not force and now - cls._last_flush < cls.FLUSH_INTERVAL):
+            return False
+        cls._last_flush = now
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+            path = cls.snapshot_path()
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(cls.snapshot(), f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+            return True
+        except OSError as e:
+            logger.debug(f"Metrics flush failed: {e}")
+            return False
+
+    @classmethod
+    def collect(cls):
+        """
+        Merge every live worker's snapshot (this process's live numbers included).
+        Snapshots of workers that have exited are skipped and removed, so a
+        restart doesn't leave the dead worker's counters in the totals.
+
+        Returns:
+            tuple: ({(name, labels): value}, {(name, labels): [buckets, sum, count]})
+        """
+        snapshots = []
+        directory = cls.metrics_dir()
+        own_file = f'{os.getpid()}.json'
+        if directory and os.path.isdir(directory):
+            for filename in os.listdir(directory):
+                if not filename.endswith('.json') or filename == own_file:
+                    continue
+                path = os.path.join(directory, filename)
+                if cls._is_stale(path, filename):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                try:
+                    with open(path) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        snapshots.append(cls.snapshot())
+
+        counters, histograms = {}, {}
+        for snapshot in snapshots:
+            for name, labels, value in snapshot.get('counters', []):
+                key = (name, tuple(tuple(pair) for pair in labels))
+                counters[key] = counters.get(key, 0) + value
+            for name, labels, buckets, total, count in snapshot.get('histograms', []):
+                key = (name, tuple(tuple(pair) for pair in labels))
+                merged = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+                merged[1] += total
+                merged[2] += count
+        return counters, histograms
+
+    @classmethod
+    def render_prometheus(cls):
+        """Prometheus text exposition (version 0.0.4) of the merged metrics"""
+        counters, histograms = cls.collect()
+        lines = []
+
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            return '{' + ','.join(f'{k}="{_escape_label(v)}"' for k, v in pairs) + '}'
+
+        for name in sorted({name for name, _ in counters}):
+            lines.append(f'# HELP {name} {cls.HELP.get(name, name)}')
+            lines.append(f'# TYPE {name} counter')
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{label_text(labels)} {value}')
+
+        for name in sorted({name for name, _ in histograms}):
+            lines.append(f'# HELP {name} {cls.HELP.get(name, name)}')
+            lines.append(f'# TYPE {name} histogram')
+            for (metric, labels), (buckets, total, count) in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                bounds = cls.METRIC_BUCKETS.get(name, cls.BUCKETS) + ('+Inf',)
+                for bound, bucket_count in zip(bounds, buckets):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{label_text(labels, [("le", bound)])} {cumulative}')
+                lines.append(f'{name}_sum{label_text(labels)} {round(total, 6)}')
+                lines.append(f'{name}_count{label_text(labels)} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+
+class InstrumentedLocMemCache(LocMemCache):
+    """
+    LocMemCache that records hits, misses, sets and latency per key family.
+    Drop-in for the default backend; the overhead is one perf_counter pair per call.
+    get_many/get_or_set go through get/add, so they are counted per key.
+    """
+
+    _MISSING = object()
+
+    def _record(self, operation, key, started, result=None):
+        elapsed = time.perf_counter() - started
+        family = key_family(key)
+        MetricsRegistry.record(
+            'cache_operations_total', (('family', family), ('operation', operation), ('result', result or 'ok')),
+            'cache_operation_duration_seconds', (('family', family), ('operation', operation)),
+            elapsed
+        )
+
+    def get(self, key, default=None, version=None):
+        started = time.perf_counter()
+        value = super().get(key, self._MISSING, version)
+        hit = value is not self._MISSING
+        self._record('get', key, started, 'hit' if hit else 'miss')
+        return value if hit else default
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        started = time.perf_counter()
+        super().set(key, value, timeout, version)
+        self._record('set', key, started)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        started = time.perf_counter()
+        added = super().add(key, value, timeout, version)
+        self._record('add', key, started, 'ok' if added else 'exists')
+        return added
+
+    def delete(self, key, version=None):
+        started = time.perf_counter()
+        deleted = super().delete(key, version)
+        self._record('delete', key, started, 'ok' if deleted else 'missing')
+        return deleted
@@ -0,0 +1,196 @@
+"""
+Set-based bulk engine for VesselProductPrice upserts and vessel-to-vessel price copies.
+Resolves IDs with one query each, validates in memory and writes with chunked bulk statements.
+"""
+
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger('frontend')
+
+
+class BulkPricingHelper:
+    """
+    Bulk vessel pricing operations.
+
+    Every operation runs in one atomic block, issues a constant number of
+    lookup queries plus chunked bulk_create/bulk_update statements, and
+    invalidates the pricing caches once for the whole batch after it commits.
+    """
+
+    BATCH_SIZE = 500
+
+    @classmethod
+    def apply_price_updates(cls, updates, user=None):
+        """
+        Upsert custom vessel prices.
+
+        Args:
+            updates: iterable of {vessel_id, product_id, price} dicts
+            user: User recorded as created_by
+
+        Returns:
+            tuple: (successful_count, errors) where errors is a list of messages
+        """
+        from vessels.models import Vessel
+        from products.models import Product
+
+        errors = []
+        requested = {}
+        for update in updates:
+            vessel_id = update.get('vessel_id')
+            product_id = update.get('product_id')
+            price = update.get('price')
+            if not all([vessel_id, product_id, price]):
+                errors.append(f"Missing data for update: {update}")
+                continue
+            try:
+                key = (int(vessel_id), int(product_id))
+                price_decimal = Decimal(str(price))
+            except (InvalidOperation, ValueError, TypeError):
+                errors.append(f"Invalid data for update: {update}")
+                continue
+            # Last entry wins for repeated vessel/product pairs
+            requested[key] = price_decimal
+
+        if not requested:
+            return 0, errors
+
+        vessels = Vessel.objects.in_bulk({vessel_id for vessel_id, _ in requested})
+        products = Product.objects.in_bulk({product_id for _, product_id in requested})
+
+        prices = {}
+        for (vessel_id, product_id), price_decimal in requested.items():
+            vessel = vessels.get(vessel_id)
+            product = products.get(product_id)
+            if vessel is None or product is None:
+                errors.append(f"Vessel or product not found: vessel {vessel_id}, product {product_id}")
+                continue
+            if vessel.has_duty_free or product.is_duty_free:
+                errors.append(f"Invalid vessel-product combination: {vessel.name} - {product.name}")
+                continue
+            if price_decimal <= 0:
+                errors.append(f"Invalid price for {product.name}: {price_decimal}")
+                continue
+            prices[(vessel_id, product_id)] = price_decimal
+
+        created, updated = cls._upsert_prices(prices, user)
+        return created + updated, errors
+
+    @classmethod
+    def copy_prices(cls, source_vessel, target_vessels, overwrite=False, user=None):
+        """
+        Copy all custom prices from one vessel to others.
+
+        Returns:
+            dict: copied_count, skipped_count and invalid target vessel names
+        """
+        from transactions.models import VesselProductPrice
+
+        source_prices = dict(
+            VesselProductPrice.objects.filter(vessel=source_vessel).values_list('product_id', 'selling_price')
+        )
+
+        valid_targets = [v for v in target_vessels if not v.has_duty_free and v.id != source_vessel.id]
+        invalid_targets = [v.name for v in target_vessels if v.has_duty_free]
+
+        existing = set()
+        if source_prices and valid_targets:
+            existing = set(
+                VesselProductPrice.objects.filter(
+                    vessel_id__in=[v.id for v in valid_targets],
+                    product_id__in=list(source_prices)
+                ).values_list('vessel_id', 'product_id')
+            )
+
+        prices = {}
+        skipped_count = 0
+        for vessel in valid_targets:
+            for product_id, selling_price in source_prices.items():
+                if (vessel.id, product_id) in existing and not overwrite:
+                    skipped_count += 1
+                    continue
+                prices[(vessel.id, product_id)] = selling_price
+
+        created, updated = cls._upsert_prices(prices, user)
+        return {
+            'source_count': len(source_prices),
+            'copied_count': created + updated,
+            'skipped_count': skipped_count,
+            'invalid_targets': invalid_targets,
+        }
+
+    @classmethod
+    def _upsert_prices(cls, prices, user):
+        """
+        Write {(vessel_id, product_id): price} with one lookup and chunked bulk statements.
+
+        Returns:
+            tuple: (created_count, updated_count)
+        """
+        from transactions.models import VesselProductPrice
+
+        if not prices:
+            return 0, 0
+
+        vessel_ids = {vessel_id for vessel_id, _ in prices}
+        product_ids = {product_id for _, product_id in prices}
+
+        now = timezone.now()
+        with transaction.atomic():
+            existing = {
+                (price.vessel_id, price.product_id): price
+                for price in VesselProductPrice.objects.select_for_update().filter(
+                    vessel_id__in=vessel_ids, product_id__in=product_ids
+                )
+                if (price.vessel_id, price.product_id) in prices
+            }
+
+            to_update = []
+            to_create = []
+            for (vessel_id, product_id), selling_price in prices.items():
+                price = existing.get((vessel_id, product_id))
+                if price is None:
+                    to_create.append(VesselProductPrice(
+                        vessel_id=vessel_id,
+                        product_id=product_id,
+                        selling_price=selling_price,
+                        created_by=user
+                    ))
+                else:
+                    price.selling_price = selling_price
+                    price.created_by = user
+                    price.updated_at = now
+                    to_update.append(price)
+
+            VesselProductPrice.objects.bulk_create(to_create, batch_size=cls.BATCH_SIZE)
+            VesselProductPrice.objects.bulk_update(
+                to_update, ['selling_price', 'created_by', 'updated_at'], batch_size=cls.BATCH_SIZE
+            )
+            cls.invalidate_pricing_caches(prices.keys())
+
+        logger.info(f"Bulk pricing: {len(to_create)} created, {len(to_update)} updated across {len(vessel_ids)} vessels")
+        return len(to_create), len(to_update)
+
+    @classmethod
+    def invalidate_pricing_caches(cls, vessel_product_pairs):
+        """
+        Invalidate pricing caches once for a whole batch, after the caller's
+        transaction commits (same path as VesselProductPrice.save/delete)
+        """
+        from frontend.utils.cache_helpers import ProductCacheHelper, VesselPricingCacheHelper
+        from frontend.utils.cache_invalidation import CacheInvalidationCollector
+        from frontend.utils.pricing_completeness import PricingCompletenessHelper
+
+        CacheInvalidationCollector.defer(ProductCacheHelper.clear_cache_after_product_update)
+        CacheInvalidationCollector.defer(PricingCompletenessHelper.invalidate)
+
+        products_by_vessel = {}
+        for vessel_id, product_id in vessel_product_pairs:
+            products_by_vessel.setdefault(vessel_id, []).append(product_id)
+        for vessel_id, product_ids in products_by_vessel.items():
+            CacheInvalidationCollector.defer(VesselPricingCacheHelper.invalidate_vessel, vessel_id)
+            CacheInvalidationCollector.defer_stock_changed(vessel_id, product_ids)
@@ -0,0 +1,158 @@
+"""
+Vessel × product pricing completeness matrix.
+Built with one query and cached as per-vessel bitsets; price changes drop it after commit.
+"""
+
+import logging
+import time
+
+from django.core.cache import cache
+
+logger = logging.getLogger('frontend')
+
+
+class PricingCompletenessMatrix:
+    """
+    Coverage of custom prices over active general (non-duty-free) products.
+
+    Products get a fixed ordinal; each vessel row is a Python int whose bit
+    ``ordinal`` is set when the vessel has a custom price for that product.
+    Rows exist for every vessel with at least one custom price, so callers
+    pick the touristic vessels they care about.
+    """
+
+    __slots__ = ('products', 'ordinals', 'rows', 'full_mask')
+
+    def __init__(self, products, rows):
+        self.products = products  # tuple of (id, name, item_id) ordered by ordinal
+        self.ordinals = {product[0]: ordinal for ordinal, product in enumerate(products)}
+        self.rows = rows
+        self.full_mask = (1 << len(products)) - 1
+
+    def __getstate__(self):
+        return {'products': self.products, 'rows': self.rows}
+
+    def __setstate__(self, state):
+        self.__init__(state['products'], state['rows'])
+
+    @property
+    def total_products(self):
+        return len(self.products)
+
+    def priced_count(self, vessel_id):
+        return self.rows.get(vessel_id, 0).bit_count()
+
+    def missing_count(self, vessel_id):
+        return self.total_products - self.priced_count(vessel_id)
+
+    def is_priced(self, vessel_id, product_id):
+        ordinal = self.ordinals.get(product_id)
+        return ordinal is not None and bool(self.rows.get(vessel_id, 0) >> ordinal & 1)
+
+    def missing_products(self, vessel_id):
+        """List of {id, name, item_id} for products the vessel has no custom price for"""
+        missing_mask = ~self.rows.get(vessel_id, 0) & self.full_mask
+        missing = []
+        while missing_mask:
+            lowest = missing_mask & -missing_mask
+            product_id, name, item_id = self.products[lowest.bit_length() - 1]
+            missing.append({'id': product_id, 'name': name, 'item_id': item_id})
+            missing_mask ^= lowest
+        return missing
+
+    def product_coverage(self, vessel_ids):
+        """{product_id: number of the given vessels with a custom price}"""
+        masks = [self.rows.get(vessel_id, 0) for vessel_id in vessel_ids]
+        coverage = {}
+        for ordinal, product in enumerate(self.products):
+            coverage[product[0]] = sum(mask >> ordinal & 1 for mask in masks)
+        return coverage
+
+    def set_priced(self, vessel_id, product_id, priced):
+        """Flip one cell; returns False when the product is outside the matrix"""
+        ordinal = self.ordinals.get(product_id)
+        if ordinal is None:
+            return False
+        row = self.rows.get(vessel_id, 0)
+        if priced:
+            row |= 1 << ordinal
+        else:
+            row &= ~(1 << ordinal)
+        self.rows[vessel_id] = row
+        return True
+
+
+class PricingCompletenessHelper:
+    """
+    🚀 Cached pricing completeness matrix.
+
+    Keyed on the VesselPricingCacheHelper global version, so product saves
+    (active / duty-free flags, names) trigger a full rebuild; custom price
+    saves and deletes drop the current key once they commit.
+    """
+
+    MATRIX_TIMEOUT = 3600  # 1 hour
+
+    @classmethod
+    def get_cache_key(cls):
+        from frontend.utils.cache_helpers import VesselPricingCacheHelper
+        global_version = VesselPricingCacheHelper._get_version(VesselPricingCacheHelper.GLOBAL_VERSION_KEY)
+        return f"pricing_completeness_matrix_g{global_version}"
+
+    @classmethod
+    def get_matrix(cls):
+        """Get the completeness matrix, building it on a cache miss"""
+        from frontend.utils.cache_helpers import CachePerformanceTracker
+
+        cache_key = cls.get_cache_key()
+        matrix = cache.get(cache_key)
+        if matrix is None:
+            matrix = cls._build_matrix()
+            cache.set(cache_key, matrix, cls.MATRIX_TIMEOUT)
+            CachePerformanceTracker.track_operation('pricing_completeness', cache_key, hit=False)
+        else:
+            CachePerformanceTracker.track_operation('pricing_completeness', cache_key, hit=True)
+        return matrix
+
+    @classmethod
+    def _build_matrix(cls):
+        """One grouped query: every general product joined to the vessels that price it"""
+        from django.db.models import Count
+        from products.models import Product
+
+        started = time.monotonic()
+        cells = (
+            Product.objects.filter(active=True, is_duty_free=False)
+            .values_list('id', 'name', 'item_id', 'vessel_prices__vessel_id')
+            .annotate(prices=Count('vessel_prices'))
+            .order_by('id')
+        )
+
+        products = []
+        priced_pairs = []
+        for product_id, name, item_id, vessel_id, _ in cells.iterator(chunk_size=5000):
+            if not products or products[-1][0] != product_id:
+                products.append((product_id, name, item_id))
+            if vessel_id is not None:
+                priced_pairs.append((vessel_id, product_id))
+
+        matrix = PricingCompletenessMatrix(tuple(products), {})
+        for vessel_id, product_id in priced_pairs:
+            matrix.set_priced(vessel_id, product_id, True)
+
+        logger.debug(
+            f"Pricing completeness matrix built: {len(products)} products × {len(matrix.rows)} vessels "
+            f"in {time.monotonic() - started:.3f}s"
+        )
+        return matrix
+
+    @classmethod
+    def invalidate(cls):
+        """
+        Drop the cached matrix; the next read rebuilds it.
+        Price saves, deletes and bulk upserts queue this through
+        CacheInvalidationCollector so it runs only once they commit. Patching
+        the bitsets in place instead would be a non-atomic read-modify-write
+        of the whole matrix, losing bits to concurrent edits.
+        """
+        cache.delete(cls.get_cache_key())
@@ -0,0 +1,477 @@
+"""
+In-memory typeahead and barcode index for the POS entry screens.
+Replaces the per-keystroke lot join with icontains in the *_search_products endpoints.
+"""
+
+import json
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from frontend.utils.sync_journal import SyncJournalHelper
+
+logger = logging.getLogger('frontend')
+
+TOKEN_SPLIT_RE = re.compile(r'[^\w]+', re.UNICODE)
+
+
+class VesselProductIndex:
+    """
+    Versioned index of sellable products for a single vessel.
+
+    Holds one compact entry per product with stock on the vessel plus:
+    - a prefix trie over lowercased name words and item_id
+    - an exact-match hash map for barcodes
+    - the lowercased item_id/barcode of each product for substring matches
+
+    Duty-free products are indexed on every vessel with their is_duty_free
+    flag; sales callers exclude them on vessels without duty-free.
+
+    Instances are process-local and managed by ProductIndexHelper.
+    """
+
+    # Order of values in the compact snapshot rows
+    SNAPSHOT_FIELDS = ['id', 'name', 'item_id', 'barcode', 'is_duty_free', 'stock', 'price', 'is_custom_price', 'cost']
+
+    def __init__(self, vessel_id, version):
+        self.vessel_id = vessel_id
+        self.version = version
+        self.entries = {}
+        self.barcodes = {}
+        self._trie = {}
+        self._tokens = {}
+        self._codes = {}
+        self._snapshot_bytes = None
+
+    # ------------------------------------------------------------------
+    # Mutation
+    # ------------------------------------------------------------------
+
+    def upsert(self, entry):
+        """Insert or replace a product entry and re-index its tokens"""
+        product_id = entry['id']
+        if product_id in self.entries:
+            self.remove(product_id)
+
+        self.entries[product_id] = entry
+        if entry['barcode']:
+            self.barcodes[entry['barcode'].lower()] = product_id
+
+        self._codes[product_id] = f"{entry['item_id']}\n{entry['barcode']}".lower()
+        tokens = self._tokenize(entry)
+        self._tokens[product_id] = tokens
+        for token in tokens:
+            node = self._trie
+            for char in token:
+                node = node.setdefault(char, {})
+                node.setdefault('_ids', set()).add(product_id)
+
+        self._snapshot_bytes = None
+
+    def remove(self, product_id):
+        """Remove a product entry (no-op if missing)"""
+        entry = self.entries.pop(product_id, None)
+        if entry is None:
+            return
+
+        barcode = entry['barcode'].lower()
+        if barcode and self.barcodes.get(barcode) == product_id:
+            del self.barcodes[barcode]
+        self._codes.pop(product_id, None)
+
+        for token in self._tokens.pop(product_id, ()):
+            path = []
+            node = self._trie
+            for char in token:
+                child = node.get(char)
+                if child is None:
+                    break
+                child['_ids'].discard(product_id)
+                path.append((node, char, child))
+                node = child
+
+            # Prune branches that no longer index anything
+            for parent, char, child in reversed(path):
+                if child['_ids'] or len(child) > 1:
+                    break
+                del parent[char]
+
+        self._snapshot_bytes = None
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def search(self, term, limit=None, exclude_duty_free=False):
+        """
+        Return entries matching a search term, ordered by item_id.
+
+        Like the icontains search it replaces, the term matches anywhere in the
+        item_id or barcode. Names match when every word of the term prefixes a
+        word of the name (mid-word name fragments no longer match). An exact
+        barcode hit is listed first.
+        """
+        term = (term or '').strip().lower()
+        if not term:
+            return []
+
+        words = [w for w in TOKEN_SPLIT_RE.split(term) if w]
+        candidate_ids = None
+        for word in words or [term]:
+            ids = self._prefix_ids(word)
+            candidate_ids = ids if candidate_ids is None else candidate_ids & ids
+            if not candidate_ids:
+                break
+
+        matched_ids = set(candidate_ids or ())
+        matched_ids.update(pid for pid, codes in self._codes.items() if term in codes)
+        if exclude_duty_free:
+            matched_ids = {pid for pid in matched_ids if not self.entries[pid]['is_duty_free']}
+
+        barcode_id = self.barcodes.get(term)
+        matched = [barcode_id] if barcode_id in matched_ids else []
+        matched.extend(sorted(
+            (pid for pid in matched_ids if pid != barcode_id),
+            key=lambda pid: self.entries[pid]['item_id']
+        ))
+        return [self.entries[pid] for pid in matched[:limit]]
+
+    def _prefix_ids(self, word):
+        """Product IDs with a name word (or item_id) starting with word"""
+        node = self._trie
+        for char in word:
+            node = node.get(char)
+            if node is None:
+                return set()
+        return set(node['_ids'])
+
+    def lookup_barcode(self, barcode):
+        """Exact barcode lookup"""
+        product_id = self.barcodes.get((barcode or '').strip().lower())
+        return self.entries.get(product_id) if product_id is not None else None
+
+    def snapshot(self):
+        """Compact JSON snapshot (bytes) for client-side search, memoized per version"""
+        if self._snapshot_bytes is None:
+            rows = [
+                [entry[field] for field in self.SNAPSHOT_FIELDS]
+                for entry in sorted(self.entries.values(), key=lambda e: e['item_id'])
+            ]
+            payload = {
+                'vessel_id': self.vessel_id,
+                'version': self.version,
+                'fields': self.SNAPSHOT_FIELDS,
+                'products': rows,
+            }
+            self._snapshot_bytes = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return self._snapshot_bytes
+
+    @staticmethod
+    def _tokenize(entry):
+        tokens = {w for w in TOKEN_SPLIT_RE.split(entry['name'].lower()) if w}
+        tokens.add(entry['name'].lower())
+        tokens.add(entry['item_id'].lower())
+        return tokens
+
+
+class ProductIndexHelper:
+    """
+    Process-local registry of VesselProductIndex instances.
+
+    The authoritative version of each vessel index lives in the shared cache so
+    every worker sees changes. Each change also appends the touched product IDs
+    to a bounded change log; workers behind by a contiguous run of versions only
+    reload those products, otherwise they rebuild the whole vessel index.
+    """
+
+    VERSION_KEY = 'pos_index_version_{vessel_id}'
+    CHANGE_LOG_KEY = 'pos_index_changes_{vessel_id}'
+    CHANGE_LOG_LIMIT = 500
+    # Batches larger than this skip the change log and force a full rebuild
+    BULK_REBUILD_THRESHOLD = 200
+
+    _indexes = {}
+    _lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Versioning
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def get_version(cls, vessel_id):
+        """Get the shared version for a vessel index (seeded from the clock after a cache flush)"""
+        key = cls.VERSION_KEY.format(vessel_id=vessel_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, int(time.time() * 1000), None)
+            version = cache.get(key)
+        return version
+
+    @classmethod
+    def mark_products_changed(cls, vessel_id, product_ids):
+        """Record stock/price/catalog changes for products on one vessel"""
+        product_ids = sorted({pid for pid in product_ids if pid is not None})
+        if vessel_id is None or not product_ids:
+            return None
+
+        SyncJournalHelper.record_products(vessel_id, product_ids)
+        return cls._bump_version(vessel_id, product_ids)
+
+    @classmethod
+    def mark_index_changed(cls, vessel_id, product_ids):
+        """
+        Cache-only half of mark_products_changed: bump the vessel index version.
+        For callers that already journaled the change inside the writing transaction.
+        """
+        product_ids = sorted({pid for pid in product_ids if pid is not None})
+        if vessel_id is None or not product_ids:
+            return None
+        return cls._bump_version(vessel_id, product_ids)
+
+    @classmethod
+    def _bump_version(cls, vessel_id, product_ids):
+        try:
+            cls.get_version(vessel_id)
+            version = cache.incr(cls.VERSION_KEY.format(vessel_id=vessel_id))
+            if len(product_ids) > cls.BULK_REBUILD_THRESHOLD:
+                return version
+
+            log_key = cls.CHANGE_LOG_KEY.format(vessel_id=vessel_id)
+            changes = cache.get(log_key) or []
+            changes.append((version, product_ids))
+            cache.set(log_key, changes[-cls.CHANGE_LOG_LIMIT:], None)
+            return version
+        except Exception as e:
+            logger.warning(f"Product index change tracking error for vessel {vessel_id}: {e}")
+            return None
+
+    @classmethod
+    def mark_stock_changed(cls, vessel_id, product_id):
+        """Convenience wrapper used by Transaction save/delete"""
+        return cls.mark_products_changed(vessel_id, [product_id])
+
+    @classmethod
+    def mark_products_changed_all_vessels(cls, product_ids):
+        """Record catalog changes (name, barcode, default price, active flag) on every vessel"""
+        product_ids = sorted({pid for pid in product_ids if pid is not None})
+        if not product_ids:
+            return
+
+        # One journal entry per product for all vessels, then bump each vessel index
+        SyncJournalHelper.record_products(None, product_ids)
+        cls.mark_index_changed_all_vessels(product_ids)
+
+    @classmethod
+    def mark_index_changed_all_vessels(cls, product_ids):
+        """Cache-only half of mark_products_changed_all_vessels"""
+        from vessels.models import Vessel
+        product_ids = sorted({pid for pid in product_ids if pid is not None})
+        if not product_ids:
+            return
+
+        for vessel_id in Vessel.objects.values_list('id', flat=True):
+            cls._bump_version(vessel_id, product_ids)
+
+    @classmethod
+    def invalidate_all_vessels(cls):
+        """Force a full rebuild on every vessel (bulk catalog imports)"""
+        from vessels.models import Vessel
+        SyncJournalHelper.record_reset()
+        for vessel_id in Vessel.objects.values_list('id', flat=True):
+            try:
+                cls.get_version(vessel_id)
+                # Bumping without a change log entry leaves a gap, so workers rebuild
+                cache.incr(cls.VERSION_KEY.format(vessel_id=vessel_id))
+            except Exception as e:
+                logger.warning(f"Product index invalidation error for vessel {vessel_id}: {e}")
+
+    # ------------------------------------------------------------------
+    # Access
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def get_index(cls, vessel):
+        """Get an up-to-date index for a vessel, rebuilding incrementally where possible"""
+        current_version = cls.get_version(vessel.id)
+
+        with cls._lock:
+            index = cls._indexes.get(vessel.id)
+            if index is not None and index.version == current_version:
+                return index
+
+            changed_ids = cls._changed_since(vessel.id, index.version, current_version) if index else None
+            if changed_ids is None:
+                index = cls._build(vessel, current_version)
+                cls._indexes[vessel.id] = index
+                logger.debug(f"Product index built: vessel {vessel.id}, {len(index.entries)} products, v{current_version}")
+            else:
+                entries = cls._load_entries(vessel, changed_ids)
+                for product_id in changed_ids:
+                    if product_id in entries:
+                        index.upsert(entries[product_id])
+                    else:
+                        index.remove(product_id)
+                index.version = current_version
+                index._snapshot_bytes = None
+                logger.debug(f"Product index refreshed: vessel {vessel.id}, {len(changed_ids)} products, v{current_version}")
+
+            return index
+
+    @classmethod
+    def search(cls, vessel, term, limit=None, exclude_duty_free=False):
+        """Search products with stock on a vessel"""
+        return cls.get_index(vessel).search(term, limit=limit, exclude_duty_free=exclude_duty_free)
+
+    @classmethod
+    def clear_local(cls):
+        """Drop all process-local indexes (tests and cache flushes)"""
+        with cls._lock:
+            cls._indexes.clear()
+
+    # ------------------------------------------------------------------
+    # Async access (ASGI fast path)
+    # ------------------------------------------------------------------
+
+    @classmethod
+    async def aget_version(cls, vessel_id):
+        version = await cache.aget(cls.VERSION_KEY.format(vessel_id=vessel_id))
+        if version is None:
+            version = await sync_to_async(cls.get_version)(vessel_id)
+        return version
+
+    @classmethod
+    async def aget_index(cls, vessel):
+        """Async get_index(): a current process-local index costs one async cache read, no lock or query"""
+        current_version = await cls.aget_version(vessel.id)
+        index = cls._indexes.get(vessel.id)
+        if index is not None and index.version == current_version:
+            return index
+        # Stale or missing: the (multi-query) refresh runs in one sync hop
+        return await sync_to_async(cls.get_index)(vessel)
+
+    @classmethod
+    async def asearch(cls, vessel, term, limit=None, exclude_duty_free=False):
+        return (await cls.aget_index(vessel)).search(term, limit=limit, exclude_duty_free=exclude_duty_free)
+
+    @classmethod
+    async def aget_open_lots(cls, vessel, product_ids):
+        """Async get_open_lots()"""
+        from transactions.models import InventoryLot
+
+        lots_by_product = defaultdict(list)
+        if not product_ids:
+            return lots_by_product
+
+        async for lot in InventoryLot.objects.filter(
+            vessel_id=vessel.id,
+            product_id__in=list(product_ids),
+            remaining_quantity__gt=0
+        ).order_by('purchase_date', 'created_at'):
+            lots_by_product[lot.product_id].append(lot)
+        return lots_by_product
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _changed_since(cls, vessel_id, from_version, to_version):
+        """Product IDs changed in (from_version, to_version], or None if the log has gaps"""
+        if to_version < from_version or to_version - from_version > cls.CHANGE_LOG_LIMIT:
+            return None
+
+        changes = cache.get(cls.CHANGE_LOG_KEY.format(vessel_id=vessel_id)) or []
+        pending = {version: ids for version, ids in changes if from_version < version <= to_version}
+        if len(pending) != to_version - from_version:
+            return None
+
+        changed_ids = set()
+        for ids in pending.values():
+            changed_ids.update(ids)
+        return changed_ids
+
+    @classmethod
+    def _build(cls, vessel, version):
+        index = VesselProductIndex(vessel.id, version)
+        for entry in cls._load_entries(vessel).values():
+            index.upsert(entry)
+        return index
+
+    @classmethod
+    def _load_entries(cls, vessel, product_ids=None):
+        """
+        Load index entries in three queries: open lots, products, custom prices.
+
+        Returns:
+            dict: product_id -> entry, only for products with stock on the vessel
+        """
+        from products.models import Product
+        from transactions.models import InventoryLot, VesselProductPrice
+
+        lots = InventoryLot.objects.filter(
+            vessel_id=vessel.id,
+            remaining_quantity__gt=0
+        )
+        if product_ids is not None:
+            lots = lots.filter(product_id__in=product_ids)
+
+        stock = defaultdict(int)
+        oldest_cost = {}
+        for product_id, remaining, price in lots.order_by(
+            'product_id', 'purchase_date', 'created_at'
+        ).values_list('product_id', 'remaining_quantity', 'purchase_price'):
+            stock[product_id] += remaining
+            oldest_cost.setdefault(product_id, price)
+
+        if not stock:
+            return {}
+
+        products = Product.objects.filter(id__in=list(stock), active=True)
+
+        custom_prices = {}
+        if not vessel.has_duty_free:
+            custom_prices = dict(
+                VesselProductPrice.objects.filter(
+                    vessel_id=vessel.id, product_id__in=list(stock)
+                ).values_list('product_id', 'selling_price')
+            )
+
+        entries = {}
+        for product in products.only('id', 'name', 'item_id', 'barcode', 'is_duty_free', 'selling_price'):
+            custom_price = None if product.is_duty_free else custom_prices.get(product.id)
+            price = custom_price if custom_price is not None else product.selling_price
+            entries[product.id] = {
+                'id': product.id,
+                'name': product.name,
+                'item_id': product.item_id,
+                'barcode': product.barcode or '',
+                'is_duty_free': product.is_duty_free,
+                'stock': stock[product.id],
+                'price': float(price),
+                'is_custom_price': custom_price is not None,
+                'cost': float(oldest_cost.get(product.id, Decimal('0'))),
+            }
+        return entries
+
+    @classmethod
+    def get_open_lots(cls, vessel, product_ids):
+        """Open FIFO lots for several products in one query, grouped by product"""
+        from transactions.models import InventoryLot
+
+        lots_by_product = defaultdict(list)
+        if not product_ids:
+            return lots_by_product
+
+        for lot in InventoryLot.objects.filter(
+            vessel_id=vessel.id,
+            product_id__in=list(product_ids),
+            remaining_quantity__gt=0
+        ).order_by('purchase_date', 'created_at'):
+            lots_by_product[lot.product_id].append(lot)
+        return lots_by_product
@@ -0,0 +1,139 @@
+"""
+Actual-cost profitability engine.
+Gross margin = SALE revenue minus the FIFO cost of the units those sales consumed,
+aggregated per vessel, product, category, trip or day with one grouped query each.
+"""
+
+from decimal import Decimal
+
+from django.db import models
+from django.db.models import Sum, Count, F, Q, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+ZERO = Decimal('0')
+
+
+class ProfitabilityHelper:
+    """
+    Gross margin from actual COGS.
+
+    Cost per sale is ``Transaction.cogs_total``; sales recorded before that
+    column existed fall back to the sum of their FIFOConsumption rows. Sales
+    with neither are counted in ``uncosted_count`` and contribute no cost.
+    """
+
+    # group_by -> (id column, label columns)
+    DIMENSIONS = {
+        'vessel': ('vessel_id', ('vessel__name', 'vessel__name_ar')),
+        'product': ('product_id', ('product__name', 'product__item_id', 'product__category__name')),
+        'category': ('product__category_id', ('product__category__name',)),
+        'trip': ('trip_id', ('trip__trip_number', 'trip__trip_date', 'vessel__name')),
+        'day': ('transaction_date', ()),
+    }
+
+    MONEY = models.DecimalField(max_digits=20, decimal_places=6)
+
+    @classmethod
+    def sales(cls, start_date=None, end_date=None, vessel=None, product=None, category=None, trip=None):
+        """SALE transactions in the window (dates inclusive), optionally narrowed"""
+        from transactions.models import Transaction
+
+        sales = Transaction.objects.filter(transaction_type='SALE')
+        if start_date:
+            sales = sales.filter(transaction_date__gte=start_date)
+        if end_date:
+            sales = sales.filter(transaction_date__lte=end_date)
+        if vessel:
+            sales = sales.filter(vessel_id=getattr(vessel, 'id', vessel))
+        if product:
+            sales = sales.filter(product_id=getattr(product, 'id', product))
+        if category:
+            sales = sales.filter(product__category_id=getattr(category, 'id', category))
+        if trip:
+            sales = sales.filter(trip_id=getattr(trip, 'id', trip))
+        return sales
+
+    @classmethod
+    def _cost_expression(cls):
+        from transactions.models import FIFOConsumption
+
+        fifo_cost = FIFOConsumption.objects.filter(
+            transaction=OuterRef('pk')
+        ).values('transaction').annotate(
+            total=Sum(F('consumed_quantity') * F('unit_cost'), output_field=cls.MONEY)
+        ).values('total')
+        return Coalesce('cogs_total', Subquery(fifo_cost, output_field=cls.MONEY))
+
+    @classmethod
+    def _aggregates(cls):
+        return {
+            'revenue': Sum(F('quantity') * F('unit_price'), output_field=cls.MONEY),
+            'cogs': Sum('line_cost', output_field=cls.MONEY),
+            'quantity': Sum('quantity'),
+            'sales_count': Count('id'),
+            'uncosted_count': Count('id', filter=Q(line_cost__isnull=True)),
+        }
+
+    @classmethod
+    def _costed(cls, sales):
+        return sales.annotate(line_cost=cls._cost_expression())
+
+    @staticmethod
+    def _finish(row):
+        revenue = row.get('revenue') or ZERO
+        cogs = row.get('cogs') or ZERO
+        gross_profit = revenue - cogs
+        row.update({
+            'revenue': revenue,
+            'cogs': cogs,
+            'quantity': row.get('quantity') or ZERO,
+            'sales_count': row.get('sales_count') or 0,
+            'uncosted_count': row.get('uncosted_count') or 0,
+            'gross_profit': gross_profit,
+            'margin_percent': float(gross_profit / revenue * 100) if revenue else 0.0,
+        })
+        return row
+
+    @classmethod
+    def summarize(cls, start_date=None, end_date=None, **filters):
+        """
+        Totals for the window in a single query.
+
+        Returns:
+            dict: revenue, cogs, gross_profit, margin_percent, quantity, sales_count, uncosted_count
+        """
+        sales = cls._costed(cls.sales(start_date, end_date, **filters))
+        return cls._finish(sales.aggregate(**cls._aggregates()))
+
+    @classmethod
+    def breakdown(cls, group_by, start_date=None, end_date=None, order_by='-revenue', **filters):
+        """
+        Gross margin grouped by one dimension (vessel, product, category, trip or day).
+
+        Returns:
+            list[dict]: one row per group with the ``summarize`` keys plus
+            ``key`` (the group id or date) and the dimension's label columns
+        """
+        if group_by not in cls.DIMENSIONS:
+            raise ValueError(f"Unknown profitability dimension: {group_by}")
+
+        key_column, label_columns = cls.DIMENSIONS[group_by]
+        sales = cls._costed(cls.sales(start_date, end_date, **filters))
+        if group_by == 'trip':
+            sales = sales.filter(trip__isnull=False)
+
+        rows = sales.values(key_column, *label_columns).annotate(**cls._aggregates()).order_by()
+        results = []
+        for row in rows:
+            row['key'] = row.pop(key_column)
+            results.append(cls._finish(row))
+
+        if order_by:
+            field = order_by.lstrip('-')
+            results.sort(key=lambda row: row[field], reverse=order_by.startswith('-'))
+        return results
+
+    @classmethod
+    def breakdown_map(cls, group_by, start_date=None, end_date=None, **filters):
+        """``breakdown`` keyed by group id for joining onto existing report rows"""
+        return {row['key']: row for row in cls.breakdown(group_by, start_date, end_date, order_by=None, **filters)}
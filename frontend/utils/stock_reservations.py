@@ -0,0 +1,202 @@
+"""
+Reservation ledger for pending workflow transfers.
+Pending TRANSFER_OUT lines skip FIFO consumption until the workflow is confirmed;
+the ledger keeps their quantities promised so sales and other transfers cannot
+take the same stock in the meantime.
+"""
+
+import logging
+import math
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F, Sum
+
+logger = logging.getLogger('transactions')
+
+
+class StockReservationHelper:
+    """
+    Maintain StockReservation lines and their ReservedStock totals.
+
+    A transfer holds a reservation for each product with unconsumed
+    TRANSFER_OUT lines while its workflow is under review. The lines are
+    re-synced on submit and on quantity edits (increases are checked against
+    available-to-promise) and released on reject and delete. A confirmed
+    transfer holds its reservation until execution, which releases it in the
+    same transaction that consumes the FIFO lots - the stock is never
+    promised to nobody in between.
+
+    Available to promise = on hand (open lots) - reserved (one ReservedStock row).
+    """
+
+    # Workflow states whose TRANSFER_OUT lines have not been executed yet
+    PENDING_STATUSES = ('created', 'pending_review', 'under_review', 'pending_confirmation', 'confirmed')
+
+    @classmethod
+    def pending_lines(cls, transfer):
+        """
+        Unexecuted TRANSFER_OUT quantity per product of a transfer.
+
+        Only transfers with a workflow that is still pending have pending lines.
+        Transfers without a workflow, and completed ones, have none, including
+        those completed before execution wrote FIFOConsumption rows.
+        Fractional quantities are rounded up to whole units.
+        """
+        from transactions.models import Transaction
+
+        rows = Transaction.objects.filter(
+            transfer=transfer,
+            transfer__workflow__status__in=cls.PENDING_STATUSES,
+            transaction_type='TRANSFER_OUT',
+            fifo_consumptions__isnull=True
+        ).values('product_id').annotate(total=Sum('quantity'))
+        return {row['product_id']: math.ceil(row['total']) for row in rows if row['total']}
+
+    @classmethod
+    def sync_transfer(cls, transfer, grow=True):
+        """
+        Make a transfer's reservation match its pending lines.
+
+        Args:
+            grow: reserve new and increased lines too; False only shrinks what
+                the transfer already holds (line deletes on transfers that may
+                not be under review)
+
+        Raises:
+            ValidationError: an increase exceeds available-to-promise stock
+
+        Returns:
+            dict: product_id -> reserved quantity change
+        """
+        from transactions.models import StockReservation
+
+        with transaction.atomic():
+            wanted = cls.pending_lines(transfer)
+            held = {
+                line.product_id: line
+                for line in StockReservation.objects.select_for_update().filter(transfer=transfer)
+            }
+            if not grow:
+                wanted = {
+                    product_id: min(quantity, held[product_id].quantity)
+                    for product_id, quantity in wanted.items() if product_id in held
+                }
+
+            deltas = {}
+            for product_id in wanted.keys() | held.keys():
+                delta = wanted.get(product_id, 0) - (held[product_id].quantity if product_id in held else 0)
+                if delta:
+                    deltas[product_id] = delta
+            if not deltas:
+                return {}
+
+            increases = {product_id: delta for product_id, delta in deltas.items() if delta > 0}
+            if increases:
+                cls._check_available(transfer.from_vessel, increases)
+
+            changed = []
+            for product_id, line in held.items():
+                if product_id not in wanted:
+                    continue
+                line.quantity = wanted[product_id]
+                changed.append(line)
+            StockReservation.objects.bulk_update(changed, ['quantity'])
+            StockReservation.objects.filter(
+                transfer=transfer, product_id__in=[pid for pid in held if pid not in wanted]
+            ).delete()
+            StockReservation.objects.bulk_create([
+                StockReservation(
+                    transfer=transfer,
+                    vessel_id=transfer.from_vessel_id,
+                    product_id=product_id,
+                    quantity=quantity
+                )
+                for product_id, quantity in wanted.items() if product_id not in held
+            ])
+
+            cls._apply_totals(transfer.from_vessel_id, deltas)
+
+        logger.debug(f"Reservation synced for transfer {transfer.id}: {deltas}")
+        return deltas
+
+    @classmethod
+    def release_transfer(cls, transfer):
+        """Drop every reservation a transfer holds; returns product_id -> released quantity"""
+        from transactions.models import StockReservation
+
+        with transaction.atomic():
+            lines = list(StockReservation.objects.select_for_update().filter(transfer=transfer))
+            if not lines:
+                return {}
+            StockReservation.objects.filter(id__in=[line.id for line in lines]).delete()
+            cls._apply_totals(transfer.from_vessel_id, {line.product_id: -line.quantity for line in lines})
+
+        logger.debug(f"Reservation released for transfer {transfer.id}")
+        return {line.product_id: line.quantity for line in lines}
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def reserved_map(vessel_id, product_ids):
+        """Reserved quantity per product on a vessel (missing products: 0)"""
+        from transactions.models import ReservedStock
+
+        rows = ReservedStock.objects.filter(
+            vessel_id=vessel_id, product_id__in=product_ids, quantity__gt=0
+        ).values_list('product_id', 'quantity')
+        return dict(rows)
+
+    @classmethod
+    def reserved(cls, vessel_id, product_id):
+        """Reserved quantity of one product on a vessel"""
+        return cls.reserved_map(vessel_id, [product_id]).get(product_id, 0)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _check_available(cls, vessel, increases):
+        """Lock the vessel's open lots and compare each increase with available-to-promise"""
+        from products.models import Product
+        from transactions.models import InventoryLot
+
+        on_hand = dict(
+            InventoryLot.objects.select_for_update().filter(
+                vessel=vessel, product_id__in=increases, remaining_quantity__gt=0
+            ).values('product_id').annotate(total=Sum('remaining_quantity')).values_list('product_id', 'total')
+        )
+        reserved = cls.reserved_map(vessel.id, increases)
+
+        short = {
+            product_id: on_hand.get(product_id, 0) - reserved.get(product_id, 0)
+            for product_id, delta in increases.items()
+            if delta > on_hand.get(product_id, 0) - reserved.get(product_id, 0)
+        }
+        if short:
+            names = dict(Product.objects.filter(id__in=short).values_list('id', 'name'))
+            product_id = min(short, key=lambda pid: names.get(pid, ''))
+            raise ValidationError(
+                f"Insufficient available stock for {names.get(product_id, product_id)} on {vessel.name}. "
+                f"Available to promise: {max(short[product_id], 0)}, Additional requested: {increases[product_id]}"
+            )
+
+    @staticmethod
+    def _apply_totals(vessel_id, deltas):
+        """Add deltas to the ReservedStock rows (created on first use)"""
+        from transactions.models import ReservedStock
+
+        deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        ReservedStock.objects.bulk_create(
+            [ReservedStock(vessel_id=vessel_id, product_id=product_id) for product_id in deltas],
+            ignore_conflicts=True
+        )
+        for product_id, delta in deltas.items():
+            ReservedStock.objects.filter(vessel_id=vessel_id, product_id=product_id).update(
+                quantity=F('quantity') + delta
+            )
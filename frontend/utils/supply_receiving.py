@@ -0,0 +1,152 @@
+"""
+Bulk receiving of supplier delivery files (CSV/XLSX) into purchase orders.
+Validates every line up front, then posts through create_supply_transactions_bulk.
+"""
+
+import logging
+from decimal import Decimal, InvalidOperation
+
+from frontend.utils.file_readers import TabularFileReader, TabularFileError
+
+logger = logging.getLogger('frontend')
+
+
+class SupplyReceivingHelper:
+    """
+    Parse and post supplier delivery files.
+
+    Expected columns: item_id and/or barcode, quantity, plus optional
+    unit_price (defaults to the product purchase price), boxes,
+    items_per_box and notes. A file is posted all-or-nothing: any invalid
+    line rejects the whole delivery.
+    """
+
+    REQUIRED_COLUMNS = ('quantity',)
+    OPTIONAL_COLUMNS = ('item_id', 'barcode', 'unit_price', 'boxes', 'items_per_box', 'notes')
+    MAX_ERRORS = 100
+
+    @classmethod
+    def parse_file(cls, file_path, vessel):
+        """
+        Read and validate all lines of a delivery file in bulk.
+
+        Products are resolved with one query per identifier column.
+
+        Returns:
+            tuple: (lines, errors) - lines ready for create_supply_transactions_bulk,
+                   errors as a list of {'row', 'error'} dicts
+        """
+        from products.models import Product
+
+        reader = TabularFileReader(file_path, cls.REQUIRED_COLUMNS, cls.OPTIONAL_COLUMNS)
+        try:
+            rows = [(row_num, row) for row_num, row in reader if any(row.values())]
+        except TabularFileError as e:
+            return [], [{'row': None, 'error': str(e)}]
+
+        if not (reader.has_column('item_id') or reader.has_column('barcode')):
+            return [], [{'row': None, 'error': 'File needs an item_id or barcode column'}]
+
+        item_ids = {row.get('item_id') for _, row in rows if row.get('item_id')}
+        barcodes = {row.get('barcode') for _, row in rows if row.get('barcode') and not row.get('item_id')}
+
+        products_by_item_id = Product.objects.filter(item_id__in=item_ids).in_bulk(field_name='item_id') if item_ids else {}
+        products_by_barcode = {}
+        if barcodes:
+            for product in Product.objects.filter(barcode__in=barcodes):
+                products_by_barcode.setdefault(product.barcode, product)
+
+        lines = []
+        errors = []
+        for row_num, row in rows:
+            try:
+                lines.append(cls._parse_line(row, vessel, products_by_item_id, products_by_barcode))
+            except ValueError as e:
+                errors.append({'row': row_num, 'error': str(e)})
+                if len(errors) >= cls.MAX_ERRORS:
+                    break
+
+        if not lines and not errors:
+            errors.append({'row': None, 'error': 'File has no delivery lines'})
+        return lines, errors
+
+    @classmethod
+    def _parse_line(cls, row, vessel, products_by_item_id, products_by_barcode):
+        item_id = row.get('item_id', '')
+        barcode = row.get('barcode', '')
+        product = products_by_item_id.get(item_id) if item_id else products_by_barcode.get(barcode)
+        if product is None:
+            raise ValueError(f'Product not found: {item_id or barcode or "(no identifier)"}')
+        if not product.active:
+            raise ValueError(f'Product {product.item_id} is inactive')
+        if product.is_duty_free and not vessel.has_duty_free:
+            raise ValueError(f'Cannot add duty-free product {product.item_id} to {vessel.name}')
+
+        try:
+            quantity = Decimal(row['quantity'])
+            unit_price = Decimal(row['unit_price']) if row.get('unit_price') else product.purchase_price
+        except InvalidOperation:
+            raise ValueError(f"Invalid quantity or unit price: {row['quantity']!r} / {row.get('unit_price')!r}")
+
+        if quantity <= 0 or unit_price <= 0:
+            raise ValueError('Quantity and unit price must be positive values')
+        if quantity != quantity.to_integral_value():
+            raise ValueError(f'Quantity must be a whole number of units: {quantity}')
+
+        boxes = items_per_box = None
+        if row.get('boxes') or row.get('items_per_box'):
+            try:
+                boxes = int(row.get('boxes') or 0)
+                items_per_box = int(row.get('items_per_box') or 0)
+            except ValueError:
+                raise ValueError('Invalid boxes / items_per_box values')
+            if boxes <= 0 or items_per_box <= 0:
+                raise ValueError('Boxes and items per box must be positive values')
+            if boxes * items_per_box != quantity:
+                raise ValueError(
+                    f'Quantity mismatch: {boxes} boxes × {items_per_box} items = {boxes * items_per_box}, but quantity is {quantity}'
+                )
+
+        return {
+            'product': product,
+            'quantity': quantity,
+            'unit_price': unit_price,
+            'boxes': boxes,
+            'items_per_box': items_per_box,
+            'notes': row.get('notes', ''),
+        }
+
+    @classmethod
+    def receive_file(cls, purchase_order, file_path, user, dry_run=False, complete=False):
+        """
+        Validate a delivery file and post it to a purchase order.
+
+        Returns:
+            dict: success flag, errors, line count and total cost
+        """
+        from transactions.models import create_supply_transactions_bulk
+        from frontend.utils.cache_helpers import POCacheHelper
+
+        if purchase_order.is_completed:
+            return {'success': False, 'errors': [{'row': None, 'error': 'Purchase order is already completed'}]}
+
+        lines, errors = cls.parse_file(file_path, purchase_order.vessel)
+        total_cost = sum((line['quantity'] * line['unit_price'] for line in lines), Decimal('0'))
+        result = {
+            'success': not errors,
+            'errors': errors,
+            'lines': len(lines),
+            'total_cost': float(total_cost),
+            'dry_run': dry_run,
+        }
+        if errors or dry_run:
+            return result
+
+        create_supply_transactions_bulk(purchase_order, lines, created_by=user)
+        if complete:
+            purchase_order.is_completed = True
+            purchase_order.save(update_fields=['is_completed', 'updated_at'])
+
+        POCacheHelper.clear_cache_after_po_update(purchase_order.id)
+        logger.info(f"PO {purchase_order.po_number}: received {len(lines)} lines from file")
+        return result
@@ -0,0 +1,348 @@
+"""
+Delta sync for offline-first vessel tablets.
+Stock, price, catalog and assignment changes are appended to the SyncChange journal;
+clients pull only what changed since their token instead of full catalog payloads.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db.models import Q, Sum, Max, Min
+from django.utils import timezone
+
+logger = logging.getLogger('frontend')
+
+
+class SyncJournalHelper:
+    """
+    Record and read the SyncChange journal.
+
+    Tokens are opaque strings for the client:
+    - ``c<id>``: caught up to journal entry ``id``; the next pull returns newer changes
+    - ``s<id>.<product_id>``: full snapshot in progress, taken at journal entry ``id``,
+      products up to ``product_id`` already sent
+
+    A missing, unknown or pruned token starts a snapshot. When the snapshot ends the
+    client continues with ``c<id>``, so changes made while paging are not lost.
+    """
+
+    PAGE_SIZE = 500
+    MAX_PAGE_SIZE = 2000
+    RETENTION_DAYS = 30
+
+    PRODUCT_FIELDS = ['id', 'name', 'item_id', 'barcode', 'is_duty_free', 'active', 'category_id', 'selling_price']
+    PRICE_FIELDS = ['product_id', 'selling_price']
+    STOCK_FIELDS = ['product_id', 'quantity']
+    ASSIGNMENT_FIELDS = ['user_id', 'username', 'is_active', 'can_make_sales', 'can_receive_inventory',
+                         'can_initiate_transfers', 'can_approve_transfers']
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def record_products(cls, vessel_id, product_ids):
+        """Journal product state changes on one vessel (or every vessel when vessel_id is None)"""
+        from api.models import SyncChange
+
+        product_ids = sorted({pid for pid in product_ids if pid is not None})
+        if product_ids:
+            SyncChange.objects.bulk_create([
+                SyncChange(entity='PRODUCT', vessel_id=vessel_id, entity_id=product_id)
+                for product_id in product_ids
+            ])
+
+    @classmethod
+    def record_assignments(cls, vessel_ids, user_id):
+        """Journal a user's assignment change on the given vessels"""
+        from api.models import SyncChange
+
+        SyncChange.objects.bulk_create([
+            SyncChange(entity='ASSIGNMENT', vessel_id=vessel_id, entity_id=user_id)
+            for vessel_id in sorted(set(vessel_ids))
+        ])
+
+    @classmethod
+    def record_reset(cls):
+        """Force every client into a full snapshot (bulk catalog imports)"""
+        from api.models import SyncChange
+
+        SyncChange.objects.create(entity='RESET')
+
+    @classmethod
+    def prune(cls, retention_days=None, dry_run=False):
+        """
+        Drop journal entries older than the retention window.
+        Clients holding an older token get a full snapshot on their next pull.
+
+        Returns:
+            int: entries removed (or that would be removed)
+        """
+        from api.models import SyncChange
+
+        retention_days = cls.RETENTION_DAYS if retention_days is None else retention_days
+        old = SyncChange.objects.filter(changed_at__lt=timezone.now() - timedelta(days=retention_days))
+        if dry_run:
+            return old.count()
+        # Keep the newest entry so the journal floor survives a fully idle period
+        newest_id = SyncChange.objects.aggregate(newest=Max('id'))['newest']
+        deleted, _ = old.exclude(id=newest_id).delete()
+        return deleted
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def latest_token(cls):
+        from api.models import SyncChange
+
+        return SyncChange.objects.aggregate(latest=Max('id'))['latest'] or 0
+
+    @staticmethod
+    def parse_token(token):
+        """Returns ('c', change_id, None), ('s', change_id, after_product_id) or None"""
+        try:
+            if token and token[0] == 'c':
+                return 'c', int(token[1:]), None
+            if token and token[0] == 's':
+                base, after = token[1:].split('.', 1)
+                return 's', int(base), int(after)
+        except ValueError:
+            pass
+        return None
+
+    @classmethod
+    def _is_pruned(cls, change_id):
+        """True when entries after change_id may already have been pruned"""
+        from api.models import SyncChange
+
+        floor = SyncChange.objects.aggregate(floor=Min('id'))['floor']
+        return floor is not None and change_id < floor - 1
+
+    @classmethod
+    def pull(cls, vessel, token=None, limit=None):
+        """
+        One page of changes for a vessel.
+
+        Returns:
+            dict: token, has_more, snapshot flag and the product/price/stock/assignment
+            sections (compact ``fields`` + ``rows``)
+        """
+        from api.models import SyncChange
+
+        limit = min(max(int(limit or cls.PAGE_SIZE), 1), cls.MAX_PAGE_SIZE)
+        parsed = cls.parse_token(token)
+
+        if parsed is None or (parsed[0] == 'c' and cls._is_pruned(parsed[1])):
+            return cls._snapshot_page(vessel, cls.latest_token(), 0, limit)
+        if parsed[0] == 's':
+            return cls._snapshot_page(vessel, parsed[1], parsed[2], limit)
+
+        since = parsed[1]
+        changes = list(
+            SyncChange.objects.filter(
+                Q(vessel_id=vessel.id) | Q(vessel_id__isnull=True), id__gt=since
+            ).order_by('id').values_list('id', 'entity', 'entity_id')[:limit + 1]
+        )
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        if any(entity == 'RESET' for _, entity, _ in changes):
+            return cls._snapshot_page(vessel, cls.latest_token(), 0, limit)
+
+        product_ids = {entity_id for _, entity, entity_id in changes if entity == 'PRODUCT'}
+        assignments_changed = any(entity == 'ASSIGNMENT' for _, entity, _ in changes)
+
+        payload = cls._build_payload(vessel, product_ids, include_assignments=assignments_changed)
+        payload.update({
+            'token': f"c{changes[-1][0] if changes else since}",
+            'has_more': has_more,
+            'snapshot': False,
+            'reset': False,
+            'change_count': len(changes),
+        })
+        return payload
+
+    @classmethod
+    def _snapshot_page(cls, vessel, base, after_product_id, limit):
+        from products.models import Product
+
+        product_ids = list(
+            Product.objects.filter(id__gt=after_product_id).order_by('id').values_list('id', flat=True)[:limit + 1]
+        )
+        has_more = len(product_ids) > limit
+        product_ids = product_ids[:limit]
+
+        payload = cls._build_payload(vessel, product_ids, include_assignments=after_product_id == 0)
+        payload.update({
+            'token': f"s{base}.{product_ids[-1]}" if has_more else f"c{base}",
+            'has_more': has_more,
+            'snapshot': True,
+            # First snapshot page: the client drops its local copy before applying rows
+            'reset': after_product_id == 0,
+            'change_count': len(product_ids),
+        })
+        return payload
+
+    @classmethod
+    def _build_payload(cls, vessel, product_ids, include_assignments=False):
+        """Current product, price and stock rows for the given products (three queries)"""
+        from products.models import Product
+        from transactions.models import InventoryLot, VesselProductPrice
+
+        product_ids = sorted(product_ids)
+        products, prices, stock = [], [], []
+        removed_products, cleared_prices = [], []
+
+        if product_ids:
+            found = {
+                row[0]: row for row in Product.objects.filter(id__in=product_ids).values_list(*cls.PRODUCT_FIELDS)
+            }
+            vessel_prices = dict(
+                VesselProductPrice.objects.filter(
+                    vessel_id=vessel.id, product_id__in=product_ids
+                ).values_list('product_id', 'selling_price')
+            )
+            balances = dict(
+                InventoryLot.objects.filter(
+                    vessel_id=vessel.id, product_id__in=product_ids, remaining_quantity__gt=0
+                ).values('product_id').annotate(total=Sum('remaining_quantity')).values_list('product_id', 'total')
+            )
+
+            for product_id in product_ids:
+                row = found.get(product_id)
+                if row is None:
+                    removed_products.append(product_id)
+                    continue
+                products.append([*row[:-1], str(row[-1])])
+                if product_id in vessel_prices:
+                    prices.append([product_id, str(vessel_prices[product_id])])
+                else:
+                    cleared_prices.append(product_id)
+                stock.append([product_id, balances.get(product_id, 0)])
+
+        payload = {
+            'vessel_id': vessel.id,
+            'products': {'fields': cls.PRODUCT_FIELDS, 'rows': products, 'removed': removed_products},
+            'prices': {'fields': cls.PRICE_FIELDS, 'rows': prices, 'cleared': cleared_prices},
+            'stock': {'fields': cls.STOCK_FIELDS, 'rows': stock},
+        }
+        if include_assignments:
+            payload['assignments'] = {'fields': cls.ASSIGNMENT_FIELDS, 'rows': cls._assignment_rows(vessel)}
+        return payload
+
+    @classmethod
+    def _assignment_rows(cls, vessel):
+        from vessel_management.models import UserVesselAssignment
+
+        return [
+            list(row) for row in UserVesselAssignment.objects.filter(vessel_id=vessel.id).values_list(
+                'user_id', 'user__username', 'is_active', 'can_make_sales', 'can_receive_inventory',
+                'can_initiate_transfers', 'can_approve_transfers'
+            ).order_by('user_id')
+        ]
+
+
+class OfflineSaleReplayHelper:
+    """
+    Replay sales queued on a disconnected tablet through the normal FIFO path.
+
+    Each sale carries a client-generated ``client_id``; an OfflineSaleReceipt
+    is written in the same database transaction as the sale, so a batch can
+    be resent any number of times and each sale is applied exactly once.
+    """
+
+    MAX_BATCH = 500
+
+    @classmethod
+    def replay(cls, vessel, sales, user, device_id=''):
+        """
+        Apply a batch of offline sales in order.
+
+        Returns:
+            list[dict]: one result per sale with client_id, status
+            ('applied', 'duplicate' or 'failed'), transaction_id and error
+        """
+        from django.core.exceptions import ValidationError
+        from django.db import IntegrityError, transaction
+        from api.models import OfflineSaleReceipt
+
+        client_ids = [str(sale.get('client_id') or '') for sale in sales]
+        existing = dict(
+            OfflineSaleReceipt.objects.filter(client_id__in=[c for c in client_ids if c]).values_list(
+                'client_id', 'transaction_id'
+            )
+        )
+
+        results = []
+        for client_id, sale in zip(client_ids, sales):
+            if not client_id:
+                results.append(cls._result(client_id, 'failed', error='client_id is required'))
+                continue
+            if client_id in existing:
+                results.append(cls._result(client_id, 'duplicate', existing[client_id]))
+                continue
+
+            try:
+                with transaction.atomic():
+                    txn = cls._create_sale(vessel, sale, user)
+                    OfflineSaleReceipt.objects.create(
+                        client_id=client_id, device_id=device_id, vessel=vessel,
+                        transaction=txn, created_by=user
+                    )
+                existing[client_id] = txn.id
+                results.append(cls._result(client_id, 'applied', txn.id))
+            except IntegrityError:
+                # Same client_id replayed concurrently by another request - it won
+                receipt = OfflineSaleReceipt.objects.filter(client_id=client_id).first()
+                if receipt is None:
+                    results.append(cls._result(client_id, 'failed', error='Could not record sale'))
+                else:
+                    results.append(cls._result(client_id, 'duplicate', receipt.transaction_id))
+            except (ValidationError, ValueError, KeyError, TypeError, ArithmeticError) as e:
+                message = '; '.join(e.messages) if isinstance(e, ValidationError) else str(e)
+                results.append(cls._result(client_id, 'failed', error=message))
+
+        applied = sum(1 for result in results if result['status'] == 'applied')
+        if applied:
+            logger.info(f"Offline replay: {applied}/{len(sales)} sales applied on vessel {vessel.id} ({device_id or 'unknown device'})")
+        return results
+
+    @staticmethod
+    def _result(client_id, status, transaction_id=None, error=None):
+        return {'client_id': client_id, 'status': status, 'transaction_id': transaction_id, 'error': error}
+
+    @classmethod
+    def _create_sale(cls, vessel, sale, user):
+        from decimal import Decimal
+        from django.utils.dateparse import parse_date
+        from products.models import Product
+        from transactions.models import Transaction, Trip, get_vessel_product_price
+
+        product = Product.objects.filter(id=sale['product_id']).first()
+        if product is None:
+            raise ValueError(f"Unknown product {sale['product_id']}")
+
+        transaction_date = parse_date(str(sale.get('transaction_date') or '')) or timezone.now().date()
+        unit_price = sale.get('unit_price')
+        if unit_price in (None, ''):
+            unit_price, _, _ = get_vessel_product_price(vessel, product)
+
+        trip = None
+        if sale.get('trip_id'):
+            trip = Trip.objects.filter(id=sale['trip_id'], vessel=vessel).first()
+            if trip is None:
+                raise ValueError(f"Trip {sale['trip_id']} not found on this vessel")
+
+        return Transaction.objects.create(
+            vessel=vessel,
+            product=product,
+            transaction_type='SALE',
+            transaction_date=transaction_date,
+            quantity=Decimal(str(sale['quantity'])),
+            unit_price=Decimal(str(unit_price)),
+            trip=trip,
+            notes=sale.get('notes') or 'Offline sale replay',
+            created_by=user,
+        )
@@ -5,17 +5,25 @@ from django.http import HttpResponse
 from django.template.loader import render_to_string
 from django.conf import settings
 import weasyprint
-import matplotlib
-matplotlib.use('Agg')  # Use non-interactive backend
-import matplotlib.pyplot as plt
 import logging
-import matplotlib.pyplot as plt
-
-plt.style.use('default')  # <— ✅ One-time global style setting
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+_pyplot = None
+
+
+def get_pyplot():
+    """matplotlib is only needed for charts - import and configure it on first use"""
+    global _pyplot
+    if _pyplot is None:
+        import matplotlib
+        matplotlib.use('Agg')  # Use non-interactive backend
+        import matplotlib.pyplot as plt
+        plt.style.use('default')  # <— ✅ One-time global style setting
+        _pyplot = plt
+    return _pyplot
+
 class WeasyPrintExporter:
     def __init__(self, title="Report", template_type="standard", orientation="portrait", 
                  language="en", rtl_labels=None):
@@ -87,6 +95,7 @@ class WeasyPrintExporter:
                 return
                 
             labels, values = zip(*chart_data)
+            plt = get_pyplot()
             # Create matplotlib figure
             fig, ax = plt.subplots(figsize=(8, 4))
             
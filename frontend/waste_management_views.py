@@ -2,7 +2,7 @@ from django.urls import reverse
 from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.views.decorators.http import require_http_methods
-from frontend.utils.cache_helpers import VesselCacheHelper, WasteCacheHelper, get_optimized_pagination
+from frontend.utils.cache_helpers import VesselCacheHelper, WasteCacheHelper
 from .utils.query_helpers import TransactionQueryHelper
 from .utils.response_helpers import JsonResponseHelper
 from .utils.crud_helpers import CRUDHelper, AdminActionHelper
@@ -21,56 +21,31 @@ from django.db import transaction
 
 logger = logging.getLogger('frontend')
 
+def waste_mgmt_queryset():
+    """Unfiltered waste report management queryset (paged and cached by WasteCacheHelper.MGMT_LIST)"""
+    return WasteReport.objects.select_related('vessel', 'created_by')
+
+
 @login_required
 @user_passes_test(is_admin_or_manager)
 def waste_management(request):
     """OPTIMIZED: Waste report management with COUNT-free pagination"""
     
-    # 🚀 CACHE: Check for cached waste report list (only when no filters applied)
-    has_filters = any([
-        request.GET.get('search', ''),
-        request.GET.get('vessel', ''),
-        request.GET.get('status', ''),
-        request.GET.get('date_from', ''),
-        request.GET.get('date_to', '')
-    ])
-    
-    if not has_filters:
-        cached_waste_list = WasteCacheHelper.get_waste_mgmt_list()
-        
-        if cached_waste_list:
-            logger.debug(f"Cache hit: Waste Management List ({len(cached_waste_list)} waste reports)")
-            waste_reports = cached_waste_list
-        else:
-            logger.debug("Cache miss: Building waste management list")
-            
-            # 🚀 OPTIMIZED: Build and cache evaluated list of waste report objects
-            waste_reports = list(WasteReport.objects.select_related(
-                'vessel', 'created_by'
-            ).order_by('-report_date', '-created_at'))
-            
-            # 🚀 CACHE: Store evaluated waste report list for future requests
-            WasteCacheHelper.cache_waste_mgmt_list(waste_reports)
-            logger.debug(f"Cached: Waste Management List ({len(waste_reports)} waste reports) - 1 hour timeout")
-    else:
-        # Filters applied - always do fresh query (can't use cache)
-        waste_reports = WasteReport.objects.select_related(
-            'vessel', 'created_by'
-        )
-        
-        # Apply all filters using helper with custom field mappings
-        waste_reports = TransactionQueryHelper.apply_common_filters(
-            waste_reports, request,
-            date_field='report_date',        # Waste reports use report_date
-            status_field='is_completed'      # Enable status filtering for waste reports
-        )
-        
-        # Order for consistent results
-        waste_reports = waste_reports.order_by('-report_date', '-created_at')
+    # Apply all filters using helper with custom field mappings
+    waste_reports = TransactionQueryHelper.apply_common_filters(
+        waste_mgmt_queryset(), request,
+        date_field='report_date',        # Waste reports use report_date
+        status_field='is_completed'      # Enable status filtering for waste reports
+    )
     
-    # ✅ REPLACE Django Paginator with optimized pagination
+    # 🚀 CACHE: First pages per vessel/status come from cached windows,
+    # deeper pages and date-filtered views use keyset queries
     page_number = request.GET.get('page', 1)
-    page_obj = get_optimized_pagination(waste_reports, page_number, page_size=25, use_count=False)
+    page_obj = WasteCacheHelper.MGMT_LIST.paginate(
+        waste_reports,
+        {name: request.GET.get(name) for name in ('vessel', 'status', 'date_from', 'date_to')},
+        page_number, page_size=25
+    )
     
     # Add cost performance class to each waste report (for template)
     waste_reports_list = page_obj.object_list  # Use optimized pagination object list
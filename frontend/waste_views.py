@@ -1,16 +1,20 @@
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.db.models import Q, Sum
 from django.http import JsonResponse
 from datetime import date, datetime
 from decimal import Decimal
 import json
 import logging
 from frontend.utils.cache_helpers import VesselCacheHelper, WasteCacheHelper
+from frontend.utils.product_index import ProductIndexHelper
+from frontend.utils.completion_edits import CompletionEditHelper
+from frontend.utils.cache_invalidation import CacheInvalidationCollector
+from frontend.utils.cart_preview import CartPreviewHelper
 from vessels.models import Vessel
 from products.models import Product
 from transactions.models import Transaction, InventoryLot, WasteReport, get_available_inventory, get_available_inventory_at_date
+from vessel_management.utils import VesselAccessHelper
 from .utils import BilingualMessages
 from .permissions import operations_access_required
 from django.core.exceptions import ValidationError
@@ -189,46 +193,17 @@ def waste_search_products(request):
         
         vessel = Vessel.objects.get(id=vessel_id, active=True)
         
-        # Search for products with available inventory on this vessel
-        available_lots = InventoryLot.objects.filter(
-            vessel=vessel,
-            remaining_quantity__gt=0,
-            product__active=True
-        ).filter(
-            Q(product__name__icontains=search_term) |
-            Q(product__item_id__icontains=search_term) |
-            Q(product__barcode__icontains=search_term)
-        ).select_related('product')
-        
-        # Group by product and calculate totals
-        product_summaries = available_lots.values(
-            'product__id', 'product__name', 'product__item_id', 
-            'product__barcode', 'product__is_duty_free'
-        ).annotate(
-            total_quantity=Sum('remaining_quantity')
-        ).order_by('product__item_id')
-        
+        # 🚀 POS INDEX: Trie/barcode lookup with stock and FIFO cost already resolved
         products = []
-        for summary in product_summaries:
-            product_id = summary['product__id']
-            
-            # Get FIFO cost (oldest available lot)
-            oldest_lot = InventoryLot.objects.filter(
-                vessel=vessel,
-                product_id=product_id,
-                remaining_quantity__gt=0
-            ).order_by('purchase_date', 'created_at').first()
-            
-            current_cost = oldest_lot.purchase_price if oldest_lot else 0
-            
+        for entry in ProductIndexHelper.search(vessel, search_term):
             products.append({
-                'id': product_id,
-                'name': summary['product__name'],
-                'item_id': summary['product__item_id'],
-                'barcode': summary['product__barcode'] or '',
-                'is_duty_free': summary['product__is_duty_free'],
-                'available_quantity': summary['total_quantity'],  # ← Fixed field name
-                'current_cost': float(current_cost),
+                'id': entry['id'],
+                'name': entry['name'],
+                'item_id': entry['item_id'],
+                'barcode': entry['barcode'],
+                'is_duty_free': entry['is_duty_free'],
+                'available_quantity': entry['stock'],
+                'current_cost': entry['cost'],
             })
         
         return JsonResponse({
@@ -239,6 +214,36 @@ def waste_search_products(request):
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
+@operations_access_required
+def waste_preview_cart(request):
+    """
+    AJAX endpoint: stock and FIFO cost of a whole waste cart.
+    Body: {vessel_id, lines: [{product_id, quantity}, ...]}
+    """
+    if request.method != 'POST':
+        return JsonResponse({'success': False, 'error': 'POST method required'})
+    
+    try:
+        data = json.loads(request.body)
+        vessel = Vessel.objects.get(id=data.get('vessel_id'), active=True)
+        
+        # Validate user has access to this vessel
+        if not VesselAccessHelper.can_user_access_vessel(request.user, vessel):
+            return JsonResponse({'success': False, 'error': f"User {request.user.username} does not have access to vessel {vessel.name}"})
+        
+        lines = CartPreviewHelper.parse_lines(data.get('lines'))
+        
+        # Damaged stock is gone whether or not a pending transfer promised it
+        preview = CartPreviewHelper.preview(vessel, lines, respects_reservations=False)
+        return JsonResponse(CartPreviewHelper.as_json({'success': True, **preview}))
+        
+    except Vessel.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Vessel not found'})
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
 @operations_access_required
 def waste_available_products(request):
     """AJAX endpoint to get all products available for waste on specific vessel with historical inventory support"""
@@ -363,26 +368,27 @@ def waste_bulk_complete(request):
         if waste_report.is_completed:
             return JsonResponse({'success': False, 'error': 'Waste report already completed'})
         
-        created_transactions = []
-        total_cost = Decimal('0')
+        # Bulk fetch all products
+        product_ids = [item.get('product_id') for item in items if item.get('product_id')]
+        products_by_id = Product.objects.in_bulk(product_ids)
         
         with transaction.atomic():
-            # Delete existing waste transactions to re-create from cart
-            existing_waste_transactions = Transaction.objects.filter(
+            existing_waste_transactions = list(Transaction.objects.select_related('product').filter(
                 waste_report=waste_report, 
                 transaction_type='WASTE'
-            )
-
-            if existing_waste_transactions.exists():
-                logger.info(f"🔄 WASTE EDIT: Deleting {existing_waste_transactions.count()} existing waste transactions individually for inventory restoration")
-                
-                # Delete each transaction individually to trigger inventory restoration
-                for txn in existing_waste_transactions:
-                    txn.delete()  # This calls the individual delete() method with inventory restoration
-                
-                logger.info(f"✅ WASTE EDIT: Inventory restored for {existing_waste_transactions.count()} transactions")
+            ).order_by('created_at', 'id'))
+            
+            # Waste is costed at the oldest lot in stock (one query for the whole cart)
+            unit_costs = {txn.product_id: txn.unit_price for txn in existing_waste_transactions}
+            oldest_lots = InventoryLot.objects.filter(
+                vessel=waste_report.vessel,
+                product_id__in=products_by_id.keys(),
+                remaining_quantity__gt=0
+            ).order_by('-purchase_date', '-created_at').values_list('product_id', 'purchase_price')
+            unit_costs.update(oldest_lots)  # Last write per product wins: the oldest lot
             
             # Process each waste item
+            lines = []
             for item in items:
                 product_id = item.get('product_id')
                 quantity = Decimal(str(item.get('quantity', 0)))
@@ -392,66 +398,58 @@ def waste_bulk_complete(request):
                 if quantity <= 0:
                     continue
                 
-                try:
-                    product = Product.objects.select_for_update().get(id=product_id)
-                    
-                    # Check available inventory at waste report date (point-in-time validation)
-                    from django.utils import timezone
-                    today = timezone.now().date()
-                    
-                    if waste_report.report_date < today:
-                        # Historical waste report - use point-in-time inventory balance
-                        available_quantity, _ = get_available_inventory_at_date(waste_report.vessel, product, waste_report.report_date)
-                    else:
-                        # Current or future waste report - use current inventory balance
-                        available_quantity, _ = get_available_inventory(waste_report.vessel, product)
-                    
-                    if quantity > available_quantity:
-                        return JsonResponse({
-                            'success': False, 
-                            'error': f'Insufficient inventory for {product.name}. Available at {waste_report.report_date}: {available_quantity}, Requested: {quantity}'
-                        })
-                    
-                    # Get FIFO cost for waste tracking
-                    oldest_lot = InventoryLot.objects.filter(
-                        vessel=waste_report.vessel,
-                        product=product,
-                        remaining_quantity__gt=0
-                    ).order_by('purchase_date', 'created_at').first()
-                    
-                    if not oldest_lot:
-                        continue  # Skip if no inventory available
-                    
-                    unit_cost = oldest_lot.purchase_price
-                    
-                    # SIMPLE FIX: Check if notes are already formatted to prevent duplication
-                    if raw_user_notes.startswith(f"Waste Report: {waste_report.report_number}"):
-                        formatted_notes = raw_user_notes  # Already formatted, use as-is
-                    else:
-                        # Apply formatting to raw user notes
-                        formatted_notes = f"Waste Report: {waste_report.report_number}. Reason: {damage_reason}."
-                        if raw_user_notes:
-                            formatted_notes += f" {raw_user_notes}"
-                    
-                    # Create waste transaction
-                    waste_transaction = Transaction.objects.create(
-                        vessel=waste_report.vessel,
-                        product=product,
-                        transaction_type='WASTE',
-                        quantity=quantity,
-                        unit_price=unit_cost,
-                        transaction_date=waste_report.report_date,
-                        waste_report=waste_report,
-                        damage_reason=damage_reason,
-                        notes=formatted_notes,  # Use properly formatted notes
-                        created_by=request.user
-                    )
-                    
-                    created_transactions.append(waste_transaction)
-                    total_cost += quantity * unit_cost
-                    
-                except Product.DoesNotExist:
-                    continue  # Skip invalid products
+                product = products_by_id.get(product_id)
+                if product is None or product_id not in unit_costs:
+                    continue  # Skip invalid products and products without inventory
+                
+                # SIMPLE FIX: Check if notes are already formatted to prevent duplication
+                if raw_user_notes.startswith(f"Waste Report: {waste_report.report_number}"):
+                    formatted_notes = raw_user_notes  # Already formatted, use as-is
+                else:
+                    # Apply formatting to raw user notes
+                    formatted_notes = f"Waste Report: {waste_report.report_number}. Reason: {damage_reason}."
+                    if raw_user_notes:
+                        formatted_notes += f" {raw_user_notes}"
+                
+                lines.append({
+                    'product': product,
+                    'quantity': quantity,
+                    'unit_price': unit_costs[product_id],
+                    'damage_reason': damage_reason,
+                    'notes': formatted_notes,  # Use properly formatted notes
+                })
+            
+            # 🔄 DELTA EDIT: Diff the cart against waste lines already posted to this report
+            plan = CompletionEditHelper.diff(existing_waste_transactions, lines, 'WASTE')
+            
+            # Check available inventory at waste report date (point-in-time validation) for the stock the edit adds
+            from django.utils import timezone
+            today = timezone.now().date()
+            
+            for product_id, quantity in plan.increases().items():
+                product = products_by_id[product_id]
+                if waste_report.report_date < today:
+                    # Historical waste report - use point-in-time inventory balance
+                    available_quantity, _ = get_available_inventory_at_date(waste_report.vessel, product, waste_report.report_date)
+                else:
+                    # Current or future waste report - use current inventory balance
+                    available_quantity, _ = get_available_inventory(waste_report.vessel, product)
+                
+                if quantity > available_quantity:
+                    return JsonResponse({
+                        'success': False, 
+                        'error': f'Insufficient inventory for {product.name}. Available at {waste_report.report_date}: {available_quantity}, Additional requested: {quantity}'
+                    })
+            
+            # Only added, removed and re-quantified lines touch inventory lots
+            CompletionEditHelper.apply(plan, 'WASTE', {
+                'vessel': waste_report.vessel,
+                'transaction_date': waste_report.report_date,
+                'waste_report': waste_report,
+                'created_by': request.user,
+            })
+            created_transactions = plan.transactions
+            total_cost = sum((txn.quantity * txn.unit_price for txn in created_transactions), Decimal('0'))
             
             # Mark waste report as completed and update summary fields
             waste_report.is_completed = True
@@ -460,7 +458,7 @@ def waste_bulk_complete(request):
             # Update pre-calculated summary fields (total_cost and item_count)
             waste_report.update_summary_fields()
             
-            WasteCacheHelper.clear_cache_after_waste_complete(waste_report.id)
+            CacheInvalidationCollector.defer(WasteCacheHelper.clear_cache_after_waste_complete, waste_report.id)
         
         return JsonResponse({
             'success': True,
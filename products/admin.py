@@ -1,6 +1,7 @@
 from django.shortcuts import redirect
 from django.contrib import messages, admin
 from frontend.utils.cache_helpers import ProductCacheHelper
+from frontend.utils.product_index import ProductIndexHelper
 from .models import Category, Product
 
 @admin.register(Category)
@@ -26,17 +27,20 @@ class ProductAdminMixin:
                 ProductCacheHelper.clear_cache_after_product_update()
             else:
                 ProductCacheHelper.clear_cache_after_product_create()
+            ProductIndexHelper.mark_products_changed_all_vessels([obj.pk])
             
             messages.success(request, "Product saved and cache cleared!")
         except Exception as e:
             messages.warning(request, f"Product saved but cache clear failed: {e}")
     
     def delete_model(self, request, obj):
+        product_id = obj.pk
         super().delete_model(request, obj)
         
         # Clear cache after deletion in admin
         try:
             ProductCacheHelper.clear_cache_after_product_delete()
+            ProductIndexHelper.mark_products_changed_all_vessels([product_id])
             messages.success(request, "Product deleted and cache cleared!")
         except Exception as e:
             messages.warning(request, f"Product deleted but cache clear failed: {e}")
@@ -94,6 +94,24 @@ class Product(models.Model):
     def __str__(self):
         return f"{self.item_id} - {self.name}"
     
+    def save(self, *args, **kwargs):
+        """Override save to invalidate the per-vessel effective price tables and journal the change for sync clients"""
+        super().save(*args, **kwargs)
+        from frontend.utils.cache_helpers import VesselPricingCacheHelper
+        from frontend.utils.sync_journal import SyncJournalHelper
+        VesselPricingCacheHelper.invalidate_all()
+        SyncJournalHelper.record_products(None, [self.id])
+    
+    def delete(self, *args, **kwargs):
+        """Override delete to invalidate the per-vessel effective price tables and journal the change for sync clients"""
+        product_id = self.id
+        result = super().delete(*args, **kwargs)
+        from frontend.utils.cache_helpers import VesselPricingCacheHelper
+        from frontend.utils.sync_journal import SyncJournalHelper
+        VesselPricingCacheHelper.invalidate_all()
+        SyncJournalHelper.record_products(None, [product_id])
+        return result
+    
     @property
     def profit_margin(self):
         """Calculate profit margin percentage"""
@@ -4,7 +4,7 @@ from django.utils.html import format_html
 from django.db.models import Sum, Count
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from .models import InventoryLot, Transaction, Trip, PurchaseOrder, WasteReport, Transfer
+from .models import InventoryLot, InventoryLotArchive, StockReservation, Transaction, Trip, PurchaseOrder, WasteReport, Transfer
 
 @admin.register(Trip)
 class TripAdmin(admin.ModelAdmin):
@@ -139,6 +139,38 @@ class InventoryLotAdmin(admin.ModelAdmin):
         return "0%"
     consumption_percentage.short_description = 'Consumed %'
 
+@admin.register(InventoryLotArchive)
+class InventoryLotArchiveAdmin(admin.ModelAdmin):
+    """Read-only view of exhausted lots moved out of the FIFO working set"""
+    
+    list_display = ['id', 'vessel', 'product', 'purchase_date', 'purchase_price', 'original_quantity', 'archived_at']
+    list_filter = ['vessel', 'purchase_date', 'archived_at']
+    search_fields = ['product__name', 'product__item_id', 'vessel__name']
+    ordering = ['-archived_at']
+    list_select_related = ['vessel', 'product']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+@admin.register(StockReservation)
+class StockReservationAdmin(admin.ModelAdmin):
+    """Read-only view of stock promised to pending workflow transfers"""
+    
+    list_display = ['transfer', 'vessel', 'product', 'quantity', 'updated_at']
+    list_filter = ['vessel']
+    search_fields = ['product__name', 'product__item_id', 'vessel__name']
+    ordering = ['-updated_at']
+    list_select_related = ['transfer__from_vessel', 'transfer__to_vessel', 'vessel', 'product']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
 @admin.register(Transfer)
 class TransferAdmin(admin.ModelAdmin):
     """Admin interface for transfers between vessels"""
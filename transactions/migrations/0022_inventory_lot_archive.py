@@ -0,0 +1,75 @@
+# Generated by Django 5.2.1 on 2026-10-18 21:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_alter_product_category'),
+        ('transactions', '0021_add_total_cost_field'),
+        ('vessels', '0003_add_database_integrity_constraints_fixed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryLotArchive',
+            fields=[
+                ('id', models.BigIntegerField(help_text='Original InventoryLot id', primary_key=True, serialize=False)),
+                ('purchase_date', models.DateField()),
+                ('purchase_price', models.DecimalField(decimal_places=6, help_text='Cost price per unit when purchased (JOD)', max_digits=20)),
+                ('original_quantity', models.IntegerField(help_text='Original quantity purchased')),
+                ('created_at', models.DateTimeField(help_text='Creation time of the original lot')),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archived Inventory Lot',
+                'verbose_name_plural': 'Archived Inventory Lots',
+                'ordering': ['vessel', 'product', 'purchase_date', 'created_at'],
+            },
+        ),
+        migrations.RemoveIndex(
+            model_name='inventorylot',
+            name='inventorylot_remaining_qty_idx',
+        ),
+        migrations.AlterField(
+            model_name='fifoconsumption',
+            name='inventory_lot',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.PROTECT, to='transactions.inventorylot'),
+        ),
+        migrations.AlterField(
+            model_name='inventoryevent',
+            name='inventory_lot',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.PROTECT, to='transactions.inventorylot'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorylot',
+            index=models.Index(condition=models.Q(('remaining_quantity__gt', 0)), fields=['vessel', 'product', 'purchase_date', 'created_at'], name='inventorylot_open_fifo_idx'),
+        ),
+        migrations.AddField(
+            model_name='inventorylotarchive',
+            name='created_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='inventorylotarchive',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_inventory_lots', to='products.product'),
+        ),
+        migrations.AddField(
+            model_name='inventorylotarchive',
+            name='vessel',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='archived_inventory_lots', to='vessels.vessel'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorylotarchive',
+            index=models.Index(fields=['vessel', 'product', 'purchase_date'], name='lot_archive_fifo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorylotarchive',
+            index=models.Index(fields=['archived_at'], name='lot_archive_archived_at_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 21:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transactions', '0022_inventory_lot_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='cogs_total',
+            field=models.DecimalField(blank=True, decimal_places=6, help_text='Exact FIFO cost of goods consumed (SALE, TRANSFER_OUT, WASTE) in JOD', max_digits=20, null=True),
+        ),
+    ]
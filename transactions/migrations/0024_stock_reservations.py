@@ -0,0 +1,50 @@
+# Generated by Django 5.2.1 on 2026-10-18 22:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_alter_product_category'),
+        ('transactions', '0023_transaction_cogs_total'),
+        ('vessels', '0003_add_database_integrity_constraints_fixed'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservedStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(default=0, help_text='Units reserved by pending transfers')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reserved_stock', to='products.product')),
+                ('vessel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reserved_stock', to='vessels.vessel')),
+            ],
+            options={
+                'verbose_name': 'Reserved Stock',
+                'verbose_name_plural': 'Reserved Stock',
+                'constraints': [models.UniqueConstraint(fields=('vessel', 'product'), name='reserved_stock_vessel_product_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(help_text='Units promised to the transfer and not yet consumed')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_reservations', to='products.product')),
+                ('transfer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_reservations', to='transactions.transfer')),
+                ('vessel', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_reservations', to='vessels.vessel')),
+            ],
+            options={
+                'verbose_name': 'Stock Reservation',
+                'verbose_name_plural': 'Stock Reservations',
+                'ordering': ['vessel', 'product', 'created_at'],
+                'indexes': [models.Index(fields=['vessel', 'product'], name='stock_reservation_vp_idx')],
+                'constraints': [models.UniqueConstraint(fields=('transfer', 'product'), name='stock_reservation_transfer_product_uniq')],
+            },
+        ),
+    ]
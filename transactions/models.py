@@ -8,9 +8,15 @@ from vessels.models import Vessel
 from products.models import Product
 from django.db.models import Sum, F, Count, Avg, Min, Max, StdDev
 from django.db import transaction
-from frontend.utils.cache_helpers import ProductCacheHelper, TripCacheHelper, WasteCacheHelper
+from frontend.utils.cache_helpers import (
+    ProductCacheHelper, TripCacheHelper, POCacheHelper, TransferCacheHelper, WasteCacheHelper, VesselPricingCacheHelper
+)
+from frontend.utils.cache_invalidation import CacheInvalidationCollector
+from frontend.utils.pricing_completeness import PricingCompletenessHelper
+from frontend.utils.lot_archive import InventoryLotArchiveHelper
+from frontend.utils.stock_reservations import StockReservationHelper
 from frontend.utils.error_helpers import InventoryErrorHelper
-from django.core.cache import cache
+from frontend.utils.change_feed import ChangeFeedHelper, ChangeFeedQuerySet
 import logging
 
 logger = logging.getLogger('transactions')
@@ -46,8 +52,13 @@ class InventoryLot(models.Model):
         indexes = [
             models.Index(fields=['vessel', 'product'], name='inventorylot_vessel_product_idx'),
             models.Index(fields=['purchase_date'], name='inventorylot_purchase_date_idx'),
-            models.Index(fields=['remaining_quantity'], name='inventorylot_remaining_qty_idx'),
             models.Index(fields=['vessel', 'product', 'purchase_date'], name='inventorylot_fifo_idx'),
+            # 🚀 Partial index: FIFO lock-and-consume only ever scans open lots
+            models.Index(
+                fields=['vessel', 'product', 'purchase_date', 'created_at'],
+                name='inventorylot_open_fifo_idx',
+                condition=models.Q(remaining_quantity__gt=0)
+            ),
             models.Index(fields=['product'], name='inventorylot_product_idx'),
         ]
         constraints = [
@@ -87,13 +98,99 @@ class InventoryLot(models.Model):
         return self.remaining_quantity == 0
 
 
+class InventoryLotArchive(models.Model):
+    """
+    Cold storage for exhausted inventory lots.
+    Rows keep the original InventoryLot id so FIFOConsumption and InventoryEvent
+    references stay valid; lots are moved back on demand when a restore needs them.
+    """
+    id = models.BigIntegerField(primary_key=True, help_text="Original InventoryLot id")
+    vessel = models.ForeignKey(Vessel, on_delete=models.PROTECT, related_name='archived_inventory_lots')
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='archived_inventory_lots')
+    purchase_date = models.DateField()
+    purchase_price = models.DecimalField(
+        max_digits=20,
+        decimal_places=6,
+        help_text="Cost price per unit when purchased (JOD)"
+    )
+    original_quantity = models.IntegerField(help_text="Original quantity purchased")
+    
+    # Metadata
+    created_at = models.DateTimeField(help_text="Creation time of the original lot")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['vessel', 'product', 'purchase_date', 'created_at']
+        verbose_name = 'Archived Inventory Lot'
+        verbose_name_plural = 'Archived Inventory Lots'
+        indexes = [
+            models.Index(fields=['vessel', 'product', 'purchase_date'], name='lot_archive_fifo_idx'),
+            models.Index(fields=['archived_at'], name='lot_archive_archived_at_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.vessel.name} - {self.product.item_id} - {self.purchase_date} (archived, 0/{self.original_quantity})"
+
+
+class StockReservation(models.Model):
+    """
+    Reservation ledger line: stock promised to a pending workflow transfer.
+    One row per transfer and product; maintained by StockReservationHelper
+    on workflow submit, edit, confirm and reject.
+    """
+    transfer = models.ForeignKey('Transfer', on_delete=models.CASCADE, related_name='stock_reservations')
+    vessel = models.ForeignKey(Vessel, on_delete=models.CASCADE, related_name='stock_reservations')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_reservations')
+    quantity = models.PositiveIntegerField(help_text="Units promised to the transfer and not yet consumed")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['vessel', 'product', 'created_at']
+        verbose_name = 'Stock Reservation'
+        verbose_name_plural = 'Stock Reservations'
+        constraints = [
+            models.UniqueConstraint(fields=['transfer', 'product'], name='stock_reservation_transfer_product_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['vessel', 'product'], name='stock_reservation_vp_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.vessel.name} - {self.product.item_id}: {self.quantity} reserved for transfer {self.transfer_id}"
+
+
+class ReservedStock(models.Model):
+    """
+    Running total of StockReservation per vessel/product, so
+    available-to-promise (on hand - reserved) needs a single row lookup.
+    """
+    vessel = models.ForeignKey(Vessel, on_delete=models.CASCADE, related_name='reserved_stock')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='reserved_stock')
+    quantity = models.IntegerField(default=0, help_text="Units reserved by pending transfers")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Reserved Stock'
+        verbose_name_plural = 'Reserved Stock'
+        constraints = [
+            models.UniqueConstraint(fields=['vessel', 'product'], name='reserved_stock_vessel_product_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.vessel.name} - {self.product.item_id}: {self.quantity} reserved"
+
+
 class FIFOConsumption(models.Model):
     """
     Dedicated table for tracking FIFO consumption details
     Replaces fragile string parsing from transaction notes
     """
     transaction = models.ForeignKey('Transaction', on_delete=models.CASCADE, related_name='fifo_consumptions')
-    inventory_lot = models.ForeignKey(InventoryLot, on_delete=models.PROTECT)
+    # No DB constraint: exhausted lots may live in InventoryLotArchive under the same id
+    inventory_lot = models.ForeignKey(InventoryLot, on_delete=models.PROTECT, db_constraint=False)
     consumed_quantity = models.DecimalField(
         max_digits=10,
         decimal_places=3,
@@ -159,7 +256,10 @@ class InventoryEvent(models.Model):
     event_type = models.CharField(max_length=20, choices=EVENT_TYPES)
     vessel = models.ForeignKey(Vessel, on_delete=models.PROTECT)
     product = models.ForeignKey(Product, on_delete=models.PROTECT)
-    inventory_lot = models.ForeignKey(InventoryLot, on_delete=models.PROTECT, null=True, blank=True)
+    # No DB constraint: exhausted lots may live in InventoryLotArchive under the same id
+    inventory_lot = models.ForeignKey(
+        InventoryLot, on_delete=models.PROTECT, db_constraint=False, null=True, blank=True
+    )
     transaction = models.ForeignKey('Transaction', on_delete=models.CASCADE)
     
     quantity_change = models.DecimalField(
@@ -182,6 +282,9 @@ class InventoryEvent(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     notes = models.TextField(blank=True, help_text="Additional context about this event")
     
+    # 📡 Inserts (save and bulk_create) are published to the change feed outbox
+    objects = ChangeFeedQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-timestamp']
         indexes = [
@@ -195,6 +298,13 @@ class InventoryEvent(models.Model):
     
     def __str__(self):
         return f"{self.event_type}: {self.vessel.name} - {self.product.item_id} ({self.quantity_change})"
+    
+    def save(self, *args, **kwargs):
+        is_new = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if is_new:
+                ChangeFeedHelper.publish(InventoryEvent, [self])
 
 
 class TransferOperation(models.Model):
@@ -340,6 +450,18 @@ class Trip(models.Model):
     def __str__(self):
         return f"{self.trip_number} - {self.vessel.name} ({self.trip_date})"
     
+    def save(self, *args, **kwargs):
+        """Override save to drop the trip management list windows of the affected vessels"""
+        previous_vessel_ids = TripCacheHelper.MGMT_LIST.stored_vessel_ids(self, kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
+        TripCacheHelper.MGMT_LIST.invalidate_instance(self, previous_vessel_ids)
+    
+    def delete(self, *args, **kwargs):
+        """Override delete to drop the trip management list windows of its vessels"""
+        result = super().delete(*args, **kwargs)
+        TripCacheHelper.MGMT_LIST.invalidate_instance(self)
+        return result
+    
     # Note: total_revenue and item_count are now database fields for performance
     # The old @property methods have been replaced with pre-calculated fields
     
@@ -395,6 +517,18 @@ class PurchaseOrder(models.Model):
     def __str__(self):
         return f"{self.po_number} - {self.vessel.name} ({self.po_date})"
     
+    def save(self, *args, **kwargs):
+        """Override save to drop the PO management list windows of the affected vessels"""
+        previous_vessel_ids = POCacheHelper.MGMT_LIST.stored_vessel_ids(self, kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
+        POCacheHelper.MGMT_LIST.invalidate_instance(self, previous_vessel_ids)
+    
+    def delete(self, *args, **kwargs):
+        """Override delete to drop the PO management list windows of its vessels"""
+        result = super().delete(*args, **kwargs)
+        POCacheHelper.MGMT_LIST.invalidate_instance(self)
+        return result
+    
     @property  
     def calculated_total_cost(self):
         """Dynamic calculation of total cost (use for validation/updates)"""
@@ -499,6 +633,24 @@ class Transfer(models.Model):
     def __str__(self):
         return f"Transfer: {self.from_vessel.name} → {self.to_vessel.name} ({self.transfer_date})"
     
+    def save(self, *args, **kwargs):
+        """Override save to drop the transfer management list windows of the affected vessels"""
+        previous_vessel_ids = TransferCacheHelper.MGMT_LIST.stored_vessel_ids(self, kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
+        TransferCacheHelper.MGMT_LIST.invalidate_instance(self, previous_vessel_ids)
+    
+    def delete(self, *args, **kwargs):
+        """Override delete to release reserved stock and drop the transfer management list windows"""
+        with transaction.atomic():
+            StockReservationHelper.release_transfer(self)
+            workflow = getattr(self, 'workflow', None)
+            if workflow is not None:
+                # Deleted first so its own delete() updates the notification counters (a cascade would not)
+                workflow.delete()
+            result = super().delete(*args, **kwargs)
+        TransferCacheHelper.MGMT_LIST.invalidate_instance(self)
+        return result
+    
     @property
     def transfer_transactions(self):
         """Get all transfer transactions (both TRANSFER_OUT and TRANSFER_IN)"""
@@ -581,6 +733,18 @@ class WasteReport(models.Model):
     def __str__(self):
         return f"{self.report_number} - {self.vessel.name} ({self.report_date})"
     
+    def save(self, *args, **kwargs):
+        """Override save to drop the waste management list windows of the affected vessels"""
+        previous_vessel_ids = WasteCacheHelper.MGMT_LIST.stored_vessel_ids(self, kwargs.get('update_fields'))
+        super().save(*args, **kwargs)
+        WasteCacheHelper.MGMT_LIST.invalidate_instance(self, previous_vessel_ids)
+    
+    def delete(self, *args, **kwargs):
+        """Override delete to drop the waste management list windows of its vessels"""
+        result = super().delete(*args, **kwargs)
+        WasteCacheHelper.MGMT_LIST.invalidate_instance(self)
+        return result
+    
     @property
     def calculated_total_cost(self):
         """Dynamic calculation of total cost (use for validation/updates)"""
@@ -665,6 +829,13 @@ class Transaction(models.Model):
         blank=True,
         help_text="Price per unit for this transaction (JOD)"
     )
+    cogs_total = models.DecimalField(
+        max_digits=20,
+        decimal_places=6,
+        null=True,
+        blank=True,
+        help_text="Exact FIFO cost of goods consumed (SALE, TRANSFER_OUT, WASTE) in JOD"
+    )
     
     # Additional Information
     notes = models.TextField(
@@ -723,6 +894,9 @@ class Transaction(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     
+    # 📡 Inserts (save and bulk_create) are published to the change feed outbox
+    objects = ChangeFeedQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-transaction_date', '-created_at']
         verbose_name = 'Transaction'
@@ -822,6 +996,25 @@ class Transaction(models.Model):
             return self.boxes * self.items_per_box
         return self.quantity
     
+    @property
+    def cogs(self):
+        """
+        FIFO cost of goods for consuming transactions.
+        Reads the stored column; rows saved before it existed fall back to
+        (prefetched) FIFOConsumption records. None when no cost is known.
+        """
+        if self.cogs_total is not None:
+            return self.cogs_total
+        consumptions = self.fifo_consumptions.all()
+        if not consumptions:
+            return None
+        return sum((c.consumed_quantity * c.unit_cost for c in consumptions), Decimal('0'))
+    
+    @staticmethod
+    def fifo_notes_enabled():
+        from django.conf import settings
+        return getattr(settings, 'TRANSACTION_FIFO_NOTES', True)
+    
     def clean(self):
         """Validate transaction data and auto-set unit price for transfers"""
         super().clean()
@@ -876,7 +1069,10 @@ class Transaction(models.Model):
                 self._validate_and_consume_for_waste()
             
             # Save transaction only after successful inventory operations
+            is_new = self._state.adding
             super().save(*args, **kwargs)
+            if is_new:
+                ChangeFeedHelper.publish(Transaction, [self])
             
             # Create FIFO and event records after transaction is saved
             if hasattr(self, '_fifo_records_to_create'):
@@ -898,6 +1094,10 @@ class Transaction(models.Model):
                     self._complete_transfer_idempotent()
                 else:
                     logger.info(f"Skipping auto-complete for pending workflow transfer: {self.transfer.id}")
+        
+        # Keep the POS product index in step with stock changes (once per vessel, after commit)
+        if not kwargs.get('update_fields'):
+            CacheInvalidationCollector.defer_stock_changed(self.vessel_id, [self.product_id])
     
     def _validate_and_consume_inventory(self):
         """
@@ -911,14 +1111,17 @@ class Transaction(models.Model):
             remaining_quantity__gt=0
         ).select_for_update().order_by('purchase_date', 'created_at')
         
-        # Calculate total available within the lock
+        # Calculate total available within the lock (stock promised to pending transfers is not for sale)
         total_available = sum(lot.remaining_quantity for lot in inventory_lots)
+        reserved = StockReservationHelper.reserved(self.vessel_id, self.product_id)
         
         # Validate availability
-        if self.quantity > total_available:
+        if self.quantity > total_available - reserved:
             raise ValidationError(
                 f"Insufficient inventory for {self.product.name} on {self.vessel.name}. "
-                f"Available: {total_available}, Requested: {self.quantity}"
+                f"Available: {max(total_available - reserved, 0)}"
+                + (f" ({reserved} reserved for pending transfers)" if reserved else "")
+                + f", Requested: {self.quantity}"
             )
         
         # Consume inventory using FIFO within the lock
@@ -984,6 +1187,9 @@ class Transaction(models.Model):
         self._fifo_records_to_create = fifo_records
         self._inventory_events_to_create = inventory_events
         
+        # Exact COGS goes into the same INSERT as the transaction
+        self.cogs_total = sum((r.consumed_quantity * r.unit_cost for r in fifo_records), Decimal('0'))
+        
         logger.info(f"FIFO consumption prepared: {len(fifo_records)} lots to process, total: {self.quantity}")
     
     def _validate_and_consume_for_transfer(self):
@@ -1002,14 +1208,17 @@ class Transaction(models.Model):
             remaining_quantity__gt=0
         ).select_for_update().order_by('purchase_date', 'created_at')
         
-        # Calculate total available within the lock
+        # Calculate total available within the lock (less other pending transfers' reservations)
         total_available = sum(lot.remaining_quantity for lot in inventory_lots)
+        reserved = StockReservationHelper.reserved(self.vessel_id, self.product_id)
         
         # Validate availability
-        if self.quantity > total_available:
+        if self.quantity > total_available - reserved:
             raise ValidationError(
                 f"Insufficient inventory for transfer of {self.product.name} from {self.vessel.name}. "
-                f"Available: {total_available}, Requested: {self.quantity}"
+                f"Available: {max(total_available - reserved, 0)}"
+                + (f" ({reserved} reserved for pending transfers)" if reserved else "")
+                + f", Requested: {self.quantity}"
             )
         
         # ✅ IMPROVED: Consume inventory using FIFO within the lock (same as sales)
@@ -1079,6 +1288,7 @@ class Transaction(models.Model):
         if fifo_records:
             try:
                 total_fifo_cost = sum(record.consumed_quantity * record.unit_cost for record in fifo_records)
+                self.cogs_total = total_fifo_cost
                 self.unit_price = total_fifo_cost / self.quantity if self.quantity > 0 else Decimal('0.001')
                 avg_cost_per_unit = float(self.unit_price)
                 logger.info(f"Transfer consumption complete - Total FIFO cost: {total_fifo_cost}, Avg per unit: {avg_cost_per_unit}")
@@ -1091,13 +1301,16 @@ class Transaction(models.Model):
         
         # Build FIFO breakdown for notes (same format as sales)
         cost_breakdown = []
-        for record in fifo_records:
-            cost_breakdown.append(
-                f"{record.consumed_quantity} units @ {record.unit_cost} JOD/unit"
-            )
+        if self.fifo_notes_enabled():
+            for record in fifo_records:
+                cost_breakdown.append(
+                    f"{record.consumed_quantity} units @ {record.unit_cost} JOD/unit"
+                )
         
         # Set initial notes - will be updated in _complete_transfer()
-        if cost_breakdown:
+        if not self.fifo_notes_enabled():
+            self.notes = "Transfer preparation."
+        elif cost_breakdown:
             self.notes = f"Transfer preparation. FIFO consumption: {'; '.join(cost_breakdown)}"
         else:
             self.notes = f"Transfer preparation. Using fallback cost: {self.unit_price} JOD/unit"
@@ -1148,8 +1361,13 @@ class Transaction(models.Model):
             
             remaining_to_consume -= consume_from_lot
         
+        self.cogs_total = sum(
+            (Decimal(detail['consumed_quantity']) * detail['unit_cost'] for detail in consumption_details),
+            Decimal('0')
+        )
+        
         # Add FIFO consumption details to notes if empty
-        if not self.notes and consumption_details:
+        if not self.notes and consumption_details and self.fifo_notes_enabled():
             cost_breakdown = []
             for detail in consumption_details:
                 cost_breakdown.append(
@@ -1159,8 +1377,8 @@ class Transaction(models.Model):
             self.notes = f"Waste - {damage_reason_text}. FIFO consumption: {'; '.join(cost_breakdown)}"
     
     def _handle_supply(self):
-        """Create new inventory lot for supply transactions"""
-        InventoryLot.objects.create(
+        """Create new inventory lot for supply transactions, linked by its LOT_CREATED event"""
+        lot = InventoryLot.objects.create(
             vessel=self.vessel,
             product=self.product,
             purchase_date=self.transaction_date,
@@ -1169,6 +1387,18 @@ class Transaction(models.Model):
             remaining_quantity=int(self.quantity),
             created_by=self.created_by
         )
+        InventoryEvent.objects.create(
+            event_type='LOT_CREATED',
+            vessel=self.vessel,
+            product=self.product,
+            inventory_lot=lot,
+            transaction=self,
+            quantity_change=self.quantity,
+            unit_cost=self.unit_price,
+            lot_remaining_after=lot.remaining_quantity,
+            created_by=self.created_by,
+            notes=f"Supply receiving: lot {lot.id}"
+        )
     
     def _is_workflow_transfer_pending(self):
         """Check if this is a workflow transfer that's still pending approval"""
@@ -1223,7 +1453,8 @@ class Transaction(models.Model):
                 # Note: transfer_out_transaction is already set in get_or_create above
                 
                 # Get FIFO consumption details from FIFOConsumption table
-                fifo_consumptions = self.fifo_consumptions.select_related('inventory_lot').order_by('sequence')
+                # No select_related('inventory_lot'): its INNER JOIN would drop archived lots
+                fifo_consumptions = self.fifo_consumptions.order_by('sequence')
                 
                 if not fifo_consumptions.exists():
                     raise ValidationError("No FIFO consumption records found for transfer")
@@ -1268,7 +1499,7 @@ class Transaction(models.Model):
                         unit_cost=fifo_consumption.unit_cost,
                         lot_remaining_after=int(fifo_consumption.consumed_quantity),
                         created_by=self.created_by,
-                        notes=f"Transfer receipt from {self.vessel.name}: lot {fifo_consumption.inventory_lot.id}"
+                        notes=f"Transfer receipt from {self.vessel.name}: lot {fifo_consumption.inventory_lot_id}"
                     )
                 
                 # Link transactions
@@ -1446,17 +1677,22 @@ class Transaction(models.Model):
         transfer_in.save()
         
         # Update notes with exact FIFO breakdown (same format as sales)
-        fifo_breakdown = '; '.join(lot_details)
-        self.notes = f"Transferred to {self.transfer_to_vessel.name}. FIFO consumption: {fifo_breakdown}"
-        transfer_in.notes = f"Received from {self.vessel.name}. FIFO details: {fifo_breakdown}"
+        if self.fifo_notes_enabled():
+            fifo_breakdown = '; '.join(lot_details)
+            self.notes = f"Transferred to {self.transfer_to_vessel.name}. FIFO consumption: {fifo_breakdown}"
+            transfer_in.notes = f"Received from {self.vessel.name}. FIFO details: {fifo_breakdown}"
+        else:
+            self.notes = f"Transferred to {self.transfer_to_vessel.name}."
+            transfer_in.notes = f"Received from {self.vessel.name}."
         
         logger.info(f"Transfer completed: {self.vessel.name} → {self.transfer_to_vessel.name}, Cost: {self.unit_price}/unit")
         
     def delete(self, *args, **kwargs):
         """Enhanced delete with comprehensive safety validation and inventory restoration"""
         
+        supply_lot_ids = None
         if self.transaction_type == 'SUPPLY':
-            self._validate_and_delete_supply_inventory()
+            supply_lot_ids = self._validate_supply_deletion()
         elif self.transaction_type == 'SALE':
             self._restore_inventory_for_sale()
         elif self.transaction_type == 'TRANSFER_OUT':
@@ -1466,65 +1702,44 @@ class Transaction(models.Model):
         elif self.transaction_type == 'TRANSFER_IN':
             self._remove_transferred_inventory()
         
-        # Clear product cache since inventory changed using versioned cache
-        try:
-            from frontend.utils.cache_helpers import VersionedCache
-            # Invalidate specific cache keys for this transaction
-            cache_keys = [
-                f'product_{self.product_id}',
-                f'vessel_{self.vessel_id}',
-                f'inventory_{self.vessel_id}_{self.product_id}',
-                'product_stats',
-                'vessel_pricing_summary'
-            ]
-            
-            for cache_key in cache_keys:
-                VersionedCache.invalidate_version(cache_key)
-            
-            # Also clear the old way as fallback
-            ProductCacheHelper.clear_cache_after_product_update()
-        except Exception as e:
-            logger.warning(f"Cache invalidation error in transaction delete: {e}")
+        # 🔄 CACHE: Invalidations are queued and deduplicated, then run once after commit -
+        # deleting every line of a trip bumps each key once, not once per line
+        from frontend.utils.cache_helpers import VersionedCache
+        for cache_key in (
+            f'product_{self.product_id}',
+            f'vessel_{self.vessel_id}',
+            f'inventory_{self.vessel_id}_{self.product_id}',
+            'product_stats',
+            'vessel_pricing_summary'
+        ):
+            CacheInvalidationCollector.defer(VersionedCache.invalidate_version, cache_key)
+        CacheInvalidationCollector.defer(ProductCacheHelper.clear_cache_after_product_update)
 
-        # 🚀 CACHE: Clear trip cache if this affects trip data
-        try:
-            if self.transaction_type == 'SALE' and hasattr(self, 'trip') and self.trip:
-                TripCacheHelper.clear_cache_after_trip_update(self.trip.id)
-                
-                # 🚀 FIX: Also clear completed trip cache specifically
-                if self.trip.is_completed:
-                    completed_cache_key = TripCacheHelper.get_completed_trip_cache_key(self.trip.id)
-                    cache.delete(completed_cache_key)
-                    logger.debug(f"Completed trip cache cleared: Trip {self.trip.id}")
-                
-                logger.debug(f"Trip cache cleared after transaction deletion: Trip {self.trip.id}")
-            else:
-                # Clear general trip cache for any transaction changes
-                TripCacheHelper.clear_recent_trips_cache_only_when_needed()
-                logger.debug("Recent trips cache cleared after transaction deletion")
-        except Exception as e:
-            logger.warning(f"Trip cache clear error: {e}")
-        
-        try:
-            if self.transaction_type == 'WASTE' and hasattr(self, 'waste_report') and self.waste_report:
-                
-                WasteCacheHelper.clear_cache_after_waste_update(self.waste_report.id)
-                
-                # 🚀 FIX: Also clear completed waste cache specifically
-                if self.waste_report.is_completed:
-                    completed_cache_key = WasteCacheHelper.get_completed_waste_cache_key(self.waste_report.id)
-                    cache.delete(completed_cache_key)
-                    logger.debug(f"Completed waste cache cleared: Waste {self.waste_report.id}")
-                
-                logger.debug(f"Waste cache cleared after transaction deletion: Waste {self.waste_report.id}")
-            else:
-                # Clear general waste cache for any transaction changes that might affect waste calculations
-                WasteCacheHelper.clear_cache_after_waste_update()
-                logger.debug("General waste cache cleared after transaction deletion")
-        except Exception as e:
-            logger.warning(f"Waste cache clear error: {e}")
+        # 🚀 CACHE: Clear trip cache if this affects trip data (completed trip cache included)
+        if self.transaction_type == 'SALE' and self.trip_id:
+            CacheInvalidationCollector.defer(TripCacheHelper.clear_cache_after_trip_update, self.trip_id)
+        else:
+            # Clear general trip cache for any transaction changes
+            CacheInvalidationCollector.defer(TripCacheHelper.clear_recent_trips_cache_only_when_needed)
+
+        # Waste cache, specific report (completed waste cache included) or general
+        if self.transaction_type == 'WASTE' and self.waste_report_id:
+            CacheInvalidationCollector.defer(WasteCacheHelper.clear_cache_after_waste_update, self.waste_report_id)
+        else:
+            CacheInvalidationCollector.defer(WasteCacheHelper.clear_cache_after_waste_update)
         
         super().delete(*args, **kwargs)
+        
+        # The supply's lots go once its events (LOT_CREATED included) were deleted with it
+        if supply_lot_ids:
+            lots_deleted, _ = InventoryLot.objects.filter(id__in=supply_lot_ids).delete()
+            logger.info(f"Deleted {lots_deleted} inventory lots")
+        
+        # A pending line no longer promises its quantity
+        if self.transaction_type == 'TRANSFER_OUT' and self.transfer_id:
+            StockReservationHelper.sync_transfer(self.transfer, grow=False)
+        
+        CacheInvalidationCollector.defer_stock_changed(self.vessel_id, [self.product_id])
 
     def _restore_inventory_for_sale(self):
         """
@@ -1534,6 +1749,9 @@ class Transaction(models.Model):
         
         logger.info(f"Restoring inventory for sale deletion: {self.product.name} on {self.vessel.name}, Qty: {self.quantity}")
         
+        # Consumed lots may have been archived - bring them back before restoring quantities
+        InventoryLotArchiveHelper.restore_for_transaction(self)
+        
         # Get FIFO consumption records for this transaction
         fifo_consumptions = self.fifo_consumptions.select_related('inventory_lot').order_by('sequence')
         
@@ -1601,6 +1819,14 @@ class Transaction(models.Model):
         
         # Find lots with matching cost (within small tolerance for decimal precision)
         tolerance = 0.000001
+        price_range = {
+            'purchase_price__gte': unit_cost - tolerance,
+            'purchase_price__lte': unit_cost + tolerance
+        }
+        if not InventoryLot.objects.filter(vessel=self.vessel, product=self.product, **price_range).exists():
+            # The original lot may have been archived once exhausted
+            InventoryLotArchiveHelper.restore_matching(self.vessel, self.product, limit=1, **price_range)
+        
         matching_lots = InventoryLot.objects.filter(
             vessel=self.vessel,
             product=self.product,
@@ -1728,7 +1954,12 @@ class Transaction(models.Model):
     def _restore_inventory_for_waste(self):
         """🔄 RESTORE INVENTORY: Handle WASTE transaction deletion"""
         logger.info(f"Restoring inventory for waste deletion: {self.product.name} on {self.vessel.name}, Qty: {self.quantity}")
-        
+
+        # Lines posted by CompletionEditHelper carry FIFO records - put stock back into its lots
+        if self.fifo_consumptions.exists():
+            self._restore_inventory_for_sale()
+            return
+
         # Create new inventory lot using the waste transaction's unit_price (original FIFO cost)
         InventoryLot.objects.create(
             vessel=self.vessel,
@@ -1783,22 +2014,42 @@ class Transaction(models.Model):
         if remaining_to_remove > 0:
             logger.warning(f"Could not remove all inventory. {remaining_to_remove} units remaining")
 
-    def _validate_and_delete_supply_inventory(self):
+    def _validate_supply_deletion(self):
         """
         🛡️ SAFE SUPPLY DELETION: Validate no consumption before deleting inventory lots
         Enhanced with user-friendly error messages and actionable guidance
+        
+        Returns:
+            list: ids of the lots to delete along with this supply
         """
         
         logger.debug(f"Checking supply deletion for {self.product.name} on {self.vessel.name}")
-        logger.debug(f"Looking for lots with date={self.transaction_date}, price={self.unit_price}")
         
-        # Find ALL inventory lots that match this supply transaction
-        matching_lots = InventoryLot.objects.filter(
-            vessel=self.vessel,
-            product=self.product,
-            purchase_date=self.transaction_date,
-            purchase_price=self.unit_price
+        # Archived (fully consumed) lots must block deletion like live ones
+        linked_lot_ids = list(
+            InventoryEvent.objects.filter(transaction=self, event_type='LOT_CREATED').values_list('inventory_lot_id', flat=True)
         )
+        if linked_lot_ids:
+            InventoryLotArchiveHelper.restore_lots(linked_lot_ids)
+            matching_lots = InventoryLot.objects.filter(id__in=linked_lot_ids)
+        else:
+            # Supplies recorded before lots were linked by LOT_CREATED events: match by date and price
+            logger.debug(f"Looking for lots with date={self.transaction_date}, price={self.unit_price}")
+            InventoryLotArchiveHelper.restore_matching(
+                self.vessel, self.product,
+                purchase_date=self.transaction_date,
+                purchase_price=self.unit_price
+            )
+            matching_lots = InventoryLot.objects.filter(
+                vessel=self.vessel,
+                product=self.product,
+                purchase_date=self.transaction_date,
+                purchase_price=self.unit_price
+            ).exclude(
+                id__in=InventoryEvent.objects.filter(
+                    event_type='LOT_CREATED', inventory_lot__isnull=False
+                ).values('inventory_lot_id')
+            )
         
         logger.debug(f"Found {matching_lots.count()} matching lots")
         
@@ -1851,10 +2102,7 @@ class Transaction(models.Model):
         
         # ✅ SAFE TO DELETE: No consumption detected
         logger.info("Safe to delete - no consumption detected")
-        lots_deleted = matching_lots.count()
-        matching_lots.delete()
-        
-        logger.info(f"Deleted {lots_deleted} inventory lots")
+        return [lot.id for lot in matching_lots]
 
 class VesselProductPrice(models.Model):
     """Custom pricing for specific vessel-product combinations (touristic vessels only)"""
@@ -1906,6 +2154,17 @@ class VesselProductPrice(models.Model):
         """Override save to run validation"""
         self.clean()
         super().save(*args, **kwargs)
+        CacheInvalidationCollector.defer(VesselPricingCacheHelper.invalidate_vessel, self.vessel_id)
+        CacheInvalidationCollector.defer_stock_changed(self.vessel_id, [self.product_id])
+        CacheInvalidationCollector.defer(PricingCompletenessHelper.invalidate)
+    
+    def delete(self, *args, **kwargs):
+        """Override delete to refresh the price table and POS product index"""
+        result = super().delete(*args, **kwargs)
+        CacheInvalidationCollector.defer(VesselPricingCacheHelper.invalidate_vessel, self.vessel_id)
+        CacheInvalidationCollector.defer_stock_changed(self.vessel_id, [self.product_id])
+        CacheInvalidationCollector.defer(PricingCompletenessHelper.invalidate)
+        return result
     
     @property
     def price_difference(self):
@@ -1931,6 +2190,12 @@ def get_available_inventory(vessel, product):
     total_quantity = sum(lot.remaining_quantity for lot in lots)
     return total_quantity, lots
 
+def get_available_to_promise(vessel, product):
+    """Current inventory less stock reserved by pending workflow transfers (lots as get_available_inventory)"""
+    total_quantity, lots = get_available_inventory(vessel, product)
+    reserved = StockReservationHelper.reserved(vessel.id, product.id)
+    return max(total_quantity - reserved, 0), lots
+
 def get_available_inventory_at_date(vessel, product, target_date):
     """Get available inventory for a vessel-product combination at a specific date (point-in-time)
     
@@ -2044,6 +2309,103 @@ def consume_inventory_fifo(vessel, product, quantity_to_consume):
     
     return consumption_details
 
+def create_supply_transactions_bulk(purchase_order, lines, created_by=None):
+    """
+    🚀 BULK RECEIVING: Post many supply lines to a purchase order with constant-count statements.
+
+    Equivalent to Transaction.objects.create(transaction_type='SUPPLY') per line (lot and
+    LOT_CREATED event via _handle_supply) but inserts transactions, lots and events with
+    one bulk_create each and refreshes the PO summary once.
+
+    Args:
+        purchase_order: PurchaseOrder receiving the goods
+        lines: list of dicts with product, quantity, unit_price and optional notes/boxes/items_per_box
+        created_by: User posting the delivery
+
+    Returns:
+        list: created SUPPLY transactions
+    """
+    from django.db import connection
+
+    if not lines:
+        return []
+
+    vessel = purchase_order.vessel
+
+    with transaction.atomic():
+        if not connection.features.can_return_rows_from_bulk_insert:
+            # Backend cannot hand back primary keys - fall back to the per-line path
+            created = [
+                Transaction.objects.create(
+                    vessel=vessel,
+                    product=line['product'],
+                    transaction_type='SUPPLY',
+                    transaction_date=purchase_order.po_date,
+                    quantity=line['quantity'],
+                    unit_price=line['unit_price'],
+                    purchase_order=purchase_order,
+                    notes=line.get('notes', ''),
+                    boxes=line.get('boxes'),
+                    items_per_box=line.get('items_per_box'),
+                    created_by=created_by
+                )
+                for line in lines
+            ]
+            purchase_order.update_summary_fields()
+            return created
+
+        supply_transactions = Transaction.objects.bulk_create([
+            Transaction(
+                vessel=vessel,
+                product=line['product'],
+                transaction_type='SUPPLY',
+                transaction_date=purchase_order.po_date,
+                quantity=line['quantity'],
+                unit_price=line['unit_price'],
+                purchase_order=purchase_order,
+                notes=line.get('notes', ''),
+                boxes=line.get('boxes'),
+                items_per_box=line.get('items_per_box'),
+                created_by=created_by
+            )
+            for line in lines
+        ])
+
+        lots = InventoryLot.objects.bulk_create([
+            InventoryLot(
+                vessel=vessel,
+                product_id=txn.product_id,
+                purchase_date=txn.transaction_date,
+                purchase_price=txn.unit_price,
+                original_quantity=int(txn.quantity),
+                remaining_quantity=int(txn.quantity),
+                created_by=created_by
+            )
+            for txn in supply_transactions
+        ])
+
+        InventoryEvent.objects.bulk_create([
+            InventoryEvent(
+                event_type='LOT_CREATED',
+                vessel=vessel,
+                product_id=txn.product_id,
+                inventory_lot=lot,
+                transaction=txn,
+                quantity_change=txn.quantity,
+                unit_cost=txn.unit_price,
+                lot_remaining_after=lot.remaining_quantity,
+                created_by=created_by,
+                notes=f'Supply receiving: lot {lot.id}'
+            )
+            for txn, lot in zip(supply_transactions, lots)
+        ])
+
+        purchase_order.update_summary_fields()
+
+    CacheInvalidationCollector.defer_stock_changed(vessel.id, [txn.product_id for txn in supply_transactions])
+    logger.info(f"Bulk received {len(supply_transactions)} supply lines into {purchase_order.po_number}")
+    return supply_transactions
+
 # Business Logic Functions
 def get_vessel_product_price(vessel, product):
     """
@@ -2062,18 +2424,20 @@ def get_vessel_product_price(vessel, product):
         # Duty-free vessels or duty-free products always use default pricing
         return product.selling_price, False, None
     
-    # Try to get vessel-specific price
-    try:
-        vessel_price = VesselProductPrice.objects.get(vessel=vessel, product=product)
-        return vessel_price.selling_price, True, None
-    except VesselProductPrice.DoesNotExist:
-        # No custom price found, use default product price
-        return product.selling_price, False, None
+    # 🚀 CACHED: Per-vessel effective price table (one query per vessel, versioned)
+    price, is_custom = VesselPricingCacheHelper.get_price_map(vessel).get(product.id, (None, False))
+    if is_custom:
+        return price, True, None
+    
+    # No custom price found, use default product price
+    return product.selling_price, False, None
 
 def get_all_vessel_pricing_summary():
     """Get enriched vessel pricing data for dashboard"""
     
-    total_products = Product.objects.filter(active=True, is_duty_free=False).count()
+    # 🚀 CACHED: Coverage comes from the completeness matrix, price stats from one grouped query
+    matrix = PricingCompletenessHelper.get_matrix()
+    total_products = matrix.total_products
 
     vessels = Vessel.objects.filter(active=True, has_duty_free=False).annotate(
         custom_price_count=Count('custom_prices'),
@@ -2087,9 +2451,8 @@ def get_all_vessel_pricing_summary():
     incomplete_count = 0
 
     for vessel in vessels:
-        warnings = get_vessel_pricing_warnings(vessel)
-        missing = warnings['missing_price_count']
-        has_warnings = warnings['has_warnings']
+        missing = matrix.missing_count(vessel.id)
+        has_warnings = missing > 0
         completion = ((total_products - missing) / max(total_products, 1)) * 100
 
         vessel_data.append({
@@ -2137,16 +2500,23 @@ def get_vessel_pricing_warnings(vessel=None):
             price_count=Count('selling_price')
         ).filter(price_count__gte=2)
         
+        flagged = []
         for item in price_variations:
             if item['std_price'] and item['avg_price']:
                 variation_percentage = (item['std_price'] / item['avg_price']) * 100
                 if variation_percentage > 25:  # More than 25% variation
-                    product = Product.objects.get(id=item['product'])
-                    warnings.append({
-                        'type': 'high_price_variation',
-                        'product': product.name,
-                        'variation': f"{variation_percentage:.1f}%"
-                    })
+                    flagged.append((item['product'], variation_percentage))
+        
+        # 🚀 BATCH: One name lookup for all flagged products
+        product_names = dict(
+            Product.objects.filter(id__in=[product_id for product_id, _ in flagged]).values_list('id', 'name')
+        ) if flagged else {}
+        for product_id, variation_percentage in flagged:
+            warnings.append({
+                'type': 'high_price_variation',
+                'product': product_names.get(product_id),
+                'variation': f"{variation_percentage:.1f}%"
+            })
         
         return warnings
     
@@ -2156,20 +2526,14 @@ def get_vessel_pricing_warnings(vessel=None):
             'has_warnings': False,
             'missing_price_count': 0,
             'missing_products': [],
-            'message': None
+            'message': None,
+            'total_products': 0
         }
     
-    # Get all general products (non-duty-free)
-    general_products = Product.objects.filter(active=True, is_duty_free=False)
-    
-    # Get products with custom pricing for this vessel
-    products_with_custom_pricing = VesselProductPrice.objects.filter(
-        vessel=vessel
-    ).values_list('product_id', flat=True)
-    
-    # Find products missing custom pricing
-    missing_products = general_products.exclude(id__in=products_with_custom_pricing)
-    missing_count = missing_products.count()
+    # 🚀 CACHED: Missing products read straight from the completeness matrix
+    matrix = PricingCompletenessHelper.get_matrix()
+    missing_products = matrix.missing_products(vessel.id)
+    missing_count = len(missing_products)
     
     warning_message = None
     if missing_count > 0:
@@ -2178,6 +2542,7 @@ def get_vessel_pricing_warnings(vessel=None):
     return {
         'has_warnings': missing_count > 0,
         'missing_price_count': missing_count,
-        'missing_products': list(missing_products.values('id', 'name', 'item_id')),
-        'message': warning_message
+        'missing_products': missing_products,
+        'message': warning_message,
+        'total_products': matrix.total_products
     }
\ No newline at end of file
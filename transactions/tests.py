@@ -1,4 +1,4 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from decimal import Decimal
@@ -6,9 +6,11 @@ from datetime import date
 
 from vessels.models import Vessel
 from products.models import Product, Category
-from .models import Transaction, InventoryLot, FIFOConsumption, InventoryEvent, TransferOperation, Transfer
+from .models import Transaction, InventoryLot, FIFOConsumption, InventoryEvent, TransferOperation, Transfer, PurchaseOrder, create_supply_transactions_bulk
 
 
+# No metrics snapshot files from test runs (settings.METRICS_DIR)
+@override_settings(METRICS_DIR='')
 class FIFOInventoryTests(TestCase):
     """Test cases for FIFO inventory consistency fixes"""
     
@@ -265,4 +267,298 @@ class FIFOInventoryTests(TestCase):
         # Check remaining inventory precision
         lot = InventoryLot.objects.get(vessel=self.vessel1, product=self.product)
         expected_remaining = Decimal('10.333') - Decimal('5.123')
-        self.assertEqual(lot.remaining_quantity, int(expected_remaining))  # Rounded to int as expected
\ No newline at end of file
+        self.assertEqual(lot.remaining_quantity, int(expected_remaining))  # Rounded to int as expected
+    
+    def test_consuming_transactions_store_fifo_cogs(self):
+        """Test SALE stores exact FIFO COGS and the backfill fills legacy rows"""
+        from django.core.management import call_command
+        from io import StringIO
+        
+        for quantity, cost in (('10', '1.00'), ('5', '1.50')):
+            Transaction.objects.create(
+                vessel=self.vessel1, product=self.product, transaction_type='SUPPLY',
+                transaction_date=date.today(), quantity=Decimal(quantity),
+                unit_price=Decimal(cost), created_by=self.user
+            )
+        sale = Transaction.objects.create(
+            vessel=self.vessel1, product=self.product, transaction_type='SALE',
+            transaction_date=date.today(), quantity=Decimal('12'),
+            unit_price=Decimal('2.00'), created_by=self.user
+        )
+        self.assertEqual(sale.cogs_total, Decimal('13.00'))
+        
+        Transaction.objects.filter(id=sale.id).update(cogs_total=None)
+        call_command('backfill_transaction_cogs', stdout=StringIO())
+        sale.refresh_from_db()
+        self.assertEqual(sale.cogs_total, Decimal('13.00'))
+
+
+@override_settings(METRICS_DIR='')
+class InventoryTestSetup(TestCase):
+    """Shared fixture for inventory feature tests: a user, a touristic vessel and one product"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser('testuser', 'test@test.com', 'password')
+        cls.vessel = Vessel.objects.create(name='Test Vessel', has_duty_free=False, created_by=cls.user)
+        cls.category = Category.objects.create(name='Test Category')
+        cls.product = cls.create_product('Test Product', 'TEST001')
+    
+    def setUp(self):
+        """Caches and in-process indexes are not rolled back with the test database"""
+        from django.core.cache import cache
+        from frontend.utils.product_index import ProductIndexHelper
+        cache.clear()
+        ProductIndexHelper.clear_local()
+    
+    @classmethod
+    def create_product(cls, name, item_id, purchase_price='1.00', selling_price='2.00', **kwargs):
+        return Product.objects.create(
+            name=name,
+            item_id=item_id,
+            category=cls.category,
+            purchase_price=Decimal(purchase_price),
+            selling_price=Decimal(selling_price),
+            created_by=cls.user,
+            **kwargs
+        )
+    
+    @classmethod
+    def create_transaction(cls, transaction_type, quantity, unit_price=None, **kwargs):
+        """Transaction dated today on the fixture vessel and product unless given"""
+        kwargs.setdefault('vessel', cls.vessel)
+        kwargs.setdefault('product', cls.product)
+        kwargs.setdefault('transaction_date', date.today())
+        if unit_price is not None:
+            kwargs['unit_price'] = Decimal(unit_price)
+        return Transaction.objects.create(
+            transaction_type=transaction_type, quantity=Decimal(quantity), created_by=cls.user, **kwargs
+        )
+
+
+class BulkSupplyReceivingTests(InventoryTestSetup):
+    """Test cases for bulk supply posting into purchase orders"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.products = [cls.product] + [cls.create_product(f'Supply Product {i}', f'SUP{i:03d}') for i in (1, 2)]
+        cls.po = PurchaseOrder.objects.create(
+            po_number='PO-BULK-001', vessel=cls.vessel, po_date=date.today(), created_by=cls.user
+        )
+    
+    def test_bulk_supply_creates_lots_events_and_summary(self):
+        """Test that bulk posting matches the per-line SUPPLY path and refreshes the PO summary"""
+        lines = [
+            {'product': product, 'quantity': Decimal('10'), 'unit_price': Decimal('1.50')}
+            for product in self.products
+        ]
+        created = create_supply_transactions_bulk(self.po, lines, created_by=self.user)
+        
+        self.assertEqual(len(created), 3)
+        self.assertEqual(InventoryLot.objects.filter(vessel=self.vessel, remaining_quantity=10).count(), 3)
+        self.assertEqual(InventoryEvent.objects.filter(event_type='LOT_CREATED', transaction__in=created).count(), 3)
+        
+        self.po.refresh_from_db()
+        self.assertEqual(self.po.item_count, 3)
+        self.assertEqual(self.po.total_cost, Decimal('45.000'))
+        
+        # A line posted on its own records the same LOT_CREATED event
+        single = self.create_transaction('SUPPLY', '10', '1.50', purchase_order=self.po)
+        event_fields = ['event_type', 'product_id', 'quantity_change', 'unit_cost', 'lot_remaining_after']
+        bulk_event = InventoryEvent.objects.filter(transaction=created[0]).values(*event_fields).get()
+        single_event = InventoryEvent.objects.filter(transaction=single).values(*event_fields).get()
+        self.assertEqual(single_event, bulk_event)
+        
+        # Unconsumed lines of either path are deleted with exactly their own lot, even at equal date and price
+        single.delete()
+        created[0].delete()
+        self.assertEqual(InventoryLot.objects.filter(vessel=self.vessel).count(), 2)
+        self.assertFalse(InventoryEvent.objects.filter(transaction_id__in=[single.id, created[0].id]).exists())
+
+
+class InventoryLotArchiveTests(InventoryTestSetup):
+    """Test cases for moving exhausted lots to the archive and back"""
+    
+    def test_archived_lots_are_restored_on_sale_deletion(self):
+        """Test exhausted lots leave the hot table and come back when a restore needs them"""
+        from datetime import timedelta
+        from frontend.utils.lot_archive import InventoryLotArchiveHelper
+        from .models import InventoryLotArchive
+        
+        old_date = date.today() - timedelta(days=200)
+        self.create_transaction('SUPPLY', '5', '1.00', transaction_date=old_date)
+        self.create_transaction('SUPPLY', '5', '1.50')
+        sale = self.create_transaction('SALE', '5', '2.00', transaction_date=old_date)
+        exhausted_lot = sale.fifo_consumptions.get().inventory_lot
+        
+        self.assertEqual(InventoryLotArchiveHelper.archive_exhausted_lots(dry_run=True), 1)
+        self.assertEqual(InventoryLotArchiveHelper.archive_exhausted_lots(), 1)
+        self.assertFalse(InventoryLot.objects.filter(id=exhausted_lot.id).exists())
+        self.assertTrue(InventoryLotArchive.objects.filter(id=exhausted_lot.id).exists())
+        
+        # FIFO consumption only ever sees the open lot
+        self.create_transaction('SALE', '2', '2.00')
+        self.assertEqual(InventoryLot.objects.get(vessel=self.vessel, remaining_quantity__gt=0).remaining_quantity, 3)
+        
+        sale.delete()
+        restored = InventoryLot.objects.get(id=exhausted_lot.id)
+        self.assertEqual(restored.remaining_quantity, 5)
+        self.assertEqual(restored.created_at, exhausted_lot.created_at)
+        self.assertFalse(InventoryLotArchive.objects.exists())
+    
+    def test_consumption_history_of_archived_lots_stays_visible(self):
+        """Test readers of FIFO history see archived lots instead of dropping them"""
+        from datetime import timedelta
+        from io import StringIO
+        from django.core.management import call_command
+        from frontend.utils.lot_archive import InventoryLotArchiveHelper
+        from .models import InventoryLotArchive
+        
+        old_date = date.today() - timedelta(days=200)
+        self.create_transaction('SUPPLY', '5', '1.00', transaction_date=old_date)
+        self.create_transaction('SUPPLY', '5', '1.50', transaction_date=old_date + timedelta(days=1))
+        sale = self.create_transaction('SALE', '7', '2.00', transaction_date=old_date + timedelta(days=1))
+        old_lot_id, new_lot_id = sale.fifo_consumptions.order_by('sequence').values_list('inventory_lot_id', flat=True)
+        
+        self.assertEqual(InventoryLotArchiveHelper.archive_exhausted_lots(), 1)
+        lots = InventoryLotArchiveHelper.resolve_lots([old_lot_id, new_lot_id])
+        self.assertIsInstance(lots[old_lot_id], InventoryLotArchive)
+        self.assertIsInstance(lots[new_lot_id], InventoryLot)
+        
+        # Consume the archived (older) lot second: the FIFO order check must still see it
+        consumptions = FIFOConsumption.objects.filter(transaction=sale)
+        consumptions.filter(sequence=1).update(sequence=99)
+        consumptions.filter(sequence=2).update(sequence=1)
+        consumptions.filter(sequence=99).update(sequence=2)
+        output = StringIO()
+        call_command('check_db_integrity', stdout=output)
+        self.assertIn('1 transactions with FIFO ordering violations', output.getvalue())
+        self.assertNotIn('reference missing inventory lots', output.getvalue())
+        
+        # Deleting the sale brings the archived lot back and restores both lots
+        sale.delete()
+        self.assertFalse(InventoryLotArchive.objects.exists())
+        self.assertEqual(
+            dict(InventoryLot.objects.filter(vessel=self.vessel).values_list('id', 'remaining_quantity')),
+            {old_lot_id: 5, new_lot_id: 5}
+        )
+
+
+class StockReservationTests(InventoryTestSetup):
+    """Test pending workflow transfers reserve stock against sales and edits"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        from vessel_management.models import TransferWorkflow
+        
+        super().setUpTestData()
+        cls.to_vessel = Vessel.objects.create(name='Reserve To', has_duty_free=False, created_by=cls.user)
+        cls.create_transaction('SUPPLY', '10', '1.00')
+        cls.transfer = Transfer.objects.create(
+            from_vessel=cls.vessel, to_vessel=cls.to_vessel,
+            transfer_date=date.today(), created_by=cls.user
+        )
+        cls.workflow = TransferWorkflow.objects.create(base_transfer=cls.transfer, status='created')
+        cls.line = cls.create_transaction(
+            'TRANSFER_OUT', '6', '1.00',
+            transfer=cls.transfer, transfer_to_vessel=cls.to_vessel, notes='PENDING_APPROVAL: '
+        )
+    
+    def test_reserve_on_submit_resync_on_edit_release_on_reject(self):
+        from frontend.utils.stock_reservations import StockReservationHelper
+        from .models import get_available_to_promise
+        
+        # Draft lines promise nothing yet
+        self.assertEqual(get_available_to_promise(self.vessel, self.product)[0], 10)
+        
+        self.workflow.submit_for_review()
+        self.assertEqual(StockReservationHelper.reserved(self.vessel.id, self.product.id), 6)
+        self.assertEqual(get_available_to_promise(self.vessel, self.product)[0], 4)
+        
+        with self.assertRaises(ValidationError):
+            self.create_transaction('SALE', '5')
+        self.create_transaction('SALE', '4')
+        
+        # Edits: increases must fit available-to-promise, decreases free stock
+        self.line.quantity = Decimal('7')
+        self.line.save()
+        with self.assertRaises(ValidationError):
+            StockReservationHelper.sync_transfer(self.transfer)
+        self.line.quantity = Decimal('5')
+        self.line.save()
+        self.assertEqual(StockReservationHelper.sync_transfer(self.transfer), {self.product.id: -1})
+        self.assertEqual(get_available_to_promise(self.vessel, self.product)[0], 1)
+        
+        self.workflow.reject_transfer(self.user, 'not needed')
+        self.assertEqual(StockReservationHelper.reserved(self.vessel.id, self.product.id), 0)
+        self.assertFalse(self.transfer.stock_reservations.exists())
+        self.assertEqual(get_available_to_promise(self.vessel, self.product)[0], 6)
+    
+    def test_shrink_only_sync_and_release(self):
+        from frontend.utils.stock_reservations import StockReservationHelper
+        
+        self.workflow.submit_for_review()
+        
+        # A shrink-only sync never reserves more, even for a grown line
+        Transaction.objects.filter(id=self.line.id).update(quantity=Decimal('8'))
+        self.assertEqual(StockReservationHelper.sync_transfer(self.transfer, grow=False), {})
+        self.assertEqual(StockReservationHelper.reserved(self.vessel.id, self.product.id), 6)
+        
+        # Fractional quantities reserve whole units, rounded up
+        Transaction.objects.filter(id=self.line.id).update(quantity=Decimal('4.250'))
+        self.assertEqual(StockReservationHelper.sync_transfer(self.transfer, grow=False), {self.product.id: -1})
+        self.assertEqual(StockReservationHelper.reserved(self.vessel.id, self.product.id), 5)
+        
+        self.line.delete()
+        self.assertEqual(StockReservationHelper.reserved(self.vessel.id, self.product.id), 0)
+        self.assertFalse(self.transfer.stock_reservations.exists())
+        self.assertEqual(StockReservationHelper.release_transfer(self.transfer), {})
+    
+    def test_finished_and_legacy_transfers_have_no_pending_lines(self):
+        """Test lines of completed workflows (legacy ones have no FIFO records) and plain transfers never reserve"""
+        from frontend.utils.stock_reservations import StockReservationHelper
+        
+        self.assertEqual(StockReservationHelper.pending_lines(self.transfer), {self.product.id: 6})
+        for status in ('completed', 'rejected', 'cancelled'):
+            self.workflow.status = status
+            self.workflow.save()
+            self.assertEqual(StockReservationHelper.pending_lines(self.transfer), {}, status)
+            self.assertEqual(StockReservationHelper.sync_transfer(self.transfer), {}, status)
+        
+        self.workflow.delete()
+        self.transfer.refresh_from_db()
+        self.assertEqual(StockReservationHelper.pending_lines(self.transfer), {})
+        self.assertEqual(StockReservationHelper.reserved(self.vessel.id, self.product.id), 0)
+    
+    def test_confirmed_transfer_holds_reservation_until_lots_are_consumed(self):
+        import json
+        from unittest import mock
+        from frontend.utils.stock_reservations import StockReservationHelper
+        
+        self.workflow.submit_for_review()
+        self.workflow.start_review(self.user)
+        self.client.force_login(self.user)
+        confirm = lambda: self.client.post('/transfer-workflow/confirm/', json.dumps({
+            'workflow_id': self.workflow.id, 'action': 'confirm'
+        }), content_type='application/json').json()
+        
+        # Execution fails: the confirm commits, the stock stays promised
+        with mock.patch.object(Transaction, '_complete_transfer_idempotent', side_effect=RuntimeError('boom')):
+            self.assertFalse(confirm()['success'])
+        self.workflow.refresh_from_db()
+        self.assertEqual(self.workflow.status, 'confirmed')
+        self.assertEqual(StockReservationHelper.reserved(self.vessel.id, self.product.id), 6)
+        with self.assertRaises(ValidationError):
+            self.create_transaction('SALE', '5')
+        
+        # Execution succeeds: release and consumption land together
+        self.workflow.status = 'under_review'
+        self.workflow.save()
+        self.assertTrue(confirm()['success'])
+        self.assertEqual(StockReservationHelper.reserved(self.vessel.id, self.product.id), 0)
+        self.assertEqual(
+            InventoryLot.objects.get(vessel=self.vessel, product=self.product).remaining_quantity, 4
+        )
+        self.workflow.refresh_from_db()
+        self.assertEqual(self.workflow.status, 'completed')
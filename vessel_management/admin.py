@@ -13,6 +13,7 @@ from .models import (
     TransferItemEdit,
     TransferApprovalHistory,
     TransferNotification,
+    TransferNotificationCounter,
     InventoryLotStatus
 )
 
@@ -221,16 +222,44 @@ class TransferNotificationAdmin(admin.ModelAdmin):
     
     def mark_as_unread(self, request, queryset):
         """Mark selected notifications as unread"""
-        count = queryset.filter(is_read=True).update(
+        queryset = queryset.filter(is_read=True)
+        recipient_ids = set(queryset.values_list('recipient_id', flat=True))
+        count = queryset.update(
             is_read=False, 
             read_at=None
         )
+        self._recount(recipient_ids)
         
         self.message_user(
             request, 
             f"Marked {count} notification(s) as unread."
         )
     mark_as_unread.short_description = "Mark selected notifications as unread"
+    
+    def delete_queryset(self, request, queryset):
+        recipient_ids = set(queryset.filter(is_read=False).values_list('recipient_id', flat=True))
+        super().delete_queryset(request, queryset)
+        self._recount(recipient_ids)
+    
+    def _recount(self, recipient_ids):
+        """Bulk updates bypass TransferNotification.save - rebuild the affected unread counters"""
+        for user_id in recipient_ids:
+            TransferNotificationCounter.recount(user_id)
+        TransferNotificationCounter.publish(recipient_ids)
+
+
+@admin.register(TransferNotificationCounter)
+class TransferNotificationCounterAdmin(admin.ModelAdmin):
+    """Read-only view of the pre-calculated unread notification counts"""
+    list_display = ['user', 'unread_count', 'updated_at']
+    search_fields = ['user__username']
+    list_select_related = ['user']
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(TransferApprovalHistory)
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 22:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('vessel_management', '0007_remove_different_users_constraint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransferNotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='transfer_notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Transfer Notification Counter',
+                'verbose_name_plural': 'Transfer Notification Counters',
+                'db_table': 'vessel_management_transfer_notification_counter',
+            },
+        ),
+    ]
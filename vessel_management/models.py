@@ -9,12 +9,17 @@ Based on new_features.txt requirements:
 - Complete process history and audit trail
 """
 
-from django.db import models
+from asgiref.sync import sync_to_async
+from django.db import models, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import User
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from vessels.models import Vessel
 from products.models import Product
+from frontend.utils.stock_reservations import StockReservationHelper
+from frontend.utils.live_events import LiveEventHub
 
 
 class UserVesselAssignment(models.Model):
@@ -76,6 +81,20 @@ class UserVesselAssignment(models.Model):
             self.can_initiate_transfers = True
             self.can_approve_transfers = True
     
+    def save(self, *args, **kwargs):
+        """Override save to journal the assignment for offline sync clients"""
+        super().save(*args, **kwargs)
+        from frontend.utils.sync_journal import SyncJournalHelper
+        SyncJournalHelper.record_assignments([self.vessel_id], self.user_id)
+    
+    def delete(self, *args, **kwargs):
+        """Override delete to journal the assignment for offline sync clients"""
+        vessel_id, user_id = self.vessel_id, self.user_id
+        result = super().delete(*args, **kwargs)
+        from frontend.utils.sync_journal import SyncJournalHelper
+        SyncJournalHelper.record_assignments([vessel_id], user_id)
+        return result
+    
     @classmethod
     def get_user_vessels(cls, user):
         """
@@ -238,9 +257,68 @@ class TransferWorkflow(models.Model):
         ]
         db_table = 'vessel_management_transfer_workflow'
     
+    # Fields whose change is pushed to the workflow's live event subscribers
+    STREAMED_FIELDS = ('status', 'has_edits', 'from_user_confirmed', 'to_user_confirmed', 'last_edited_at')
+    
     def __str__(self):
         return f"Transfer Workflow: {self.base_transfer.from_vessel.name} → {self.base_transfer.to_vessel.name} ({self.get_status_display()})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._streamed_state = instance._get_streamed_state()
+        return instance
+    
+    def _get_streamed_state(self):
+        return tuple(getattr(self, field, None) for field in self.STREAMED_FIELDS)
+    
+    def save(self, *args, **kwargs):
+        """Override save to push status and edit changes to the workflow's live event subscribers"""
+        previous_state = getattr(self, '_streamed_state', None)
+        super().save(*args, **kwargs)
+        self._streamed_state = self._get_streamed_state()
+        if previous_state is not None and previous_state != self._streamed_state:
+            self.publish_state()
+    
+    def delete(self, *args, **kwargs):
+        """Override delete to take the cascaded unread notifications off their recipients' counters"""
+        with transaction.atomic():
+            unread = dict(
+                self.notifications.filter(is_read=False).values('recipient_id').annotate(
+                    total=Count('id')
+                ).values_list('recipient_id', 'total')
+            )
+            result = super().delete(*args, **kwargs)
+            for user_id, total in unread.items():
+                TransferNotificationCounter.adjust(user_id, -total)
+        return result
+    
+    def publish_state(self):
+        """Send the current workflow state to everyone who can see this transfer (after commit)"""
+        data = {
+            'workflow_id': self.id,
+            'transfer_id': self.base_transfer_id,
+            'status': self.status,
+            'status_display': self.get_status_display(),
+            'has_edits': self.has_edits,
+            'from_user_confirmed': self.from_user_confirmed,
+            'to_user_confirmed': self.to_user_confirmed,
+            'last_edited_by': self.last_edited_by.username if self.last_edited_by_id else None,
+        }
+        transfer = self.base_transfer
+        extra_user_ids = [transfer.created_by_id, self.from_user_id, self.to_user_id]
+        
+        def send():
+            # Resolved after commit so assignment changes in the same transaction count
+            user_ids = set(User.objects.filter(
+                Q(is_superuser=True, is_active=True) |
+                Q(vessel_assignments__vessel_id__in=[transfer.from_vessel_id, transfer.to_vessel_id],
+                  vessel_assignments__is_active=True)
+            ).values_list('id', flat=True))
+            LiveEventHub.send(sorted(user_ids.union(extra_user_ids) - {None}), 'workflow', data)
+        
+        transaction.on_commit(send)
+    
     def clean(self):
         """Validate workflow data"""
         super().clean()
@@ -263,11 +341,15 @@ class TransferWorkflow(models.Model):
                 )
     
     def submit_for_review(self):
-        """Submit transfer for review by To User"""
+        """Submit transfer for review by To User and reserve its pending items"""
         if self.status == 'created':
-            self.status = 'pending_review'
-            self.submitted_at = timezone.now()
-            self.save()
+            with transaction.atomic():
+                self.status = 'pending_review'
+                self.submitted_at = timezone.now()
+                self.save()
+                
+                # Promised stock leaves available-to-promise until confirm or reject
+                StockReservationHelper.sync_transfer(self.base_transfer)
             
             # No individual notifications needed - vessel-based notifications via dashboard
             # All users with operations access to the destination vessel will see notifications
@@ -330,6 +412,8 @@ class TransferWorkflow(models.Model):
                 if not self.from_user:
                     self.from_user = self.base_transfer.created_by
             
+            # A confirmed transfer keeps its reservation until execution releases it
+            # in the same transaction that consumes the lots
             self.save()
     
     def confirm_by_from_user(self, user):
@@ -375,6 +459,7 @@ class TransferWorkflow(models.Model):
             self.status = 'rejected'
             self.rejection_reason = reason
             self.save()
+            StockReservationHelper.release_transfer(self.base_transfer)
             
             # Notify the original creator if different from rejecting user
             if self.base_transfer.created_by and self.base_transfer.created_by != user:
@@ -394,6 +479,7 @@ class TransferWorkflow(models.Model):
             if completed_by_user:
                 self.completed_by = completed_by_user
             self.save()
+            StockReservationHelper.release_transfer(self.base_transfer)
             
             # Notify both parties (if they exist)
             notification_recipients = []
@@ -614,6 +700,36 @@ class TransferNotification(models.Model):
         status = "Read" if self.is_read else "Unread"
         return f"{self.get_notification_type_display()} for {self.recipient.username} ({status})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._stored_is_read = instance.is_read
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """Override save to keep the recipient's unread counter current and push the change live"""
+        created = self._state.adding
+        stored_is_read = True if created else getattr(self, '_stored_is_read', self.is_read)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            delta = (stored_is_read and not self.is_read) - (not stored_is_read and self.is_read)
+            if delta:
+                TransferNotificationCounter.adjust(self.recipient_id, delta)
+        self._stored_is_read = self.is_read
+        
+        if created:
+            LiveEventHub.publish([self.recipient_id], 'notification', {
+                'id': self.id,
+                'workflow_id': self.workflow_id,
+                'notification_type': self.notification_type,
+                'title': self.title,
+                'message': self.message,
+                'is_urgent': self.is_urgent,
+                'created_at': self.created_at.isoformat(),
+            })
+        if delta:
+            TransferNotificationCounter.publish([self.recipient_id])
+    
     def mark_as_read(self):
         """Mark notification as read"""
         if not self.is_read:
@@ -621,10 +737,28 @@ class TransferNotification(models.Model):
             self.read_at = timezone.now()
             self.save()
     
+    @classmethod
+    def mark_read_for(cls, user, notification_ids):
+        """Mark a user's notifications read in one update; returns how many were unread"""
+        with transaction.atomic():
+            updated = cls.objects.filter(
+                id__in=notification_ids,
+                recipient=user,
+                is_read=False
+            ).update(
+                is_read=True,
+                read_at=timezone.now()
+            )
+            if updated:
+                TransferNotificationCounter.adjust(user.id, -updated)
+        if updated:
+            TransferNotificationCounter.publish([user.id])
+        return updated
+    
     @classmethod
     def get_unread_count(cls, user):
-        """Get count of unread notifications for user"""
-        return cls.objects.filter(recipient=user, is_read=False).count()
+        """Get count of unread notifications for user (pre-calculated counter)"""
+        return TransferNotificationCounter.get_count(user.id)
     
     @classmethod
     def get_pending_transfers(cls, user):
@@ -636,6 +770,68 @@ class TransferNotification(models.Model):
         ).order_by('-created_at')
 
 
+class TransferNotificationCounter(models.Model):
+    """
+    Pre-calculated unread TransferNotification count per user.
+    Kept in step by TransferNotification.save / mark_read_for and TransferWorkflow.delete;
+    the row is created from a real count the first time a user's count is needed.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='transfer_notification_counter'
+    )
+    unread_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Transfer Notification Counter'
+        verbose_name_plural = 'Transfer Notification Counters'
+        db_table = 'vessel_management_transfer_notification_counter'
+    
+    def __str__(self):
+        return f"{self.user.username}: {self.unread_count} unread"
+    
+    @classmethod
+    def get_count(cls, user_id):
+        count = cls.objects.filter(user_id=user_id).values_list('unread_count', flat=True).first()
+        return count if count is not None else cls.recount(user_id)
+    
+    @classmethod
+    async def aget_count(cls, user_id):
+        count = await cls.objects.filter(user_id=user_id).values_list('unread_count', flat=True).afirst()
+        return count if count is not None else await sync_to_async(cls.recount)(user_id)
+    
+    @classmethod
+    def adjust(cls, user_id, delta):
+        updated = cls.objects.filter(user_id=user_id).update(
+            unread_count=Greatest(F('unread_count') + delta, 0)
+        )
+        if not updated:
+            # First change for this user - start from the real count (already includes this change)
+            cls.recount(user_id)
+    
+    @classmethod
+    def recount(cls, user_id):
+        """Rebuild a user's counter from the notifications table"""
+        count = TransferNotification.objects.filter(recipient_id=user_id, is_read=False).count()
+        cls.objects.update_or_create(user_id=user_id, defaults={'unread_count': count})
+        return count
+    
+    @classmethod
+    def publish(cls, user_ids):
+        """Push each user's unread count to their live event channel after commit"""
+        user_ids = sorted(set(user_ids))
+        
+        def send():
+            counts = dict(cls.objects.filter(user_id__in=user_ids).values_list('user_id', 'unread_count'))
+            for user_id in user_ids:
+                LiveEventHub.send([user_id], 'unread_count', {'unread_count': counts.get(user_id, 0)})
+        
+        transaction.on_commit(send)
+
+
 class InventoryLotStatus(models.Model):
     """
     Tracks inventory lot status during transfer workflow.
@@ -3,7 +3,7 @@ Comprehensive Test Suite for Vessel-Based Access Control System
 Tests all major operations to ensure users can only access assigned vessels.
 """
 
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.db import transaction
@@ -14,8 +14,10 @@ from products.models import Product, Category
 from transactions.models import Transaction, Trip, PurchaseOrder, Transfer
 from vessel_management.models import UserVesselAssignment
 from vessel_management.utils import VesselAccessHelper, VesselOperationValidator
+from transactions.tests import InventoryTestSetup
 
 
+@override_settings(METRICS_DIR='')
 class VesselAccessControlTestCase(TestCase):
     """Test vessel-based access control across all operations"""
     
@@ -190,3 +192,67 @@ class VesselAccessControlTestCase(TestCase):
         # Verify trip was created
         trip_exists = Trip.objects.filter(trip_number='SUPER001', vessel=self.vessel_c).exists()
         self.assertTrue(trip_exists, "SuperUser should be able to create trips on any vessel")
+
+
+class TransferEventStreamTests(InventoryTestSetup):
+    """Test the denormalized unread counter and the live transfer event stream"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        from datetime import date
+        from vessel_management.models import TransferWorkflow
+        
+        super().setUpTestData()
+        cls.creator = cls.user
+        cls.reviewer = User.objects.create_superuser('streamreviewer', 'reviewer@test.com', 'password')
+        to_vessel = Vessel.objects.create(name='Stream To', has_duty_free=False, created_by=cls.creator)
+        cls.transfer = Transfer.objects.create(
+            from_vessel=cls.vessel, to_vessel=to_vessel,
+            transfer_date=date.today(), created_by=cls.creator
+        )
+        cls.workflow = TransferWorkflow.objects.create(base_transfer=cls.transfer, status='pending_review')
+    
+    def test_counter_and_events_follow_workflow(self):
+        from unittest import mock
+        from frontend.utils.live_events import LiveEventHub
+        from vessel_management.models import TransferNotification, TransferWorkflow
+        
+        workflow = TransferWorkflow.objects.get(id=self.workflow.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            workflow.start_review(self.reviewer)
+        
+        with self.assertNumQueries(1):
+            self.assertEqual(TransferNotification.get_unread_count(self.creator), 1)
+        events, last_id, resync = LiveEventHub.read(self.creator.id, 0)
+        self.assertFalse(resync)
+        self.assertEqual([event['event'] for event in events], ['workflow', 'notification', 'unread_count'])
+        self.assertEqual(events[0]['data']['status'], 'under_review')
+        self.assertEqual(events[2]['data'], {'unread_count': 1})
+        # The reviewer sees the state change but not the creator's notification
+        self.assertEqual([event['event'] for event in LiveEventHub.read(self.reviewer.id, 0)[0]], ['workflow'])
+        
+        # SSE resumes after Last-Event-ID
+        self.client.force_login(self.creator)
+        with mock.patch.object(LiveEventHub, 'WSGI_STREAM_SECONDS', 0.01):
+            response = self.client.get('/transfer-workflow/events/', HTTP_LAST_EVENT_ID=str(last_id - 1))
+            body = b''.join(response.streaming_content).decode()
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertIn('event: snapshot\ndata: {"unread_count": 1}', body)
+        self.assertIn(f'id: {last_id}\nevent: unread_count', body)
+        self.assertNotIn('event: notification', body)
+        
+        notification = TransferNotification.objects.get(recipient=self.creator)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(TransferNotification.mark_read_for(self.creator, [notification.id]), 1)
+            self.assertEqual(TransferNotification.mark_read_for(self.creator, [notification.id]), 0)
+        self.assertEqual(TransferNotification.get_unread_count(self.creator), 0)
+        self.assertEqual(LiveEventHub.read(self.creator.id, last_id)[0][-1]['data'], {'unread_count': 0})
+        
+        # Deleting the transfer cascades its notifications - the counter follows
+        TransferNotification.objects.create(
+            workflow=workflow, notification_type='reminder', recipient=self.creator,
+            title='Reminder', message='Reminder'
+        )
+        self.assertEqual(TransferNotification.get_unread_count(self.creator), 1)
+        self.transfer.delete()
+        self.assertEqual(TransferNotification.get_unread_count(self.creator), 0)
@@ -93,6 +93,20 @@ class VesselAccessHelper:
             is_active=True
         ).exists()
     
+    @staticmethod
+    async def acan_user_access_vessel(user, vessel):
+        """Async can_user_access_vessel()"""
+        if user.is_superuser:
+            return True
+        
+        vessel_id = vessel.id if hasattr(vessel, 'id') else vessel
+        
+        return await UserVesselAssignment.objects.filter(
+            user=user,
+            vessel_id=vessel_id,
+            is_active=True
+        ).aexists()
+    
     @staticmethod
     def get_user_vessel_permissions(user, vessel):
         """
@@ -3,6 +3,11 @@ ASGI config for vessel_sales project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serving through this module (e.g. ``uvicorn vessel_sales.asgi:application``) lets
+the transfer live event stream (/transfer-workflow/events/) run as an async
+generator, so idle SSE connections do not each hold a worker thread. Under WSGI
+the same endpoint falls back to short-lived sync streams.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -14,3 +19,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vessel_sales.settings')
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.CACHE_WARMUP_ON_STARTUP:
+    from frontend.utils.cache_warming import CacheWarmer
+    CacheWarmer.warm_in_background(delay=settings.CACHE_WARMUP_DELAY)
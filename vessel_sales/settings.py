@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 from django.contrib import messages
 from dotenv import load_dotenv
@@ -80,6 +81,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.MetricsMiddleware',  # Request / SQL timings (first, to time the whole stack)
+    'api.middleware.CacheInvalidationMiddleware',  # Coalesced, commit-deferred cache invalidation
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -189,7 +192,8 @@ SILENCED_SYSTEM_CHECKS = ['models.E034']
 
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        # LocMemCache plus per-key-family hit/miss/latency counters (see /metrics)
+        'BACKEND': 'frontend.utils.metrics.InstrumentedLocMemCache',
         'LOCATION': 'vessel_sales_cache',
         'TIMEOUT': 3600,  # 1 hour default timeout
         'OPTIONS': {
@@ -198,6 +202,17 @@ CACHES = {
     }
 }
 
+# Warm hot caches in a background thread when a WSGI/ASGI worker boots
+# (LocMemCache is per process, so each worker warms its own copy).
+# `python manage.py warm_caches` does the same on demand for shared backends.
+CACHE_WARMUP_ON_STARTUP = os.environ.get('CACHE_WARMUP_ON_STARTUP', 'false').lower() == 'true'
+CACHE_WARMUP_DELAY = 2  # seconds after boot, so the first requests are not competing with it
+
+# Each worker writes its metrics snapshot here; /metrics sums all of them.
+# Keep it outside the source tree; empty disables snapshot files (the test base classes do).
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'vessel_sales_metrics'))
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
 # =============================================================================
 # PASSWORD VALIDATION
 # =============================================================================
@@ -308,6 +323,14 @@ if DEBUG:
     
     INTERNAL_IPS = ['127.0.0.1']
 
+# =============================================================================
+# INVENTORY CONFIGURATION
+# =============================================================================
+
+# Write "N units @ X JOD" FIFO breakdowns into Transaction.notes for transfers and waste.
+# Exact costs are always stored in FIFOConsumption and Transaction.cogs_total.
+TRANSACTION_FIFO_NOTES = True
+
 # =============================================================================
 # SESSION CONFIGURATION
 # =============================================================================
@@ -451,7 +474,8 @@ CSP_CONNECT_SRC = ("'self'",)
 SECURE_CONTENT_SECURITY_POLICY = "default-src 'self'; script-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; style-src 'self' 'unsafe-inline' https://cdn.jsdelivr.net; img-src 'self' data: https:; font-src 'self' data: https://cdn.jsdelivr.net; connect-src 'self'"
 
 # Rate Limiting Settings (used with django-ratelimit decorators)
-RATELIMIT_ENABLE = True
+# RATELIMIT_ENABLE=false only for load tests from a single client IP (manage.py load_test_reads)
+RATELIMIT_ENABLE = os.environ.get('RATELIMIT_ENABLE', 'true').lower() == 'true'
 RATELIMIT_USE_CACHE = 'default'
 
 # API Rate Limits
@@ -26,6 +26,7 @@ from rest_framework_simplejwt.views import (
     TokenVerifyView,
 )
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
+from api.views.metrics_views import metrics_endpoint
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -41,6 +42,9 @@ urlpatterns = [
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
     
+    # Prometheus metrics (cache, request and SQL timings)
+    path('metrics', metrics_endpoint, name='metrics'),
+    
     # Frontend URLs (keep existing)
     path('', include('frontend.urls')),
 ]
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'vessel_sales.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.CACHE_WARMUP_ON_STARTUP:
+    from frontend.utils.cache_warming import CacheWarmer
+    CacheWarmer.warm_in_background(delay=settings.CACHE_WARMUP_DELAY)